@@ -1,8 +1,119 @@
 import sqlite3  # Встроенная библиотека для работы с SQL-базами данных
+import json  # Компактная запись версий в истории изменений
 from datetime import datetime  # Для работы с текущим временем и датами рождений
-# Библиотека для операций с файлами (нужна для резервного копирования)
-import shutil
 import os  # Библиотека для работы с путями и файловой системой
+import time  # Пауза между повторами при занятой другим процессом базе
+from contextlib import contextmanager  # Для контекстного менеджера транзакций
+from collections import namedtuple  # Для описания уведомлений об изменениях
+
+from .diagnostics import QueryProfiler  # Профилирование запросов
+from .migrations import Migrator  # Версии схемы и фоновое заполнение данных
+from .replica import ReplicaConnection  # Режим чтения из памяти
+from .search_index import SearchIndex, SEARCH_COLUMNS, search_index_available  # Поиск подстрок в памяти
+from .tags import TagBitmaps, TagFilter, ids_from_bitmap, normalize_tag  # Теги и фильтр по ним
+from .smart_groups import SmartGroups  # Сохраненные поиски с материализованным составом
+from .query_syntax import (compile_query, Condition, Lookup,  # Язык запросов строки поиска
+                           TEXT_COLUMNS, BIRTH_DAY_KEY, date_range_condition, birthday_condition)
+
+# Ключи для сортировки ФИО, поиска с учетом раскладки/транслита и нечеткого поиска
+from .text_keys import (name_sort_key, name_keys, query_key_variants,
+                        trigrams, phonetic_key, word_list, similarity,
+                        timestamp_key, birth_key)
+
+
+# Порядок полей, в котором UI передает данные контакта в add_contact/update_contact
+CONTACT_FIELDS = (
+    "last_name", "first_name", "patronymic",
+    "phone_primary", "phone_secondary", "email", "address",
+    "social_network_1", "social_nickname_1", "social_link_1",
+    "social_network_2", "social_nickname_2", "social_link_2",
+    "social_network_3", "social_nickname_3", "social_link_3",
+    "notes", "category", "birth_date",
+)
+
+# Вычисляемые колонки: хранятся в contacts, пересчитываются при каждой записи.
+# Добавляются в конец таблицы, поэтому индексы старых колонок (row[0..21]) не меняются.
+DERIVED_COLUMNS = (
+    ("name_sort_key", "TEXT"),
+    ("name_phonetic", "TEXT"),
+)
+
+# Даты целыми числами: сортировка и диапазоны — по индексам этих колонок.
+# Текстовые date_added, date_modified, birth_date остаются для показа.
+# Добавляются после category_id (row[25..27])
+DATE_KEY_COLUMNS = (
+    ("added_ts", "INTEGER"),      # Секунды (text_keys.timestamp_key)
+    ("modified_ts", "INTEGER"),
+    ("birth_ymd", "INTEGER"),     # ГГГГММДД (text_keys.birth_key)
+)
+
+# Категории — справочник categories с целыми ключами. Контакт ссылается
+# на категорию колонкой category_id, а в строках выборок (представление
+# contact_rows) и в данных формы по-прежнему видно имя категории (row[20]).
+# Категория DEFAULT_CATEGORY_ID ("Не распределён") не удаляется
+DEFAULT_CATEGORY_ID = 1
+DEFAULT_CATEGORIES = ("Не распределён", "Работа", "Семья", "Друзья",
+                      "Знакомые", "Клиенты", "Учеба", "Избранное")
+
+# Поля контакта, которые хранятся в другой колонке contacts
+STORED_COLUMNS = {"category": "category_id"}
+
+# Уведомление об изменении данных для подписчиков (см. Database.add_listener).
+# table — "contacts" или "saved_notes"; action — "insert" / "update" / "delete";
+# ids — список ID (None = затронуты все записи); fields — множество
+# измененных колонок (None = все колонки); external — изменение сделано
+# другим соединением (второе окно, скрипт) и найдено в журнале change_log.
+ChangeEvent = namedtuple("ChangeEvent", ["table", "action", "ids", "fields", "external"],
+                         defaults=(False,))
+
+# Несколько окон/процессов с одним файлом БД: сколько ждать чужую блокировку
+# и сколько раз повторять BEGIN/COMMIT, если SQLite все же ответил "database is locked"
+BUSY_TIMEOUT_MS = 2000
+LOCK_RETRIES = 3
+LOCK_RETRY_DELAY = 0.05  # Секунды; удваивается с каждой попыткой
+
+# Журнал изменений строк (change_log): таблица -> колонки, изменение которых
+# записывается. Вычисляемые колонки contacts в журнал не попадают.
+LOGGED_TABLES = {
+    "contacts": CONTACT_FIELDS,
+    "saved_notes": ("title", "content", "created_at"),
+    "tags": ("name",),
+    "categories": ("name", "position"),
+    "saved_searches": ("name", "query"),
+}
+# Порядок рассылки чужих изменений и срок хранения записей журнала.
+# Внешняя задача, отставшая больше чем на срок хранения, делает полную пересинхронизацию
+CHANGE_ACTIONS = ("insert", "update", "delete")
+CHANGE_LOG_KEEP_DAYS = 30
+
+# Запись журнала изменений (см. Database.get_changes).
+# columns — frozenset измененных колонок (None — вставка/удаление, затронута вся строка)
+ChangeRecord = namedtuple(
+    "ChangeRecord", ["seq", "table", "action", "row_id", "columns", "changed_at"])
+
+# Нечеткий поиск: сколько результатов показывать и сколько кандидатов оценивать
+FUZZY_LIMIT = 100
+FUZZY_CANDIDATES = 400
+# Ограничение суммарной длины списков триграмм, которые читаются на один запрос.
+# Самые частые триграммы ("ова", "ов ") отбрасываются, если редких хватает.
+FUZZY_MAX_POSTINGS = 100000
+
+# История правок: каждая N-я версия контакта хранится полным снимком,
+# остальные — только измененными полями
+HISTORY_SNAPSHOT_EVERY = 10
+
+# Версия контакта в истории (см. Database.get_contact_history).
+# changes — {поле: (старое значение, новое значение)}
+HistoryEntry = namedtuple("HistoryEntry", ["version", "changed_at", "changes"])
+
+# Размер порции при чтении фото из BLOB
+PHOTO_CHUNK_SIZE = 64 * 1024
+
+# Сколько заметок читать за один запрос списка (get_notes_page)
+NOTES_PAGE_SIZE = 200
+
+# Сколько контактов читать за один запрос при экспорте (iter_contacts)
+EXPORT_CHUNK_SIZE = 1000
 
 
 class Database:
@@ -11,12 +122,24 @@ class Database:
     Инкапсулирует (скрывает) SQL-запросы внутри методов Python.
     """
 
-    def __init__(self, db_file="contacts.db"):
+    def __init__(self, db_file="contacts.db", in_memory=False):
         # Имя файла базы данных
         self.db_file = db_file
 
-        # Устанавливаем соединение с файлом БД
-        self.connection = sqlite3.connect(db_file)
+        # Устанавливаем соединение с файлом БД.
+        # timeout — сколько ждать, пока другой процесс держит блокировку записи
+        self.connection = sqlite3.connect(db_file, timeout=BUSY_TIMEOUT_MS / 1000)
+        # WAL: читатели не блокируют писателя и наоборот — важно, когда
+        # с базой одновременно работают несколько окон приложения
+        try:
+            self.connection.execute("PRAGMA journal_mode=WAL")
+        except sqlite3.Error:
+            pass  # Например, база только для чтения — работаем в обычном режиме
+        # Реплика в памяти: поиск и чтения из RAM, записи — в файл и в память
+        self.replica = None
+        if in_memory:
+            self.replica = ReplicaConnection(self.connection)
+            self.connection = self.replica
 
         # Создаем кастомную SQL-функцию 'py_lower'.
         # SQLite "из коробки" плохо умеет делать lower() для кириллицы.
@@ -27,11 +150,57 @@ class Database:
         # Курсор — это инструмент, который выполняет SQL-запросы и получает результаты
         self.cursor = self.connection.cursor()
 
+        # Состояние транзакций: глубина вложенности transaction()
+        self._tx_depth = 0
+        # Групповой commit (по умолчанию выключен — каждый метод фиксирует сразу)
+        self._group_commit_ms = 0
+        self._scheduler = None
+        self._commit_pending = False
+
+        # Профилировщик запросов (включается через enable_profiling)
+        self.profiler = None
+        # Индекс подстрочного поиска в памяти (включается через enable_search_index)
+        self.search_index = None
+
+        # Подписчики на изменения данных и уведомления, ждущие конца транзакции
+        self._listeners = []
+        self._pending_events = []
+        # Битовые карты тегов для фильтра (строятся при первом фильтре по тегам)
+        self.tags = TagBitmaps(self.connection)
+        self.add_listener(self.tags.on_change)
+        # Умные группы: состав догоняет каждую запись (в том числе чужую)
+        self.groups = SmartGroups(self)
+        self.add_listener(self.groups.on_change)
+
         # При старте сразу проверяем, созданы ли таблицы
         self.create_tables()
+        # Версионные шаги схемы (быстро); долгое заполнение данных
+        # выполняется потом в фоне: self.migrations.run()
+        self.migrations = Migrator(self)
+        try:
+            self.migrations.upgrade()
+        except sqlite3.Error:
+            # Без новых таблиц и колонок методы ниже работать не смогут
+            self.connection.close()
+            raise
+        self._prepare_connection()
+
+        # Синхронизация с другими соединениями (см. poll_changes):
+        # последняя просмотренная запись журнала и счетчик чужих commit
+        self._log_seq = 0
+        self._data_version = None
+        try:
+            self.cursor.execute("SELECT COALESCE(MAX(seq), 0) FROM change_log")
+            self._log_seq = self.cursor.fetchone()[0]
+            self._data_version = self._read_data_version()
+        except sqlite3.Error as e:
+            print(f"Ошибка БД: {e}")
 
     def create_tables(self):
-        """Создает структуру таблиц, если они еще не существуют."""
+        """
+        Создает исходные таблицы (схема версии 0), если их еще нет.
+        Все, что появилось позже, создают версионные шаги (app/migrations.py).
+        """
 
         # SQL-запрос для основной таблицы контактов
         # AUTOINCREMENT делает так, чтобы id сам увеличивался (1, 2, 3...)
@@ -77,33 +246,888 @@ class Database:
             self.cursor.execute(query_contacts)
             self.cursor.execute(query_notes)
             # Фиксируем изменения в файле (Commit)
+            self._commit()
+        except sqlite3.Error as e:
+            print(f"Ошибка БД: {e}")
+
+    def _create_name_keys(self):
+        """
+        Вычисляемые колонки ФИО и служебные таблицы поиска по имени
+        (ключи транслита, фонетический ключ).
+        """
+        # В старых файлах БД вычисляемых колонок еще нет — добавляем
+        self._add_missing_columns("contacts", DERIVED_COLUMNS)
+        # Индекс для сортировки по ФИО (ORDER BY идет по индексу, без сортировки в памяти)
+        self.cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_contacts_name_sort ON contacts(name_sort_key)")
+        # Ключи слов ФИО (транслит) для поиска с перепутанной раскладкой.
+        # WITHOUT ROWID: ключи лежат в самом B-дереве, поиск по префиксу — диапазон индекса.
+        self.cursor.execute("""
+        CREATE TABLE IF NOT EXISTS contact_name_keys (
+            key TEXT NOT NULL,
+            contact_id INTEGER NOT NULL,
+            PRIMARY KEY (key, contact_id)
+        ) WITHOUT ROWID
+        """)
+        self.cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_name_keys_contact ON contact_name_keys(contact_id)")
+        # При удалении контакта его ключи удаляются автоматически
+        self.cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_contacts_delete_name_keys
+        AFTER DELETE ON contacts
+        BEGIN
+            DELETE FROM contact_name_keys WHERE contact_id = OLD.id;
+        END
+        """)
+        # Нечеткий поиск: фонетический ключ фамилии (триграммы — см. _create_fuzzy_index)
+        self.cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_contacts_name_phonetic ON contacts(name_phonetic)")
+
+    def _create_fuzzy_index(self):
+        """
+        Триграммы нечеткого поиска (ФИО и имя ящика email) — индекс FTS5
+        с токенизатором trigram. Слова контакта хранятся одной строкой
+        в contact_fuzzy_words (external content), сам индекс держат в актуальном
+        состоянии триггеры. Удаление контакта — удаление одной строки слов
+        и одна запись 'delete' в FTS, а не десятки строк отдельной таблицы
+        триграмм со вторичным индексом. Без токенизатора trigram (SQLite
+        старше 3.34) кандидаты ищутся только по фонетическому ключу.
+        """
+        self.cursor.execute("""
+        CREATE TABLE IF NOT EXISTS contact_fuzzy_words (
+            contact_id INTEGER PRIMARY KEY,
+            words TEXT NOT NULL
+        )
+        """)
+        self.cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_contacts_delete_fuzzy_words
+        AFTER DELETE ON contacts
+        BEGIN
+            DELETE FROM contact_fuzzy_words WHERE contact_id = OLD.id;
+        END
+        """)
+        try:
+            # detail='none': нужны только номера строк, позиции триграмм не хранятся
+            self.cursor.execute("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS contact_fuzzy USING fts5(
+                words, content='contact_fuzzy_words', content_rowid='contact_id',
+                tokenize='trigram', detail='none')
+            """)
+        except sqlite3.OperationalError:
+            self.fuzzy_fts = False
+            return
+        self.fuzzy_fts = True
+        delete = "INSERT INTO contact_fuzzy (contact_fuzzy, rowid, words) " \
+                 "VALUES ('delete', OLD.contact_id, OLD.words);"
+        insert = "INSERT INTO contact_fuzzy (rowid, words) VALUES (NEW.contact_id, NEW.words);"
+        for action, body in (("insert", insert), ("delete", delete), ("update", delete + insert)):
+            self.cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_contact_fuzzy_words_{action}
+            AFTER {action.upper()} ON contact_fuzzy_words
+            BEGIN
+                {body}
+            END
+            """)
+
+    def _create_photos(self):
+        """Таблица фотографий контактов."""
+        # Фотографии — отдельная таблица: запросы списка контактов BLOB не читают.
+        # contact_id — это rowid, поэтому фото читается по частям через blobopen
+        self.cursor.execute("""
+        CREATE TABLE IF NOT EXISTS contact_photos (
+            contact_id INTEGER PRIMARY KEY,
+            size INTEGER NOT NULL,
+            updated_at TEXT NOT NULL,
+            photo BLOB NOT NULL
+        )
+        """)
+        self.cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_contacts_delete_photos
+        AFTER DELETE ON contacts
+        BEGIN
+            DELETE FROM contact_photos WHERE contact_id = OLD.id;
+        END
+        """)
+
+    def _create_history(self):
+        """Таблица истории правок контактов."""
+        # История правок: дельты измененных полей и периодические полные снимки.
+        # Отдельная таблица — запросы списка контактов ее не читают
+        self.cursor.execute("""
+        CREATE TABLE IF NOT EXISTS contact_history (
+            contact_id INTEGER NOT NULL,
+            version INTEGER NOT NULL,
+            changed_at INTEGER NOT NULL,
+            is_snapshot INTEGER NOT NULL,
+            data TEXT NOT NULL,
+            PRIMARY KEY (contact_id, version)
+        ) WITHOUT ROWID
+        """)
+        self.cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_contacts_delete_history
+        AFTER DELETE ON contacts
+        BEGIN
+            DELETE FROM contact_history WHERE contact_id = OLD.id;
+        END
+        """)
+
+    def _create_categories(self):
+        """
+        Справочник категорий. contact_count — кэш числа контактов в категории,
+        его поддерживают триггеры, поэтому статистика не сканирует contacts.
+        Переименование меняет одну строку справочника.
+        """
+        self.cursor.execute("""
+        CREATE TABLE IF NOT EXISTS categories (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            name_key TEXT NOT NULL UNIQUE,
+            position INTEGER NOT NULL DEFAULT 0,
+            contact_count INTEGER NOT NULL DEFAULT 0
+        )
+        """)
+        self.cursor.execute("SELECT EXISTS (SELECT 1 FROM categories)")
+        if not self.cursor.fetchone()[0]:
+            self.cursor.executemany(
+                "INSERT INTO categories (id, name, name_key, position) VALUES (?, ?, ?, ?)",
+                [(i, name, name.lower(), i) for i, name in enumerate(DEFAULT_CATEGORIES, DEFAULT_CATEGORY_ID)])
+        # Старая текстовая колонка category остается в файле, но больше не пишется
+        self._add_missing_columns(
+            "contacts", (("category_id", "INTEGER REFERENCES categories(id)"),))
+        self.cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_contacts_category ON contacts(category_id)")
+        counters = {
+            "insert": ("INSERT ON contacts WHEN NEW.category_id IS NOT NULL",
+                       "contact_count + 1 WHERE id = NEW.category_id"),
+            "delete": ("DELETE ON contacts WHEN OLD.category_id IS NOT NULL",
+                       "contact_count - 1 WHERE id = OLD.category_id"),
+        }
+        for action, (event, change) in counters.items():
+            self.cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_contacts_count_{action}
+            AFTER {event}
+            BEGIN
+                UPDATE categories SET contact_count = {change};
+            END
+            """)
+        self.cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_contacts_count_update
+        AFTER UPDATE OF category_id ON contacts
+        WHEN OLD.category_id IS NOT NEW.category_id
+        BEGIN
+            UPDATE categories SET contact_count = contact_count - 1 WHERE id = OLD.category_id;
+            UPDATE categories SET contact_count = contact_count + 1 WHERE id = NEW.category_id;
+        END
+        """)
+
+    def _create_date_keys(self):
+        """
+        Целые колонки дат и их индексы: сортировка по дате и фильтры
+        "добавлен / изменен в диапазоне", "родился в годах" — диапазоны индекса.
+        День рождения без года — индекс по выражению ММДД (для bday: и дашборда).
+        """
+        self._add_missing_columns("contacts", DATE_KEY_COLUMNS)
+        for name, expression in (("added_ts", "added_ts"), ("modified_ts", "modified_ts"),
+                                 ("birth_ymd", "birth_ymd"), ("birth_md", BIRTH_DAY_KEY)):
+            self.cursor.execute(
+                f"CREATE INDEX IF NOT EXISTS idx_contacts_{name} ON contacts({expression})")
+
+    def _create_contact_rows_view(self):
+        """
+        Представление contact_rows: строки contacts в прежнем порядке колонок,
+        но вместо текста категории — имя из справочника (пока фоновая миграция
+        не заполнила category_id, показывается старый текст).
+        Все выборки строк контактов идут через него.
+        """
+        self.cursor.execute("PRAGMA table_info(contacts)")
+        columns = ", ".join(
+            "COALESCE(k.name, c.category) AS category" if row[1] == "category" else f"c.{row[1]}"
+            for row in self.cursor.fetchall())
+        sql = (f"CREATE VIEW contact_rows AS SELECT {columns} "
+               "FROM contacts c LEFT JOIN categories k ON k.id = c.category_id")
+        self.cursor.execute("SELECT sql FROM sqlite_master WHERE type = 'view' AND name = 'contact_rows'")
+        row = self.cursor.fetchone()
+        # Пересоздается только после добавления колонок (меняет схему для всех соединений)
+        if row is None or row[0] != sql:
+            self.cursor.execute("DROP VIEW IF EXISTS contact_rows")
+            self.cursor.execute(sql)
+
+    def _create_tag_tables(self):
+        """
+        Теги: имена задает пользователь, у контакта их может быть сколько угодно.
+        name_key — имя в нижнем регистре: "Работа" и "работа" — один тег
+        (COLLATE NOCASE кириллицу не различает).
+        """
+        self.cursor.execute("""
+        CREATE TABLE IF NOT EXISTS tags (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            name_key TEXT NOT NULL UNIQUE
+        )
+        """)
+        self.cursor.execute("""
+        CREATE TABLE IF NOT EXISTS contact_tags (
+            contact_id INTEGER NOT NULL,
+            tag_id INTEGER NOT NULL,
+            PRIMARY KEY (contact_id, tag_id)
+        ) WITHOUT ROWID
+        """)
+        self.cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_contact_tags_tag ON contact_tags(tag_id, contact_id)")
+        for table, column in (("contacts", "contact_id"), ("tags", "tag_id")):
+            self.cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_delete_contact_tags
+            AFTER DELETE ON {table}
+            BEGIN
+                DELETE FROM contact_tags WHERE {column} = OLD.id;
+            END
+            """)
+
+    def _create_saved_searches(self):
+        """
+        Сохраненные поиски (умные группы, см. app/smart_groups.py) и их состав.
+        synced_seq — до какой записи журнала изменений состав уже проверен,
+        evaluated_on — дата расчета (для условий вида "modified:last-30d").
+        """
+        self.cursor.execute("""
+        CREATE TABLE IF NOT EXISTS saved_searches (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            query TEXT NOT NULL,
+            search_mode TEXT NOT NULL DEFAULT 'smart',
+            member_count INTEGER NOT NULL DEFAULT 0,
+            synced_seq INTEGER NOT NULL DEFAULT 0,
+            evaluated_on TEXT
+        )
+        """)
+        self.cursor.execute("""
+        CREATE TABLE IF NOT EXISTS saved_search_members (
+            search_id INTEGER NOT NULL,
+            contact_id INTEGER NOT NULL,
+            PRIMARY KEY (search_id, contact_id)
+        ) WITHOUT ROWID
+        """)
+        self.cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_saved_search_members_contact ON saved_search_members(contact_id)")
+        self.cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_saved_searches_delete_members
+        AFTER DELETE ON saved_searches
+        BEGIN
+            DELETE FROM saved_search_members WHERE search_id = OLD.id;
+        END
+        """)
+        # Удаленный контакт уходит из всех групп сразу, счетчики остаются точными
+        self.cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_contacts_delete_members
+        AFTER DELETE ON contacts
+        BEGIN
+            UPDATE saved_searches SET member_count = member_count - 1
+            WHERE id IN (SELECT search_id FROM saved_search_members WHERE contact_id = OLD.id);
+            DELETE FROM saved_search_members WHERE contact_id = OLD.id;
+        END
+        """)
+
+    def _create_notes_search(self):
+        """
+        Индекс заметок по дате (список — постранично с конца, без сортировки)
+        и полнотекстовый индекс FTS5 по названию и тексту. Сам текст хранится
+        только в saved_notes (external content), индекс держат в актуальном
+        состоянии триггеры. Без FTS5 в сборке SQLite поиск идет через LIKE.
+        """
+        self.cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_saved_notes_created ON saved_notes(created_at, id)")
+        try:
+            self.cursor.execute("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS saved_notes_fts USING fts5(
+                title, content, content='saved_notes', content_rowid='id')
+            """)
+        except sqlite3.OperationalError:
+            self.notes_fts = False
+            return
+        self.notes_fts = True
+        delete = "INSERT INTO saved_notes_fts (saved_notes_fts, rowid, title, content) " \
+                 "VALUES ('delete', OLD.id, OLD.title, OLD.content);"
+        insert = "INSERT INTO saved_notes_fts (rowid, title, content) VALUES (NEW.id, NEW.title, NEW.content);"
+        for action, body in (("insert", insert), ("delete", delete), ("update", delete + insert)):
+            self.cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_saved_notes_fts_{action}
+            AFTER {action.upper()} ON saved_notes
+            BEGIN
+                {body}
+            END
+            """)
+
+    def _create_change_log(self):
+        """
+        Журнал изменений строк (change data capture): номер записи (seq)
+        растет монотонно, поэтому внешние задачи — экспорт, синхронизация,
+        индексация — читают только новые записи (get_changes), а не всю таблицу.
+        Записи добавляют триггеры, поэтому в журнал попадают изменения
+        любого писателя, в том числе сторонних скриптов.
+        """
+        self.cursor.execute("""
+        CREATE TABLE IF NOT EXISTS change_log (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            table_name TEXT NOT NULL,
+            action TEXT NOT NULL,
+            row_id INTEGER NOT NULL,
+            changed_at TEXT NOT NULL DEFAULT (datetime('now', 'localtime')),
+            changed_columns TEXT
+        )
+        """)
+        self.cursor.execute("PRAGMA table_info(change_log)")
+        if "changed_columns" not in {row[1] for row in self.cursor.fetchall()}:
+            # Журнал из прошлой версии: колонки еще нет, триггеры UPDATE ее не заполняют
+            self._add_missing_columns("change_log", (("changed_columns", "TEXT"),))
+            for table in LOGGED_TABLES:
+                self.cursor.execute(f"DROP TRIGGER IF EXISTS trg_{table}_log_update")
+
+        for table, columns in LOGGED_TABLES.items():
+            # Список измененных колонок через запятую; правка без изменений не логируется.
+            # Сравнивается колонка хранения (category_id), а пишется имя поля (category)
+            stored = {c: STORED_COLUMNS.get(c, c) if table == "contacts" else c for c in columns}
+            changed = " || ".join(
+                f"CASE WHEN OLD.{stored[c]} IS NOT NEW.{stored[c]} THEN '{c},' ELSE '' END" for c in columns)
+            differs = " OR ".join(f"OLD.{stored[c]} IS NOT NEW.{stored[c]}" for c in columns)
+            events = {
+                "insert": ("INSERT", "NEW", "NULL"),
+                # UPDATE OF: служебные UPDATE вычисляемых колонок не логируются
+                "update": (f"UPDATE OF {', '.join(stored.values())} ON {table} WHEN {differs}",
+                           "NEW", f"rtrim({changed}, ',')"),
+                "delete": ("DELETE", "OLD", "NULL"),
+            }
+            for action, (event, ref, columns_sql) in events.items():
+                if action != "update":
+                    event = f"{event} ON {table}"
+                self.cursor.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS trg_{table}_log_{action}
+                AFTER {event}
+                BEGIN
+                    INSERT INTO change_log (table_name, action, row_id, changed_columns)
+                    VALUES ('{table}', '{action}', {ref}.id, {columns_sql});
+                END
+                """)
+        # Теги контакта (contact_tags) пишутся как правка контакта с колонкой "tags":
+        # другие окна перечитают теги только этих контактов. Удаление связи
+        # вместе с самим контактом не пишется — в журнале уже есть удаление контакта
+        # Так же фото (колонка "photo"): от него зависят умные группы с has:photo
+        for table, column in (("contact_tags", "tags"), ("contact_photos", "photo")):
+            for action, ref in (("insert", "NEW"), ("delete", "OLD")):
+                self.cursor.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS trg_{table}_log_{action}
+                AFTER {action.upper()} ON {table}
+                WHEN EXISTS (SELECT 1 FROM contacts WHERE id = {ref}.contact_id)
+                BEGIN
+                    INSERT INTO change_log (table_name, action, row_id, changed_columns)
+                    VALUES ('contacts', 'update', {ref}.contact_id, '{column}');
+                END
+                """)
+
+    def _prepare_connection(self):
+        """
+        Настройка соединения после обновления схемы: схему файла не меняет.
+        Свои записи журнала помечаются во временной таблице соединения —
+        poll_changes не должен рассылать их повторно. Заодно удаляются
+        устаревшие записи журнала.
+        """
+        try:
+            self.cursor.execute(
+                "CREATE TEMP TABLE IF NOT EXISTS own_changes (seq INTEGER PRIMARY KEY)")
+            self.cursor.execute("""
+            CREATE TEMP TRIGGER IF NOT EXISTS trg_own_changes
+            AFTER INSERT ON main.change_log
+            BEGIN
+                INSERT INTO own_changes (seq) VALUES (NEW.seq);
+            END
+            """)
+            # Индексы FTS5 создают шаги миграции, если сборка SQLite их поддерживает
+            self.cursor.execute(
+                "SELECT EXISTS (SELECT 1 FROM sqlite_master WHERE name = 'saved_notes_fts')")
+            self.notes_fts = bool(self.cursor.fetchone()[0])
+            self.cursor.execute(
+                "SELECT EXISTS (SELECT 1 FROM sqlite_master WHERE name = 'contact_fuzzy')")
+            self.fuzzy_fts = bool(self.cursor.fetchone()[0])
+            self._delete_old_changes(CHANGE_LOG_KEEP_DAYS)
+            self._commit()
+        except sqlite3.Error as e:
+            print(f"Ошибка БД: {e}")
+
+    def _add_missing_columns(self, table, columns):
+        """Добавляет в таблицу колонки, которых в ней еще нет (миграция старых файлов)."""
+        self.cursor.execute(f"PRAGMA table_info({table})")
+        existing = {row[1] for row in self.cursor.fetchall()}
+        for name, declaration in columns:
+            if name not in existing:
+                self.cursor.execute(
+                    f"ALTER TABLE {table} ADD COLUMN {name} {declaration}")
+
+    def _derived_fields(self, fields):
+        """Считает значения вычисляемых колонок по полям контакта."""
+        return {
+            "name_sort_key": name_sort_key(
+                fields["last_name"], fields["first_name"], fields["patronymic"]),
+            "name_phonetic": phonetic_key(fields["last_name"]),
+            "birth_ymd": birth_key(fields["birth_date"]),
+        }
+
+    def _write_derived(self, contact_id, fields):
+        """Сохраняет вычисляемые колонки и служебные таблицы одного контакта."""
+        derived = self._derived_fields(fields)
+        assignments = ", ".join(f"{name}=?" for name in derived)
+        self.cursor.execute(
+            f"UPDATE contacts SET {assignments} WHERE id=?",
+            list(derived.values()) + [contact_id])
+        self._index_contact(contact_id, fields)
+
+    def reindex_contacts(self, ids):
+        """Пересчитывает вычисляемые колонки и поисковые ключи контактов ids."""
+        ids = list(ids)
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            self.cursor.execute(
+                f"SELECT id, {', '.join(CONTACT_FIELDS)} FROM contact_rows "
+                f"WHERE id IN ({', '.join('?' for _ in chunk)})", chunk)
+            for row in self.cursor.fetchall():
+                self._write_derived(row[0], dict(zip(CONTACT_FIELDS, row[1:])))
+
+    def fill_date_keys(self, ids):
+        """Задача миграции: целые колонки дат для записей из старых версий."""
+        placeholders = ", ".join("?" for _ in ids)
+        self.cursor.execute(
+            f"SELECT id, date_added, date_modified, birth_date FROM contacts WHERE id IN ({placeholders})", ids)
+        self.cursor.executemany(
+            "UPDATE contacts SET added_ts = ?, modified_ts = ?, birth_ymd = ? WHERE id = ?",
+            [(timestamp_key(added), timestamp_key(modified), birth_key(born), contact_id)
+             for contact_id, added, modified, born in self.cursor.fetchall()])
+
+    def _index_contact(self, contact_id, fields):
+        """Перестраивает поисковые ключи контакта в служебных таблицах."""
+        self.cursor.execute(
+            "DELETE FROM contact_name_keys WHERE contact_id = ?", (contact_id,))
+        keys = name_keys(fields["last_name"],
+                         fields["first_name"], fields["patronymic"])
+        self.cursor.executemany(
+            "INSERT OR IGNORE INTO contact_name_keys (key, contact_id) VALUES (?, ?)",
+            [(key, contact_id) for key in keys])
+
+        if self.fuzzy_fts:
+            # Не INSERT OR REPLACE: замена строки не вызывает триггер удаления,
+            # и старые триграммы остались бы в индексе FTS
+            self.cursor.execute(
+                "DELETE FROM contact_fuzzy_words WHERE contact_id = ?", (contact_id,))
+            self.cursor.execute(
+                "INSERT INTO contact_fuzzy_words (contact_id, words) VALUES (?, ?)",
+                (contact_id, self._fuzzy_words(fields)))
+
+    @staticmethod
+    def _fuzzy_text(fields):
+        """Текст, по которому работает нечеткий поиск: ФИО и имя ящика email."""
+        email_local = (fields["email"] or "").split("@")[0]
+        return " ".join([fields["last_name"] or "", fields["first_name"] or "",
+                         fields["patronymic"] or "", email_local])
+
+    @classmethod
+    def _fuzzy_words(cls, fields):
+        """
+        Строка для индекса триграмм: слова в том же виде, что и у trigrams()
+        ("  иванов "), через "|" — триграммы на стыке слов запросу не встретятся.
+        """
+        return "|".join(f"  {word} " for word in word_list(cls._fuzzy_text(fields)))
+
+    # --- Транзакции ---
+
+    @contextmanager
+    def transaction(self):
+        """
+        Единица работы: все изменения внутри блока with фиксируются одним commit.
+        Вложенные блоки оформляются точками сохранения (SAVEPOINT), поэтому
+        ошибка во вложенном блоке откатывает только его изменения.
+
+        Пример:
+            with db.transaction():
+                db.add_contact(...)
+                db.delete_contacts([...])
+        """
+        if self._tx_depth == 0:
+            # Отложенный групповой commit фиксируем заранее, чтобы откат
+            # этой транзакции не зацепил чужие правки
+            if self.connection.in_transaction:
+                self._retry_locked(self.connection.commit)
+            # IMMEDIATE: блокировка записи берется сразу, а не посреди блока,
+            # где SQLite уже не может подождать другого писателя
+            self._retry_locked(lambda: self.cursor.execute("BEGIN IMMEDIATE"))
+        savepoint = f"sp_{self._tx_depth}"
+        if self._tx_depth > 0:
+            self.cursor.execute(f"SAVEPOINT {savepoint}")
+        # Уведомления блока копятся и рассылаются только после commit
+        events_mark = len(self._pending_events)
+        self._tx_depth += 1
+        try:
+            yield self
+        except BaseException:
+            self._tx_depth -= 1
+            # Откаченные изменения не должны дойти до подписчиков
+            del self._pending_events[events_mark:]
+            if self._tx_depth == 0:
+                self.connection.rollback()
+            else:
+                # Откатываем только вложенный блок, внешняя транзакция продолжается
+                self.cursor.execute(f"ROLLBACK TO {savepoint}")
+                self.cursor.execute(f"RELEASE {savepoint}")
+            raise
+        else:
+            self._tx_depth -= 1
+            if self._tx_depth == 0:
+                try:
+                    self._retry_locked(self.connection.commit)
+                except sqlite3.Error:
+                    self._pending_events.clear()
+                    self.connection.rollback()
+                    raise
+                events, self._pending_events = self._pending_events, []
+                for event in events:
+                    self._dispatch(event)
+            else:
+                self.cursor.execute(f"RELEASE {savepoint}")
+
+    @contextmanager
+    def _atomic(self):
+        """
+        Блок записи одного CRUD-метода: все его операторы (контакт, теги,
+        ключи поиска, история) применяются или откатываются вместе.
+        Внутри transaction() и без группового commit — обычный transaction().
+        При групповом commit — точка сохранения в транзакции, которая ждет
+        сброса на диск: ошибка откатывает только этот вызов, а успешные
+        правки других вызовов остаются и фиксируются в flush().
+        Уведомления блока рассылаются после его успешного завершения.
+        """
+        if self._tx_depth or not (self._group_commit_ms and self._scheduler):
+            with self.transaction():
+                yield self
+            return
+        opened = not self.connection.in_transaction
+        if opened:
+            self._retry_locked(lambda: self.cursor.execute("BEGIN IMMEDIATE"))
+        self.cursor.execute("SAVEPOINT sp_write")
+        self._tx_depth += 1
+        try:
+            yield self
+        except BaseException:
+            self._tx_depth -= 1
+            self._pending_events.clear()
+            # Некоторые ошибки (диск полон, прерывание) SQLite откатывает сам целиком
+            if self.connection.in_transaction:
+                self.cursor.execute("ROLLBACK TO sp_write")
+                self.cursor.execute("RELEASE sp_write")
+                if opened:
+                    # Других отложенных правок нет — освобождаем блокировку записи
+                    self.connection.rollback()
+            raise
+        self._tx_depth -= 1
+        self.cursor.execute("RELEASE sp_write")
+        self._commit()
+        events, self._pending_events = self._pending_events, []
+        for event in events:
+            self._dispatch(event)
+
+    def enable_group_commit(self, window_ms, scheduler):
+        """
+        Включает групповой commit: серия правок в течение window_ms
+        миллисекунд фиксируется одним сбросом на диск.
+        scheduler — функция вида root.after(ms, callback) из Tkinter.
+        """
+        self._group_commit_ms = window_ms
+        self._scheduler = scheduler
+
+    def _commit(self):
+        """
+        Commit для CRUD-методов.
+        Внутри transaction() ничего не делает — фиксирует внешний блок.
+        При включенном групповом commit откладывает фиксацию на окно.
+        """
+        if self._tx_depth:
+            return
+        if self._group_commit_ms and self._scheduler:
+            if not self._commit_pending:
+                self._commit_pending = True
+                self._scheduler(self._group_commit_ms, self.flush)
+            return
+        self._retry_locked(self.connection.commit)
+
+    def _rollback(self):
+        """
+        Откат после ошибки в методе из одного оператора (неудачный оператор
+        SQLite и так не оставляет следов). Методы из нескольких операторов
+        пишут внутри _atomic(). Внутри transaction() решение об откате
+        принимает внешний блок, а при отложенном групповом commit откат
+        стер бы чужие успешные правки.
+        """
+        if self._tx_depth or self._commit_pending:
+            return
+        self.connection.rollback()
+
+    def flush(self):
+        """Немедленно фиксирует отложенные групповым commit изменения."""
+        self._commit_pending = False
+        if self._tx_depth == 0 and self.connection.in_transaction:
+            self._retry_locked(self.connection.commit)
+
+    def _retry_locked(self, action):
+        """
+        Выполняет action(), повторяя его, если база занята другим процессом.
+        Обычно хватает ожидания busy_timeout; повтор нужен, когда SQLite
+        возвращает SQLITE_BUSY сразу, не дожидаясь освобождения блокировки.
+        """
+        delay = LOCK_RETRY_DELAY
+        for attempt in range(LOCK_RETRIES):
+            try:
+                return action()
+            except sqlite3.OperationalError as e:
+                message = str(e).lower()
+                if attempt == LOCK_RETRIES - 1 or ("locked" not in message and "busy" not in message):
+                    raise
+                time.sleep(delay)
+                delay *= 2
+
+    def close(self):
+        """Фиксирует отложенные изменения и закрывает соединение."""
+        self.flush()
+        self.connection.close()
+
+    # --- Диагностика ---
+
+    def enable_profiling(self, slow_ms=50):
+        """
+        Включает профилирование: таймеры методов, статистику SQL-запросов
+        и журнал медленных запросов. Отчет: self.profiler.report().
+        По умолчанию выключено — обертки и обработчики SQLite замедляют каждый вызов.
+        """
+        if self.profiler is None:
+            self.profiler = QueryProfiler(self, slow_ms=slow_ms)
+        if not self.profiler.attached:
+            self.profiler.attach()
+        return self.profiler
+
+    def disable_profiling(self):
+        """Выключает профилирование; собранный отчет остается в self.profiler."""
+        if self.profiler is not None and self.profiler.attached:
+            self.profiler.detach()
+
+    def enable_search_index(self):
+        """
+        Включает индекс подстрочного поиска в памяти (app/search_index.py):
+        поиск в get_contacts перестает вызывать py_lower на каждую строку.
+        Без numpy ничего не делает и возвращает None.
+        """
+        if self.search_index is None and search_index_available():
+            self.search_index = SearchIndex(self.connection)
+            self.search_index.build()
+            # Индекс обновляется по тем же уведомлениям, что и таблица в UI
+            self.add_listener(self.search_index.on_change)
+        return self.search_index
+
+    # --- Уведомления об изменениях ---
+
+    def add_listener(self, callback):
+        """
+        Подписка на изменения данных.
+        callback(event) получает ChangeEvent после каждой успешной записи
+        (внутри transaction() — после commit всего блока).
+        """
+        self._listeners.append(callback)
+
+    def remove_listener(self, callback):
+        """Отписка от изменений данных."""
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def _notify(self, table, action, ids=None, fields=None):
+        """Сообщает подписчикам об изменении (или откладывает до конца транзакции)."""
+        event = ChangeEvent(table, action, ids, fields)
+        if self._tx_depth:
+            self._pending_events.append(event)
+        else:
+            self._dispatch(event)
+
+    def poll_changes(self):
+        """
+        Находит изменения, сделанные другими соединениями (второе окно,
+        скрипт), и рассылает их подписчикам как ChangeEvent(..., external=True).
+        PRAGMA data_version меняется только после чужого commit, поэтому
+        частый опрос почти ничего не стоит. Возвращает число чужих изменений.
+        """
+        # Открытая транзакция видит старый снимок — проверим после commit
+        if self._tx_depth or self.connection.in_transaction:
+            return 0
+        try:
+            version = self._read_data_version()
+            if version == self._data_version:
+                return 0
+            self._data_version = version
+            # Записи удалены из журнала раньше, чем мы их прочли
+            missed = self._log_seq + 1 < self._change_log_floor()
+            self.cursor.execute("""
+                SELECT c.seq, c.table_name, c.action, c.row_id, c.changed_columns,
+                       o.seq IS NOT NULL
+                FROM change_log c LEFT JOIN temp.own_changes o ON o.seq = c.seq
+                WHERE c.seq > ? ORDER BY c.seq
+            """, (self._log_seq,))
+            rows = self.cursor.fetchall()
+            if rows:
+                self._log_seq = rows[-1][0]
+            self.cursor.execute(
+                "DELETE FROM temp.own_changes WHERE seq <= ?", (self._log_seq,))
             self.connection.commit()
         except sqlite3.Error as e:
             print(f"Ошибка БД: {e}")
+            return 0
+
+        if missed:
+            for table in LOGGED_TABLES:
+                self._dispatch(ChangeEvent(table, "update", None, None, True))
+            return len(rows)
+
+        changes = {}  # (таблица, действие) -> [ID без повторов, измененные колонки]
+        for _, table, action, row_id, columns, own in rows:
+            if own:
+                continue
+            entry = changes.setdefault((table, action), [{}, set()])
+            entry[0][row_id] = None
+            if entry[1] is not None:
+                entry[1] = entry[1] | set(columns.split(",")) if columns else None
+        for (table, action), (ids, fields) in sorted(
+                changes.items(), key=lambda item: CHANGE_ACTIONS.index(item[0][1])):
+            if action != "update":
+                fields = None
+            self._dispatch(ChangeEvent(table, action, list(ids), fields, True))
+        return sum(len(ids) for ids, _ in changes.values())
+
+    def _read_data_version(self):
+        """
+        Счетчик чужих commit (PRAGMA data_version).
+        У реплики в памяти его считает файл; копия в памяти при этом перечитывается.
+        """
+        if self.replica is not None:
+            self.replica.refresh_if_changed()
+            return self.replica.disk_version
+        self.cursor.execute("PRAGMA data_version")
+        return self.cursor.fetchone()[0]
+
+    # --- Журнал изменений для внешних задач ---
+
+    def get_change_cursor(self):
+        """
+        Текущая позиция журнала: с нее внешняя задача начинает читать
+        изменения после полной выгрузки данных.
+        """
+        self.cursor.execute("SELECT COALESCE(MAX(seq), 0) FROM change_log")
+        seq = self.cursor.fetchone()[0]
+        return max(seq, self._change_log_floor() - 1)
+
+    def get_changes(self, since=0, limit=1000, tables=None):
+        """
+        Записи журнала с номером больше since (не больше limit штук) — список ChangeRecord.
+        Следующий вызов: since = последний seq полученного списка.
+        None — нужные записи уже удалены при сжатии журнала:
+        задача должна заново выгрузить данные целиком и взять get_change_cursor().
+
+        Пример инкрементального экспорта:
+            changes = db.get_changes(cursor)
+            while changes:
+                ...
+                cursor = changes[-1].seq
+                changes = db.get_changes(cursor)
+        """
+        try:
+            if since + 1 < self._change_log_floor():
+                return None
+            where, params = "seq > ?", [since]
+            if tables:
+                where += f" AND table_name IN ({', '.join('?' for _ in tables)})"
+                params.extend(tables)
+            self.cursor.execute(
+                f"""SELECT seq, table_name, action, row_id, changed_columns, changed_at
+                    FROM change_log WHERE {where} ORDER BY seq LIMIT ?""",
+                params + [limit])
+            return [ChangeRecord(seq, table, action, row_id,
+                                 frozenset(columns.split(",")) if columns else None, changed_at)
+                    for seq, table, action, row_id, columns, changed_at in self.cursor.fetchall()]
+        except sqlite3.Error as e:
+            print(f"Ошибка БД: {e}")
+            return []
+
+    def compact_change_log(self, keep_days=CHANGE_LOG_KEEP_DAYS):
+        """
+        Сжатие журнала: удаляет записи старше keep_days дней, а из оставшихся —
+        повторные правки одной строки (остается последняя запись с объединенным
+        списком колонок). Читатели, отставшие дальше удаленного начала, получат
+        None из get_changes. Возвращает число удаленных записей.
+        """
+        try:
+            with self.transaction():
+                removed = self._delete_old_changes(keep_days)
+                # Несколько UPDATE одной строки подряд -> одна запись
+                self.cursor.execute("""
+                    SELECT table_name, row_id, group_concat(changed_columns), MAX(seq)
+                    FROM change_log WHERE action = 'update'
+                    GROUP BY table_name, row_id HAVING COUNT(*) > 1
+                """)
+                for table, row_id, columns, last_seq in self.cursor.fetchall():
+                    merged = ",".join(sorted(set(columns.split(","))))
+                    self.cursor.execute(
+                        "UPDATE change_log SET changed_columns = ? WHERE seq = ?",
+                        (merged, last_seq))
+                    self.cursor.execute(
+                        """DELETE FROM change_log WHERE table_name = ? AND row_id = ?
+                           AND action = 'update' AND seq < ?""",
+                        (table, row_id, last_seq))
+                    removed += self.cursor.rowcount
+            return removed
+        except sqlite3.Error as e:
+            print(f"Ошибка БД: {e}")
+            return 0
+
+    def _delete_old_changes(self, keep_days):
+        """Удаляет из журнала записи старше keep_days дней (всегда начало журнала)."""
+        self.cursor.execute("""
+            DELETE FROM change_log WHERE seq <= (
+                SELECT MAX(seq) FROM change_log
+                WHERE changed_at < datetime('now', 'localtime', ?))
+        """, (f"-{keep_days} days",))
+        return max(self.cursor.rowcount, 0)
+
+    def _change_log_floor(self):
+        """
+        Наименьший номер записи, который еще можно прочитать из журнала.
+        Для пустого журнала — следующий номер (из sqlite_sequence).
+        """
+        self.cursor.execute("""
+            SELECT COALESCE(
+                (SELECT MIN(seq) FROM change_log),
+                (SELECT seq + 1 FROM sqlite_sequence WHERE name = 'change_log'),
+                1)
+        """)
+        return self.cursor.fetchone()[0]
+
+    def _dispatch(self, event):
+        """Вызывает подписчиков; ошибка одного не мешает остальным и самой записи."""
+        for callback in list(self._listeners):
+            try:
+                callback(event)
+            except Exception as e:
+                print(f"Ошибка обработчика изменений: {e}")
 
     # --- Методы для работы с контактами (CRUD) ---
 
-    def add_contact(self, data):
-        """Добавляет новый контакт в базу."""
+    def add_contact(self, data, tags=None):
+        """Добавляет новый контакт в базу (tags — список имен тегов)."""
         # Получаем текущее время для полей date_added и date_modified
         current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
-        # Запрос с плейсхолдерами (?) для защиты от SQL-инъекций
-        query = """
-        INSERT INTO contacts (
-            last_name, first_name, patronymic, 
-            phone_primary, phone_secondary, email, address,
-            social_network_1, social_nickname_1, social_link_1,
-            social_network_2, social_nickname_2, social_link_2,
-            social_network_3, social_nickname_3, social_link_3,
-            notes, category, birth_date, date_added, date_modified
-        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """
-        # Формируем список значений: данные от пользователя + 2 временные метки
-        values = list(data) + [current_time, current_time]
         try:
-            self.cursor.execute(query, values)
-            self.connection.commit()
+            with self._atomic():
+                contact_id = self._insert_contact(
+                    dict(zip(CONTACT_FIELDS, data)), current_time, current_time, tags)
+                self._notify("contacts", "insert", [contact_id])
             return True, "Контакт успешно добавлен"
         except sqlite3.IntegrityError:
             # Сработает, если нарушена уникальность (например, такой ID уже есть)
@@ -111,124 +1135,554 @@ class Database:
         except sqlite3.Error as e:
             return False, f"Ошибка базы данных: {e}"
 
-    def update_contact(self, contact_id, data):
-        """Обновляет существующий контакт по ID."""
+    def add_contacts(self, records):
+        """
+        Пакетная вставка (импорт): records — словари {поле: значение}
+        с полями CONTACT_FIELDS, date_added, date_modified и "tags" (список имен),
+        как у iter_contacts. Даты из файла сохраняются, если они разобраны.
+        Вся порция — одна транзакция и одно уведомление подписчикам.
+        Возвращает число добавленных контактов.
+        """
+        current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        ids = []
+        with self.transaction():
+            for record in records:
+                fields = {name: record.get(name) or "" for name in CONTACT_FIELDS}
+                date_added = record.get("date_added")
+                if timestamp_key(date_added) is None:
+                    date_added = current_time
+                date_modified = record.get("date_modified")
+                if timestamp_key(date_modified) is None:
+                    date_modified = date_added
+                ids.append(self._insert_contact(fields, date_added, date_modified, record.get("tags")))
+            if ids:
+                self._notify("contacts", "insert", ids)
+        return len(ids)
+
+    def _insert_contact(self, fields, date_added, date_modified, tags=None):
+        """Вставляет контакт (без commit) вместе с ключами поиска и тегами. Возвращает ID."""
+        # Поля от пользователя + вычисляемые колонки + 2 временные метки
+        fields = dict(fields)
+        fields.update(self._derived_fields(fields))
+        fields["date_added"] = date_added
+        fields["date_modified"] = date_modified
+        fields["added_ts"] = timestamp_key(date_added)
+        fields["modified_ts"] = timestamp_key(date_modified)
+        fields.update(self._stored_category(fields["category"]))
+
+        # Запрос с плейсхолдерами (?) для защиты от SQL-инъекций
+        columns = ", ".join(fields)
+        placeholders = ", ".join("?" for _ in fields)
+        self.cursor.execute(
+            f"INSERT INTO contacts ({columns}) VALUES ({placeholders})", list(fields.values()))
+        contact_id = self.cursor.lastrowid
+        self._index_contact(contact_id, fields)
+        if tags:
+            self._write_contact_tags(contact_id, tags)
+        return contact_id
+
+    def iter_contacts(self, chunk_size=EXPORT_CHUNK_SIZE):
+        """
+        Все контакты порциями по возрастанию ID (экспорт): списки словарей
+        {поле: значение} с id, полями CONTACT_FIELDS, date_added, date_modified
+        и "tags" — списком имен тегов. Следующая порция читается по ID после
+        последнего, поэтому между порциями соединение свободно для других
+        запросов, а в памяти — только одна порция.
+        """
+        columns = ("id",) + CONTACT_FIELDS + ("date_added", "date_modified")
+        last_id = 0
+        while True:
+            self.cursor.execute(
+                f"SELECT {', '.join(columns)} FROM contact_rows WHERE id > ? ORDER BY id LIMIT ?",
+                (last_id, chunk_size))
+            rows = self.cursor.fetchall()
+            if not rows:
+                return
+            first_id, last_id = rows[0][0], rows[-1][0]
+            tags = {}
+            self.cursor.execute("""
+                SELECT ct.contact_id, t.name FROM contact_tags ct JOIN tags t ON t.id = ct.tag_id
+                WHERE ct.contact_id BETWEEN ? AND ? ORDER BY t.name_key""", (first_id, last_id))
+            for contact_id, name in self.cursor.fetchall():
+                tags.setdefault(contact_id, []).append(name)
+            yield [dict(zip(columns, row), tags=tags.get(row[0], [])) for row in rows]
+
+    def update_contact(self, contact_id, data, tags=None):
+        """Обновляет существующий контакт по ID (tags=None — теги не меняются)."""
         current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        query = """
-        UPDATE contacts SET
-            last_name=?, first_name=?, patronymic=?, 
-            phone_primary=?, phone_secondary=?, email=?, address=?,
-            social_network_1=?, social_nickname_1=?, social_link_1=?,
-            social_network_2=?, social_nickname_2=?, social_link_2=?,
-            social_network_3=?, social_nickname_3=?, social_link_3=?,
-            notes=?, category=?, birth_date=?, date_modified=?
-        WHERE id=?
-        """
-        # Значения: поля + дата изменения + ID для WHERE
-        values = list(data) + [current_time, contact_id]
+        fields = dict(zip(CONTACT_FIELDS, data))
         try:
-            self.cursor.execute(query, values)
-            self.connection.commit()
+            with self._atomic():
+                # Старые значения нужны, чтобы сообщить подписчикам, какие поля реально изменились
+                self.cursor.execute(
+                    f"SELECT {', '.join(CONTACT_FIELDS)}, date_modified FROM contact_rows WHERE id=?",
+                    (contact_id,))
+                old_row = self.cursor.fetchone()
+                changed = {name for name, old in zip(CONTACT_FIELDS, old_row or ())
+                           if (old or "") != (fields[name] or "")}
+                new_fields = dict(fields)
+                fields.update(self._derived_fields(fields))
+                fields["date_modified"] = current_time
+                fields["modified_ts"] = timestamp_key(current_time)
+                fields.update(self._stored_category(fields["category"]))
+                assignments = ", ".join(f"{name}=?" for name in fields)
+                query = f"UPDATE contacts SET {assignments} WHERE id=?"
+                # Значения: поля + дата изменения + ID для WHERE
+                values = list(fields.values()) + [contact_id]
+                self.cursor.execute(query, values)
+                self._index_contact(contact_id, fields)
+                if tags is not None and self._write_contact_tags(contact_id, tags):
+                    changed.add("tags")
+                if old_row and changed - {"tags"}:
+                    self._record_history(contact_id, dict(zip(CONTACT_FIELDS, old_row)),
+                                         old_row[-1], new_fields, current_time)
+                self._notify("contacts", "update", [contact_id], changed)
             return True, "Контакт успешно обновлен"
         except sqlite3.Error as e:
             return False, f"Ошибка базы данных: {e}"
 
     def update_single_field(self, contact_id, field, value):
         """Быстрое обновление одного поля (используется в контекстном меню)."""
-        current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         # Внимание: имя поля (field) подставляем через f-строку,
         # так как SQL не позволяет передавать имена колонок через ?
-        query = f"UPDATE contacts SET {field}=?, date_modified=? WHERE id=?"
+        # Поэтому пускаем только известные имена колонок.
+        if field not in CONTACT_FIELDS:
+            return False
+        current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        column = STORED_COLUMNS.get(field, field)
+        query = f"UPDATE contacts SET {column}=?, date_modified=?, modified_ts=? WHERE id=?"
         try:
-            self.cursor.execute(query, (value, current_time, contact_id))
-            self.connection.commit()
+            with self._atomic():
+                # Старые значения нужны для истории изменений
+                self.cursor.execute(
+                    f"SELECT {', '.join(CONTACT_FIELDS)}, date_modified FROM contact_rows WHERE id=?",
+                    (contact_id,))
+                row = self.cursor.fetchone()
+                stored = self._stored_category(value)[column] if field == "category" else value
+                self.cursor.execute(query, (stored, current_time, timestamp_key(current_time), contact_id))
+                if row:
+                    old_fields = dict(zip(CONTACT_FIELDS, row))
+                    new_fields = dict(old_fields, **{field: value})
+                    # Вычисляемые колонки зависят от полей — пересчитываем по новым данным
+                    self._write_derived(contact_id, new_fields)
+                    if (old_fields[field] or "") != (value or ""):
+                        self._record_history(contact_id, old_fields, row[-1], new_fields, current_time)
+                self._notify("contacts", "update", [contact_id], {field})
             return True
         except sqlite3.Error:
             return False
 
     def delete_contacts(self, ids_list):
-        """Удаляет список контактов по их ID."""
+        """
+        Удаляет список контактов по их ID.
+        Количество ID не ограничено: они складываются во временную таблицу,
+        поэтому лимит SQLite на число параметров (SQLITE_MAX_VARIABLE_NUMBER)
+        не мешает удалять хоть 100 000 записей одним запросом.
+        """
         if not ids_list:
             return
-        # Создаем строку вида "?, ?, ?" в зависимости от количества ID
-        placeholders = ', '.join('?' for _ in ids_list)
-        query = f"DELETE FROM contacts WHERE id IN ({placeholders})"
         try:
-            self.cursor.execute(query, ids_list)
-            self.connection.commit()
+            # Одна транзакция на всё удаление — один сброс на диск
+            with self._atomic():
+                self._stage_ids(ids_list)
+                self.cursor.execute(
+                    "DELETE FROM contacts WHERE id IN (SELECT id FROM temp.staged_ids)")
+                self._notify("contacts", "delete", list(ids_list))
             return True
-        except sqlite3.Error as e:
+        except sqlite3.Error:
             return False
 
+    def delete_contacts_by_filter(self, search_text="", category_filter="Все категории", search_mode="smart",
+                                  tag_filter=None, date_filter=None, saved_search=None):
+        """
+        Массовое удаление по условию (тем же, что и у поиска в get_contacts:
+        с теми же аргументами удаляются ровно показанные контакты).
+        Возвращает (успех, количество удаленных записей).
+        """
+        # Нечеткий поиск показывает top-k по похожести — удаляем именно их
+        fuzzy = search_mode == "fuzzy" and search_text and compile_query(search_text) is None
+        if not fuzzy:
+            where, params = self._build_filter(
+                search_text, category_filter, search_mode, tag_filter, date_filter, saved_search)
+        try:
+            with self._atomic():
+                # Сначала собираем ID (нужны подписчикам), затем удаляем их одним запросом
+                # (из contact_rows: имя категории — из справочника, как в выборке)
+                if fuzzy:
+                    ids = [row[0] for row in self.fuzzy_search(
+                        search_text, category_filter, tag_filter=tag_filter,
+                        date_filter=date_filter, saved_search=saved_search)]
+                else:
+                    self.cursor.execute(f"SELECT id FROM contact_rows WHERE {where}", params)
+                    ids = [row[0] for row in self.cursor.fetchall()]
+                self._stage_ids(ids)
+                self.cursor.execute(
+                    "DELETE FROM contacts WHERE id IN (SELECT id FROM temp.staged_ids)")
+                deleted = self.cursor.rowcount
+                if ids:
+                    self._notify("contacts", "delete", ids)
+            return True, deleted
+        except sqlite3.Error:
+            return False, 0
+
+    def _stage_ids(self, ids_list):
+        """Складывает ID во временную таблицу (живет только в этом соединении)."""
+        self.cursor.execute(
+            "CREATE TEMP TABLE IF NOT EXISTS staged_ids (id INTEGER PRIMARY KEY)")
+        self.cursor.execute("DELETE FROM temp.staged_ids")
+        # executemany передает по одному параметру на строку — лимита нет
+        self.cursor.executemany(
+            "INSERT OR IGNORE INTO temp.staged_ids (id) VALUES (?)",
+            ((int(i),) for i in ids_list))
+
     def clear_database(self):
         """Полная очистка всех таблиц (Опасно!)."""
         try:
-            self.cursor.execute("DELETE FROM contacts")
-            self.cursor.execute("DELETE FROM saved_notes")
-            self.connection.commit()
+            # Обе таблицы очищаются атомарно: либо всё, либо ничего
+            with self.transaction():
+                self.cursor.execute("DELETE FROM contacts")
+                self.cursor.execute("DELETE FROM saved_notes")
+                self.cursor.execute("DELETE FROM tags")
+                self._notify("contacts", "delete")
+                self._notify("saved_notes", "delete")
+                self._notify("tags", "delete")
             return True
         except sqlite3.Error:
             return False
 
     def get_contact_by_id(self, contact_id):
         """Получает полные данные одного контакта."""
-        query = "SELECT * FROM contacts WHERE id = ?"
+        query = "SELECT * FROM contact_rows WHERE id = ?"
         self.cursor.execute(query, (contact_id,))
         return self.cursor.fetchone()  # Возвращает кортеж (tuple) или None
 
-    def get_contacts(self, search_text="", category_filter="Все категории", sort_by="По ФИО (А-Я)"):
+    def get_contacts_by_ids(self, ids, search_text="", category_filter="Все категории", search_mode="smart",
+                            tag_filter=None, date_filter=None, saved_search=None):
+        """
+        Строки контактов из ids, подходящие под текущий поиск и фильтр.
+        Нужна для точечного обновления таблицы (без полной перезагрузки).
+        """
+        ids = list(ids)
+        where, params = self._build_filter(
+            search_text, category_filter, search_mode, tag_filter, date_filter, saved_search)
+        rows = []
+        # Порциями: число параметров запроса в SQLite ограничено
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            placeholders = ", ".join("?" for _ in chunk)
+            self.cursor.execute(
+                f"SELECT * FROM contact_rows WHERE id IN ({placeholders}) AND {where}",
+                chunk + params)
+            rows.extend(self.cursor.fetchall())
+        return rows
+
+    def get_contacts(self, search_text="", category_filter="Все категории", sort_by="По ФИО (А-Я)", search_mode="smart",
+                     tag_filter=None, date_filter=None, saved_search=None):
         """
         Главная функция выборки.
         Реализует поиск, фильтрацию и сортировку SQL-запросом.
+        search_mode: "exact" — только подстрока, "smart" — еще и ФИО,
+        набранные в другой раскладке или транслитом ("Bdfyjd", "Ivanov"),
+        "fuzzy" — поиск с опечатками (см. fuzzy_search).
+        tag_filter — TagFilter (app/tags.py) или None.
+        date_filter — DateRange (app/query_syntax.py) или None.
+        saved_search — ID умной группы (app/smart_groups.py) или None.
         """
-        # Начало запроса - всегда истинное условие 1=1, чтобы удобно добавлять AND
-        query = "SELECT * FROM contacts WHERE 1=1"
-        params = []
+        # Нечеткий поиск ранжирует по похожести, а не по выбранной сортировке
+        # (запрос с префиксами полей выполняется как обычно)
+        if search_mode == "fuzzy" and search_text and compile_query(search_text) is None:
+            return self.fuzzy_search(search_text, category_filter, tag_filter=tag_filter,
+                                     date_filter=date_filter, saved_search=saved_search)
 
-        # Логика поиска
-        if search_text:
-            # %текст% для поиска подстроки
-            search_pattern = f"%{search_text.lower()}%"
-            # Используем нашу функцию py_lower для поиска без учета регистра
-            query += """ AND (
-                py_lower(last_name) LIKE ? OR 
-                py_lower(first_name) LIKE ? OR 
-                phone_primary LIKE ? OR 
-                py_lower(email) LIKE ? OR 
-                py_lower(notes) LIKE ? OR 
-                py_lower(category) LIKE ?
-            )"""
-            # Добавляем паттерн поиска 6 раз (для каждого поля)
-            params.extend([search_pattern]*6)
-
-        # Логика фильтрации по категории
-        if category_filter != "Все категории":
-            query += " AND category = ?"
-            params.append(category_filter)
+        if saved_search is not None:
+            self.groups.sync()  # Условие группы могло устареть со сменой дня
+        where, params = self._build_filter(
+            search_text, category_filter, search_mode, tag_filter, date_filter, saved_search)
+        query = f"SELECT * FROM contact_rows WHERE {where}"
 
         # Логика сортировки (маппинг текста из UI в SQL команды)
         sort_map = {
-            "По ФИО (А-Я)": "last_name ASC, first_name ASC",
-            "По ФИО (Я-А)": "last_name DESC, first_name DESC",
-            "По дате добавления (новые)": "date_added DESC",
-            "По дате изменения (свежие)": "date_modified DESC",
-            "По дате изменения (старые)": "date_modified ASC",
+            # name_sort_key учитывает ё/е и регистр, id — последний "тай-брейк"
+            "По ФИО (А-Я)": "name_sort_key ASC, id ASC",
+            "По ФИО (Я-А)": "name_sort_key DESC, id DESC",
+            # Целые колонки дат с индексами (ORDER BY без сортировки в памяти)
+            "По дате добавления (новые)": "added_ts DESC, id DESC",
+            "По дате изменения (свежие)": "modified_ts DESC, id DESC",
+            "По дате изменения (старые)": "modified_ts ASC, id ASC",
             "По основному телефону": "phone_primary ASC",
             "По категории": "category ASC",
             "По email": "email ASC"
         }
-        order_clause = sort_map.get(sort_by, "last_name ASC")
+        order_clause = sort_map.get(sort_by, "name_sort_key ASC, id ASC")
         query += f" ORDER BY {order_clause}"
 
         self.cursor.execute(query, params)
         return self.cursor.fetchall()  # Возвращает список кортежей
 
+    def _build_filter(self, search_text="", category_filter="Все категории", search_mode="exact",
+                      tag_filter=None, date_filter=None, saved_search=None, row_check=False):
+        """
+        Собирает условие WHERE для поиска и фильтров по категории, тегам,
+        датам и умной группе. Используется и для выборки, и для массового удаления.
+        Строка поиска с синтаксисом (phone:900 -tag:архив, см. app/query_syntax.py)
+        разбирается в план, и каждое условие идет в свою колонку.
+        row_check=True — условие для проверки нескольких строк (умные группы):
+        без индексов в памяти, которые считают совпадения по всей базе.
+        """
+        # Начало условия - всегда истинное 1=1, чтобы удобно добавлять AND
+        where = "1=1"
+        params = []
+
+        # Логика поиска
+        if search_text:
+            plan = compile_query(search_text)
+            # Без синтаксиса — вся строка ищется во всех полях поиска
+            terms = plan if plan is not None else [Lookup("text", TEXT_COLUMNS, search_text, False)]
+            tag_include, tag_exclude = [], []
+            for term in terms:
+                if isinstance(term, Condition):
+                    sql, term_params = term.sql, list(term.params)
+                elif term.kind == "tag" and not row_check:
+                    (tag_exclude if term.negated else tag_include).append(term.value)
+                    continue
+                elif term.kind == "tag":
+                    sql = """EXISTS (SELECT 1 FROM contact_tags
+                        WHERE contact_id = contact_rows.id
+                        AND tag_id = (SELECT id FROM tags WHERE name_key = ?))"""
+                    term_params = [normalize_tag(term.value).lower()]
+                elif term.kind == "text":
+                    sql, term_params = self._text_condition(
+                        term.value, term.columns, search_mode, use_index=not row_check)
+                elif term.kind == "name":
+                    keys_sql, term_params = self._name_keys_subquery(term.value)
+                    sql = f"id IN ({keys_sql})" if keys_sql else "0"
+                else:
+                    sql, term_params = self._category_condition(term.value)
+                if term.negated:
+                    # NOT по пустой колонке (NULL) тоже должно подходить
+                    sql = f"NOT IFNULL(({sql}), 0)"
+                where += f" AND {sql}"
+                params.extend(term_params)
+            if tag_include or tag_exclude:
+                where, params = self._tag_condition(
+                    where, params, TagFilter(tuple(tag_include), tuple(tag_exclude)))
+
+        return self._list_filters(where, params, category_filter, tag_filter, date_filter, saved_search)
+
+    def _text_condition(self, text, columns=TEXT_COLUMNS, search_mode="exact", use_index=True):
+        """
+        Условие "подстрока text в одной из колонок columns" (без учета регистра).
+        При полном наборе колонок и режиме "smart" подходят еще и ФИО,
+        набранные в другой раскладке или транслитом.
+        use_index=False — без индекса подстрок в памяти.
+        """
+        keys_condition = ""
+        keys_params = []
+        if search_mode == "smart" and tuple(columns) == TEXT_COLUMNS:
+            keys_sql, keys_params = self._name_keys_subquery(text)
+            if keys_sql:
+                keys_condition = f" OR\n                id IN ({keys_sql})"
+        hits = None
+        if use_index and self.search_index and set(columns) <= set(SEARCH_COLUMNS):
+            hits = self.search_index.search(text, columns)
+        if hits is not None:
+            # Подстроку нашел индекс в памяти — в SQL только список ID
+            ids_sql, ids_params = self._ids_condition(hits.ids.tolist(), hits.negated)
+            return f"""(
+                {ids_sql}{keys_condition}
+            )""", ids_params + keys_params
+        # %текст% для поиска подстроки.
+        # Используем нашу функцию py_lower для поиска без учета регистра
+        # (телефон состоит из цифр — сравнивается как есть)
+        search_pattern = f"%{text.lower()}%"
+        likes = " OR \n                ".join(
+            f"{column} LIKE ?" if column.startswith("phone") else f"py_lower({column}) LIKE ?"
+            for column in columns)
+        return f"""(
+                {likes}{keys_condition}
+            )""", [search_pattern] * len(columns) + keys_params
+
+    def _list_filters(self, where, params, category_filter, tag_filter=None, date_filter=None,
+                      saved_search=None):
+        """Добавляет к условию фильтры по умной группе, категории, датам и тегам."""
+        # Состав группы уже посчитан — чтение по ключу saved_search_members
+        if saved_search is not None:
+            where += " AND id IN (SELECT contact_id FROM saved_search_members WHERE search_id = ?)"
+            params.append(saved_search)
+        if category_filter != "Все категории":
+            sql, category_params = self._category_condition(category_filter)
+            where += f" AND {sql}"
+            params.extend(category_params)
+        # Диапазон дат — диапазон индекса целой колонки (added_ts, modified_ts, birth_ymd)
+        condition = date_range_condition(date_filter) if date_filter else None
+        if condition is not None:
+            where += f" AND {condition.sql}"
+            params.extend(condition.params)
+        return self._tag_condition(where, params, tag_filter)
+
+    def _category_condition(self, name):
+        """
+        Условие "категория name": сравнение целых ключей по индексу.
+        Строки, до которых фоновая миграция еще не дошла, — по старому тексту.
+        """
+        return ("(category_id = ? OR (category_id IS NULL AND category = ?))",
+                [self._find_category(name), name])
+
+    def _tag_condition(self, where, params, tag_filter):
+        """Добавляет к условию фильтр по тегам (TagFilter или None)."""
+        # Теги: сочетание И/ИЛИ/НЕ считается по битовым картам в памяти
+        if tag_filter and (tag_filter.include or tag_filter.exclude):
+            bits, matched, total = self.tags.match(tag_filter)
+            if matched * 2 > total:
+                # Подошло больше половины — короче передать тех, кто не подошел
+                ids_sql, ids_params = self._ids_condition(
+                    ids_from_bitmap(self.tags.universe & ~bits), negated=True)
+            else:
+                ids_sql, ids_params = self._ids_condition(ids_from_bitmap(bits))
+            where += f" AND {ids_sql}"
+            params.extend(ids_params)
+
+        return where, params
+
+    @staticmethod
+    def _ids_condition(ids, negated=False):
+        """
+        Условие "id в списке" для списка, посчитанного в памяти.
+        Список передается одним параметром (JSON-массив): лимит числа
+        параметров не мешает, а без временной таблицы запрос остается чтением.
+        """
+        return (f"id {'NOT IN' if negated else 'IN'} (SELECT value FROM json_each(?))",
+                [json.dumps(ids)])
+
+    def _name_keys_subquery(self, search_text):
+        """
+        Подзапрос ID контактов, чьи слова ФИО начинаются с вариантов слов запроса
+        (перепутанная раскладка, транслит). Каждый вариант — диапазон по индексу
+        contact_name_keys, поэтому расширение запроса не добавляет сканирований таблицы.
+        Слова запроса объединяются через INTERSECT: "Ivanov Ivan" требует оба слова.
+        """
+        parts = []
+        params = []
+        for word in search_text.split():
+            ranges = []
+            for variant in sorted(query_key_variants(word)):
+                # Префикс "abc" = диапазон [abc, abd)
+                upper = variant[:-1] + chr(ord(variant[-1]) + 1)
+                ranges.append("(key >= ? AND key < ?)")
+                params.extend([variant, upper])
+            if ranges:
+                parts.append(
+                    f"SELECT contact_id FROM contact_name_keys WHERE {' OR '.join(ranges)}")
+        return " INTERSECT ".join(parts), params
+
+    def fuzzy_search(self, search_text, category_filter="Все категории", limit=FUZZY_LIMIT, tag_filter=None,
+                     date_filter=None, saved_search=None):
+        """
+        Поиск с опечатками по ФИО и email ("Иванв", "Петрова Ана").
+        1. Кандидаты: контакты с общими триграммами (по индексу FTS5 contact_fuzzy)
+           и контакты с тем же фонетическим ключом фамилии.
+        2. Ранжирование в Python только для кандидатов, результат — top-k.
+        """
+        query_words = word_list(search_text)
+        query_trigrams = trigrams(search_text)
+        if not query_words:
+            return []
+
+        candidate_ids = []
+        if self.fuzzy_fts:
+            candidate_ids = self._trigram_candidates(query_trigrams)
+
+        phonetic_keys = sorted({phonetic_key(w) for w in query_words} - {""})
+        if phonetic_keys:
+            placeholders = ", ".join("?" for _ in phonetic_keys)
+            self.cursor.execute(
+                f"SELECT id FROM contacts WHERE name_phonetic IN ({placeholders}) LIMIT ?",
+                phonetic_keys + [FUZZY_CANDIDATES])
+            candidate_ids.extend(row[0] for row in self.cursor.fetchall())
+        if not candidate_ids:
+            return []
+
+        # Кандидаты — одним параметром (json_each), а не временной таблицей:
+        # поиск остается чтением и не открывает транзакцию записи
+        ids_sql, ids_params = self._ids_condition(candidate_ids)
+        where, params = self._list_filters(
+            ids_sql, ids_params, category_filter, tag_filter, date_filter, saved_search)
+        self.cursor.execute(f"SELECT * FROM contact_rows WHERE {where}", params)
+        rows = self.cursor.fetchall()
+
+        # Для каждого слова запроса — лучшее совпадение среди слов контакта
+        query_parts = [(trigrams(w), phonetic_key(w), w) for w in query_words]
+        scored = []
+        for row in rows:
+            fields = dict(zip(CONTACT_FIELDS, row[1:]))
+            contact_words = [(trigrams(w), phonetic_key(w), w)
+                             for w in word_list(self._fuzzy_text(fields))]
+            total = 0.0
+            for q_tri, q_phon, q_word in query_parts:
+                best = 0.0
+                for c_tri, c_phon, c_word in contact_words:
+                    if c_word.startswith(q_word):
+                        best = 1.0
+                        break
+                    score = similarity(q_tri, c_tri)
+                    if q_phon and q_phon == c_phon:
+                        score = max(score, 0.9)
+                    best = max(best, score)
+                total += best
+            score = total / len(query_parts)
+            if score >= 0.4:
+                scored.append((score, row))
+
+        # Лучшие сверху; при равной похожести — по алфавиту (row[22] — name_sort_key)
+        scored.sort(key=lambda item: (-item[0], item[1][22] or ""))
+        return [row for _, row in scored[:limit]]
+
+    def _trigram_candidates(self, query_trigrams):
+        """
+        ID контактов с наибольшим числом общих с запросом триграмм
+        (не больше FUZZY_CANDIDATES). Каждая триграмма — отдельный MATCH,
+        совпадения считает GROUP BY по их объединению.
+        """
+        # Длина списка контактов для каждой триграммы
+        postings = []
+        for tri in query_trigrams:
+            self.cursor.execute(
+                "SELECT COUNT(*) FROM contact_fuzzy WHERE contact_fuzzy MATCH ?", (self._fts_phrase(tri),))
+            count = self.cursor.fetchone()[0]
+            if count:
+                postings.append((count, tri))
+        # Сначала редкие триграммы; частые добавляем, пока не превышен бюджет
+        postings.sort()
+        selected = []
+        budget = 0
+        for count, tri in postings:
+            if selected and budget + count > FUZZY_MAX_POSTINGS:
+                break
+            selected.append(self._fts_phrase(tri))
+            budget += count
+        if not selected:
+            return []
+        matches = " UNION ALL ".join(
+            "SELECT rowid FROM contact_fuzzy WHERE contact_fuzzy MATCH ?" for _ in selected)
+        self.cursor.execute(f"""
+            SELECT rowid FROM ({matches})
+            GROUP BY rowid
+            ORDER BY COUNT(*) DESC
+            LIMIT ?""", selected + [FUZZY_CANDIDATES])
+        return [row[0] for row in self.cursor.fetchall()]
+
+    @staticmethod
+    def _fts_phrase(text):
+        """Строка как фраза запроса FTS5 (в кавычках, кавычки внутри удваиваются)."""
+        return '"' + text.replace('"', '""') + '"'
+
     def get_statistics(self):
         """Возвращает общее кол-во и разбивку по категориям."""
         self.cursor.execute("SELECT COUNT(*) FROM contacts")
         total = self.cursor.fetchone()[0]
+        # Счетчики категорий хранятся в справочнике — без группировки contacts
         self.cursor.execute(
-            "SELECT category, COUNT(*) FROM contacts GROUP BY category")
+            "SELECT name, contact_count FROM categories WHERE contact_count > 0 ORDER BY position, id")
         by_category = self.cursor.fetchall()
         return total, by_category
 
@@ -248,11 +1702,17 @@ class Database:
         Сложная логика поиска ближайших дней рождений (на 30 дней вперед).
         Учитывает переход года (например, если сегодня 30 декабря, а ДР 2 января).
         """
-        query = "SELECT last_name, first_name, birth_date FROM contacts WHERE birth_date IS NOT NULL AND birth_date != ''"
-        self.cursor.execute(query)
+        today = datetime.now().date()
+        # Кандидаты — диапазон индекса по дню рождения без года (ММДД),
+        # а не все контакты с датой рождения
+        condition = birthday_condition("next-30d", today, False)
+        # Строки, до которых фоновая миграция еще не дошла (birth_ymd пуст),
+        # проверяются по тексту даты ниже, в Python
+        query = f"""SELECT last_name, first_name, birth_date FROM contacts
+                    WHERE ({condition.sql}) OR (birth_ymd IS NULL AND birth_date != '')"""
+        self.cursor.execute(query, condition.params)
         all_dates = self.cursor.fetchall()
 
-        today = datetime.now().date()
         upcoming = []
 
         for last, first, bdate_str in all_dates:
@@ -281,14 +1741,342 @@ class Database:
         upcoming.sort(key=lambda x: x[0])
         return upcoming
 
+    # --- Категории ---
+
+    def get_categories(self):
+        """Справочник категорий: список (id, имя, число контактов) в порядке показа."""
+        self.cursor.execute(
+            "SELECT id, name, contact_count FROM categories ORDER BY position, id")
+        return self.cursor.fetchall()
+
+    def get_category_names(self):
+        """Имена категорий для выпадающих списков."""
+        return [name for _, name, _ in self.get_categories()]
+
+    def add_category(self, name):
+        """Новая категория в конце списка. Возвращает (успех, сообщение)."""
+        name = normalize_tag(name)
+        if not name:
+            return False, "Имя категории не может быть пустым"
+        if self._find_category(name) is not None:
+            return False, f"Категория «{name}» уже есть"
+        try:
+            with self._atomic():
+                self._stored_category(name)
+            return True, "Категория добавлена"
+        except sqlite3.Error as e:
+            return False, f"Ошибка базы данных: {e}"
+
+    def rename_category(self, category_id, name):
+        """
+        Переименование — одна строка справочника, сколько бы контактов
+        ни было в категории. Возвращает (успех, сообщение).
+        """
+        name = normalize_tag(name)
+        if not name:
+            return False, "Имя категории не может быть пустым"
+        try:
+            self.cursor.execute(
+                "UPDATE categories SET name = ?, name_key = ? WHERE id = ?",
+                (name, name.lower(), category_id))
+            self._commit()
+            self._notify("categories", "update", [category_id])
+            return True, "Категория переименована"
+        except sqlite3.IntegrityError:
+            return False, f"Категория «{name}» уже есть"
+        except sqlite3.Error as e:
+            return False, f"Ошибка базы данных: {e}"
+
+    def delete_category(self, category_id):
+        """
+        Удаляет категорию; ее контакты переходят в "Не распределён".
+        Возвращает (успех, сообщение).
+        """
+        if category_id == DEFAULT_CATEGORY_ID:
+            return False, "Эту категорию удалить нельзя"
+        try:
+            with self.transaction():
+                self.cursor.execute(
+                    "SELECT id FROM contacts WHERE category_id = ?", (category_id,))
+                ids = [row[0] for row in self.cursor.fetchall()]
+                self.cursor.execute(
+                    "UPDATE contacts SET category_id = ? WHERE category_id = ?",
+                    (DEFAULT_CATEGORY_ID, category_id))
+                self.cursor.execute("DELETE FROM categories WHERE id = ?", (category_id,))
+                if ids:
+                    self._notify("contacts", "update", ids, {"category"})
+                self._notify("categories", "delete", [category_id])
+            return True, "Категория удалена"
+        except sqlite3.Error as e:
+            return False, f"Ошибка базы данных: {e}"
+
+    def _find_category(self, name):
+        """ID категории по имени (без учета регистра) или None."""
+        self.cursor.execute(
+            "SELECT id FROM categories WHERE name_key = ?", (normalize_tag(name).lower(),))
+        row = self.cursor.fetchone()
+        return row[0] if row else None
+
+    def _stored_category(self, name):
+        """
+        Колонки хранения категории для записи в contacts: ссылка на справочник
+        (неизвестное имя, например из CSV, добавляется в справочник),
+        старая текстовая колонка очищается.
+        Вызывается только внутри _atomic()/transaction(): уведомление о новой
+        категории уходит подписчикам после записи контакта, а не до нее.
+        """
+        name = normalize_tag(name)
+        category_id = self._find_category(name) if name else DEFAULT_CATEGORY_ID
+        if category_id is None:
+            self.cursor.execute("""
+                INSERT INTO categories (name, name_key, position)
+                VALUES (?, ?, (SELECT COALESCE(MAX(position), 0) + 1 FROM categories))""",
+                                (name, name.lower()))
+            category_id = self.cursor.lastrowid
+            self._notify("categories", "insert", [category_id])
+        return {"category": None, "category_id": category_id}
+
+    def fill_category_ids(self, ids):
+        """Задача миграции: ссылки на справочник вместо текста категории."""
+        placeholders = ", ".join("?" for _ in ids)
+        self.cursor.execute(f"""
+            SELECT DISTINCT category FROM contacts
+            WHERE id IN ({placeholders}) AND category_id IS NULL""", ids)
+        for (name,) in self.cursor.fetchall():
+            self._stored_category(name)
+        self.cursor.execute(f"""
+            UPDATE contacts SET
+                category_id = COALESCE(
+                    (SELECT k.id FROM categories k WHERE k.name_key = py_lower(trim(contacts.category))),
+                    {DEFAULT_CATEGORY_ID}),
+                category = NULL
+            WHERE id IN ({placeholders}) AND category_id IS NULL""", ids)
+
+    # --- Теги ---
+
+    def get_tags(self):
+        """Все теги: список (id, имя) по алфавиту."""
+        self.cursor.execute("SELECT id, name FROM tags ORDER BY name_key")
+        return self.cursor.fetchall()
+
+    def get_contact_tags(self, contact_id):
+        """Имена тегов контакта по алфавиту."""
+        self.cursor.execute("""
+            SELECT t.name FROM contact_tags ct JOIN tags t ON t.id = ct.tag_id
+            WHERE ct.contact_id = ? ORDER BY t.name_key""", (contact_id,))
+        return [row[0] for row in self.cursor.fetchall()]
+
+    def set_contact_tags(self, contact_id, names):
+        """Заменяет теги контакта (недостающие теги создаются)."""
+        try:
+            with self._atomic():
+                if self._write_contact_tags(contact_id, names):
+                    self._notify("contacts", "update", [contact_id], {"tags"})
+            return True
+        except sqlite3.Error:
+            return False
+
+    def rename_tag(self, tag_id, name):
+        """Переименование тега. Возвращает (успех, сообщение)."""
+        name = normalize_tag(name)
+        if not name:
+            return False, "Имя тега не может быть пустым"
+        try:
+            self.cursor.execute(
+                "UPDATE tags SET name = ?, name_key = ? WHERE id = ?", (name, name.lower(), tag_id))
+            self._commit()
+            self._notify("tags", "update", [tag_id])
+            return True, "Тег переименован"
+        except sqlite3.IntegrityError:
+            return False, f"Тег «{name}» уже есть"
+        except sqlite3.Error as e:
+            return False, f"Ошибка базы данных: {e}"
+
+    def delete_tag(self, tag_id):
+        """Удаляет тег у всех контактов (связи удаляет триггер)."""
+        try:
+            with self._atomic():
+                self.cursor.execute(
+                    "SELECT contact_id FROM contact_tags WHERE tag_id = ?", (tag_id,))
+                ids = [row[0] for row in self.cursor.fetchall()]
+                self.cursor.execute("DELETE FROM tags WHERE id = ?", (tag_id,))
+                self._notify("tags", "delete", [tag_id])
+                if ids:
+                    self._notify("contacts", "update", ids, {"tags"})
+            return True
+        except sqlite3.Error:
+            return False
+
+    def tag_contacts_by_category(self, ids):
+        """Задача миграции: категория контакта становится его тегом."""
+        placeholders = ", ".join("?" for _ in ids)
+        self.cursor.execute(f"""
+            SELECT DISTINCT category FROM contact_rows WHERE id IN ({placeholders})
+            AND category IS NOT NULL AND category NOT IN ('', 'Не распределён')""", ids)
+        self._tag_ids([row[0] for row in self.cursor.fetchall()])
+        self.cursor.execute(f"""
+            INSERT OR IGNORE INTO contact_tags (contact_id, tag_id)
+            SELECT c.id, t.id FROM contact_rows c JOIN tags t ON t.name_key = py_lower(c.category)
+            WHERE c.id IN ({placeholders})""", ids)
+        self._notify("contacts", "update", list(ids), {"tags"})
+
+    def _tag_ids(self, names):
+        """
+        ID тегов по именам; недостающие теги создаются.
+        Вызывается только внутри _atomic()/transaction(): уведомление о новом
+        теге уходит подписчикам после записи всего блока, а не посреди нее.
+        """
+        ids = []
+        for name in names:
+            name = normalize_tag(name)
+            if not name:
+                continue
+            self.cursor.execute("SELECT id FROM tags WHERE name_key = ?", (name.lower(),))
+            row = self.cursor.fetchone()
+            if row is None:
+                self.cursor.execute(
+                    "INSERT INTO tags (name, name_key) VALUES (?, ?)", (name, name.lower()))
+                row = (self.cursor.lastrowid,)
+                self._notify("tags", "insert", [row[0]])
+            ids.append(row[0])
+        return ids
+
+    def _write_contact_tags(self, contact_id, names):
+        """Заменяет теги контакта (без commit). True, если набор тегов изменился."""
+        new = set(self._tag_ids(names))
+        self.cursor.execute("SELECT tag_id FROM contact_tags WHERE contact_id = ?", (contact_id,))
+        old = {row[0] for row in self.cursor.fetchall()}
+        if new == old:
+            return False
+        self.cursor.executemany(
+            "DELETE FROM contact_tags WHERE contact_id = ? AND tag_id = ?",
+            [(contact_id, tag_id) for tag_id in old - new])
+        self.cursor.executemany(
+            "INSERT INTO contact_tags (contact_id, tag_id) VALUES (?, ?)",
+            [(contact_id, tag_id) for tag_id in new - old])
+        return True
+
+    # --- История изменений контакта ---
+
+    def _record_history(self, contact_id, old_fields, old_time, new_fields, current_time):
+        """
+        Записывает новую версию контакта: только измененные поля (дельта),
+        а каждая HISTORY_SNAPSHOT_EVERY-я версия — полный снимок, чтобы
+        восстановление любой версии читало не больше HISTORY_SNAPSHOT_EVERY строк.
+        Версия 1 — состояние до первой правки (контакты без правок историю не занимают).
+        """
+        self.cursor.execute(
+            "SELECT MAX(version) FROM contact_history WHERE contact_id = ?", (contact_id,))
+        last = self.cursor.fetchone()[0]
+        rows = []
+        if last is None:
+            last = 1
+            rows.append((contact_id, 1, self._history_time(old_time), 1,
+                         self._pack_fields(old_fields)))
+        version = last + 1
+        if version % HISTORY_SNAPSHOT_EVERY == 1:
+            rows.append((contact_id, version, self._history_time(current_time), 1,
+                         self._pack_fields(new_fields)))
+        else:
+            changed = {name: new_fields[name] for name in CONTACT_FIELDS
+                       if (old_fields[name] or "") != (new_fields[name] or "")}
+            rows.append((contact_id, version, self._history_time(current_time), 0,
+                         self._pack_fields(changed, keep_empty=True)))
+        self.cursor.executemany(
+            "INSERT INTO contact_history (contact_id, version, changed_at, is_snapshot, data) VALUES (?, ?, ?, ?, ?)",
+            rows)
+
+    @staticmethod
+    def _history_time(text):
+        """Дата версии хранится числом секунд (меньше места, чем строка)."""
+        try:
+            return int(datetime.strptime(text, "%Y-%m-%d %H:%M:%S").timestamp())
+        except (TypeError, ValueError):
+            return int(datetime.now().timestamp())
+
+    @staticmethod
+    def _pack_fields(fields, keep_empty=False):
+        """
+        Поля версии в компактный JSON: ключ — номер поля в CONTACT_FIELDS
+        (новые поля добавляются только в конец, номера не меняются).
+        В снимке пустые поля не хранятся, в дельте пустое значение — это правка.
+        """
+        return json.dumps({str(CONTACT_FIELDS.index(name)): value or "" for name, value in fields.items()
+                           if name in CONTACT_FIELDS and (value or keep_empty)},
+                          ensure_ascii=False, separators=(",", ":"))
+
+    @staticmethod
+    def _apply_history_row(state, is_snapshot, data):
+        """Состояние полей после версии: снимок заменяет все поля, дельта — только свои."""
+        if is_snapshot:
+            state = dict.fromkeys(CONTACT_FIELDS, "")
+        else:
+            state = dict(state)
+        for index, value in json.loads(data).items():
+            state[CONTACT_FIELDS[int(index)]] = value
+        return state
+
+    def get_contact_history(self, contact_id):
+        """
+        История правок контакта: список HistoryEntry от старых версий к новым.
+        changes — {поле: (было, стало)}; у первой версии — исходные значения.
+        """
+        self.cursor.execute(
+            """SELECT version, changed_at, is_snapshot, data FROM contact_history
+               WHERE contact_id = ? ORDER BY version""", (contact_id,))
+        entries = []
+        state = dict.fromkeys(CONTACT_FIELDS, "")
+        for version, changed_at, is_snapshot, data in self.cursor.fetchall():
+            new_state = self._apply_history_row(state, is_snapshot, data)
+            changes = {name: (state[name], new_state[name]) for name in CONTACT_FIELDS
+                       if state[name] != new_state[name]}
+            changed_at = datetime.fromtimestamp(changed_at).strftime("%Y-%m-%d %H:%M:%S")
+            entries.append(HistoryEntry(version, changed_at, changes))
+            state = new_state
+        return entries
+
+    def get_contact_version(self, contact_id, version):
+        """
+        Поля контакта в версии version ({поле: значение}) или None.
+        Читается ближайший снимок и дельты после него — не больше
+        HISTORY_SNAPSHOT_EVERY строк при любой длине истории.
+        """
+        self.cursor.execute(
+            """SELECT version, is_snapshot, data FROM contact_history
+               WHERE contact_id = ? AND version <= ? AND version >= (
+                   SELECT MAX(version) FROM contact_history
+                   WHERE contact_id = ? AND version <= ? AND is_snapshot)
+               ORDER BY version""", (contact_id, version, contact_id, version))
+        rows = self.cursor.fetchall()
+        if not rows or rows[-1][0] != version:
+            return None
+        state = dict.fromkeys(CONTACT_FIELDS, "")
+        for _, is_snapshot, data in rows:
+            state = self._apply_history_row(state, is_snapshot, data)
+        return state
+
+    def revert_contact(self, contact_id, version):
+        """
+        Возвращает контакт к версии version. Откат — обычная правка,
+        поэтому он сам попадает в историю и его тоже можно отменить.
+        """
+        fields = self.get_contact_version(contact_id, version)
+        if fields is None:
+            return False, "Версия не найдена"
+        return self.update_contact(contact_id, [fields[name] for name in CONTACT_FIELDS])
+
     # --- Методы для заметок (аналогично контактам) ---
 
     def save_note(self, title, content):
         current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         try:
-            self.cursor.execute(
-                "INSERT INTO saved_notes (title, content, created_at) VALUES (?, ?, ?)", (title, content, current_time))
-            self.connection.commit()
+            # Вместе с заметкой пишется индекс полнотекстового поиска (триггер)
+            with self._atomic():
+                self.cursor.execute(
+                    "INSERT INTO saved_notes (title, content, created_at) VALUES (?, ?, ?)",
+                    (title, content, current_time))
+                note_id = self.cursor.lastrowid
+                self._notify("saved_notes", "insert", [note_id])
             return True
         except sqlite3.Error:
             return False
@@ -298,15 +2086,112 @@ class Database:
             "SELECT * FROM saved_notes ORDER BY created_at DESC")
         return self.cursor.fetchall()
 
+    def get_notes_page(self, search_text="", after=None, limit=NOTES_PAGE_SIZE):
+        """
+        Страница списка заметок, новые сверху: [(id, название, дата), ...].
+        Текст заметок не читается (get_note_content — по выбору).
+        after — последняя строка предыдущей страницы: следующая страница
+        продолжает индекс с этого места, а не пропускает OFFSET строк.
+        search_text — слова из названия или текста (по началу слова).
+        """
+        where, params = "1=1", []
+        if after is not None:
+            where += " AND (created_at, id) < (?, ?)"
+            params.extend([after[2], after[0]])
+        words = search_text.split()
+        if words and self.notes_fts:
+            # Каждое слово — префикс в кавычках (кавычки в слове удваиваются)
+            match = " ".join('"{}"*'.format(word.replace('"', '""')) for word in words)
+            where += " AND id IN (SELECT rowid FROM saved_notes_fts WHERE saved_notes_fts MATCH ?)"
+            params.append(match)
+        elif words:
+            for word in words:
+                where += " AND (py_lower(title) LIKE ? OR py_lower(content) LIKE ?)"
+                params.extend([f"%{word.lower()}%"] * 2)
+        try:
+            self.cursor.execute(
+                f"""SELECT id, title, created_at FROM saved_notes WHERE {where}
+                    ORDER BY created_at DESC, id DESC LIMIT ?""", params + [limit])
+            return self.cursor.fetchall()
+        except sqlite3.Error as e:
+            print(f"Ошибка БД: {e}")
+            return []
+
+    def get_note_content(self, note_id):
+        """Текст заметки или None, если ее уже удалили."""
+        self.cursor.execute("SELECT content FROM saved_notes WHERE id = ?", (note_id,))
+        row = self.cursor.fetchone()
+        return row[0] if row else None
+
     def delete_note(self, note_id):
+        try:
+            with self._atomic():
+                self.cursor.execute(
+                    "DELETE FROM saved_notes WHERE id = ?", (note_id,))
+                self._notify("saved_notes", "delete", [note_id])
+            return True
+        except sqlite3.Error:
+            return False
+
+    # --- Фотографии контактов ---
+
+    def set_contact_photo(self, contact_id, data):
+        """Сохраняет (или заменяет) фото контакта; data — байты изображения."""
+        current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         try:
             self.cursor.execute(
-                "DELETE FROM saved_notes WHERE id = ?", (note_id,))
-            self.connection.commit()
+                "INSERT OR REPLACE INTO contact_photos (contact_id, size, updated_at, photo) VALUES (?, ?, ?, ?)",
+                (contact_id, len(data), current_time, sqlite3.Binary(data)))
+            self._commit()
+            self._notify("contact_photos", "update", [contact_id])
             return True
         except sqlite3.Error:
+            self._rollback()
             return False
 
+    def delete_contact_photo(self, contact_id):
+        try:
+            self.cursor.execute(
+                "DELETE FROM contact_photos WHERE contact_id = ?", (contact_id,))
+            self._commit()
+            self._notify("contact_photos", "delete", [contact_id])
+            return True
+        except sqlite3.Error:
+            self._rollback()
+            return False
+
+    def get_photo_info(self, contact_id):
+        """(размер, дата изменения) фото контакта или None. Сам BLOB не читается."""
+        self.cursor.execute(
+            "SELECT size, updated_at FROM contact_photos WHERE contact_id = ?", (contact_id,))
+        return self.cursor.fetchone()
+
+    def read_contact_photo(self, contact_id, chunk_size=PHOTO_CHUNK_SIZE):
+        """
+        Читает фото по частям (Connection.blobopen, Python 3.11+),
+        не загружая страницы BLOB в обычные запросы. Возвращает bytes или None.
+        """
+        info = self.get_photo_info(contact_id)
+        if info is None:
+            return None
+        size = info[0]
+        parts = []
+        if hasattr(self.connection, "blobopen"):
+            with self.connection.blobopen("contact_photos", "photo", contact_id, readonly=True) as blob:
+                while True:
+                    chunk = blob.read(chunk_size)
+                    if not chunk:
+                        break
+                    parts.append(chunk)
+        else:
+            # Старые версии Python: те же порции через substr (позиции с 1)
+            for offset in range(1, size + 1, chunk_size):
+                self.cursor.execute(
+                    "SELECT substr(photo, ?, ?) FROM contact_photos WHERE contact_id = ?",
+                    (offset, chunk_size, contact_id))
+                parts.append(self.cursor.fetchone()[0])
+        return b"".join(parts)
+
     # --- Служебные методы ---
 
     def check_if_empty(self):
@@ -323,14 +2208,18 @@ class Database:
                 ("Петрова", "Анна", "", "+7 (999) 888-77-66", "", "anna@mail.ru", "СПб", "VK", "anna_k",
                  "https://vk.com/anna", "", "", "", "", "", "", "Одногруппница", "Учеба", "10.05.1995")
             ]
-            for contact in test_contacts:
-                self.add_contact(contact)
+            with self.transaction():
+                for contact in test_contacts:
+                    self.add_contact(contact)
 
     def backup_db(self):
         """Создает копию файла contacts.db в папке backups."""
         if not os.path.exists(self.db_file):
             return False, "База данных не найдена"
 
+        # Отложенные изменения должны попасть в файл до копирования
+        self.flush()
+
         backup_dir = "backups"
         if not os.path.exists(backup_dir):
             os.makedirs(backup_dir)
@@ -340,7 +2229,13 @@ class Database:
         backup_path = os.path.join(backup_dir, backup_filename)
 
         try:
-            shutil.copy2(self.db_file, backup_path)
+            # Backup API вместо копирования файла: в режиме WAL часть данных
+            # лежит в файле -wal, а другое окно может писать прямо во время копии
+            target = sqlite3.connect(backup_path)
+            try:
+                self.connection.backup(target)
+            finally:
+                target.close()
             return True, os.path.abspath(backup_path)
         except Exception as e:
             return False, str(e)
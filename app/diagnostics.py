@@ -0,0 +1,326 @@
+"""
+Диагностика производительности: гистограммы задержек, профилировщик SQL-запросов
+и журнал медленных запросов с планом выполнения (EXPLAIN QUERY PLAN).
+"""
+
+import inspect
+import json
+import re
+import time
+from bisect import bisect_left
+from collections import deque
+from datetime import datetime
+from functools import wraps
+
+# Верхние границы корзин гистограммы задержек (мс); последняя корзина — "больше"
+LATENCY_BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25,
+                      50, 100, 250, 500, 1000, 2500, 5000)
+
+# Методы Database, которые не оборачиваются таймером
+# (transaction — контекстный менеджер, время его создания ничего не говорит)
+SKIPPED_METHODS = {"transaction", "enable_profiling", "disable_profiling"}
+
+
+class LatencyHistogram:
+    """Гистограмма задержек с фиксированными корзинами (памяти O(1))."""
+
+    def __init__(self):
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def add(self, ms):
+        self.buckets[bisect_left(LATENCY_BUCKETS_MS, ms)] += 1
+        self.count += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+
+    def percentile(self, p):
+        """Оценка перцентиля сверху: граница корзины, в которую он попал."""
+        if not self.count:
+            return 0.0
+        threshold = self.count * p / 100
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if seen >= threshold:
+                if i < len(LATENCY_BUCKETS_MS):
+                    return round(min(LATENCY_BUCKETS_MS[i], self.max_ms), 3)
+                return round(self.max_ms, 3)
+        return round(self.max_ms, 3)
+
+    def to_dict(self):
+        buckets = {}
+        for i, n in enumerate(self.buckets):
+            if n:
+                label = (f"<={LATENCY_BUCKETS_MS[i]}" if i < len(LATENCY_BUCKETS_MS)
+                         else f">{LATENCY_BUCKETS_MS[-1]}")
+                buckets[label] = n
+        return {
+            "count": self.count,
+            "total_ms": round(self.total_ms, 3),
+            "avg_ms": round(self.total_ms / self.count, 3) if self.count else 0.0,
+            "p50_ms": self.percentile(50),
+            "p95_ms": self.percentile(95),
+            "p99_ms": self.percentile(99),
+            "max_ms": round(self.max_ms, 3),
+            "buckets": buckets,
+        }
+
+
+def normalize_sql(sql):
+    """Приводит текст запроса к шаблону: пробелы схлопнуты, списки "?, ?, ?" — в "?...". """
+    sql = re.sub(r"\s+", " ", sql).strip()
+    return re.sub(r"\?(?:\s*,\s*\?)+", "?...", sql)
+
+
+class StatementStats:
+    """Статистика одного шаблона SQL-запроса."""
+
+    def __init__(self):
+        self.latency = LatencyHistogram()
+        self.rows_total = 0
+        self.rows_max = 0
+        self.vm_steps = 0
+
+    def to_dict(self):
+        data = self.latency.to_dict()
+        data.update(rows_total=self.rows_total, rows_max=self.rows_max,
+                    vm_steps=self.vm_steps)
+        return data
+
+
+class _ProfiledCursor:
+    """
+    Обертка над sqlite3.Cursor: замеряет время execute и последующих fetch*
+    и считает возвращенные строки. Всё остальное передается настоящему курсору.
+    """
+
+    def __init__(self, cursor, profiler):
+        self._cursor = cursor
+        self._profiler = profiler
+
+    def execute(self, sql, params=()):
+        # Предыдущий оператор на этом курсоре завершен — закрываем его учет
+        self._profiler.finish_statement()
+        start = time.perf_counter()
+        self._cursor.execute(sql, params)
+        self._profiler.begin_statement(
+            sql, params, (time.perf_counter() - start) * 1000)
+        return self
+
+    def executemany(self, sql, seq_of_params):
+        self._profiler.finish_statement()
+        start = time.perf_counter()
+        self._cursor.executemany(sql, seq_of_params)
+        # Параметры executemany не сохраняем: план для пачки не строится
+        self._profiler.begin_statement(
+            sql, None, (time.perf_counter() - start) * 1000)
+        return self
+
+    def fetchone(self):
+        start = time.perf_counter()
+        row = self._cursor.fetchone()
+        self._profiler.add_fetch(
+            (time.perf_counter() - start) * 1000, 1 if row is not None else 0)
+        return row
+
+    def fetchmany(self, size=None):
+        start = time.perf_counter()
+        rows = self._cursor.fetchmany(
+            size if size is not None else self._cursor.arraysize)
+        self._profiler.add_fetch(
+            (time.perf_counter() - start) * 1000, len(rows))
+        return rows
+
+    def fetchall(self):
+        start = time.perf_counter()
+        rows = self._cursor.fetchall()
+        self._profiler.add_fetch(
+            (time.perf_counter() - start) * 1000, len(rows))
+        return rows
+
+    def __iter__(self):
+        while True:
+            rows = self.fetchmany(500)
+            if not rows:
+                return
+            yield from rows
+
+    def __getattr__(self, name):
+        # lastrowid, rowcount, description и т.д.
+        return getattr(self._cursor, name)
+
+
+class QueryProfiler:
+    """
+    Профилировщик Database.
+    - таймеры на всех публичных методах Database;
+    - гистограммы задержек и счетчики строк по каждому шаблону SQL;
+    - set_trace_callback: учет всех операторов, включая выполненные триггерами;
+    - set_progress_handler: число шагов виртуальной машины SQLite на запрос;
+    - журнал медленных запросов с EXPLAIN QUERY PLAN.
+    """
+
+    def __init__(self, db, slow_ms=50, progress_step=1000, slow_log_size=200):
+        self.db = db
+        self.slow_ms = slow_ms
+        self.progress_step = progress_step
+        self.slow_log = deque(maxlen=slow_log_size)
+        self.plans = {}  # Шаблон запроса -> план (строится один раз)
+        self.reset()
+        self._current = None  # Незакрытый оператор: [sql, params, ms, rows, method]
+        self._steps = 0  # Шаги VM SQLite с момента закрытия предыдущего оператора
+        self._method_stack = []
+        self._explaining = False
+        self._wrapped = []  # Имена обернутых методов Database (для detach)
+
+    def reset(self):
+        """Обнуляет накопленную статистику."""
+        self.started_at = datetime.now()
+        self.methods = {}
+        self.statements = {}
+        self.traced_total = 0
+        self.traced_by_kind = {}
+        self.slow_log.clear()
+
+    # --- Подключение к Database ---
+
+    def attach(self):
+        conn = self.db.connection
+        conn.set_trace_callback(self._on_trace)
+        conn.set_progress_handler(self._on_progress, self.progress_step)
+        self.db.cursor = _ProfiledCursor(self.db.cursor, self)
+
+        # Оборачиваем публичные методы именно этого объекта (класс не трогаем)
+        for name, method in inspect.getmembers(self.db, inspect.ismethod):
+            if name.startswith("_") or name in SKIPPED_METHODS:
+                continue
+            setattr(self.db, name, self._timed(name, method))
+            self._wrapped.append(name)
+
+    @property
+    def attached(self):
+        return isinstance(self.db.cursor, _ProfiledCursor)
+
+    def detach(self):
+        """Снимает обработчики и обертки; накопленная статистика остается."""
+        self.finish_statement()
+        conn = self.db.connection
+        conn.set_trace_callback(None)
+        conn.set_progress_handler(None, 0)
+        self.db.cursor = self.db.cursor._cursor
+        # Без атрибута экземпляра снова вызывается метод класса
+        for name in self._wrapped:
+            delattr(self.db, name)
+        self._wrapped = []
+
+    def _timed(self, name, method):
+        @wraps(method)
+        def wrapper(*args, **kwargs):
+            self._method_stack.append(name)
+            start = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                self.finish_statement()
+                self._method_stack.pop()
+                self.methods.setdefault(name, LatencyHistogram()).add(
+                    (time.perf_counter() - start) * 1000)
+        return wrapper
+
+    # --- Обратные вызовы SQLite ---
+
+    def _on_trace(self, statement):
+        if self._explaining:
+            return
+        self.traced_total += 1
+        # Операторы триггеров SQLite помечает комментарием "-- TRIGGER name"
+        if statement.startswith("--"):
+            kind = "TRIGGER"
+        else:
+            kind = statement.lstrip().split(" ", 1)[0].upper()
+        self.traced_by_kind[kind] = self.traced_by_kind.get(kind, 0) + 1
+
+    def _on_progress(self):
+        if not self._explaining:
+            self._steps += self.progress_step
+        return 0  # 0 = продолжать выполнение
+
+    # --- Учет операторов (вызывается из _ProfiledCursor) ---
+
+    def begin_statement(self, sql, params, ms):
+        method = self._method_stack[-1] if self._method_stack else None
+        self._current = [sql, params, ms, 0, method]
+
+    def add_fetch(self, ms, rows):
+        if self._current is not None:
+            self._current[2] += ms
+            self._current[3] += rows
+
+    def finish_statement(self):
+        """Закрывает текущий оператор: время = execute + все fetch."""
+        if self._current is None:
+            return
+        sql, params, ms, rows, method = self._current
+        steps, self._steps = self._steps, 0
+        self._current = None
+        key = normalize_sql(sql)
+        stats = self.statements.setdefault(key, StatementStats())
+        stats.latency.add(ms)
+        stats.rows_total += rows
+        stats.rows_max = max(stats.rows_max, rows)
+        stats.vm_steps += steps
+        if ms >= self.slow_ms:
+            self.slow_log.append({
+                "time": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                "method": method,
+                "sql": key,
+                "ms": round(ms, 3),
+                "rows": rows,
+                "vm_steps": steps,
+                "plan": self._explain(key, sql, params),
+            })
+
+    def _explain(self, key, sql, params):
+        """План выполнения медленного запроса (строится один раз на шаблон)."""
+        if key in self.plans:
+            return self.plans[key]
+        plan = []
+        if params is not None and sql.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE", "WITH")):
+            self._explaining = True
+            try:
+                rows = self.db.connection.execute(
+                    f"EXPLAIN QUERY PLAN {sql}", params).fetchall()
+                plan = [row[3] for row in rows]
+            except Exception as e:
+                plan = [f"План недоступен: {e}"]
+            finally:
+                self._explaining = False
+        self.plans[key] = plan
+        return plan
+
+    # --- Отчет ---
+
+    def report(self):
+        """Сводка в виде словаря (пригодна для json.dump)."""
+        self.finish_statement()
+        return {
+            "started_at": self.started_at.strftime("%Y-%m-%d %H:%M:%S"),
+            "generated_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "slow_threshold_ms": self.slow_ms,
+            "methods": {name: hist.to_dict()
+                        for name, hist in sorted(self.methods.items(),
+                                                 key=lambda kv: -kv[1].total_ms)},
+            "statements": {sql: stats.to_dict()
+                           for sql, stats in sorted(self.statements.items(),
+                                                    key=lambda kv: -kv[1].latency.total_ms)},
+            "traced": {"total": self.traced_total, "by_kind": dict(self.traced_by_kind)},
+            "slow_queries": list(self.slow_log),
+        }
+
+    def dump_json(self, path):
+        """Сохраняет отчет в JSON-файл."""
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(self.report(), file, ensure_ascii=False, indent=2)
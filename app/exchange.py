@@ -0,0 +1,463 @@
+"""
+Обмен контактами: vCard 3.0 / 4.0 и JSON Lines (все поля контакта и теги).
+
+Экспорт потоковый: контакты читаются из базы порциями (Database.iter_contacts)
+и сразу пишутся в файл.
+
+Импорт большого файла: файл делится на куски по границам записей
+(split_chunks находит их по смещениям, не читая файл целиком), куски
+разбираются в пуле процессов — каждый процесс сам читает свой диапазон
+байтов (parse_chunk), — а записи идут в базу в порядке файла пакетами
+в транзакциях (Database.add_contacts). В работе одновременно не больше
+двух кусков на процесс, поэтому память не зависит от размера файла.
+
+Обе операции — генераторы для TaskScheduler: yield (сделано, всего).
+"""
+
+import json
+import os
+import quopri
+import re
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, wait
+from datetime import datetime
+from itertools import islice
+
+from .database import CONTACT_FIELDS
+
+# Поля записи обмена (кроме id и "tags")
+EXCHANGE_FIELDS = CONTACT_FIELDS + ("date_added", "date_modified")
+
+# Расширение файла -> формат
+FORMATS = {".vcf": "vcard", ".vcard": "vcard", ".jsonl": "jsonl", ".ndjson": "jsonl"}
+VCARD_VERSIONS = ("3.0", "4.0")
+
+# Размер куска файла для одного процесса разбора
+CHUNK_BYTES = 1024 * 1024
+# Сколько байтов читать за раз при поиске границы записи
+SCAN_BYTES = 64 * 1024
+# Сколько контактов вставлять одной транзакцией
+IMPORT_BATCH_SIZE = 500
+# Сколько ждать готовый кусок за один шаг планировщика, секунды
+WAIT_STEP = 0.005
+
+# Длина строки vCard до переноса, байт (RFC 6350, 3.2)
+VCARD_LINE_BYTES = 75
+VCARD_START_RE = re.compile(rb"\nBEGIN:VCARD", re.IGNORECASE)
+# Перенос строки vCard: перевод строки и пробел или табуляция в начале следующей
+VCARD_FOLD_RE = re.compile(r"\r?\n[ \t]")
+VCARD_TIME_RE = re.compile(r"^(\d{4})-?(\d\d)-?(\d\d)(?:[T ](\d\d):?(\d\d):?(\d\d))?")
+VCARD_ESCAPES = {"n": "\n", "N": "\n"}
+# Соцсетей у контакта не больше трех (social_network_1..3)
+SOCIAL_SLOTS = 3
+
+
+def detect_format(filename):
+    """Формат по расширению файла ("vcard", "jsonl") или None."""
+    return FORMATS.get(os.path.splitext(filename)[1].lower())
+
+
+# --- Экспорт ---
+
+def export_contacts(db, filename, file_format, version="3.0"):
+    """
+    Задача планировщика: экспорт всех контактов в файл.
+    yield (записано, всего); return — число записанных контактов.
+    """
+    total, _ = db.get_statistics()
+    count = 0
+    newline = "\r\n" if file_format == "vcard" else "\n"
+    with open(filename, "w", encoding="utf-8", newline=newline) as file:
+        for records in db.iter_contacts():
+            if file_format == "vcard":
+                file.writelines(format_vcard(record, version) for record in records)
+            else:
+                file.writelines(format_json_line(record) for record in records)
+            count += len(records)
+            yield count, total
+    return count
+
+
+def format_json_line(record):
+    """Строка JSON Lines: поля с их именами в contacts, теги — списком."""
+    return json.dumps(record, ensure_ascii=False) + "\n"
+
+
+def _escape(value, separators=",;"):
+    """Экранирование текстового значения vCard."""
+    value = value.replace("\\", "\\\\").replace("\r\n", "\n").replace("\n", "\\n")
+    for separator in separators:
+        value = value.replace(separator, "\\" + separator)
+    return value
+
+
+def _param(value):
+    """Значение параметра vCard (в кавычках, если в нем есть ; : ,)."""
+    value = value.replace('"', "'").replace("\n", " ")
+    return f'"{value}"' if any(c in value for c in ";:,") else value
+
+
+def _fold(line):
+    """Перенос длинной строки vCard: не длиннее 75 байт, символ UTF-8 не разрывается."""
+    if len(line.encode("utf-8")) <= VCARD_LINE_BYTES:
+        return line + "\n"
+    parts = []
+    current, size = [], 0
+    for char in line:
+        char_size = len(char.encode("utf-8"))
+        # У строк продолжения первый байт — пробел
+        if size + char_size > VCARD_LINE_BYTES - (1 if parts else 0):
+            parts.append("".join(current))
+            current, size = [], 0
+        current.append(char)
+        size += char_size
+    parts.append("".join(current))
+    return "\n ".join(parts) + "\n"
+
+
+def _vcard_time(text):
+    """"ГГГГ-ММ-ДД ЧЧ:ММ:СС" -> "ГГГГММДДTЧЧММСС" (местное время, как в базе)."""
+    match = VCARD_TIME_RE.match(text or "")
+    return "{}{}{}T{}{}{}".format(*match.groups()) if match and match.group(4) else None
+
+
+def format_vcard(record, version="3.0"):
+    """
+    Одна карточка vCard. Поля без стандартного свойства — расширения X-:
+    категория (X-CATEGORY), соцсети (X-SOCIALPROFILE, как у Apple),
+    дата добавления (X-DATE-ADDED). Теги — CATEGORIES, дата изменения — REV.
+    """
+    get = lambda name: (record.get(name) or "").strip()
+    v4 = version == "4.0"
+    lines = ["BEGIN:VCARD", f"VERSION:{version}"]
+    names = [get("last_name"), get("first_name"), get("patronymic")]
+    lines.append("N:" + ";".join(_escape(name) for name in names) + ";;")
+    lines.append("FN:" + _escape(" ".join(filter(None, names)) or get("email") or get("phone_primary")))
+    if get("phone_primary"):
+        params = "TYPE=cell;PREF=1" if v4 else "TYPE=CELL,PREF"
+        lines.append(f"TEL;{params}:{_escape(get('phone_primary'))}")
+    if get("phone_secondary"):
+        lines.append(f"TEL;TYPE={'home' if v4 else 'HOME'}:{_escape(get('phone_secondary'))}")
+    if get("email"):
+        lines.append(("EMAIL:" if v4 else "EMAIL;TYPE=INTERNET:") + _escape(get("email")))
+    if get("address"):
+        lines.append(f"ADR;TYPE={'home' if v4 else 'HOME'}:;;{_escape(get('address'))};;;;")
+    for slot in range(1, SOCIAL_SLOTS + 1):
+        network, nickname, link = (get(f"social_{kind}_{slot}") for kind in ("network", "nickname", "link"))
+        if network or nickname or link:
+            params = "".join(f";{key}={_param(value)}"
+                             for key, value in (("TYPE", network), ("X-USER", nickname)) if value)
+            lines.append(f"X-SOCIALPROFILE{params}:{link}")
+    if get("notes"):
+        lines.append("NOTE:" + _escape(get("notes")))
+    try:
+        born = datetime.strptime(get("birth_date"), "%d.%m.%Y")
+        lines.append("BDAY:" + born.strftime("%Y%m%d" if v4 else "%Y-%m-%d"))
+    except ValueError:
+        pass
+    if get("category"):
+        lines.append("X-CATEGORY:" + _escape(get("category")))
+    tags = [tag for tag in record.get("tags") or () if tag]
+    if tags:
+        lines.append("CATEGORIES:" + ",".join(_escape(tag) for tag in tags))
+    for prop, field in (("X-DATE-ADDED", "date_added"), ("REV", "date_modified")):
+        value = _vcard_time(get(field))
+        if value:
+            lines.append(f"{prop}:{value}")
+    lines.append("END:VCARD")
+    return "".join(_fold(line) for line in lines)
+
+
+# --- Импорт ---
+
+def import_contacts(db, filename, file_format, workers=None):
+    """
+    Задача планировщика: импорт файла (формат — "vcard" или "jsonl").
+    yield (добавлено, "~оценка всего" по доле прочитанного файла);
+    return — число добавленных контактов.
+    """
+    size = os.path.getsize(filename)
+    count = 0
+    position = 0  # Конец последнего разобранного куска
+    for records, end in parsed_chunks(filename, file_format, workers):
+        if records is None:
+            yield count, _estimate(count, position, size)
+            continue
+        position = end
+        for start in range(0, len(records), IMPORT_BATCH_SIZE):
+            count += db.add_contacts(records[start:start + IMPORT_BATCH_SIZE])
+            yield count, _estimate(count, position, size)
+    return count
+
+
+def _estimate(count, position, size):
+    """Оценка числа записей в файле по доле уже разобранных байтов."""
+    if not position:
+        return "?"
+    if position >= size:
+        return count
+    return f"~{count * size // position}"
+
+
+def parsed_chunks(filename, file_format, workers=None):
+    """
+    Разобранные куски файла по порядку: (записи, конец куска в байтах).
+    (None, None) — следующий кусок еще разбирается (задача отдает управление окну).
+    Небольшой файл разбирается здесь же, без запуска процессов.
+    """
+    workers = workers or os.cpu_count() or 1
+    chunks = split_chunks(filename, file_format)
+    if workers == 1 or os.path.getsize(filename) <= CHUNK_BYTES:
+        for start, end in chunks:
+            yield parse_chunk(filename, file_format, start, end), end
+        return
+    pool = ProcessPoolExecutor(max_workers=workers)
+    pending = deque()
+    try:
+        while True:
+            for start, end in islice(chunks, workers * 2 - len(pending)):
+                pending.append((pool.submit(parse_chunk, filename, file_format, start, end), end))
+            if not pending:
+                return
+            future, end = pending[0]
+            if not wait([future], timeout=WAIT_STEP).done:
+                yield None, None
+                continue
+            pending.popleft()
+            yield future.result(), end
+    finally:
+        # Отмена импорта: куски, которые еще не начали разбираться, не нужны
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def split_chunks(filename, file_format, chunk_bytes=CHUNK_BYTES):
+    """Куски файла (начало, конец) в байтах; каждый кусок начинается с начала записи."""
+    size = os.path.getsize(filename)
+    with open(filename, "rb") as file:
+        start = 0
+        while start < size:
+            end = _record_start(file, start + chunk_bytes, file_format) if start + chunk_bytes < size else size
+            yield start, end
+            start = end
+
+
+def _record_start(file, position, file_format):
+    """Смещение первой записи, которая начинается не раньше position (или конец файла)."""
+    # С байта перед position: запись, начинающаяся ровно с position, тоже найдется
+    file.seek(position - 1)
+    if file_format == "jsonl":
+        file.readline()
+        return file.tell()
+    tail = b""
+    while True:
+        block = file.read(SCAN_BYTES)
+        if not block:
+            return file.tell()
+        data = tail + block
+        match = VCARD_START_RE.search(data)
+        if match:
+            return file.tell() - len(data) + match.start() + 1
+        tail = data[-len("\nBEGIN:VCARD"):]
+
+
+def parse_chunk(filename, file_format, start, end):
+    """Записи из байтов [start, end) файла (выполняется в процессе пула)."""
+    with open(filename, "rb") as file:
+        file.seek(start)
+        data = file.read(end - start)
+    text = data.decode("utf-8-sig" if start == 0 else "utf-8", errors="replace")
+    if file_format == "jsonl":
+        return parse_json_lines(text)
+    return parse_vcards(text)
+
+
+def _text(value):
+    if value is None:
+        return ""
+    return value if isinstance(value, str) else str(value)
+
+
+def parse_json_lines(text):
+    """Записи из строк JSON Lines; строки, которые не разобраны, пропускаются."""
+    records = []
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        try:
+            data = json.loads(line)
+        except ValueError:
+            continue
+        if not isinstance(data, dict):
+            continue
+        record = {name: _text(data.get(name)) for name in EXCHANGE_FIELDS}
+        tags = data.get("tags")
+        record["tags"] = [_text(tag) for tag in tags] if isinstance(tags, list) else []
+        records.append(record)
+    return records
+
+
+def _split_escaped(value, separator):
+    """Части значения vCard по неэкранированному разделителю (экранирование снимается)."""
+    parts, current = [], []
+    chars = iter(value)
+    for char in chars:
+        if char == "\\":
+            escaped = next(chars, "")
+            current.append(VCARD_ESCAPES.get(escaped, escaped))
+        elif char == separator:
+            parts.append("".join(current))
+            current = []
+        else:
+            current.append(char)
+    parts.append("".join(current))
+    return parts
+
+
+def _unescape(value):
+    return _split_escaped(value, None)[0]
+
+
+def _parse_line(line):
+    """
+    Строка vCard -> (имя свойства, {параметр: [значения]}, значение).
+    Группа ("item1.TEL") отбрасывается; параметр без имени (vCard 2.1: "TEL;CELL") — TYPE.
+    """
+    in_quotes = False
+    for index, char in enumerate(line):
+        if char == '"':
+            in_quotes = not in_quotes
+        elif char == ":" and not in_quotes:
+            break
+    else:
+        return None, {}, ""
+    head, value = line[:index], line[index + 1:]
+    parts = re.findall(r'(?:[^;"]|"[^"]*")+', head)
+    if not parts:
+        return None, {}, ""
+    name = parts[0].rsplit(".", 1)[-1].upper()
+    params = {}
+    for part in parts[1:]:
+        key, sep, values = part.partition("=")
+        if not sep:
+            key, values = "TYPE", key
+        params.setdefault(key.upper(), []).extend(
+            v.strip('"') for v in re.findall(r'"[^"]*"|[^,]+', values))
+    return name, params, value
+
+
+def _birth_date(value):
+    """BDAY (ГГГГ-ММ-ДД, ГГГГММДД, с временем или без) -> "ДД.ММ.ГГГГ"; без года — ""."""
+    match = VCARD_TIME_RE.match(value.strip())
+    if not match:
+        return ""
+    try:
+        born = datetime(int(match.group(1)), int(match.group(2)), int(match.group(3)))
+    except ValueError:
+        return ""
+    return born.strftime("%d.%m.%Y")
+
+
+def _timestamp(value):
+    """REV / X-DATE-ADDED -> "ГГГГ-ММ-ДД ЧЧ:ММ:СС" ("" — не разобрано)."""
+    match = VCARD_TIME_RE.match(value.strip())
+    if not match or not match.group(4):
+        return ""
+    return "{}-{}-{} {}:{}:{}".format(*match.groups())
+
+
+def parse_vcards(text):
+    """Записи из карточек vCard (2.1, 3.0, 4.0); карточки без имени, телефона и email пропускаются."""
+    records = []
+    card = None
+    lines = iter(VCARD_FOLD_RE.sub("", text).splitlines())
+    for line in lines:
+        name, params, value = _parse_line(line)
+        if name is None:
+            continue
+        if name == "BEGIN" and value.strip().upper() == "VCARD":
+            card = {"phones": [], "socials": [], "tags": [], "note_lines": []}
+        elif card is None:
+            continue
+        elif name == "END" and value.strip().upper() == "VCARD":
+            record = _vcard_record(card)
+            if record is not None:
+                records.append(record)
+            card = None
+        else:
+            if "QUOTED-PRINTABLE" in (value.upper() for value in params.get("ENCODING", ())):
+                # Мягкий перенос quoted-printable: "=" в конце, значение продолжается со следующей строки
+                while value.endswith("="):
+                    value = value[:-1] + next(lines, "")
+                value = _quoted_printable(value, params)
+            _vcard_property(card, name, params, value)
+    return records
+
+
+def _quoted_printable(value, params):
+    """Значение vCard 2.1 в quoted-printable."""
+    charset = (params.get("CHARSET") or ["utf-8"])[0]
+    try:
+        return quopri.decodestring(value.encode("ascii", "replace")).decode(charset, "replace")
+    except LookupError:
+        return value
+
+
+def _vcard_property(card, name, params, value):
+    """Разбирает одно свойство карточки в словарь card."""
+    types = [value.lower() for value in params.get("TYPE", [])]
+    if name == "N":
+        parts = _split_escaped(value, ";") + ["", "", ""]
+        card["last_name"], card["first_name"], card["patronymic"] = (p.strip() for p in parts[:3])
+    elif name == "FN":
+        card["fn"] = _unescape(value).strip()
+    elif name == "TEL":
+        preferred = "pref" in types or "PREF" in params
+        card["phones"].append((not preferred, _unescape(value).strip()))
+    elif name == "EMAIL":
+        preferred = "pref" in types or "PREF" in params
+        if "email" not in card or (preferred and not card.get("email_pref")):
+            card["email"] = _unescape(value).strip()
+            card["email_pref"] = preferred
+    elif name == "ADR" and "address" not in card:
+        parts = [p.strip() for p in _split_escaped(value, ";")]
+        card["address"] = ", ".join(p for p in parts if p)
+    elif name == "NOTE":
+        card["note_lines"].append(_unescape(value))
+    elif name == "BDAY":
+        card["birth_date"] = _birth_date(value)
+    elif name == "CATEGORIES":
+        card["tags"].extend(tag.strip() for tag in _split_escaped(value, ",") if tag.strip())
+    elif name == "X-CATEGORY":
+        card["category"] = _unescape(value).strip()
+    elif name == "X-SOCIALPROFILE":
+        network = (params.get("TYPE") or [""])[0]
+        nickname = (params.get("X-USER") or [""])[0]
+        card["socials"].append((network, nickname, value.strip()))
+    elif name == "IMPP":
+        # "skype:nick", "xmpp:user@host" — схема как сеть, остальное как ник
+        scheme, sep, rest = value.strip().partition(":")
+        card["socials"].append((scheme, rest, "") if sep else ("", scheme, ""))
+    elif name == "REV":
+        card["date_modified"] = _timestamp(value)
+    elif name == "X-DATE-ADDED":
+        card["date_added"] = _timestamp(value)
+
+
+def _vcard_record(card):
+    """Запись обмена из разобранной карточки; None — пустая карточка."""
+    record = {name: card.get(name, "") for name in EXCHANGE_FIELDS}
+    if not card.get("last_name") and not card.get("first_name") and card.get("fn"):
+        record["first_name"] = card["fn"]
+    # Основной телефон — помеченный PREF, иначе первый
+    phones = [phone for _, phone in sorted(card["phones"], key=lambda p: p[0]) if phone]
+    record["phone_primary"] = phones[0] if phones else ""
+    record["phone_secondary"] = phones[1] if len(phones) > 1 else ""
+    for slot, (network, nickname, link) in enumerate(card["socials"][:SOCIAL_SLOTS], 1):
+        record[f"social_network_{slot}"] = network
+        record[f"social_nickname_{slot}"] = nickname
+        record[f"social_link_{slot}"] = link
+    record["notes"] = "\n".join(card["note_lines"])
+    record["tags"] = card["tags"]
+    if not (record["last_name"] or record["first_name"] or record["phone_primary"] or record["email"]):
+        return None
+    return record
@@ -0,0 +1,283 @@
+"""
+Версионные миграции схемы БД (номер версии — PRAGMA user_version).
+
+Шаг миграции — быстрое изменение схемы (колонка, индекс, таблица).
+Он выполняется при открытии базы в одной транзакции с новым user_version,
+поэтому сбой посреди шага не оставляет схему наполовину измененной.
+Database.create_tables создает только исходные таблицы (contacts, saved_notes),
+все остальное создают шаги: файл с актуальной версией открывается без DDL.
+Долгое заполнение данных (backfill) шаг не делает сам, а ставит задачу
+в таблицу migration_jobs. Задача выполняется порциями в фоне (Migrator.run):
+каждая порция — отдельная транзакция вместе с отметкой прогресса, поэтому
+после сбоя или закрытия программы работа продолжается с места остановки.
+
+Новый шаг добавляется в конец MIGRATIONS со следующим номером версии.
+Шаг должен быть повторяемым (IF NOT EXISTS): в файлах, созданных до появления
+версий схемы, его таблицы и колонки уже могут быть.
+"""
+
+from collections import namedtuple
+
+# Сколько строк заполняется за одну транзакцию фоновой задачи
+BACKFILL_BATCH_SIZE = 500
+
+# version — номер схемы после шага; apply(db) меняет схему и возвращает
+# имена задач заполнения (ключи BACKFILLS), которые нужно поставить в очередь
+Migration = namedtuple("Migration", ["version", "title", "apply"])
+
+# Порционное заполнение: строки table перебираются по возрастанию id,
+# apply(db, ids) обрабатывает одну порцию
+Backfill = namedtuple("Backfill", ["title", "table", "apply"])
+
+
+# --- Шаги ---
+
+def migrate_name_keys(db):
+    """
+    Вычисляемые колонки ФИО и служебные таблицы поиска; у записей из старых
+    версий программы они заполняются в фоне (раньше — при каждом запуске полным проходом).
+    """
+    db._create_name_keys()
+    condition = " OR ".join(f"{name} IS NULL" for name in ("name_sort_key", "name_phonetic"))
+    db.cursor.execute(f"SELECT EXISTS (SELECT 1 FROM contacts WHERE {condition})")
+    stale = db.cursor.fetchone()[0]
+    # Таблица ключей появилась позже колонок — если она пуста, индексируем всех
+    db.cursor.execute(
+        "SELECT NOT EXISTS (SELECT 1 FROM contact_name_keys) AND EXISTS (SELECT 1 FROM contacts)")
+    stale = stale or db.cursor.fetchone()[0]
+    return ["reindex_contacts"] if stale else []
+
+
+def migrate_category_tags(db):
+    """
+    Категории переходят в теги: каждый контакт получает тег с именем
+    своей категории.
+    """
+    db._create_tag_tables()
+    db.cursor.execute("""
+        SELECT EXISTS (SELECT 1 FROM contacts
+                       WHERE category IS NOT NULL AND category NOT IN ('', 'Не распределён'))""")
+    return ["category_tags"] if db.cursor.fetchone()[0] else []
+
+
+def migrate_category_ids(db):
+    """
+    Категории переходят в справочник categories и колонку category_id;
+    выборки читают строки через представление contact_rows.
+    Старый триггер журнала правок следил за текстовой колонкой — удаляется,
+    новый создаст шаг журнала изменений.
+    """
+    db._create_categories()
+    db._create_contact_rows_view()
+    db.cursor.execute("DROP TRIGGER IF EXISTS trg_contacts_log_update")
+    db.cursor.execute("SELECT EXISTS (SELECT 1 FROM contacts WHERE category_id IS NULL)")
+    return ["category_ids"] if db.cursor.fetchone()[0] else []
+
+
+def migrate_date_keys(db):
+    """
+    Целые колонки дат (added_ts, modified_ts, birth_ymd) с индексами;
+    индексы по текстовым датам больше не нужны.
+    """
+    db._create_date_keys()
+    db._create_contact_rows_view()  # Новые колонки видны и в представлении
+    for name in ("date_added", "date_modified", "birth_day"):
+        db.cursor.execute(f"DROP INDEX IF EXISTS idx_contacts_{name}")
+    db.cursor.execute("SELECT EXISTS (SELECT 1 FROM contacts WHERE added_ts IS NULL)")
+    return ["date_keys"] if db.cursor.fetchone()[0] else []
+
+
+def migrate_notes_search(db):
+    """
+    Полнотекстовый индекс заметок; заполняется по уже сохраненным заметкам.
+    Заметки короткие, поэтому индекс строится сразу, без фоновой задачи.
+    """
+    db._create_notes_search()
+    if db.notes_fts:
+        db.cursor.execute("INSERT INTO saved_notes_fts (saved_notes_fts) VALUES ('rebuild')")
+    return []
+
+
+def migrate_photos(db):
+    """Фотографии контактов (отдельная таблица BLOB)."""
+    db._create_photos()
+    return []
+
+
+def migrate_history(db):
+    """История правок контактов."""
+    db._create_history()
+    return []
+
+
+def migrate_saved_searches(db):
+    """Сохраненные поиски (умные группы) и их состав."""
+    db._create_saved_searches()
+    return []
+
+
+def migrate_change_log(db):
+    """
+    Журнал изменений и его триггеры. Последним шагом: триггеры
+    следят за таблицами, которые создают предыдущие шаги.
+    """
+    db._create_change_log()
+    return []
+
+
+def migrate_fuzzy_index(db):
+    """
+    Триграммы нечеткого поиска переходят из таблицы contact_trigrams
+    (строка на триграмму и вторичный индекс по контакту — удаление 100 000
+    контактов занимало секунды) в индекс FTS5. Индекс заполняется в фоне.
+    """
+    db.cursor.execute("DROP TRIGGER IF EXISTS trg_contacts_delete_trigrams")
+    db.cursor.execute("DROP TABLE IF EXISTS contact_trigrams")
+    db._create_fuzzy_index()
+    db.cursor.execute("SELECT EXISTS (SELECT 1 FROM contacts)")
+    return ["reindex_contacts"] if db.fuzzy_fts and db.cursor.fetchone()[0] else []
+
+
+MIGRATIONS = [
+    Migration(1, "Поисковые ключи ФИО для старых записей", migrate_name_keys),
+    Migration(2, "Теги из категорий", migrate_category_tags),
+    Migration(3, "Справочник категорий", migrate_category_ids),
+    Migration(4, "Даты целыми числами", migrate_date_keys),
+    Migration(5, "Поиск по заметкам", migrate_notes_search),
+    Migration(6, "Фотографии контактов", migrate_photos),
+    Migration(7, "История правок", migrate_history),
+    Migration(8, "Умные группы", migrate_saved_searches),
+    Migration(9, "Журнал изменений", migrate_change_log),
+    Migration(10, "Нечеткий поиск по индексу FTS5", migrate_fuzzy_index),
+]
+
+BACKFILLS = {
+    "reindex_contacts": Backfill(
+        "Индексация контактов", "contacts",
+        lambda db, ids: db.reindex_contacts(ids)),
+    "category_tags": Backfill(
+        "Теги из категорий", "contacts",
+        lambda db, ids: db.tag_contacts_by_category(ids)),
+    "category_ids": Backfill(
+        "Справочник категорий", "contacts",
+        lambda db, ids: db.fill_category_ids(ids)),
+    "date_keys": Backfill(
+        "Даты целыми числами", "contacts",
+        lambda db, ids: db.fill_date_keys(ids)),
+}
+
+
+class Migrator:
+    """Применение шагов схемы и фоновое выполнение задач заполнения."""
+
+    def __init__(self, db, migrations=MIGRATIONS, backfills=BACKFILLS,
+                 batch_size=BACKFILL_BATCH_SIZE):
+        self.db = db
+        self.migrations = sorted(migrations, key=lambda m: m.version)
+        self.backfills = backfills
+        self.batch_size = batch_size
+
+    def schema_version(self):
+        self.db.cursor.execute("PRAGMA user_version")
+        return self.db.cursor.fetchone()[0]
+
+    def upgrade(self):
+        """
+        Выполняет шаги схемы, которых еще нет в файле (быстро, при открытии БД).
+        Каждый шаг и его задачи заполнения фиксируются одной транзакцией.
+        Возвращает список выполненных шагов.
+        """
+        cursor = self.db.cursor
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS migration_jobs (
+            name TEXT PRIMARY KEY,
+            last_id INTEGER NOT NULL DEFAULT 0,
+            max_id INTEGER NOT NULL,
+            done_rows INTEGER NOT NULL DEFAULT 0,
+            total_rows INTEGER NOT NULL,
+            finished INTEGER NOT NULL DEFAULT 0
+        )
+        """)
+        current = self.schema_version()
+        latest = self.migrations[-1].version if self.migrations else 0
+        if current > latest:
+            print(f"База создана более новой версией программы (схема {current}, известна {latest})")
+        applied = []
+        for migration in self.migrations:
+            if migration.version <= current:
+                continue
+            with self.db.transaction():
+                for name in migration.apply(self.db) or ():
+                    self._add_job(name)
+                # user_version меняется в той же транзакции, что и схема
+                cursor.execute(f"PRAGMA user_version = {int(migration.version)}")
+            applied.append(migration)
+        return applied
+
+    def _add_job(self, name):
+        """
+        Ставит задачу заполнения. Обрабатываются строки, которые уже есть
+        в таблице: новые записи программа сразу пишет в новом формате.
+        """
+        table = self.backfills[name].table
+        self.db.cursor.execute(f"SELECT COALESCE(MAX(id), 0), COUNT(*) FROM {table}")
+        max_id, total = self.db.cursor.fetchone()
+        self.db.cursor.execute(
+            """INSERT OR REPLACE INTO migration_jobs (name, max_id, total_rows)
+               VALUES (?, ?, ?)""", (name, max_id, total))
+
+    def pending(self):
+        """Имена незавершенных задач заполнения."""
+        self.db.cursor.execute(
+            "SELECT name FROM migration_jobs WHERE NOT finished ORDER BY rowid")
+        return [row[0] for row in self.db.cursor.fetchall()]
+
+    def progress(self):
+        """(обработано строк, всего строк) по незавершенным задачам."""
+        self.db.cursor.execute(
+            "SELECT COALESCE(SUM(done_rows), 0), COALESCE(SUM(total_rows), 0) FROM migration_jobs WHERE NOT finished")
+        return self.db.cursor.fetchone()
+
+    def run(self):
+        """
+        Задача планировщика: выполняет задачи заполнения порциями.
+        yield (обработано, всего) после каждой порции; return — число строк.
+        Прерванная работа (отмена, закрытие, сбой) продолжается при следующем запуске.
+        """
+        processed = 0
+        for name in self.pending():
+            backfill = self.backfills.get(name)
+            if backfill is None:
+                print(f"Неизвестная задача миграции: {name}")
+                continue
+            while True:
+                progress = self.progress()
+                with self.db.transaction():
+                    ids = self._next_batch(name, backfill.table)
+                    if ids:
+                        backfill.apply(self.db, ids)
+                        self.db.cursor.execute(
+                            """UPDATE migration_jobs SET last_id = ?, done_rows = done_rows + ?
+                               WHERE name = ?""", (ids[-1], len(ids), name))
+                    else:
+                        self.db.cursor.execute(
+                            "UPDATE migration_jobs SET finished = 1 WHERE name = ?", (name,))
+                if not ids:
+                    break
+                processed += len(ids)
+                yield progress[0] + len(ids), progress[1]
+        return processed
+
+    def _next_batch(self, name, table):
+        self.db.cursor.execute(
+            "SELECT last_id, max_id FROM migration_jobs WHERE name = ?", (name,))
+        last_id, max_id = self.db.cursor.fetchone()
+        self.db.cursor.execute(
+            f"SELECT id FROM {table} WHERE id > ? AND id <= ? ORDER BY id LIMIT ?",
+            (last_id, max_id, self.batch_size))
+        return [row[0] for row in self.db.cursor.fetchall()]
+
+    def run_all(self):
+        """Выполняет все задачи заполнения сразу (скрипты, бенчмарки)."""
+        for _ in self.run():
+            pass
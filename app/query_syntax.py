@@ -0,0 +1,282 @@
+"""
+Язык запросов строки поиска: префиксы полей, фразы в кавычках,
+отрицание и диапазоны дат.
+
+    phone:900 category:Работа        телефон содержит 900 И категория "Работа"
+    "Иван Петров" -tag:архив         фраза целиком, без тега "архив"
+    added:>2026-01-01 bday:this-month born:1980..1990
+    category:Клиенты -has:email      категория "Клиенты", email не заполнен
+
+Запрос разбирается один раз в план (compile_query, кэш по строке и дате):
+условия, которые сразу выражаются в SQL (диапазоны по целым колонкам
+дат с индексами), — готовый текст с параметрами (Condition); условия, для которых
+нужны справочники и индексы в памяти (категории, теги, индекс подстрок,
+ключи ФИО), — описание поиска (Lookup), их достраивает Database.
+Строка без синтаксиса плана не дает (None) — работает обычный поиск.
+"""
+
+import calendar
+import re
+from collections import namedtuple
+from datetime import date, timedelta
+from functools import lru_cache
+
+from .text_keys import day_key
+
+# Сколько разобранных запросов держать в кэше (строка поиска меняется с каждой клавишей)
+QUERY_CACHE_SIZE = 256
+
+# Готовое условие SQL с параметрами
+Condition = namedtuple("Condition", ["sql", "params", "negated"])
+
+# Фильтр по датам: field — "added", "modified" или "born"; start, end — даты
+# (datetime.date) полуоткрытого диапазона [start, end), None — без границы
+DateRange = namedtuple("DateRange", ["field", "start", "end"])
+
+# Поле фильтра дат -> целая колонка contacts (секунды или ГГГГММДД, см. text_keys)
+DATE_COLUMNS = {"added": "added_ts", "modified": "modified_ts", "born": "birth_ymd"}
+
+# Условие, которое достраивает Database:
+# kind — "text" (подстрока в колонках columns), "name" (слова ФИО),
+# "category", "tag"; value — искомое значение
+Lookup = namedtuple("Lookup", ["kind", "columns", "value", "negated"])
+
+# bday:next-Nd от стольких дней охватывает весь год: подходит любой день рождения
+YEAR_DAYS = 365
+
+# Колонки обычного поиска (те же, что в Database._build_filter)
+TEXT_COLUMNS = ("last_name", "first_name", "phone_primary", "email", "notes", "category")
+
+# Префикс поля -> (вид условия, колонки)
+FIELDS = {
+    "name": ("name", ()), "фио": ("name", ()),
+    "last": ("text", ("last_name",)), "фамилия": ("text", ("last_name",)),
+    "first": ("text", ("first_name",)), "имя": ("text", ("first_name",)),
+    "phone": ("text", ("phone_primary",)), "тел": ("text", ("phone_primary",)),
+    "email": ("text", ("email",)), "почта": ("text", ("email",)),
+    "notes": ("text", ("notes",)), "заметки": ("text", ("notes",)),
+    "address": ("text", ("address",)), "адрес": ("text", ("address",)),
+    "category": ("category", ()), "cat": ("category", ()), "категория": ("category", ()),
+    "tag": ("tag", ()), "тег": ("tag", ()),
+    "added": ("date", ("added",)), "добавлен": ("date", ("added",)),
+    "modified": ("date", ("modified",)), "изменен": ("date", ("modified",)),
+    "born": ("date", ("born",)), "родился": ("date", ("born",)),
+    "bday": ("bday", ()), "др": ("bday", ()),
+    "has": ("has", ()), "есть": ("has", ()),
+}
+
+# has:поле — поле заполнено (-has:email — контакты без email)
+HAS_CONDITIONS = {
+    "email": "IFNULL(email, '') != ''",
+    "phone": "IFNULL(phone_primary, '') != ''",
+    "address": "IFNULL(address, '') != ''",
+    "notes": "IFNULL(notes, '') != ''",
+    "bday": "birth_ymd IS NOT NULL",
+    "photo": "id IN (SELECT contact_id FROM contact_photos)",
+}
+
+# День рождения без года (ММДД) из birth_ymd: по этому выражению есть индекс
+# (оно должно совпадать с индексом idx_contacts_birth_md буква в букву)
+BIRTH_DAY_KEY = "(birth_ymd % 10000)"
+
+# -слово, поле:значение, поле:"фраза", "фраза"
+TOKEN_RE = re.compile(r'(-)?(?:([^\s:"]+):)?(?:"([^"]*)"?|(\S*))')
+RANGE_RE = re.compile(r"^(>=|<=|>|<)?(.*)$")
+LAST_DAYS_RE = re.compile(r"^(?:last|next)-(\d+)d$")
+
+
+def compile_query(text, today=None):
+    """
+    План запроса: кортеж условий (Condition / Lookup), все через И.
+    None — в строке нет синтаксиса, нужен обычный поиск.
+    """
+    return _compile(text.strip(), today or date.today())
+
+
+@lru_cache(maxsize=QUERY_CACHE_SIZE)
+def _compile(text, today):
+    terms = []
+    syntax = False
+    for match in TOKEN_RE.finditer(text):
+        negated, field, phrase, word = match.groups()
+        kind, columns = FIELDS.get((field or "").lower(), (None, None))
+        if field and kind is None:
+            # Не поле ("http://", "10:30") — обычное слово целиком
+            word = match.group(0).lstrip("-")
+            if phrase is not None:
+                word, phrase = f"{field}:{phrase}", None
+        value = phrase if phrase is not None else word
+        syntax = syntax or bool(negated or kind or phrase is not None)
+        if not value:
+            continue  # Поле без значения ("phone:") — пока набирается
+        negated = bool(negated)
+        if kind is None:
+            terms.append(Lookup("text", TEXT_COLUMNS, value, negated))
+        elif kind == "date":
+            bounds = date_bounds(value, today)
+            condition = date_range_condition(DateRange(columns[0], *bounds), negated) if bounds else None
+            if condition is not None:
+                terms.append(condition)
+        elif kind == "has":
+            sql = HAS_CONDITIONS.get(value.lower())
+            if sql is not None:
+                terms.append(Condition(sql, (), negated))
+        elif kind == "bday":
+            condition = birthday_condition(value, today, negated)
+            if condition is not None:
+                terms.append(condition)
+        else:
+            terms.append(Lookup(kind, columns, value, negated))
+    return tuple(terms) if syntax else None
+
+
+# --- Даты ---
+
+def _parse_date(text):
+    """Начало и конец (не включительно) периода "2026", "2026-03" или "2026-03-15"."""
+    parts = text.split("-")
+    try:
+        numbers = [int(p) for p in parts]
+        if len(numbers) == 1:
+            start = date(numbers[0], 1, 1)
+            return start, date(numbers[0] + 1, 1, 1)
+        if len(numbers) == 2:
+            start = date(numbers[0], numbers[1], 1)
+            return start, start + timedelta(days=calendar.monthrange(*numbers)[1])
+        if len(numbers) == 3:
+            start = date(*numbers)
+            return start, start + timedelta(days=1)
+    except (ValueError, OverflowError):
+        pass  # Нет такой даты или конец периода за 9999 годом
+    return None
+
+
+def _month_start(day, shift=0):
+    month = day.month - 1 + shift
+    return date(day.year + month // 12, month % 12 + 1, 1)
+
+
+def _named_period(name, today):
+    """Период по имени (today, this-week, last-month, last-30d...) или None."""
+    week_start = today - timedelta(days=today.weekday())
+    periods = {
+        "today": (today, today + timedelta(days=1)),
+        "yesterday": (today - timedelta(days=1), today),
+        "this-week": (week_start, week_start + timedelta(days=7)),
+        "last-week": (week_start - timedelta(days=7), week_start),
+        "this-month": (_month_start(today), _month_start(today, 1)),
+        "last-month": (_month_start(today, -1), _month_start(today)),
+        "this-year": (date(today.year, 1, 1), date(today.year + 1, 1, 1)),
+        "last-year": (date(today.year - 1, 1, 1), date(today.year, 1, 1)),
+    }
+    if name in periods:
+        return periods[name]
+    match = LAST_DAYS_RE.match(name)
+    if match and name.startswith("last"):
+        try:
+            return today - timedelta(days=int(match.group(1)) - 1), today + timedelta(days=1)
+        except OverflowError:
+            return None  # Раньше 1 года н. э. ("last-99999999d") — условие не применяется
+    return None
+
+
+def date_bounds(value, today):
+    """
+    Полуоткрытый диапазон дат [начало, конец) из значения поля даты:
+    ">2026-01-01", "<=2026-03", "2026-01-01..2026-02-15", "this-month".
+    Любая граница может быть None (не ограничено). None — значение не разобрано.
+    """
+    value = value.lower()
+    if ".." in value:
+        low, high = value.split("..", 1)
+        low = _parse_date(low) if low else (None, None)
+        high = _parse_date(high) if high else (None, None)
+        if low is None or high is None:
+            return None
+        return low[0], high[1]
+    period = _named_period(value, today)
+    if period is not None:
+        return period
+    operator, rest = RANGE_RE.match(value).groups()
+    period = _parse_date(rest)
+    if period is None:
+        return None
+    start, end = period
+    return {
+        ">": (end, None), ">=": (start, None),
+        "<": (None, start), "<=": (None, end),
+    }.get(operator, period)
+
+
+def date_range_condition(date_range, negated=False):
+    """Условие DateRange — диапазон по индексу целой колонки даты."""
+    column = DATE_COLUMNS[date_range.field]
+    if date_range.field == "born":
+        key = lambda day: day.year * 10000 + day.month * 100 + day.day
+    else:
+        key = day_key
+    parts = []
+    params = []
+    if date_range.start is not None:
+        parts.append(f"{column} >= ?")
+        params.append(key(date_range.start))
+    if date_range.end is not None:
+        parts.append(f"{column} < ?")
+        params.append(key(date_range.end))
+    if not parts:
+        return None
+    return Condition(" AND ".join(parts), tuple(params), negated)
+
+
+def birthday_condition(value, today, negated):
+    """
+    Дни рождения без учета года: "today", "this-week", "this-month",
+    "next-month", "next-30d", месяц "03", день "03-08" или диапазон "12-20..01-10".
+    Сравнивается ключ ММДД, переход через Новый год — двумя диапазонами;
+    "next-Nd" на год и больше — все дни рождения.
+    """
+    value = value.lower()
+    next_month = _month_start(today, 1)
+    periods = {
+        "today": (today, today),
+        "this-week": (today - timedelta(days=today.weekday()),
+                      today - timedelta(days=today.weekday() - 6)),
+        "this-month": (_month_start(today), next_month - timedelta(days=1)),
+        "next-month": (next_month, _month_start(today, 2) - timedelta(days=1)),
+    }
+    match = LAST_DAYS_RE.match(value)
+    if value in periods:
+        first, last = (day.month * 100 + day.day for day in periods[value])
+    elif match and value.startswith("next"):
+        days = int(match.group(1))
+        if days >= YEAR_DAYS:
+            # Иначе ключи ММДД начала и конца совпали бы или перехлестнулись
+            first, last = 101, 1231
+        else:
+            last_day = today + timedelta(days=days)
+            first = today.month * 100 + today.day
+            last = last_day.month * 100 + last_day.day
+    else:
+        low, _, high = value.partition("..")
+        first = _month_day(low, start=True)
+        last = _month_day(high or low, start=False)
+        if first is None or last is None:
+            return None
+    if first <= last:
+        return Condition(f"{BIRTH_DAY_KEY} BETWEEN ? AND ?", (first, last), negated)
+    return Condition(f"({BIRTH_DAY_KEY} >= ? OR {BIRTH_DAY_KEY} <= ?)", (first, last), negated)
+
+
+def _month_day(text, start):
+    """"03" -> 301/331, "03-08" -> 308 (ММДД); None — не разобрано."""
+    parts = text.split("-")
+    try:
+        numbers = [int(p) for p in parts]
+    except ValueError:
+        return None
+    if len(numbers) == 1 and 1 <= numbers[0] <= 12:
+        day = 1 if start else calendar.monthrange(2000, numbers[0])[1]  # 2000 — високосный
+        return numbers[0] * 100 + day
+    if len(numbers) == 2 and 1 <= numbers[0] <= 12 and 1 <= numbers[1] <= 31:
+        return numbers[0] * 100 + numbers[1]
+    return None
@@ -0,0 +1,197 @@
+"""
+Реплика базы в памяти: при открытии файл целиком копируется в :memory:
+(backup API), чтения идут из памяти, а каждая запись выполняется в том же
+вызове и в файле, и в памяти (write-through). Файл остается главной копией:
+commit сначала фиксирует его, поэтому после сбоя данные не теряются.
+Перед первой записью каждой транзакции копия догоняет чужие commit,
+а lastrowid/rowcount записи берутся из файла и сверяются с памятью.
+
+ReplicaConnection повторяет ту часть интерфейса sqlite3.Connection,
+которой пользуется Database, поэтому остальной код режима не замечает.
+"""
+
+import sqlite3
+
+# Операторы, которые только читают: выполняются на копии в памяти
+READ_STATEMENTS = ("SELECT", "WITH", "EXPLAIN")
+# Операторы, с которых начинается транзакция записи
+TRANSACTION_STATEMENTS = ("BEGIN", "SAVEPOINT", "INSERT", "UPDATE", "DELETE", "REPLACE")
+
+
+def is_read(sql):
+    """Читающий ли оператор (PRAGMA без "=" — чтение настройки)."""
+    words = sql.lstrip().split(None, 1)
+    if not words:
+        return True
+    head = words[0].upper()
+    if head == "PRAGMA":
+        return "=" not in sql
+    return head in READ_STATEMENTS
+
+
+class ReplicaCursor:
+    """Курсор: чтения — из памяти, записи — в файл, затем в память."""
+
+    def __init__(self, connection, memory_cursor, disk_cursor):
+        self._connection = connection
+        self._memory = memory_cursor
+        self._disk = disk_cursor
+        self._wrote = False  # Последний оператор — запись (lastrowid/rowcount из файла)
+
+    def execute(self, sql, params=()):
+        self._wrote = not is_read(sql)
+        if self._wrote:
+            if self._begin(sql):
+                return self
+            # Сначала файл: если запись не удалась (блокировка, ограничение),
+            # копия в памяти остается такой же, как файл
+            self._disk.execute(sql, params)
+        self._memory.execute(sql, params)
+        return self
+
+    def executemany(self, sql, seq_of_params):
+        seq_of_params = list(seq_of_params)  # Генератор нельзя пройти дважды
+        self._wrote = True
+        self._begin(sql)
+        self._disk.executemany(sql, seq_of_params)
+        self._memory.executemany(sql, seq_of_params)
+        return self
+
+    def _begin(self, sql):
+        """
+        Первая запись транзакции: файл блокируется на запись (BEGIN IMMEDIATE),
+        и только потом копия в памяти догоняет чужие commit. Иначе запись
+        попала бы в устаревшую копию: счетчики AUTOINCREMENT файла и памяти
+        разошлись бы, и теги, история и ключи поиска записались бы в файл
+        с чужим ID. Возвращает True, если sql — сам оператор BEGIN (уже выполнен).
+        """
+        head = sql.lstrip().split(None, 1)[0].upper() if sql.strip() else ""
+        if head not in TRANSACTION_STATEMENTS or self._connection.disk.in_transaction:
+            return False
+        self._disk.execute("BEGIN IMMEDIATE")
+        try:
+            self._connection.refresh_if_changed()
+            self._memory.execute("BEGIN")
+        except sqlite3.Error:
+            self._connection.disk.rollback()
+            raise
+        return head == "BEGIN"
+
+    def _agreed(self, name):
+        """lastrowid/rowcount записи: значение файла, сверенное с копией в памяти."""
+        value = getattr(self._memory, name)
+        if not self._wrote:
+            return value
+        disk_value = getattr(self._disk, name)
+        if disk_value != value:
+            # Копия разошлась с файлом: при следующей записи она перечитывается
+            self._connection.disk_version = None
+            raise sqlite3.DatabaseError(
+                f"Реплика в памяти разошлась с файлом ({name}: {disk_value} != {value})")
+        return disk_value
+
+    @property
+    def lastrowid(self):
+        return self._agreed("lastrowid")
+
+    @property
+    def rowcount(self):
+        return self._agreed("rowcount")
+
+    def fetchone(self):
+        return self._memory.fetchone()
+
+    def fetchmany(self, size=None):
+        return self._memory.fetchmany(size if size is not None else self._memory.arraysize)
+
+    def fetchall(self):
+        return self._memory.fetchall()
+
+    def __iter__(self):
+        return iter(self._memory)
+
+    def __getattr__(self, name):
+        # description и прочее — из памяти
+        return getattr(self._memory, name)
+
+
+class ReplicaConnection:
+    """Пара соединений "файл + память" с интерфейсом sqlite3.Connection."""
+
+    def __init__(self, disk):
+        self.disk = disk
+        self.memory = sqlite3.connect(":memory:")
+        self.reload()
+        self.disk_version = self._read_disk_version()
+
+    def reload(self):
+        """
+        Заново копирует файл в память (после изменений другими процессами).
+        Копирует отдельное соединение: свое может уже держать транзакцию
+        записи (ReplicaCursor._begin), а backup из такого соединения ждет ее конца.
+        """
+        path = self.disk.execute("PRAGMA database_list").fetchone()[2]
+        if not path:
+            self.disk.backup(self.memory)  # Сам файл — база в памяти (тесты)
+            return
+        source = sqlite3.connect(path)
+        try:
+            source.backup(self.memory)
+        finally:
+            source.close()
+
+    def _read_disk_version(self):
+        return self.disk.execute("PRAGMA data_version").fetchone()[0]
+
+    def refresh_if_changed(self):
+        """
+        Если файл изменил другой процесс, перечитывает его в память.
+        Возвращает True, если копия обновлена.
+        """
+        version = self._read_disk_version()
+        if version == self.disk_version:
+            return False
+        self.disk_version = version
+        self.reload()
+        return True
+
+    # --- Интерфейс sqlite3.Connection ---
+
+    def cursor(self):
+        return ReplicaCursor(self, self.memory.cursor(), self.disk.cursor())
+
+    def execute(self, sql, params=()):
+        return self.cursor().execute(sql, params)
+
+    def commit(self):
+        self.disk.commit()
+        self.memory.commit()
+
+    def rollback(self):
+        self.disk.rollback()
+        self.memory.rollback()
+
+    @property
+    def in_transaction(self):
+        return self.disk.in_transaction or self.memory.in_transaction
+
+    def create_function(self, *args, **kwargs):
+        self.disk.create_function(*args, **kwargs)
+        self.memory.create_function(*args, **kwargs)
+
+    def set_trace_callback(self, callback):
+        self.memory.set_trace_callback(callback)
+
+    def set_progress_handler(self, handler, n):
+        self.memory.set_progress_handler(handler, n)
+
+    def backup(self, target, **kwargs):
+        self.disk.backup(target, **kwargs)
+
+    def close(self):
+        self.memory.close()
+        self.disk.close()
+
+    def __getattr__(self, name):
+        # Прочее (blobopen и т.д.) — только чтение, из памяти
+        return getattr(self.memory, name)
@@ -0,0 +1,308 @@
+"""
+Упакованный индекс подстрочного поиска в памяти процесса (нужен numpy).
+
+Значения шести полей поиска (тех же, что в Database._build_filter) приводятся
+к нижнему регистру, повторы схлопываются, и все различные значения
+склеиваются через разделитель в несколько длинных строк — "стогов".
+Поиск подстроки — несколько вызовов str.find/str.split по стогам вместо
+вызова py_lower на каждую строку и колонку. Найденные позиции переводятся
+в номера значений (searchsorted по смещениям), а номера значений —
+в контакты маской по массивам кодов колонок.
+
+ASCII-значения (телефоны, email — основная масса) лежат в отдельных стогах:
+CPython хранит такие строки по байту на символ и ищет в них быстрее всего,
+а кириллический запрос отбрасывает их сразу, не сканируя.
+
+Индекс обновляется по уведомлениям Database (ChangeEvent), в том числе
+о чужих изменениях из change_log. Новые значения копятся в небольшом
+"хвосте" и упаковываются в стог порциями; когда устаревших значений
+становится слишком много, индекс перестраивается при следующем поиске.
+"""
+
+from array import array
+from collections import namedtuple
+
+try:
+    import numpy as np
+except ImportError:  # Без numpy поиск работает запросом SQL, как раньше
+    np = None
+
+# Поля поиска: порядок совпадает с условием в Database._build_filter
+SEARCH_COLUMNS = ("last_name", "first_name", "phone_primary", "email", "notes", "category")
+
+# Разделитель значений в стоге (в запросе и данных его не бывает)
+SEPARATOR = "\x00"
+
+# Сколько вхождений искать циклом str.find; частые подстроки дальше
+# разбираются одним вызовом str.split
+FIND_LOOP_HITS = 64
+
+# Сколько новых значений держать в хвосте, прежде чем упаковать их в стог
+TAIL_SIZE = 4096
+
+# Размер порции ID при чтении измененных строк (лимит параметров SQLite)
+READ_CHUNK = 500
+# Размер порции строк при построении индекса
+BUILD_CHUNK = 10000
+
+# Упакованные значения: стог, смещения начала значений в нем, номера значений
+Segment = namedtuple("Segment", ["haystack", "starts", "vids"])
+
+# Результат поиска: отсортированные ID; negated — это ID, которые НЕ подошли
+# (когда совпало больше половины контактов, дополнение короче)
+SearchHits = namedtuple("SearchHits", ["ids", "negated"])
+
+
+def search_index_available():
+    return np is not None
+
+
+def normalize(value):
+    """Значение поля в виде, в котором оно ищется (как py_lower в SQL)."""
+    if not value:
+        return ""
+    return value.lower().replace(SEPARATOR, " ")
+
+
+def find_positions(haystack, query):
+    """Начала вхождений query в haystack (без перекрытий), массив numpy."""
+    positions = []
+    pos = haystack.find(query)
+    while pos >= 0:
+        positions.append(pos)
+        if len(positions) == FIND_LOOP_HITS:
+            # Частая подстрока: split проходит стог один раз на C,
+            # а длины кусков между вхождениями дают позиции всех вхождений
+            pieces = haystack.split(query)
+            lengths = np.fromiter(map(len, pieces), dtype=np.int64, count=len(pieces))
+            return np.cumsum(lengths[:-1] + len(query)) - len(query)
+        pos = haystack.find(query, pos + len(query))
+    return np.array(positions, dtype=np.int64)
+
+
+def pack(values, vids):
+    """Склеивает значения в один стог."""
+    lengths = np.fromiter(map(len, values), dtype=np.int64, count=len(values)) + len(SEPARATOR)
+    starts = np.zeros(len(values), dtype=np.int64)
+    np.cumsum(lengths[:-1], out=starts[1:])
+    return Segment(SEPARATOR.join(values) + SEPARATOR, starts, np.asarray(vids, dtype=np.int32))
+
+
+def pack_by_kind(values, vids):
+    """Стоги ASCII-значений и остальных значений (пустые не добавляются)."""
+    segments = []
+    for ascii_kind in (True, False):
+        chosen = [(value, vid) for value, vid in zip(values, vids) if value.isascii() == ascii_kind]
+        if chosen:
+            segments.append(pack([value for value, _ in chosen], [vid for _, vid in chosen]))
+    return segments
+
+
+class SearchIndex:
+    """
+    Индекс подстрок по контактам. Номер контакта в индексе (ordinal) — позиция
+    в массиве ids, отсортированном по ID; коды колонок — номера значений (vid),
+    vid 0 — пустое значение, которое ничему не соответствует.
+    """
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.stale = True
+
+    # --- Построение ---
+
+    def build(self):
+        """Полное построение по контактам (при включении и после сброса)."""
+        columns = ", ".join(SEARCH_COLUMNS)
+        cursor = self.connection.execute(f"SELECT id, {columns} FROM contact_rows ORDER BY id")
+        dictionary = {"": 0}
+        ids = array("q")
+        codes = [array("i") for _ in SEARCH_COLUMNS]
+        # Порциями: список всех строк таблицы занял бы в памяти в разы больше индекса
+        while True:
+            rows = cursor.fetchmany(BUILD_CHUNK)
+            if not rows:
+                break
+            ids.extend(row[0] for row in rows)
+            for c, column in enumerate(codes):
+                column.extend(dictionary.setdefault(normalize(row[c + 1]), len(dictionary))
+                              for row in rows)
+        ids = np.array(ids, dtype=np.int64)
+        codes = [np.array(column, dtype=np.int32) for column in codes]
+
+        values = list(dictionary)
+        self.count = len(ids)
+        self.ids = ids
+        self.alive = np.ones(self.count, dtype=bool)
+        self.codes = codes
+        self.value_count = len(values)
+        # В каких колонках встречается значение (биты): маска считается только по ним
+        self.value_columns = np.zeros(self.value_count, dtype=np.uint8)
+        for c, column in enumerate(codes):
+            self.value_columns[column] |= np.uint8(1 << c)
+        # Повторяющиеся значения (имена, категории) переиспользуются при правках,
+        # уникальные (телефоны, email) при правке просто получают новый номер
+        counts = np.zeros(self.value_count, dtype=np.int64)
+        for column in codes:
+            counts += np.bincount(column, minlength=self.value_count)
+        self.common = {values[vid]: int(vid) for vid in np.flatnonzero(counts > 1)}
+        self.common[""] = 0
+        self.segments = pack_by_kind(values[1:], range(1, self.value_count))
+        self.tail_values = []
+        self.tail_vids = []
+        self.garbage = 0
+        self.stale = False
+
+    def _grow(self, size):
+        """Увеличивает емкость массивов контактов (удвоением)."""
+        if size <= len(self.ids):
+            return
+        capacity = max(size, len(self.ids) * 2, 1024)
+        self.ids = np.resize(self.ids, capacity)
+        self.alive = np.resize(self.alive, capacity)
+        self.alive[self.count:] = False
+        self.codes = [np.resize(column, capacity) for column in self.codes]
+
+    def _add_value(self, value, column):
+        """Номер значения (новое значение попадает в хвост)."""
+        vid = self.common.get(value)
+        if vid is None:
+            vid = self.value_count
+            self.value_count += 1
+            self.tail_values.append(value)
+            self.tail_vids.append(vid)
+            if len(self.tail_values) >= TAIL_SIZE:
+                self.segments.extend(pack_by_kind(self.tail_values, self.tail_vids))
+                self.tail_values, self.tail_vids = [], []
+        if vid >= len(self.value_columns):
+            self.value_columns = np.resize(self.value_columns, max(vid + 1, len(self.value_columns) * 2))
+            self.value_columns[vid:] = 0
+        self.value_columns[vid] |= np.uint8(1 << column)
+        return vid
+
+    # --- Обновление по уведомлениям Database ---
+
+    def on_change(self, event):
+        """Подписчик Database.add_listener."""
+        if self.stale:
+            return
+        if event.table == "categories":
+            # Имя категории хранится в справочнике: переименование меняет
+            # значение у всех ее контактов сразу — проще перестроить
+            if event.action != "insert":
+                self.stale = True
+            return
+        if event.table != "contacts":
+            return
+        if event.ids is None:
+            # Затронуты все записи: после очистки базы индекс просто пуст,
+            # иначе перестраивается при следующем поиске
+            if event.action == "delete":
+                self._clear()
+            else:
+                self.stale = True
+            return
+        if event.action == "delete":
+            self.remove(event.ids)
+            return
+        columns = None
+        if event.action == "update" and event.fields is not None:
+            columns = [c for c, name in enumerate(SEARCH_COLUMNS) if name in event.fields]
+            if not columns:
+                return  # Поля поиска не менялись
+        self.update(event.ids, columns)
+
+    def _clear(self):
+        self.count = 0
+        self.alive[:] = False
+
+    def update(self, ids, columns=None):
+        """Перечитывает строки ids (новые или измененные); columns — номера колонок."""
+        columns = range(len(SEARCH_COLUMNS)) if columns is None else columns
+        ids = list(ids)
+        found = set()
+        names = ", ".join(SEARCH_COLUMNS)
+        for start in range(0, len(ids), READ_CHUNK):
+            chunk = ids[start:start + READ_CHUNK]
+            placeholders = ", ".join("?" for _ in chunk)
+            rows = self.connection.execute(
+                f"SELECT id, {names} FROM contact_rows WHERE id IN ({placeholders}) ORDER BY id",
+                chunk).fetchall()
+            for row in rows:
+                ordinal = self._ordinal(row[0])
+                if ordinal is None:
+                    self.stale = True  # ID меньше известных, но не найден — редкий случай
+                    return
+                for c in columns:
+                    if self.codes[c][ordinal]:
+                        self.garbage += 1
+                    self.codes[c][ordinal] = self._add_value(normalize(row[c + 1]), c)
+                found.add(row[0])
+        # Строки, которых уже нет (удалены после уведомления), убираем
+        self.remove([i for i in ids if i not in found])
+        if self.garbage > self.value_count // 2 + TAIL_SIZE:
+            self.stale = True  # Устаревших значений слишком много — перестроить
+
+    def _ordinal(self, contact_id):
+        """Номер контакта в индексе; новый ID больше всех известных добавляется в конец."""
+        ordinal = int(np.searchsorted(self.ids[:self.count], contact_id))
+        if ordinal < self.count and self.ids[ordinal] == contact_id:
+            self.alive[ordinal] = True
+            return ordinal
+        if ordinal < self.count:
+            return None
+        self._grow(self.count + 1)
+        self.ids[ordinal] = contact_id
+        self.alive[ordinal] = True
+        for column in self.codes:
+            column[ordinal] = 0
+        self.count += 1
+        return ordinal
+
+    def remove(self, ids):
+        if not len(ids) or not self.count:
+            return
+        ids = np.asarray(ids, dtype=np.int64)
+        ordinals = np.searchsorted(self.ids[:self.count], ids)
+        ordinals = ordinals[ordinals < self.count]
+        ordinals = ordinals[np.isin(self.ids[ordinals], ids)]
+        self.alive[ordinals] = False
+        self.garbage += len(ordinals) * len(SEARCH_COLUMNS)
+
+    # --- Поиск ---
+
+    def search(self, text, columns=None):
+        """
+        ID контактов, у которых хотя бы одно поле поиска содержит text
+        (без учета регистра); columns — имена полей, если искать не во всех.
+        None — запрос нельзя выполнить индексом
+        (символы шаблона LIKE "%" и "_"), нужен обычный SQL.
+        """
+        query = normalize(text)
+        if not query or "%" in query or "_" in query:
+            return None
+        if self.stale:
+            self.build()
+        vids = [segment.vids[np.searchsorted(segment.starts, find_positions(segment.haystack, query),
+                                             side="right") - 1]
+                for segment in self.segments]
+        vids.append(np.array([vid for value, vid in zip(self.tail_values, self.tail_vids)
+                              if query in value], dtype=np.int32))
+        vids = np.concatenate(vids)
+        # Таблица "значение подходит", затем маска контактов по колонкам,
+        # в которых найденные значения вообще встречаются
+        matched = np.zeros(self.value_count, dtype=bool)
+        matched[vids] = True
+        column_bits = int(np.bitwise_or.reduce(self.value_columns[vids])) if len(vids) else 0
+        if columns is not None:
+            column_bits &= sum(1 << SEARCH_COLUMNS.index(name) for name in columns)
+        hit = np.zeros(self.count, dtype=bool)
+        for c, column in enumerate(self.codes):
+            if column_bits & (1 << c):
+                hit |= matched[column[:self.count]]
+        alive = self.alive[:self.count]
+        hit &= alive
+        hit_count = int(np.count_nonzero(hit))
+        if hit_count * 2 > int(np.count_nonzero(alive)):
+            return SearchHits(self.ids[:self.count][alive & ~hit], True)
+        return SearchHits(self.ids[:self.count][hit], False)
@@ -0,0 +1,177 @@
+"""
+Умные группы — сохраненные поиски (строка поиска с синтаксисом
+app/query_syntax.py, например "category:Клиенты -has:email").
+
+Состав группы хранится в таблице saved_search_members, поэтому открыть
+группу — одно чтение по первичному ключу, а не выполнение условия.
+Состав поддерживается по журналу изменений (change_log): после каждой
+записи условие группы проверяется только для измененных строк
+(id IN (...) AND условие). Так же подхватываются чужие изменения и правки,
+сделанные, пока программа была закрыта. Полный пересчет — только когда
+журнал уже сжат, изменились теги или категории (переименование меняет смысл
+условия) или условие зависит от текущей даты ("modified:last-30d") и день сменился.
+"""
+
+import sqlite3
+from datetime import date
+
+from .query_syntax import compile_query
+
+# Записей журнала за одно чтение
+SYNC_PAGE = 1000
+# Если изменено больше строк, группа пересчитывается целиком (одним запросом быстрее)
+FULL_REBUILD_ROWS = 20000
+# Размер порции ID при проверке условия (лимит параметров SQLite)
+READ_CHUNK = 500
+
+
+class SmartGroups:
+    """Сохраненные поиски и их состав (таблицы создает Database._create_saved_searches)."""
+
+    def __init__(self, db):
+        self.db = db
+
+    # --- Список и правка ---
+
+    def get_all(self):
+        """Группы: список (id, имя, запрос, число контактов) в порядке создания."""
+        self.sync()
+        self.db.cursor.execute(
+            "SELECT id, name, query, member_count FROM saved_searches ORDER BY id")
+        return self.db.cursor.fetchall()
+
+    def add(self, name, query, search_mode="smart"):
+        """Сохраняет поиск и сразу считает состав. Возвращает (успех, сообщение)."""
+        name = " ".join((name or "").split())
+        query = (query or "").strip()
+        if not name or not query:
+            return False, "Нужны имя группы и строка поиска"
+        try:
+            self.sync()  # Остальные группы — на ту же позицию журнала
+            self.db.cursor.execute(
+                "INSERT INTO saved_searches (name, query, search_mode) VALUES (?, ?, ?)",
+                (name, query, search_mode))
+            search_id = self.db.cursor.lastrowid
+            self._rebuild(search_id, query, search_mode)
+            self._mark_synced(search_id, self.db.get_change_cursor())
+            self.db._commit()
+            self.db._notify("saved_searches", "insert", [search_id])
+            return True, "Группа сохранена"
+        except sqlite3.Error as e:
+            self.db._rollback()
+            return False, f"Ошибка базы данных: {e}"
+
+    def rename(self, search_id, name):
+        name = " ".join((name or "").split())
+        if not name:
+            return False, "Имя группы не может быть пустым"
+        try:
+            self.db.cursor.execute(
+                "UPDATE saved_searches SET name = ? WHERE id = ?", (name, search_id))
+            self.db._commit()
+            self.db._notify("saved_searches", "update", [search_id], {"name"})
+            return True, "Группа переименована"
+        except sqlite3.Error as e:
+            return False, f"Ошибка базы данных: {e}"
+
+    def delete(self, search_id):
+        """Удаляет группу (состав удаляет триггер); контакты не трогаются."""
+        try:
+            self.db.cursor.execute("DELETE FROM saved_searches WHERE id = ?", (search_id,))
+            self.db._commit()
+            self.db._notify("saved_searches", "delete", [search_id])
+            return True
+        except sqlite3.Error:
+            self.db._rollback()
+            return False
+
+    # --- Поддержание состава ---
+
+    def on_change(self, event):
+        """Подписчик Database.add_listener: свои и чужие правки контактов."""
+        if event.table in ("contacts", "tags", "categories"):
+            self.sync()
+
+    def sync(self):
+        """Догоняет журнал изменений: проверяет условия групп для измененных строк."""
+        cursor = self.db.cursor
+        try:
+            cursor.execute(
+                "SELECT id, query, search_mode, synced_seq, evaluated_on FROM saved_searches")
+            groups = cursor.fetchall()
+            if not groups:
+                return
+            today = date.today()
+            records = []
+            since = min(group[3] for group in groups)
+            changes = self.db.get_changes(since, SYNC_PAGE, ("contacts", "tags", "categories"))
+            full = changes is None  # Нужные записи журнала уже удалены
+            while changes and not full:
+                records.extend(changes)
+                full = len(records) > FULL_REBUILD_ROWS
+                changes = self.db.get_changes(changes[-1].seq, SYNC_PAGE, ("contacts", "tags", "categories"))
+            head = self.db.get_change_cursor()
+            for search_id, query, search_mode, synced_seq, evaluated_on in groups:
+                fresh = [r for r in records if r.seq > synced_seq]
+                if not fresh and synced_seq >= head and evaluated_on == today.isoformat():
+                    continue
+                if full or self._depends_on_date(query, evaluated_on, today) or any(
+                        r.table != "contacts" and r.action != "insert" for r in fresh):
+                    self._rebuild(search_id, query, search_mode)
+                else:
+                    # Удаленные контакты уже убрал триггер
+                    ids = {r.row_id for r in fresh if r.table == "contacts" and r.action != "delete"}
+                    self._evaluate(search_id, query, search_mode, list(ids))
+                self._mark_synced(search_id, head)
+            self.db._commit()
+        except sqlite3.Error as e:
+            self.db._rollback()
+            print(f"Ошибка БД: {e}")
+
+    @staticmethod
+    def _depends_on_date(query, evaluated_on, today):
+        """Условие с относительными датами посчитано в другой день."""
+        if evaluated_on is None:
+            return True
+        if evaluated_on == today.isoformat():
+            return False
+        return compile_query(query, today) != compile_query(query, date.fromisoformat(evaluated_on))
+
+    def _mark_synced(self, search_id, seq):
+        self.db.cursor.execute(
+            "UPDATE saved_searches SET synced_seq = ?, evaluated_on = ? WHERE id = ?",
+            (seq, date.today().isoformat(), search_id))
+
+    def _rebuild(self, search_id, query, search_mode):
+        """Полный пересчет состава одним запросом (условие — по индексам)."""
+        cursor = self.db.cursor
+        cursor.execute("DELETE FROM saved_search_members WHERE search_id = ?", (search_id,))
+        where, params = self.db._build_filter(query, search_mode=search_mode)
+        cursor.execute(
+            f"""INSERT INTO saved_search_members (search_id, contact_id)
+                SELECT ?, id FROM contact_rows WHERE {where}""", [search_id] + params)
+        cursor.execute(
+            "UPDATE saved_searches SET member_count = ? WHERE id = ?", (cursor.rowcount, search_id))
+
+    def _evaluate(self, search_id, query, search_mode, ids):
+        """Проверяет условие группы только для строк ids."""
+        if not ids:
+            return
+        cursor = self.db.cursor
+        where, params = self.db._build_filter(query, search_mode=search_mode, row_check=True)
+        delta = 0
+        for start in range(0, len(ids), READ_CHUNK):
+            chunk = ids[start:start + READ_CHUNK]
+            placeholders = ", ".join("?" for _ in chunk)
+            cursor.execute(
+                f"DELETE FROM saved_search_members WHERE search_id = ? AND contact_id IN ({placeholders})",
+                [search_id] + chunk)
+            delta -= cursor.rowcount
+            cursor.execute(
+                f"""INSERT INTO saved_search_members (search_id, contact_id)
+                    SELECT ?, id FROM contact_rows WHERE id IN ({placeholders}) AND {where}""",
+                [search_id] + chunk + params)
+            delta += cursor.rowcount
+        if delta:
+            cursor.execute(
+                "UPDATE saved_searches SET member_count = member_count + ? WHERE id = ?", (delta, search_id))
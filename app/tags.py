@@ -0,0 +1,178 @@
+"""
+Теги контактов: произвольные имена, связь многие-ко-многим
+(таблицы tags и contact_tags, см. Database._create_tag_tables).
+
+Фильтр по нескольким тегам (И / ИЛИ / НЕ) считается в памяти по битовым
+картам: у каждого тега — целое Python, бит N которого установлен, если
+контакт с id = N помечен этим тегом (id плотные, дыры от удалений только
+удлиняют число). Сочетание тегов — операции & | над целыми, без JOIN в SQL;
+в запрос уходит готовый список ID.
+
+Карты строятся при первом фильтре по тегам и дальше обновляются
+по уведомлениям Database (в том числе о чужих изменениях из change_log).
+"""
+
+from collections import namedtuple
+
+# Условие фильтра: include — имена тегов, которые должны быть у контакта
+# (все — match_all=True, хотя бы один — False), exclude — которых быть не должно
+TagFilter = namedtuple("TagFilter", ["include", "exclude", "match_all"],
+                       defaults=((), (), True))
+
+# Размер порции ID при чтении связей (лимит параметров SQLite)
+READ_CHUNK = 500
+
+# Номера установленных битов для каждого значения байта
+BYTE_BITS = [tuple(bit for bit in range(8) if value >> bit & 1) for value in range(256)]
+
+
+def bitmap_from_ids(ids):
+    """Битовая карта (int) из ID."""
+    ids = list(ids)
+    if not ids:
+        return 0
+    buffer = bytearray(max(ids) // 8 + 1)
+    for contact_id in ids:
+        buffer[contact_id >> 3] |= 1 << (contact_id & 7)
+    return int.from_bytes(buffer, "little")
+
+
+def ids_from_bitmap(bits):
+    """ID установленных битов по возрастанию."""
+    data = bits.to_bytes((bits.bit_length() + 7) // 8, "little")
+    ids = []
+    for index, value in enumerate(data):
+        if value:
+            base = index * 8
+            ids.extend(base + bit for bit in BYTE_BITS[value])
+    return ids
+
+
+def normalize_tag(name):
+    """Имя тега без лишних пробелов (пустая строка — не тег)."""
+    return " ".join((name or "").split())
+
+
+def parse_tags(text):
+    """Теги из строки "работа, дача, важное" (повторы без учета регистра убираются)."""
+    tags = {}
+    for part in (text or "").split(","):
+        name = normalize_tag(part)
+        if name:
+            tags.setdefault(name.lower(), name)
+    return list(tags.values())
+
+
+class TagBitmaps:
+    """Битовые карты тегов и всех существующих контактов."""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.loaded = False
+
+    def load(self):
+        self.names = {}     # id тега -> имя
+        self.by_name = {}   # имя в нижнем регистре -> id тега
+        self.bitmaps = {}   # id тега -> карта контактов
+        for tag_id, name in self.connection.execute("SELECT id, name FROM tags").fetchall():
+            self._set_name(tag_id, name)
+        self.universe = bitmap_from_ids(
+            row[0] for row in self.connection.execute("SELECT id FROM contacts"))
+        members = {}
+        for contact_id, tag_id in self.connection.execute(
+                "SELECT contact_id, tag_id FROM contact_tags"):
+            members.setdefault(tag_id, []).append(contact_id)
+        for tag_id, ids in members.items():
+            self.bitmaps[tag_id] = bitmap_from_ids(ids)
+        self.loaded = True
+
+    def _set_name(self, tag_id, name):
+        old = self.names.get(tag_id)
+        if old is not None:
+            self.by_name.pop(old.lower(), None)
+        self.names[tag_id] = name
+        self.by_name[name.lower()] = tag_id
+
+    # --- Обновление по уведомлениям Database ---
+
+    def on_change(self, event):
+        """Подписчик Database.add_listener."""
+        if not self.loaded or event.table not in ("contacts", "tags"):
+            return
+        if event.ids is None:
+            self.loaded = False  # Затронуто всё — перечитать при следующем фильтре
+            return
+        if event.table == "tags":
+            self._reload_tags(event.ids)
+            return
+        mask = bitmap_from_ids(event.ids)
+        if event.action == "delete":
+            self.universe &= ~mask
+            for tag_id in self.bitmaps:
+                self.bitmaps[tag_id] &= ~mask
+            return
+        if event.action == "insert":
+            self.universe |= mask
+        if event.action == "insert" or event.fields is None or "tags" in event.fields:
+            self._reload_contacts(event.ids, mask)
+
+    def _reload_tags(self, tag_ids):
+        """Перечитывает имена тегов (создание, переименование, удаление)."""
+        for tag_id in tag_ids:
+            row = self.connection.execute("SELECT name FROM tags WHERE id = ?", (tag_id,)).fetchone()
+            if row is None:
+                name = self.names.pop(tag_id, None)
+                if name is not None:
+                    self.by_name.pop(name.lower(), None)
+                self.bitmaps.pop(tag_id, None)
+            else:
+                self._set_name(tag_id, row[0])
+
+    def _reload_contacts(self, ids, mask):
+        """Перечитывает теги контактов ids."""
+        for tag_id in self.bitmaps:
+            self.bitmaps[tag_id] &= ~mask
+        ids = list(ids)
+        members = {}
+        for start in range(0, len(ids), READ_CHUNK):
+            chunk = ids[start:start + READ_CHUNK]
+            placeholders = ", ".join("?" for _ in chunk)
+            for contact_id, tag_id in self.connection.execute(
+                    f"SELECT contact_id, tag_id FROM contact_tags WHERE contact_id IN ({placeholders})",
+                    chunk):
+                members.setdefault(tag_id, []).append(contact_id)
+        for tag_id, tag_ids in members.items():
+            self.bitmaps[tag_id] = self.bitmaps.get(tag_id, 0) | bitmap_from_ids(tag_ids)
+
+    # --- Фильтр ---
+
+    def match(self, tag_filter):
+        """
+        Карта контактов, подходящих под TagFilter.
+        Возвращает (карта, число подходящих, число всех контактов).
+        """
+        if not self.loaded:
+            self.load()
+
+        def bitmap(name):
+            tag_id = self.by_name.get(normalize_tag(name).lower())
+            return self.bitmaps.get(tag_id, 0)
+
+        if tag_filter.include:
+            maps = [bitmap(name) for name in tag_filter.include]
+            result = maps[0]
+            for other in maps[1:]:
+                result = result & other if tag_filter.match_all else result | other
+            result &= self.universe
+        else:
+            result = self.universe
+        for name in tag_filter.exclude:
+            result &= ~bitmap(name)
+        return result, result.bit_count(), self.universe.bit_count()
+
+    def counts(self):
+        """Число контактов у каждого тега: {имя: количество}."""
+        if not self.loaded:
+            self.load()
+        return {self.names[tag_id]: (bits & self.universe).bit_count()
+                for tag_id, bits in self.bitmaps.items() if tag_id in self.names}
@@ -0,0 +1,208 @@
+"""
+Вычисление служебных ключей для текстовых полей контактов.
+Ключи считаются в Python один раз при записи и хранятся в БД,
+поэтому сортировка и поиск идут по индексу без вызова Python на каждое сравнение.
+"""
+
+import calendar
+import re
+from datetime import datetime
+
+# Разделители внутри ключа сортировки.
+# Оба меньше любого печатного символа, поэтому "Иван" окажется раньше "Иванов".
+LEVEL_SEP = "\x01"  # Между уровнями сравнения (основной / ё / регистр)
+PART_SEP = "\x02"   # Между частями ФИО (фамилия / имя / отчество)
+
+
+def fold(text):
+    """Приводит строку к виду для сравнения: нижний регистр и ё = е."""
+    return (text or "").strip().lower().replace("ё", "е")
+
+
+def name_sort_key(last_name, first_name, patronymic=""):
+    """
+    Ключ сортировки ФИО по правилам русского алфавита.
+    1-й уровень: без учета регистра, ё приравнена к е.
+    2-й уровень (при равенстве): е раньше ё.
+    3-й уровень: строчные раньше заглавных.
+    Ключ сравнивается побайтно (BINARY), поэтому по нему строится обычный индекс.
+    """
+    parts = [(p or "").strip() for p in (last_name, first_name, patronymic)]
+    primary = PART_SEP.join(fold(p) for p in parts)
+    secondary = PART_SEP.join(p.lower() for p in parts)
+    tertiary = PART_SEP.join(p.swapcase() for p in parts)
+    return LEVEL_SEP.join((primary, secondary, tertiary))
+
+
+# --- Раскладка клавиатуры и транслитерация ---
+
+# Одни и те же клавиши в раскладках QWERTY и ЙЦУКЕН
+_EN_KEYS = "`qwertyuiop[]asdfghjkl;'zxcvbnm,."
+_RU_KEYS = "ёйцукенгшщзхъфывапролджэячсмитьбю"
+_EN_TO_RU = str.maketrans(_EN_KEYS, _RU_KEYS)
+_RU_TO_EN = str.maketrans(_RU_KEYS, _EN_KEYS)
+
+# Транслитерация кириллицы латиницей (упрощенная, близкая к загранпаспортной)
+_TRANSLIT = str.maketrans({
+    "а": "a", "б": "b", "в": "v", "г": "g", "д": "d", "е": "e", "ж": "zh",
+    "з": "z", "и": "i", "й": "y", "к": "k", "л": "l", "м": "m", "н": "n",
+    "о": "o", "п": "p", "р": "r", "с": "s", "т": "t", "у": "u", "ф": "f",
+    "х": "kh", "ц": "ts", "ч": "ch", "ш": "sh", "щ": "shch", "ъ": "", "ы": "y",
+    "ь": "", "э": "e", "ю": "yu", "я": "ya",
+})
+
+# Сведение разных вариантов латинского написания к одному виду.
+# Порядок важен: длинные сочетания заменяются раньше коротких.
+_CANON_RULES = (
+    ("shch", "sh"), ("sch", "sh"), ("kh", "h"), ("tz", "c"), ("ts", "c"),
+    ("ph", "f"), ("ck", "k"), ("w", "v"), ("x", "ks"), ("q", "k"), ("j", "y"),
+    ("yo", "e"), ("ye", "e"), ("iya", "ia"), ("ya", "ia"), ("yu", "iu"),
+    ("iy", "i"), ("yi", "i"), ("ey", "ei"), ("ii", "i"),
+)
+
+_WORD_RE = re.compile(r"[^\W_]+")
+
+
+def swap_layout_to_ru(text):
+    """Текст, набранный в английской раскладке вместо русской: 'Bdfyjd' -> 'иванов'."""
+    return text.lower().translate(_EN_TO_RU)
+
+
+def swap_layout_to_en(text):
+    """Текст, набранный в русской раскладке вместо английской: 'шмфт' -> 'ivan'."""
+    return text.lower().translate(_RU_TO_EN)
+
+
+def translit_key(word):
+    """
+    Ключ слова для поиска без учета алфавита: 'Иванов', 'Ivanov' -> 'ivanov'.
+    Кириллица транслитерируется, затем латиница сводится к каноническому виду.
+    """
+    key = "".join(_WORD_RE.findall(fold(word))).translate(_TRANSLIT)
+    for src, dst in _CANON_RULES:
+        key = key.replace(src, dst)
+    # Конечная -y пишется по-разному: Dmitry = Dmitriy = Дмитрий
+    if key.endswith("y"):
+        key = key[:-1] + "i"
+    return key
+
+
+def name_keys(last_name, first_name, patronymic=""):
+    """Набор ключей для всех слов ФИО (составная фамилия дает несколько слов)."""
+    keys = set()
+    for part in (last_name, first_name, patronymic):
+        for word in _WORD_RE.findall(fold(part)):
+            key = translit_key(word)
+            if key:
+                keys.add(key)
+    return keys
+
+
+def query_key_variants(word):
+    """
+    Варианты ключа для одного слова запроса: как набрано,
+    в перепутанной раскладке (en->ru и ru->en) и транслитом.
+    Все варианты уже в виде translit_key, поэтому сравниваются с name_keys.
+    """
+    variants = {translit_key(word),
+                translit_key(swap_layout_to_ru(word)),
+                translit_key(swap_layout_to_en(word))}
+    variants.discard("")
+    return variants
+
+
+# --- Нечеткий поиск: триграммы и фонетический ключ ---
+
+# Упрощенная русская фонетика: безударные гласные сливаются, ь/ъ не слышны
+_PHONETIC_VOWELS = str.maketrans({
+    "о": "а", "я": "а", "е": "и", "э": "и", "ы": "и", "ю": "у", "й": "и",
+    "щ": "ш", "ь": None, "ъ": None,
+})
+# Оглушение звонких согласных на конце слова и перед глухими
+_DEVOICE = {"б": "п", "в": "ф", "г": "к", "д": "т", "ж": "ш", "з": "с"}
+_VOICELESS = set("пфктшсхцчщ")
+
+
+def word_list(text):
+    """Слова строки в нормализованном виде (для триграмм и фонетики)."""
+    return _WORD_RE.findall(fold(text))
+
+
+def trigrams(text):
+    """
+    Множество триграмм всех слов строки.
+    Слово дополняется пробелами ("  иванов "), чтобы начало слова весило больше.
+    """
+    result = set()
+    for word in word_list(text):
+        padded = f"  {word} "
+        for i in range(len(padded) - 2):
+            result.add(padded[i:i + 3])
+    return result
+
+
+def phonetic_key(word):
+    """
+    Фонетический ключ слова: 'Петрова' и 'Питрова' дают одно и то же,
+    'Ана' и 'Анна' тоже. Латиница сводится к translit_key.
+    """
+    word = "".join(word_list(word))
+    if not word:
+        return ""
+    if word.isascii():
+        return translit_key(word)
+    # "тс"/"дс"/"тьс" звучат как "ц"
+    for src in ("тьс", "тс", "дс"):
+        word = word.replace(src, "ц")
+    word = word.translate(_PHONETIC_VOWELS)
+    chars = list(word)
+    for i, ch in enumerate(chars):
+        if ch in _DEVOICE:
+            is_last = i == len(chars) - 1
+            if is_last or chars[i + 1] in _VOICELESS:
+                chars[i] = _DEVOICE[ch]
+    # Удвоенные буквы звучат как одна: "Анна" = "Ана"
+    collapsed = []
+    for ch in chars:
+        if not collapsed or collapsed[-1] != ch:
+            collapsed.append(ch)
+    return "".join(collapsed)
+
+
+def similarity(trigrams_a, trigrams_b):
+    """Коэффициент Дайса для двух множеств триграмм (от 0 до 1)."""
+    if not trigrams_a or not trigrams_b:
+        return 0.0
+    return 2 * len(trigrams_a & trigrams_b) / (len(trigrams_a) + len(trigrams_b))
+
+
+# --- Даты ---
+
+def timestamp_key(text):
+    """
+    Время "ГГГГ-ММ-ДД ЧЧ:ММ:СС" целым числом секунд (местное время записи
+    как есть, без пересчета поясов): сортируется и сравнивается по индексу.
+    None — пусто или не разобрано.
+    """
+    try:
+        return calendar.timegm(datetime.strptime(text, "%Y-%m-%d %H:%M:%S").timetuple())
+    except (TypeError, ValueError):
+        return None
+
+
+def day_key(day):
+    """Полночь даты (datetime.date) в тех же секундах, что timestamp_key."""
+    return calendar.timegm(day.timetuple())
+
+
+def birth_key(text):
+    """
+    Дата рождения "ДД.ММ.ГГГГ" целым ГГГГММДД: диапазон лет — диапазон чисел,
+    а остаток от деления на 10000 (ММДД) — день рождения без года.
+    None — пусто или не разобрано.
+    """
+    try:
+        born = datetime.strptime(text, "%d.%m.%Y")
+    except (TypeError, ValueError):
+        return None
+    return born.year * 10000 + born.month * 100 + born.day
@@ -0,0 +1,97 @@
+import tkinter as tk
+from tkinter import ttk, messagebox, simpledialog
+
+
+class CategoriesWindow(tk.Toplevel):
+    """
+    Окно 'Категории': справочник категорий с числом контактов.
+    Переименование меняет одну строку справочника, поэтому мгновенно
+    и для категории на сотни тысяч контактов.
+    """
+
+    def __init__(self, parent, db):
+        super().__init__(parent)
+        self.db = db
+        self.title("Категории")
+        self.geometry("420x400")
+        self.transient(parent)
+
+        main_frame = tk.Frame(self, padx=10, pady=10)
+        main_frame.pack(fill=tk.BOTH, expand=True)
+
+        self.tree = ttk.Treeview(main_frame, columns=("name", "count"),
+                                 show="headings", selectmode="browse")
+        self.tree.heading("name", text="Категория")
+        self.tree.heading("count", text="Контактов")
+        self.tree.column("name", width=260)
+        self.tree.column("count", width=100, anchor=tk.E)
+        sb_y = ttk.Scrollbar(main_frame, orient=tk.VERTICAL, command=self.tree.yview)
+        self.tree.configure(yscrollcommand=sb_y.set)
+        sb_y.pack(side=tk.RIGHT, fill=tk.Y)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.tree.bind("<Double-1>", lambda e: self.rename())
+
+        btn_frame = tk.Frame(self, pady=5)
+        btn_frame.pack(fill=tk.X)
+        tk.Button(btn_frame, text="Добавить", command=self.add,
+                  width=12, cursor="hand2").pack(side=tk.LEFT, padx=5)
+        tk.Button(btn_frame, text="Переименовать", command=self.rename,
+                  width=14, cursor="hand2").pack(side=tk.LEFT, padx=5)
+        tk.Button(btn_frame, text="Удалить", command=self.delete,
+                  width=12, cursor="hand2").pack(side=tk.LEFT, padx=5)
+        tk.Button(btn_frame, text="Закрыть", command=self.destroy,
+                  width=12, cursor="hand2").pack(side=tk.RIGHT, padx=5)
+
+        self.bind("<Escape>", lambda e: self.destroy())
+        self.refresh()
+
+    def refresh(self):
+        """Перечитывает справочник (выбранная строка сохраняется)."""
+        selected = self.tree.selection()
+        self.tree.delete(*self.tree.get_children())
+        for category_id, name, count in self.db.get_categories():
+            self.tree.insert("", tk.END, iid=str(category_id), values=(name, count))
+        if selected and self.tree.exists(selected[0]):
+            self.tree.selection_set(selected[0])
+
+    def selected_category(self):
+        """(id, имя) выбранной категории или None."""
+        selection = self.tree.selection()
+        if not selection:
+            messagebox.showwarning("Категории", "Выберите категорию", parent=self)
+            return None
+        return int(selection[0]), self.tree.set(selection[0], "name")
+
+    def add(self):
+        name = simpledialog.askstring("Новая категория", "Название:", parent=self)
+        if name is None:
+            return
+        self.show_result(*self.db.add_category(name))
+
+    def rename(self):
+        selected = self.selected_category()
+        if selected is None:
+            return
+        category_id, old_name = selected
+        name = simpledialog.askstring("Переименование", "Новое название:",
+                                      initialvalue=old_name, parent=self)
+        if name is None or name == old_name:
+            return
+        self.show_result(*self.db.rename_category(category_id, name))
+
+    def delete(self):
+        selected = self.selected_category()
+        if selected is None:
+            return
+        category_id, name = selected
+        if not messagebox.askyesno(
+                "Удаление", f"Удалить категорию «{name}»?\n"
+                            "Ее контакты перейдут в «Не распределён».", parent=self):
+            return
+        self.show_result(*self.db.delete_category(category_id))
+
+    def show_result(self, success, message):
+        if success:
+            self.refresh()
+        else:
+            messagebox.showerror("Категории", message, parent=self)
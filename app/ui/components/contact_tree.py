@@ -71,9 +71,20 @@ class ContactTableFrame(tk.Frame):
         self.tree.bind("<Button-3>", on_r_click)    # ПКМ (контекстное меню)
 
     def clear(self):
-        """Удаляет все строки из таблицы (перед обновлением)."""
-        for row in self.tree.get_children():
-            self.tree.delete(row)
+        """Удаляет все строки из таблицы (перед обновлением) одним вызовом."""
+        rows = self.tree.get_children()
+        if rows:
+            self.tree.delete(*rows)
+
+    def delete_rows(self, ids):
+        """Удаляет из таблицы только указанные строки (без перезагрузки всего списка)."""
+        existing = [str(cid) for cid in ids if self.tree.exists(str(cid))]
+        if existing:
+            self.tree.delete(*existing)
+
+    def row_count(self):
+        """Количество строк в таблице."""
+        return len(self.tree.get_children())
 
     def insert_contact(self, cid, values, tag="normal"):
         """Вставляет новую строку. iid=cid позволяет использовать ID из БД как ID строки таблицы."""
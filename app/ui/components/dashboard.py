@@ -1,5 +1,12 @@
 import tkinter as tk
 from tkinter import messagebox, simpledialog
+from datetime import datetime, timedelta
+
+# Поля, от которых зависит блок дней рождения (дата и отображаемое имя)
+BIRTHDAY_FIELDS = {"birth_date", "last_name", "first_name"}
+
+# Задержка поиска по заметкам после нажатия клавиши, мс
+SEARCH_DELAY_MS = 250
 
 
 class DashboardFrame(tk.Frame):
@@ -13,11 +20,17 @@ class DashboardFrame(tk.Frame):
         super().__init__(parent, bg="#f0f0f0", pady=5, padx=10)
         self.db = db
         self.notes_window = None  # Ссылка на окно заметок (Singleton)
+        self.refresh_scheduled = False  # Пересчет дней рождения уже запланирован
         self.pack(fill=tk.X)
 
         self.create_left_panel()
         self.create_right_panel()
 
+        # Пересчитываем дни рождения только когда меняются нужные данные
+        # и когда наступает новый день — обычный поиск и сортировка дашборд не трогают
+        self.db.add_listener(self.on_data_changed)
+        self.schedule_midnight_refresh()
+
     def create_left_panel(self):
         left_frame = tk.Frame(self, bg="#f0f0f0")
         left_frame.pack(side=tk.LEFT, fill=tk.X, expand=True)
@@ -52,6 +65,34 @@ class DashboardFrame(tk.Frame):
         self.lbl_birthdays.pack(side=tk.RIGHT)
         self.update_birthdays_display()
 
+    def on_data_changed(self, event):
+        """Реакция на изменения в БД: пересчет, только если затронуты дни рождения."""
+        if event.table != "contacts":
+            return
+        if event.action == "update" and event.fields is not None \
+                and not (event.fields & BIRTHDAY_FIELDS):
+            return
+        # Серия изменений (импорт, массовое удаление) дает один пересчет
+        if not self.refresh_scheduled:
+            self.refresh_scheduled = True
+            self.after_idle(self.run_scheduled_refresh)
+
+    def run_scheduled_refresh(self):
+        self.refresh_scheduled = False
+        self.update_birthdays_display()
+
+    def schedule_midnight_refresh(self):
+        """Таймер на полночь: "завтра" становится "сегодня" без участия пользователя."""
+        now = datetime.now()
+        midnight = datetime.combine(now.date() + timedelta(days=1), datetime.min.time())
+        # +1 секунда запаса, чтобы точно оказаться в новом дне
+        delay_ms = int((midnight - now).total_seconds() * 1000) + 1000
+        self.after(delay_ms, self.on_midnight)
+
+    def on_midnight(self):
+        self.update_birthdays_display()
+        self.schedule_midnight_refresh()
+
     def update_birthdays_display(self):
         upcoming = self.db.get_upcoming_birthdays()
         if not upcoming:
@@ -91,28 +132,77 @@ class DashboardFrame(tk.Frame):
             self.notes_window.lift()
             return
 
-        notes = self.db.get_all_notes()
-        if not notes:
+        if not self.db.get_notes_page(limit=1):
             messagebox.showinfo("Заметки", "Нет сохраненных заметок")
             return
 
         self.notes_window = tk.Toplevel(self)
         self.notes_window.title("Сохраненные заметки")
-        self.notes_window.geometry("400x300")
+        self.notes_window.geometry("400x340")
         self.notes_window.resizable(False, False)
 
-        lb = tk.Listbox(self.notes_window, width=50, height=15)
-        lb.pack(padx=10, pady=10, fill=tk.BOTH, expand=True)
-
-        for n in notes:
-            lb.insert(tk.END, f"{n[1]} ({n[2]})")
+        search_frame = tk.Frame(self.notes_window)
+        search_frame.pack(fill=tk.X, padx=10, pady=(10, 0))
+        tk.Label(search_frame, text="Поиск:").pack(side=tk.LEFT)
+        search_entry = tk.Entry(search_frame)
+        search_entry.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=(5, 0))
+
+        list_frame = tk.Frame(self.notes_window)
+        list_frame.pack(padx=10, pady=10, fill=tk.BOTH, expand=True)
+        sb = tk.Scrollbar(list_frame, orient=tk.VERTICAL)
+        lb = tk.Listbox(list_frame, width=50, height=15)
+        sb.config(command=lb.yview)
+        sb.pack(side=tk.RIGHT, fill=tk.Y)
+        lb.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+        # Заметки читаются страницами (только id, название и дата);
+        # следующая страница — когда список прокручен почти до конца
+        notes = []
+        state = {"more": True, "pending": False, "search_job": None}
+
+        def load_page():
+            state["pending"] = False
+            if not lb.winfo_exists() or not state["more"]:
+                return
+            page = self.db.get_notes_page(search_entry.get().strip(), notes[-1] if notes else None)
+            state["more"] = bool(page)  # Пустая страница — список закончился
+            notes.extend(page)
+            if page:
+                lb.insert(tk.END, *(f"{n[1]} ({n[2]})" for n in page))
+
+        def on_scroll(first, last):
+            sb.set(first, last)
+            if float(last) > 0.9 and state["more"] and not state["pending"]:
+                state["pending"] = True
+                lb.after_idle(load_page)
+
+        def reload_list():
+            state["search_job"] = None
+            lb.delete(0, tk.END)
+            notes.clear()
+            state["more"] = True
+            load_page()
+
+        def on_search(event=None):
+            # Поиск запускается, когда пользователь перестал печатать
+            if state["search_job"] is not None:
+                lb.after_cancel(state["search_job"])
+            state["search_job"] = lb.after(SEARCH_DELAY_MS, reload_list)
+
+        lb.config(yscrollcommand=on_scroll)
+        search_entry.bind("<KeyRelease>", on_search)
+        load_page()
+        search_entry.focus_set()
 
         def on_select(event=None):
             sel = lb.curselection()
             if not sel:
                 return
-            idx = sel[0]
-            note_content = notes[idx][2]
+            # Текст читается только для выбранной заметки
+            note_content = self.db.get_note_content(notes[sel[0]][0])
+            if note_content is None:
+                messagebox.showinfo("Заметки", "Заметка уже удалена", parent=self.notes_window)
+                return
             self.scratch_entry.delete(0, tk.END)
             self.scratch_entry.insert(0, note_content)
             self.notes_window.destroy()
@@ -122,12 +212,10 @@ class DashboardFrame(tk.Frame):
             if not sel:
                 return
             idx = sel[0]
-            if messagebox.askyesno("Удалить", "Удалить эту заметку?"):
+            if messagebox.askyesno("Удалить", "Удалить эту заметку?", parent=self.notes_window):
                 self.db.delete_note(notes[idx][0])
-                self.notes_window.destroy()
-                # Сбрасываем ссылку, чтобы можно было открыть снова
-                self.notes_window = None
-                self.load_notes_dialog()
+                del notes[idx]
+                lb.delete(idx)
 
         lb.bind("<Double-Button-1>", on_select)
 
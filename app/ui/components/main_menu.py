@@ -26,6 +26,10 @@ class MainMenu:
                               command=self.app.export_csv, accelerator="Ctrl+S")
         file_menu.add_command(label="Импорт из CSV...",
                               command=self.app.import_csv, accelerator="Ctrl+O")
+        file_menu.add_command(label="Экспорт в vCard / JSON Lines...",
+                              command=self.app.export_exchange)
+        file_menu.add_command(label="Импорт из vCard / JSON Lines...",
+                              command=self.app.import_exchange)
         file_menu.add_command(label="Создать резервную копию",
                               command=self.app.create_backup)
         file_menu.add_separator()
@@ -61,6 +65,8 @@ class MainMenu:
         self.app.compact_var = tk.BooleanVar(value=True)
         self.app.maximized_var = tk.BooleanVar(value=False)
         self.app.fullscreen_var = tk.BooleanVar(value=False)
+        # Пул окон: формы и просмотр не пересоздаются при каждом открытии
+        self.app.pool_windows_var = tk.BooleanVar(value=True)
 
         view_menu.add_checkbutton(
             label="Компактный вид", variable=self.app.compact_var, command=self.app.toggle_compact)
@@ -68,6 +74,9 @@ class MainMenu:
                                   variable=self.app.maximized_var, command=self.app.toggle_maximize)
         view_menu.add_checkbutton(
             label="Полноэкранный режим", variable=self.app.fullscreen_var, command=self.app.toggle_fullscreen)
+        view_menu.add_separator()
+        view_menu.add_checkbutton(label="Держать окна в памяти (быстрое открытие)",
+                                  variable=self.app.pool_windows_var, command=self.app.toggle_window_pool)
 
         menubar.add_cascade(label="Вид", menu=view_menu)
 
@@ -75,8 +84,18 @@ class MainMenu:
         tools_menu = tk.Menu(menubar, tearoff=0)
         tools_menu.add_command(label="Статистика базы",
                                command=self.app.show_statistics)
+        tools_menu.add_command(label="Категории",
+                               command=self.app.show_categories)
         tools_menu.add_command(label="Поиск дубликатов",
                                command=self.app.show_duplicates)
+        tools_menu.add_command(label="Диагностика",
+                               command=self.app.show_diagnostics)
+        self.app.profiling_var = tk.BooleanVar(value=False)
+        tools_menu.add_checkbutton(label="Профилирование запросов",
+                                   variable=self.app.profiling_var, command=self.app.toggle_profiling)
+        self.app.watchdog_var = tk.BooleanVar(value=False)
+        tools_menu.add_checkbutton(label="Мониторинг зависаний UI",
+                                   variable=self.app.watchdog_var, command=self.app.toggle_watchdog)
         tools_menu.add_separator()
         tools_menu.add_command(label="Очистить базу",
                                command=self.app.clear_all_data)
@@ -0,0 +1,162 @@
+import json
+import tkinter as tk
+from tkinter import ttk, messagebox, filedialog
+
+
+class DiagnosticsWindow(tk.Toplevel):
+    """
+    Окно 'Диагностика': сводка профилировщика базы данных
+    (самые затратные методы и запросы, журнал медленных запросов с планами)
+    и отчет мониторинга зависаний интерфейса, если он включен.
+    """
+
+    def __init__(self, parent, db, watchdog=None):
+        super().__init__(parent)
+        self.db = db
+        self.watchdog = watchdog
+        self.title("Диагностика")
+        self.geometry("900x600")
+        self.transient(parent)
+
+        main_frame = tk.Frame(self, padx=10, pady=10)
+        main_frame.pack(fill=tk.BOTH, expand=True)
+
+        # Отчет выводится в read-only Text моноширинным шрифтом (таблицы выравниваются)
+        self.text_area = tk.Text(main_frame, wrap=tk.NONE, font=(
+            "Courier", 9), bg="#f9f9f9", bd=0)
+        sb_y = ttk.Scrollbar(main_frame, orient=tk.VERTICAL,
+                             command=self.text_area.yview)
+        sb_x = ttk.Scrollbar(main_frame, orient=tk.HORIZONTAL,
+                             command=self.text_area.xview)
+        self.text_area.configure(
+            yscrollcommand=sb_y.set, xscrollcommand=sb_x.set)
+        sb_y.pack(side=tk.RIGHT, fill=tk.Y)
+        sb_x.pack(side=tk.BOTTOM, fill=tk.X)
+        self.text_area.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.text_area.tag_configure("h2", font=("Arial", 11, "bold"))
+
+        btn_frame = tk.Frame(self, pady=5)
+        btn_frame.pack(fill=tk.X)
+        tk.Button(btn_frame, text="Обновить", command=self.refresh,
+                  width=12, cursor="hand2").pack(side=tk.LEFT, padx=5)
+        tk.Button(btn_frame, text="Сбросить", command=self.reset,
+                  width=12, cursor="hand2").pack(side=tk.LEFT, padx=5)
+        tk.Button(btn_frame, text="Сохранить JSON...", command=self.export_json,
+                  width=16, cursor="hand2").pack(side=tk.LEFT, padx=5)
+        tk.Button(btn_frame, text="Закрыть", command=self.destroy,
+                  width=12, cursor="hand2").pack(side=tk.RIGHT, padx=5)
+
+        self.bind("<Escape>", lambda e: self.destroy())
+        self.refresh()
+
+    def refresh(self):
+        """Перерисовывает отчет по текущей статистике."""
+        t = self.text_area
+        t.config(state=tk.NORMAL)
+        t.delete("1.0", tk.END)
+
+        self.show_ui_report()
+
+        profiler = self.db.profiler
+        if profiler is None:
+            t.insert(tk.END, "Профилирование базы данных выключено "
+                             "(Сервис -> Профилирование запросов).\n")
+            t.config(state=tk.DISABLED)
+            return
+
+        report = profiler.report()
+        if not profiler.attached:
+            t.insert(tk.END, "Профилирование выключено, показана собранная статистика.\n")
+        t.insert(tk.END, f"Статистика с {report['started_at']} "
+                         f"(медленные запросы: от {report['slow_threshold_ms']} мс)\n\n")
+
+        # Методы Database: вызовы и перцентили задержки
+        t.insert(tk.END, "Методы базы данных\n", "h2")
+        t.insert(tk.END, f"{'Метод':<30}{'Вызовы':>8}{'Всего, мс':>12}"
+                         f"{'p50':>9}{'p95':>9}{'Макс':>10}\n")
+        for name, h in report["methods"].items():
+            t.insert(tk.END, f"{name:<30}{h['count']:>8}{h['total_ms']:>12.1f}"
+                             f"{h['p50_ms']:>9.1f}{h['p95_ms']:>9.1f}{h['max_ms']:>10.1f}\n")
+
+        # Самые затратные запросы (по суммарному времени)
+        t.insert(tk.END, "\nЗапросы (топ-20 по суммарному времени)\n", "h2")
+        for sql, st in list(report["statements"].items())[:20]:
+            t.insert(tk.END, f"{st['count']:>6} раз, всего {st['total_ms']:.1f} мс, "
+                             f"p95 {st['p95_ms']:.1f} мс, строк {st['rows_total']}, "
+                             f"шагов VM {st['vm_steps']}\n    {sql[:300]}\n")
+
+        traced = report["traced"]
+        kinds = ", ".join(f"{k}: {n}" for k, n in sorted(
+            traced["by_kind"].items(), key=lambda kv: -kv[1]))
+        t.insert(tk.END, f"\nВсего операторов SQLite: {traced['total']} ({kinds})\n")
+
+        # Журнал медленных запросов с планом выполнения
+        t.insert(tk.END, "\nМедленные запросы\n", "h2")
+        if not report["slow_queries"]:
+            t.insert(tk.END, "Нет\n")
+        for entry in reversed(report["slow_queries"]):
+            t.insert(tk.END, f"[{entry['time']}] {entry['method'] or '-'}: "
+                             f"{entry['ms']:.1f} мс, строк {entry['rows']}\n    {entry['sql'][:300]}\n")
+            for step in entry["plan"]:
+                t.insert(tk.END, f"      план: {step}\n")
+
+        t.config(state=tk.DISABLED)
+
+    def show_ui_report(self):
+        """Раздел мониторинга зависаний UI: задержка цикла событий и обработчики."""
+        t = self.text_area
+        if self.watchdog is None:
+            t.insert(tk.END, "Мониторинг зависаний UI выключен "
+                             "(Сервис -> Мониторинг зависаний UI).\n\n")
+            return
+
+        report = self.watchdog.report()
+        lat = report["mainloop_latency"]
+        t.insert(tk.END, "Интерфейс: задержка цикла событий\n", "h2")
+        t.insert(tk.END, f"С {report['started_at']}: пульсов {lat['count']}, "
+                         f"p50 {lat['p50_ms']:.1f} мс, p95 {lat['p95_ms']:.1f} мс, "
+                         f"p99 {lat['p99_ms']:.1f} мс, макс {lat['max_ms']:.1f} мс\n")
+
+        t.insert(tk.END, "\nОбработчики (топ-20 по максимальному времени)\n", "h2")
+        t.insert(tk.END, f"{'Обработчик':<45}{'Вызовы':>8}{'Всего, мс':>12}"
+                         f"{'p95':>9}{'Макс':>10}\n")
+        for name, h in list(report["handlers"].items())[:20]:
+            t.insert(tk.END, f"{name[:44]:<45}{h['count']:>8}{h['total_ms']:>12.1f}"
+                             f"{h['p95_ms']:>9.1f}{h['max_ms']:>10.1f}\n")
+
+        t.insert(tk.END, f"\nЗависания дольше {report['stall_threshold_ms']} мс\n", "h2")
+        if not report["stalls"]:
+            t.insert(tk.END, "Нет\n")
+        for entry in reversed(report["stalls"]):
+            t.insert(tk.END, f"[{entry['time']}] {entry['handler'] or '-'}: "
+                             f"{entry['ms']:.1f} мс\n")
+            for line in entry["stack"]:
+                t.insert(tk.END, f"    {line}\n")
+        t.insert(tk.END, "\n")
+
+    def reset(self):
+        """Обнуление статистики."""
+        if self.db.profiler:
+            self.db.profiler.reset()
+        if self.watchdog:
+            self.watchdog.reset()
+        self.refresh()
+
+    def export_json(self):
+        """Сохранение полного отчета (база данных и интерфейс) в JSON."""
+        if self.db.profiler is None and self.watchdog is None:
+            return
+        filename = filedialog.asksaveasfilename(
+            parent=self, defaultextension=".json", filetypes=[("JSON", "*.json")])
+        if not filename:
+            return
+        report = {
+            "database": self.db.profiler.report() if self.db.profiler else None,
+            "ui": self.watchdog.report() if self.watchdog else None,
+        }
+        try:
+            with open(filename, "w", encoding="utf-8") as file:
+                json.dump(report, file, ensure_ascii=False, indent=2)
+            messagebox.showinfo("Диагностика", f"Отчет сохранен:\n{filename}", parent=self)
+        except Exception as e:
+            messagebox.showerror("Ошибка", str(e), parent=self)
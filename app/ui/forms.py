@@ -3,33 +3,46 @@ from tkinter import ttk, messagebox
 import re
 from datetime import datetime
 
+from .history import HistoryWindow
+from ..tags import parse_tags
+
+# Поля формы и индексы соответствующих столбцов в строке contacts
+FIELD_COLUMNS = {
+    "last_name": 1, "first_name": 2, "patronymic": 3,
+    "phone_primary": 4, "phone_secondary": 5, "email": 6, "address": 7,
+    "social_network_1": 8, "social_nickname_1": 9, "social_link_1": 10,
+    "social_network_2": 11, "social_nickname_2": 12, "social_link_2": 13,
+    "social_network_3": 14, "social_nickname_3": 15, "social_link_3": 16,
+    "notes": 17, "category": 20, "birth_date": 21
+}
+
+# Значения пустой формы (остальные поля пустые)
+FIELD_DEFAULTS = {"phone_primary": "+7", "phone_secondary": "+7",
+                  "category": "Не распределён"}
+
 
 class ContactFormWindow(tk.Toplevel):
     """
     Класс окна для добавления или редактирования контакта.
     Поддерживает валидацию полей и автоформатирование (маски) ввода.
+
+    В режиме пула (pooled=True) окно при закрытии не уничтожается, а прячется;
+    следующее открытие (open_for) перезаполняет только изменившиеся поля.
     """
 
-    def __init__(self, parent_window, db, refresh_callback, contact_id=None):
+    def __init__(self, parent_window, db, refresh_callback, contact_id=None, pooled=False):
         super().__init__()
         self.db = db
         self.refresh_callback = refresh_callback
         self.contact_id = contact_id  # Если ID передан, режим редактирования
+        self.pooled = pooled
 
         # Настройка размеров окна
         self.width = 580
-        self.height = 680
+        self.height = 710
         self.geometry(f"{self.width}x{self.height}")
         self.resizable(False, False)
 
-        # Хранение дат создания/изменения для режима редактирования
-        self.contact_dates = {"added": "", "modified": ""}
-
-        if self.contact_id:
-            self.title("Редактирование")
-        else:
-            self.title("Новый контакт")
-
         self.center_window()
 
         # Делаем окно модальным (блокирует родительское)
@@ -49,14 +62,91 @@ class ContactFormWindow(tk.Toplevel):
         self.main_frame.pack(fill=tk.BOTH, expand=True)
 
         self.create_form()
+        self.update_mode()
 
         # Если редактируем, загружаем данные из БД
         if self.contact_id:
             self.load_existing_data()
 
         # Горячие клавиши
-        self.bind("<Escape>", lambda e: self.destroy())
+        self.bind("<Escape>", lambda e: self.close())
         self.bind("<Control-Key>", self.handle_local_hotkeys)
+        self.protocol("WM_DELETE_WINDOW", self.close)
+
+    # ---------------------------------------------------------
+    # ПУЛ ОКОН: повторное использование вместо создания заново
+    # ---------------------------------------------------------
+
+    def open_for(self, contact_id=None, refresh_callback=None):
+        """Показ спрятанного окна из пула для другого контакта (или нового)."""
+        self.contact_id = contact_id
+        self.refresh_callback = refresh_callback
+        self.update_mode()
+
+        if self.contact_id:
+            if not self.load_existing_data():
+                return
+        else:
+            self.fill_fields(None)
+            self.fill_tags([])
+
+        self.center_window()
+        self.deiconify()
+        self.lift()
+        self.grab_set()
+        self.entries["last_name"].focus_set()
+
+    def is_shown(self):
+        """Окно на экране (а не спрятано в пуле)."""
+        return self.winfo_exists() and self.state() != "withdrawn"
+
+    def close(self):
+        """Закрытие: в пуле окно прячется, иначе уничтожается."""
+        if not self.pooled:
+            self.destroy()
+            return
+        self.grab_release()
+        self.withdraw()
+
+    def update_mode(self):
+        """Заголовок и кнопки под режим: добавление или редактирование."""
+        if self.contact_id:
+            self.title("Редактирование")
+            self.btn_save.config(text="Сохранить изменения")
+            self.btn_history.pack(side=tk.LEFT, padx=5, after=self.btn_save)
+        else:
+            self.title("Новый контакт")
+            self.btn_save.config(text="Сохранить")
+            self.btn_history.pack_forget()
+
+    def fill_fields(self, data):
+        """
+        Заполняет поля значениями строки contacts (None — пустая форма).
+        Трогаются только поля, значение которых отличается от текущего.
+        """
+        for key, idx in FIELD_COLUMNS.items():
+            value = data[idx] if data and len(data) > idx and data[idx] else ""
+            value = value or FIELD_DEFAULTS.get(key, "")
+            widget = self.entries[key]
+            if isinstance(widget, tk.Text):
+                if widget.get("1.0", "end-1c") != value:
+                    widget.delete("1.0", tk.END)
+                    widget.insert("1.0", value)
+            elif isinstance(widget, ttk.Combobox):
+                if widget.get() != value:
+                    widget.set(value)
+            else:
+                widget.config(bg="white")  # Сброс подсветки ошибок
+                if widget.get() != value:
+                    widget.delete(0, tk.END)
+                    widget.insert(0, value)
+
+    def fill_tags(self, names):
+        """Теги контакта в поле ввода (через запятую)."""
+        text = ", ".join(names)
+        if self.entry_tags.get() != text:
+            self.entry_tags.delete(0, tk.END)
+            self.entry_tags.insert(0, text)
 
     def center_window(self):
         """Центрирование окна на экране."""
@@ -294,19 +384,27 @@ class ContactFormWindow(tk.Toplevel):
         # Категория
         tk.Label(lbl_frame_other, text="Категория:").grid(
             row=0, column=0, sticky=tk.W, padx=5, pady=2)
-        categories = ["Не распределён", "Работа", "Семья",
-                      "Друзья", "Знакомые", "Клиенты", "Учеба", "Избранное"]
-        cb_cat = ttk.Combobox(
-            lbl_frame_other, values=categories, state="readonly", width=30)
+        # Список — из справочника в БД; перечитывается при каждом открытии списка
+        cb_cat = ttk.Combobox(lbl_frame_other, state="readonly", width=30)
+        cb_cat.config(postcommand=lambda: cb_cat.config(values=self.db.get_category_names()))
+        cb_cat.config(values=self.db.get_category_names())
         cb_cat.current(0)
         cb_cat.grid(row=0, column=1, padx=5, pady=2, sticky=tk.W)
         self.entries["category"] = cb_cat
 
+        # Теги: любые имена через запятую, новые теги создаются при сохранении
+        tk.Label(lbl_frame_other, text="Теги:").grid(
+            row=1, column=0, sticky=tk.W, padx=5, pady=2)
+        self.entry_tags = tk.Entry(lbl_frame_other, width=33)
+        self.entry_tags.grid(row=1, column=1, padx=5, pady=2, sticky=tk.W)
+        tk.Label(lbl_frame_other, text="(через запятую)", fg="gray",
+                 font=("Arial", 8)).grid(row=1, column=2, sticky="w")
+
         # Заметки (Text widget)
         tk.Label(lbl_frame_other, text="Заметки:").grid(
-            row=1, column=0, sticky=tk.NW, padx=5, pady=2)
+            row=2, column=0, sticky=tk.NW, padx=5, pady=2)
         txt_notes = tk.Text(lbl_frame_other, height=3, width=33, wrap=tk.WORD)
-        txt_notes.grid(row=1, column=1, padx=5, pady=2)
+        txt_notes.grid(row=2, column=1, padx=5, pady=2)
 
         # Ограничение длины заметок (нет встроенного validate для Text, делаем через bind)
         def check_notes_length(event):
@@ -319,16 +417,15 @@ class ContactFormWindow(tk.Toplevel):
         # --- Кнопки управления ---
         btn_frame = tk.Frame(self.main_frame, pady=10)
         btn_frame.pack(fill=tk.X, side=tk.BOTTOM)
-        save_text = "Сохранить изменения" if self.contact_id else "Сохранить"
-
-        tk.Button(btn_frame, text=save_text, bg="#4CAF50", fg="white", font=("Arial", 10, "bold"),
-                  command=self.save_contact, height=2, width=18, cursor="hand2").pack(side=tk.LEFT, padx=10, expand=True)
+        # Текст кнопки сохранения и видимость "Истории" задает update_mode
+        self.btn_save = tk.Button(btn_frame, text="Сохранить", bg="#4CAF50", fg="white", font=("Arial", 10, "bold"),
+                                  command=self.save_contact, height=2, width=18, cursor="hand2")
+        self.btn_save.pack(side=tk.LEFT, padx=10, expand=True)
 
-        if self.contact_id:
-            tk.Button(btn_frame, text="История", command=self.show_history,
-                      height=2, width=10, cursor="hand2").pack(side=tk.LEFT, padx=5)
+        self.btn_history = tk.Button(btn_frame, text="История", command=self.show_history,
+                                     height=2, width=10, cursor="hand2")
 
-        tk.Button(btn_frame, text="Отмена", command=self.destroy, height=2,
+        tk.Button(btn_frame, text="Отмена", command=self.close, height=2,
                   width=15, cursor="hand2").pack(side=tk.RIGHT, padx=10, expand=True)
 
     def load_existing_data(self):
@@ -336,42 +433,25 @@ class ContactFormWindow(tk.Toplevel):
         data = self.db.get_contact_by_id(self.contact_id)
         if not data:
             messagebox.showerror("Ошибка", "Контакт не найден!")
-            self.destroy()
-            return
+            self.close()
+            return False
 
         full_name = f"{data[1]} {data[2]}".strip()
         self.title(f"Редактировать: {full_name}")
 
-        # Сохраняем даты для кнопки "История"
-        self.contact_dates["added"] = data[18]
-        self.contact_dates["modified"] = data[19]
-
-        # Маппинг ключей полей к индексам столбцов в БД
-        mapping = {
-            "last_name": 1, "first_name": 2, "patronymic": 3,
-            "phone_primary": 4, "phone_secondary": 5, "email": 6, "address": 7,
-            "social_network_1": 8, "social_nickname_1": 9, "social_link_1": 10,
-            "social_network_2": 11, "social_nickname_2": 12, "social_link_2": 13,
-            "social_network_3": 14, "social_nickname_3": 15, "social_link_3": 16,
-            "category": 20, "birth_date": 21
-        }
-
-        for key, idx in mapping.items():
-            if len(data) > idx:
-                val = data[idx]
-                if val:
-                    if isinstance(self.entries[key], ttk.Combobox):
-                        self.entries[key].set(val)
-                    elif isinstance(self.entries[key], tk.Entry):
-                        self.entries[key].delete(0, tk.END)
-                        self.entries[key].insert(0, val)
-
-        if data[17]:  # Заметки
-            self.entries["notes"].insert("1.0", data[17])
+        self.fill_fields(data)
+        self.fill_tags(self.db.get_contact_tags(self.contact_id))
+        return True
 
     def show_history(self):
-        msg = f"Дата создания:\n{self.contact_dates['added']}\n\nПоследнее изменение:\n{self.contact_dates['modified']}"
-        messagebox.showinfo("История изменений", msg)
+        """Окно версий контакта с откатом к любой из них."""
+        HistoryWindow(self, self.db, self.contact_id, on_revert=self.on_history_revert)
+
+    def on_history_revert(self):
+        """После отката форма и таблица показывают восстановленные данные."""
+        self.load_existing_data()
+        if self.refresh_callback:
+            self.refresh_callback()
 
     def create_entry(self, parent, label_text, key, row, limit=255, required=False, regex=None, is_email=False):
         """Вспомогательный метод для создания стандартного поля ввода с Label."""
@@ -509,16 +589,18 @@ class ContactFormWindow(tk.Toplevel):
             data["notes"], data["category"], data["birth_date"]
         ]
 
+        tags = parse_tags(self.entry_tags.get())
+
         # Вызов методов БД
         if self.contact_id:
             success, message = self.db.update_contact(
-                self.contact_id, db_values)
+                self.contact_id, db_values, tags)
         else:
-            success, message = self.db.add_contact(db_values)
+            success, message = self.db.add_contact(db_values, tags)
 
         if success:
             if self.refresh_callback:
                 self.refresh_callback()
-            self.destroy()
+            self.close()
         else:
             messagebox.showerror("Ошибка", message)
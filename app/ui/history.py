@@ -0,0 +1,146 @@
+import tkinter as tk
+from tkinter import ttk, messagebox
+
+# Подписи полей контакта для окна истории
+FIELD_LABELS = {
+    "last_name": "Фамилия", "first_name": "Имя", "patronymic": "Отчество",
+    "phone_primary": "Телефон осн.", "phone_secondary": "Телефон доп.",
+    "email": "Email", "address": "Адрес",
+    "social_network_1": "Соцсеть #1", "social_nickname_1": "Ник #1", "social_link_1": "URL #1",
+    "social_network_2": "Соцсеть #2", "social_nickname_2": "Ник #2", "social_link_2": "URL #2",
+    "social_network_3": "Соцсеть #3", "social_nickname_3": "Ник #3", "social_link_3": "URL #3",
+    "notes": "Заметки", "category": "Категория", "birth_date": "Дата рождения",
+}
+
+
+class HistoryWindow(tk.Toplevel):
+    """
+    Окно 'История изменений' контакта: список версий (что и когда изменено),
+    подробности выбранной версии и откат к ней одной кнопкой.
+    """
+
+    def __init__(self, parent, db, contact_id, on_revert=None):
+        super().__init__(parent)
+        self.parent = parent
+        self.db = db
+        self.contact_id = contact_id
+        self.on_revert = on_revert  # Вызывается после успешного отката
+        self.entries = []
+
+        self.title("История изменений")
+        self.geometry("640x460")
+        self.transient(parent)
+
+        main_frame = tk.Frame(self, padx=10, pady=10)
+        main_frame.pack(fill=tk.BOTH, expand=True)
+
+        columns = ("version", "date", "fields")
+        self.tree = ttk.Treeview(main_frame, columns=columns, show="headings",
+                                 height=8, selectmode="browse")
+        self.tree.heading("version", text="№")
+        self.tree.heading("date", text="Дата")
+        self.tree.heading("fields", text="Изменено")
+        self.tree.column("version", width=40, anchor=tk.CENTER, stretch=False)
+        self.tree.column("date", width=140, stretch=False)
+        self.tree.column("fields", width=400)
+        self.tree.pack(fill=tk.X)
+        self.tree.bind("<<TreeviewSelect>>", self.show_details)
+
+        # Подробности версии: поле, было -> стало
+        self.text_details = tk.Text(main_frame, height=10, wrap=tk.WORD,
+                                    bg="#f9f9f9", bd=0, font=("Arial", 9))
+        self.text_details.pack(fill=tk.BOTH, expand=True, pady=(10, 0))
+        self.text_details.tag_configure("old", foreground="#999", overstrike=True)
+        self.text_details.tag_configure("new", foreground="#2E7D32")
+
+        btn_frame = tk.Frame(self, pady=5)
+        btn_frame.pack(fill=tk.X)
+        self.btn_revert = tk.Button(btn_frame, text="Вернуть эту версию", command=self.revert,
+                                    width=18, cursor="hand2", state="disabled")
+        self.btn_revert.pack(side=tk.LEFT, padx=10)
+        tk.Button(btn_frame, text="Закрыть", command=self.close,
+                  width=12, cursor="hand2").pack(side=tk.RIGHT, padx=10)
+
+        self.bind("<Escape>", lambda e: self.close())
+        self.protocol("WM_DELETE_WINDOW", self.close)
+        self.load_history()
+
+        # Форма редактирования модальная — окно истории забирает захват на себя
+        self.grab_set()
+
+    def load_history(self):
+        """Список версий, новые сверху."""
+        self.tree.delete(*self.tree.get_children())
+        self.entries = self.db.get_contact_history(self.contact_id)
+        if not self.entries:
+            data = self.db.get_contact_by_id(self.contact_id)
+            self.show_text("Контакт еще не редактировался.\n\n"
+                           f"Дата создания: {data[18] if data else ''}")
+            return
+        for entry in reversed(self.entries):
+            if entry.version == 1:
+                fields = "Исходная версия"
+            else:
+                fields = ", ".join(FIELD_LABELS.get(name, name) for name in entry.changes)
+            self.tree.insert("", tk.END, iid=str(entry.version),
+                             values=(entry.version, entry.changed_at, fields))
+        latest = str(self.entries[-1].version)
+        self.tree.selection_set(latest)
+        self.tree.focus(latest)
+
+    def selected_entry(self):
+        selection = self.tree.selection()
+        if not selection:
+            return None
+        version = int(selection[0])
+        return next((e for e in self.entries if e.version == version), None)
+
+    def show_text(self, text):
+        self.text_details.config(state=tk.NORMAL)
+        self.text_details.delete("1.0", tk.END)
+        self.text_details.insert(tk.END, text)
+        self.text_details.config(state=tk.DISABLED)
+
+    def show_details(self, event=None):
+        entry = self.selected_entry()
+        if entry is None:
+            return
+        t = self.text_details
+        t.config(state=tk.NORMAL)
+        t.delete("1.0", tk.END)
+        t.insert(tk.END, f"Версия {entry.version} от {entry.changed_at}\n\n")
+        for name, (old, new) in entry.changes.items():
+            t.insert(tk.END, f"{FIELD_LABELS.get(name, name)}: ")
+            if entry.version > 1:
+                t.insert(tk.END, old or "(пусто)", "old")
+                t.insert(tk.END, " → ")
+            t.insert(tk.END, new or "(пусто)", "new")
+            t.insert(tk.END, "\n")
+        t.config(state=tk.DISABLED)
+
+        # Последняя версия — это текущие данные, возвращать нечего
+        is_latest = entry.version == self.entries[-1].version
+        self.btn_revert.config(state="disabled" if is_latest else "normal")
+
+    def revert(self):
+        entry = self.selected_entry()
+        if entry is None:
+            return
+        if not messagebox.askyesno(
+                "Откат", f"Вернуть контакт к версии {entry.version} от {entry.changed_at}?\n"
+                         "Несохраненные правки в форме будут потеряны.", parent=self):
+            return
+        success, msg = self.db.revert_contact(self.contact_id, entry.version)
+        if not success:
+            messagebox.showerror("Ошибка", msg, parent=self)
+            return
+        if self.on_revert:
+            self.on_revert()
+        self.load_history()
+
+    def close(self):
+        """Закрытие с возвратом модальности форме, из которой окно открыто."""
+        self.grab_release()
+        self.destroy()
+        if self.parent.winfo_exists() and self.parent.state() != "withdrawn":
+            self.parent.grab_set()
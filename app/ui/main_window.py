@@ -1,19 +1,38 @@
 import tkinter as tk
-from tkinter import ttk, messagebox, filedialog, font
+from tkinter import ttk, messagebox, filedialog, font, simpledialog
 import csv
 import os
+from datetime import date
 import sys  # Нужно для доступа к системным переменным PyInstaller
 
 # Импорт диалоговых окон
 from .about import AboutWindow
 from .forms import ContactFormWindow
 from .view import ViewContactWindow
+from .diagnostics import DiagnosticsWindow
+from .categories import CategoriesWindow
+from .watchdog import UiWatchdog
+from .scheduler import TaskScheduler, PRIORITY_HIGH, PRIORITY_LOW
+from .photos import PhotoCache, photos_available
+from ..tags import TagFilter
+from ..query_syntax import DateRange, date_bounds
+from ..exchange import detect_format, export_contacts, import_contacts
 
 # Импорт компонентов
 from .components.main_menu import MainMenu
 from .components.dashboard import DashboardFrame
 from .components.contact_tree import ContactTableFrame
 
+# Размер порции для длинных циклов (вставка строк, отметки, импорт):
+# одна порция укладывается в квант планировщика, между порциями окно отзывчиво
+BATCH_SIZE = 200
+IMPORT_BATCH_SIZE = 100
+
+# Синхронизация с другими окнами/процессами: период опроса БД и сколько
+# чужих изменений обновлять построчно (больше — проще перечитать таблицу)
+SYNC_POLL_MS = 500
+SYNC_MAX_ROWS = 500
+
 
 def resource_path(relative_path):
     """
@@ -45,16 +64,24 @@ class ContactApp:
 
         # Хранение ID выбранных контактов
         self.selected_ids = set()
+        # ID контактов текущего списка (в порядке таблицы; строки могут еще вставляться)
+        self.row_ids = {}
+        # Строки, отметку которых нужно перерисовать (делается порциями)
+        self.rows_to_mark = set()
         self.current_view_window = None
-
-        # Список категорий для фильтрации
-        self.categories_list = ["Не распределён", "Работа", "Семья",
-                                "Друзья", "Знакомые", "Клиенты", "Учеба", "Избранное"]
+        self.form_window = None  # Спрятанная форма из пула (см. Вид -> Держать окна в памяти)
+        # Детектор зависаний интерфейса (Сервис -> Мониторинг зависаний UI)
+        self.watchdog = None
 
         # Настройка окна и стилей
         self.setup_window()
         self.configure_styles()
 
+        # Длинные операции выполняются порциями, чтобы окно не замирало
+        self.scheduler = TaskScheduler(self.root)
+        # Миниатюры фото контактов (нужен Pillow)
+        self.photos = PhotoCache(self.root, self.db) if photos_available() else None
+
         # --- Инициализация компонентов UI ---
         self.menu_manager = MainMenu(self.root, self)
         self.dashboard = DashboardFrame(self.root, self.db)
@@ -83,6 +110,15 @@ class ContactApp:
         # Первичная загрузка данных
         self.load_contacts()
 
+        # Изменения из других окон и скриптов, работающих с тем же файлом БД
+        self.db.add_listener(self.on_external_change)
+        self.root.after(SYNC_POLL_MS, self.poll_external_changes)
+
+        # Незавершенное обновление формата базы продолжается в фоне
+        if self.db.migrations.pending():
+            self.run_background("Обновление базы", self.db.migrations.run(),
+                                self.on_migration_finished)
+
     def setup_window(self):
         """Базовая настройка главного окна."""
         self.root.title("Адресник v1.0")
@@ -137,7 +173,8 @@ class ContactApp:
         self.toolbar_frame = tk.Frame(self.root, bd=1, relief=tk.RAISED)
         self.toolbar_frame.pack(fill=tk.X)
 
-        self.create_tb_btn("Добавить", self.open_add_dialog, "#e1f5fe")
+        self.btn_add = self.create_tb_btn(
+            "Добавить", self.open_add_dialog, "#e1f5fe")
         self.btn_view = self.create_tb_btn(
             "Просмотр", self.view_contact, bg="#e8f5e9", state="disabled")
         self.btn_edit = self.create_tb_btn(
@@ -162,17 +199,53 @@ class ContactApp:
         # Поле поиска
         tk.Label(filter_frame, text="Поиск:").pack(side=tk.LEFT, padx=(0, 5))
         self.entry_search = tk.Entry(filter_frame, width=25)
-        self.entry_search.pack(side=tk.LEFT, padx=(0, 15))
+        self.entry_search.pack(side=tk.LEFT, padx=(0, 5))
         self.entry_search.bind("<KeyRelease>", self.refresh_table_with_filter)
 
-        # Фильтр категорий
-        self.combo_category = ttk.Combobox(filter_frame, values=[
-                                           "Все категории"] + self.categories_list, state="readonly", width=15)
+        # Нечеткий поиск (с опечатками), результаты ранжируются по похожести
+        self.fuzzy_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(filter_frame, text="Нечеткий", variable=self.fuzzy_var,
+                       command=self.refresh_table_with_filter).pack(side=tk.LEFT, padx=(0, 15))
+
+        # Фильтр категорий (список — из справочника в БД, обновляется при открытии)
+        self.combo_category = ttk.Combobox(filter_frame, state="readonly", width=15,
+                                           postcommand=self.load_category_filter)
+        self.load_category_filter()
         self.combo_category.current(0)
         self.combo_category.pack(side=tk.LEFT, padx=(0, 15))
         self.combo_category.bind(
             "<<ComboboxSelected>>", self.refresh_table_with_filter)
 
+        # Умные группы: сохраненные поиски, состав которых хранится в БД
+        # и обновляется сам (кнопка "+" сохраняет текущий поиск)
+        self.current_group = tk.IntVar(value=0)  # 0 — группа не выбрана
+        self.last_group = 0
+        self.groups_frame = tk.Frame(filter_frame)
+        self.groups_frame.pack(side=tk.LEFT, padx=(0, 15))
+        self.group_buttons = {}
+        self.menu_group = tk.Menu(self.root, tearoff=0)
+        self.build_group_buttons()
+
+        # Фильтр по тегам: несколько тегов сразу (И / ИЛИ) и исключение тегов (НЕ)
+        self.tag_include = set()
+        self.tag_exclude = set()
+        self.tag_match_all = tk.BooleanVar(value=True)
+        self.tag_vars = []  # Переменные пунктов меню (иначе их соберет сборщик мусора)
+        self.btn_tags = tk.Menubutton(filter_frame, text="Теги ▾", relief=tk.RAISED,
+                                      width=16, anchor=tk.W, cursor="hand2")
+        self.menu_tags = tk.Menu(self.btn_tags, tearoff=0, postcommand=self.build_tags_menu)
+        self.btn_tags.config(menu=self.menu_tags)
+        self.btn_tags.pack(side=tk.LEFT, padx=(0, 15))
+
+        # Фильтр по датам: добавлены / изменены за период, родились в годах
+        self.date_filter = None
+        self.btn_dates = tk.Menubutton(filter_frame, text="Даты ▾", relief=tk.RAISED,
+                                       width=16, anchor=tk.W, cursor="hand2")
+        self.menu_dates = tk.Menu(self.btn_dates, tearoff=0)
+        self.btn_dates.config(menu=self.menu_dates)
+        self.build_dates_menu()
+        self.btn_dates.pack(side=tk.LEFT, padx=(0, 15))
+
         # Сортировка
         sort_options = ["По ФИО (А-Я)", "По ФИО (Я-А)", "По дате добавления (новые)",
                         "По дате изменения (свежие)", "По дате изменения (старые)", "По основному телефону"]
@@ -183,6 +256,193 @@ class ContactApp:
         self.combo_sort.bind("<<ComboboxSelected>>",
                              self.refresh_table_with_filter)
 
+    def build_group_buttons(self):
+        """Кнопки умных групп: "имя (число контактов)"; выбор повторным нажатием снимается."""
+        for widget in self.groups_frame.winfo_children():
+            widget.destroy()
+        self.group_buttons = {}
+        groups = self.db.groups.get_all()
+        if self.current_group.get() not in {group[0] for group in groups}:
+            self.current_group.set(0)  # Выбранную группу удалили
+            self.last_group = 0
+        for search_id, name, query, count in groups:
+            button = tk.Radiobutton(
+                self.groups_frame, text=f"{name} ({count})", variable=self.current_group,
+                value=search_id, indicatoron=0, cursor="hand2", padx=6,
+                command=lambda i=search_id: self.toggle_group(i))
+            button.bind("<Button-3>", lambda e, i=search_id, n=name: self.show_group_menu(e, i, n))
+            button.pack(side=tk.LEFT, padx=(0, 2))
+            self.group_buttons[search_id] = button
+        tk.Button(self.groups_frame, text="+", width=2, cursor="hand2",
+                  command=self.save_group).pack(side=tk.LEFT)
+
+    def refresh_group_counts(self):
+        """Подписи кнопок групп (число контактов меняется с правками)."""
+        for search_id, name, query, count in self.db.groups.get_all():
+            button = self.group_buttons.get(search_id)
+            if button is not None:
+                button.config(text=f"{name} ({count})")
+
+    def toggle_group(self, search_id):
+        if self.last_group == search_id:
+            self.current_group.set(0)  # Повторное нажатие — показать всех
+        self.last_group = self.current_group.get()
+        self.refresh_table_with_filter()
+
+    def current_saved_search(self):
+        """ID выбранной умной группы или None."""
+        return self.current_group.get() or None
+
+    def save_group(self):
+        """Сохраняет текущий поиск (и категорию) как умную группу."""
+        query = self.entry_search.get().strip()
+        category = self.combo_category.get()
+        if category != "Все категории":
+            query = f'{query} category:"{category}"'.strip()
+        if not query:
+            messagebox.showinfo("Умная группа", "Введите строку поиска, например:\n"
+                                                "category:Клиенты -has:email")
+            return
+        name = simpledialog.askstring("Умная группа", f"Название группы для поиска\n{query}",
+                                      parent=self.root)
+        if name is None:
+            return
+        success, message = self.db.groups.add(name, query)
+        if not success:
+            messagebox.showerror("Умная группа", message)
+
+    def show_group_menu(self, event, search_id, name):
+        menu = self.menu_group
+        menu.delete(0, tk.END)
+        menu.add_command(label="Переименовать...", command=lambda: self.rename_group(search_id, name))
+        menu.add_command(label="Удалить", command=lambda: self.delete_group(search_id, name))
+        menu.post(event.x_root, event.y_root)
+
+    def rename_group(self, search_id, old_name):
+        name = simpledialog.askstring("Умная группа", "Новое название:",
+                                      initialvalue=old_name, parent=self.root)
+        if name is None or name == old_name:
+            return
+        success, message = self.db.groups.rename(search_id, name)
+        if not success:
+            messagebox.showerror("Умная группа", message)
+
+    def delete_group(self, search_id, name):
+        if messagebox.askyesno("Умная группа", f"Удалить группу «{name}»?\nКонтакты не удаляются."):
+            self.db.groups.delete(search_id)
+
+    def load_category_filter(self):
+        """Значения фильтра категорий; удаленная категория сбрасывает фильтр."""
+        values = ["Все категории"] + self.db.get_category_names()
+        self.combo_category.config(values=values)
+        if self.combo_category.get() not in values:
+            self.combo_category.current(0)
+
+    def build_tags_menu(self):
+        """Меню фильтра тегов строится при открытии: теги могли появиться или исчезнуть."""
+        menu = self.menu_tags
+        menu.delete(0, tk.END)
+        self.tag_vars = []
+        tags = [name for _, name in self.db.get_tags()]
+        # Выбор удаленных тегов забываем
+        self.tag_include.intersection_update(tags)
+        self.tag_exclude.intersection_update(tags)
+        if not tags:
+            menu.add_command(label="Тегов пока нет", state="disabled")
+            return
+        counts = self.db.tags.counts()
+        exclude_menu = tk.Menu(menu, tearoff=0)
+        for name in tags:
+            label = f"{name} ({counts.get(name, 0)})"
+            for target, selected in ((menu, self.tag_include), (exclude_menu, self.tag_exclude)):
+                var = tk.BooleanVar(value=name in selected)
+                target.add_checkbutton(
+                    label=label, variable=var,
+                    command=lambda n=name, v=var, s=selected: self.toggle_tag(s, n, v.get()))
+                self.tag_vars.append(var)
+        menu.add_separator()
+        menu.add_radiobutton(label="Все выбранные (И)", variable=self.tag_match_all,
+                             value=True, command=self.on_tag_filter_changed)
+        menu.add_radiobutton(label="Любой из выбранных (ИЛИ)", variable=self.tag_match_all,
+                             value=False, command=self.on_tag_filter_changed)
+        menu.add_cascade(label="Исключить (НЕ)", menu=exclude_menu)
+        menu.add_separator()
+        menu.add_command(label="Сбросить", command=self.reset_tag_filter)
+
+    def toggle_tag(self, selected, name, checked):
+        # Тег не может быть одновременно нужным и исключенным
+        self.tag_include.discard(name)
+        self.tag_exclude.discard(name)
+        if checked:
+            selected.add(name)
+        self.on_tag_filter_changed()
+
+    def reset_tag_filter(self):
+        self.tag_include.clear()
+        self.tag_exclude.clear()
+        self.on_tag_filter_changed()
+
+    def current_tag_filter(self):
+        """TagFilter по выбору в меню (None — фильтра нет)."""
+        if not self.tag_include and not self.tag_exclude:
+            return None
+        return TagFilter(tuple(sorted(self.tag_include)), tuple(sorted(self.tag_exclude)),
+                         self.tag_match_all.get())
+
+    def on_tag_filter_changed(self):
+        """Подпись кнопки отражает выбранные теги; таблица перечитывается."""
+        parts = sorted(self.tag_include)
+        text = (" + " if self.tag_match_all.get() else " / ").join(parts)
+        if self.tag_exclude:
+            text = " ".join(filter(None, [text] + [f"−{name}" for name in sorted(self.tag_exclude)]))
+        self.btn_tags.config(text=f"Теги: {text}" if text else "Теги ▾")
+        self.refresh_table_with_filter()
+
+    def build_dates_menu(self):
+        """Меню фильтра дат: готовые периоды и произвольный диапазон."""
+        menu = self.menu_dates
+        for field, title in (("added", "Добавлены"), ("modified", "Изменены")):
+            submenu = tk.Menu(menu, tearoff=0)
+            for label, period in (("Сегодня", "today"), ("За 7 дней", "last-7d"),
+                                  ("За 30 дней", "last-30d"), ("В этом году", "this-year")):
+                submenu.add_command(
+                    label=label,
+                    command=lambda f=field, p=period, t=f"{title}: {label.lower()}": self.set_date_filter(f, p, t))
+            submenu.add_separator()
+            submenu.add_command(label="Диапазон...", command=lambda f=field, t=title: self.ask_date_range(f, t))
+            menu.add_cascade(label=title, menu=submenu)
+        menu.add_command(label="Родились в годах...",
+                         command=lambda: self.ask_date_range("born", "Родились"))
+        menu.add_separator()
+        menu.add_command(label="Сбросить", command=lambda: self.set_date_filter(None, None, None))
+
+    def ask_date_range(self, field, title):
+        if field == "born":
+            prompt = "Годы рождения (1980..1990, 1985, >=1990):"
+        else:
+            prompt = "Период (2026-01-01..2026-03-31, 2026-05, >2026-01-01):"
+        value = simpledialog.askstring(title, prompt, parent=self.root)
+        if value is None or not value.strip():
+            return
+        if not self.set_date_filter(field, value.strip(), f"{title}: {value.strip()}"):
+            messagebox.showerror(title, f"Не удалось разобрать период: {value}")
+
+    def set_date_filter(self, field, value, label):
+        """
+        Ставит фильтр дат (field=None — сбрасывает) и перечитывает таблицу.
+        Возвращает False, если период не разобран.
+        """
+        if field is None:
+            self.date_filter = None
+        else:
+            bounds = date_bounds(value, date.today())
+            if bounds is None or bounds == (None, None):
+                return False
+            self.date_filter = DateRange(field, *bounds)
+        self.btn_dates.config(text=label or "Даты ▾")
+        self.refresh_table_with_filter()
+        return True
+
     def create_statusbar(self):
         """Создание строки состояния (внизу)."""
         status_frame = tk.Frame(self.root, bd=1, relief=tk.SUNKEN)
@@ -194,6 +454,12 @@ class ContactApp:
             status_frame, text="Выбрано: 0", bd=1, relief=tk.SUNKEN, width=15)
         self.lbl_selected.pack(side=tk.RIGHT)
 
+        # Ход фоновой операции (импорт) и кнопка ее отмены; видны только во время работы
+        self.lbl_progress = tk.Label(status_frame, text="", anchor="w")
+        self.lbl_progress.pack(side=tk.LEFT, padx=5)
+        self.btn_cancel_task = tk.Button(status_frame, text="Отмена", command=self.cancel_background_task,
+                                         relief=tk.FLAT, cursor="hand2")
+
     def create_context_menus(self):
         """Создание контекстных меню (ПКМ)."""
         # Меню для таблицы
@@ -334,37 +600,60 @@ class ContactApp:
             self.root.resizable(True, True)
             self.root.minsize(self.min_width, self.min_height)
 
-    def load_contacts(self, search_text="", category="Все категории", sort_by="По ФИО (А-Я)"):
-        """Загрузка контактов из БД в таблицу."""
+    def load_contacts(self, search_text="", category="Все категории", sort_by="По ФИО (А-Я)", search_mode="smart",
+                      tag_filter=None, date_filter=None, saved_search=None):
+        """
+        Загрузка контактов из БД в таблицу.
+        Строки вставляются порциями через планировщик; новая загрузка
+        (следующая буква в поиске) отменяет недоделанную предыдущую.
+        """
         self.selected_ids.clear()
+        self.rows_to_mark.clear()
         self.update_buttons_state()
         self.table_frame.clear()
 
-        contacts = self.db.get_contacts(search_text, category, sort_by)
-        for row in contacts:
-            full_name = f"{row[1]} {row[2]} {row[3] if row[3] else ''}".strip()
-            social = f"{row[8] if row[8] else ''} {row[9] if row[9] else ''}".strip()
-            self.table_frame.insert_contact(
-                row[0], ("☐", full_name, row[4], row[6], social, row[20], row[18]))
+        contacts = self.db.get_contacts(
+            search_text, category, sort_by, search_mode, tag_filter, date_filter, saved_search)
+        self.row_ids = dict.fromkeys(row[0] for row in contacts)
 
+        # Дашборд сам следит за изменениями дней рождения (подписка на Database)
         self.lbl_count.config(text=f"Всего: {len(contacts)}")
-        self.dashboard.update_birthdays_display()
+        self.scheduler.spawn(self.fill_table(contacts),
+                             key="table", priority=PRIORITY_HIGH)
+
+    def fill_table(self, contacts):
+        """Задача планировщика: вставка строк таблицы порциями."""
+        for start in range(0, len(contacts), BATCH_SIZE):
+            for row in contacts[start:start + BATCH_SIZE]:
+                if row[0] not in self.row_ids:
+                    continue  # Удален, пока таблица заполнялась
+                checked = row[0] in self.selected_ids
+                self.table_frame.insert_contact(
+                    row[0], self.row_values(row, checked), "selected" if checked else "normal")
+            yield start
+
+    def row_values(self, row, checked):
+        """Значения колонок таблицы для строки БД."""
+        full_name = f"{row[1]} {row[2]} {row[3] if row[3] else ''}".strip()
+        social = f"{row[8] if row[8] else ''} {row[9] if row[9] else ''}".strip()
+        return ("☑" if checked else "☐", full_name, row[4], row[6], social, row[20], row[18])
 
     def refresh_table_with_filter(self, event=None):
         """Обновление таблицы с учетом текущих фильтров."""
         search_text = self.entry_search.get().strip()
         category = self.combo_category.get()
         sort_val = self.combo_sort.get()
-        self.load_contacts(search_text, category, sort_val)
+        search_mode = "fuzzy" if self.fuzzy_var.get() else "smart"
+        self.load_contacts(search_text, category, sort_val, search_mode,
+                           self.current_tag_filter(), self.date_filter, self.current_saved_search())
 
     def on_root_click(self, event):
         """Обработка клика мимо окон."""
-        if self.current_view_window and self.current_view_window.winfo_exists():
+        if self.current_view_window and self.current_view_window.is_shown():
             widget = event.widget
             if str(widget).startswith(str(self.toolbar_frame)):
                 return
-            self.current_view_window.destroy()
-            self.current_view_window = None
+            self.current_view_window.close()
 
     def on_tree_click(self, event):
         """Клик по строке таблицы."""
@@ -422,19 +711,34 @@ class ContactApp:
             self.context_menu_table.post(event.x_root, event.y_root)
 
     def select_all(self):
-        """Выбрать все строки."""
-        self.selected_ids.clear()
-        for item_id in self.tree.get_children():
-            self.selected_ids.add(int(item_id))
-            self.set_row_checked(item_id, True)
+        """Выбрать все строки (отметки в таблице перерисовываются порциями)."""
+        self.selected_ids = set(self.row_ids)
         self.update_buttons_state()
+        self.mark_rows(self.selected_ids)
 
     def deselect_all(self):
-        """Снять выделение."""
-        for item_id in self.tree.get_children():
-            self.set_row_checked(item_id, False)
-        self.selected_ids.clear()
+        """Снять выделение (перерисовываются только отмеченные строки)."""
+        previous = self.selected_ids
+        self.selected_ids = set()
         self.update_buttons_state()
+        self.mark_rows(previous)
+
+    def mark_rows(self, ids):
+        """Ставит строки в очередь перерисовки отметки по текущему selected_ids."""
+        self.rows_to_mark.update(ids)
+        if self.rows_to_mark and self.scheduler.get("marks") is None:
+            self.scheduler.spawn(self.mark_rows_task(),
+                                 key="marks", priority=PRIORITY_HIGH)
+
+    def mark_rows_task(self):
+        """Задача планировщика: перерисовка отметок порциями."""
+        while self.rows_to_mark:
+            for _ in range(min(BATCH_SIZE, len(self.rows_to_mark))):
+                cid = self.rows_to_mark.pop()
+                # Еще не вставленные строки fill_table сразу нарисует как надо
+                if self.tree.exists(str(cid)):
+                    self.set_row_checked(str(cid), cid in self.selected_ids)
+            yield len(self.rows_to_mark)
 
     def update_buttons_state(self):
         """Активация кнопок в зависимости от выделения."""
@@ -452,31 +756,65 @@ class ContactApp:
     def open_add_dialog(self, event=None):
         """Открыть окно добавления."""
         self.deselect_all()
-        ContactFormWindow(self.root, self.db,
-                          lambda: self.refresh_table_with_filter())
+        self.open_form()
+
+    def open_form(self, contact_id=None):
+        """
+        Открывает форму добавления/редактирования.
+        С пулом окон форма создается один раз, затем только прячется и показывается.
+        """
+        refresh = lambda: self.refresh_table_with_filter()
+        if not self.pool_windows_var.get():
+            ContactFormWindow(self.root, self.db, refresh, contact_id=contact_id)
+            return
+        form = self.form_window
+        if form is None or not form.winfo_exists():
+            self.form_window = ContactFormWindow(
+                self.root, self.db, refresh, contact_id=contact_id, pooled=True)
+        elif form.is_shown():
+            # Пул занят открытой формой — правки в ней не трогаем
+            ContactFormWindow(self.root, self.db, refresh, contact_id=contact_id)
+        else:
+            form.open_for(contact_id, refresh)
 
     def view_contact(self, event=None):
         """Открыть окно просмотра."""
         if len(self.selected_ids) != 1:
             return
         contact_id = list(self.selected_ids)[0]
-        if self.current_view_window and self.current_view_window.winfo_exists():
-            self.current_view_window.destroy()
+        view = self.current_view_window
+        if view is not None and view.winfo_exists():
+            if view.pooled and self.pool_windows_var.get():
+                view.show_contact(contact_id)
+                return
+            view.destroy()
         self.current_view_window = ViewContactWindow(
-            self.root, self.db, contact_id, self.open_edit_from_view, self.db.delete_contacts)
+            self.root, self.db, contact_id, self.open_edit_from_view, self.remove_contacts,
+            pooled=self.pool_windows_var.get(), photos=self.photos)
+
+    def toggle_window_pool(self):
+        """Выключение пула: спрятанные окна больше не нужны."""
+        if self.pool_windows_var.get():
+            return
+        for window in (self.form_window, self.current_view_window):
+            if window is None or not window.winfo_exists():
+                continue
+            if window.is_shown():
+                window.pooled = False  # Открытое окно уничтожится при закрытии
+            else:
+                window.destroy()
+        self.form_window = None
 
     def open_edit_from_view(self, contact_id):
         """Переход к редактированию из окна просмотра."""
-        ContactFormWindow(
-            self.root, self.db, lambda: self.refresh_table_with_filter(), contact_id=contact_id)
+        self.open_form(contact_id)
 
     def edit_contact(self):
         """Редактировать выбранный контакт."""
         if len(self.selected_ids) != 1:
             return
         contact_id = list(self.selected_ids)[0]
-        ContactFormWindow(
-            self.root, self.db, lambda: self.refresh_table_with_filter(), contact_id=contact_id)
+        self.open_form(contact_id)
 
     def delete_selected(self):
         """Удаление выбранных."""
@@ -484,8 +822,94 @@ class ContactApp:
         if count == 0:
             return
         if messagebox.askyesno("Подтверждение", f"Удалить {count} контактов?"):
-            self.db.delete_contacts(list(self.selected_ids))
+            self.remove_contacts(list(self.selected_ids))
+
+    def remove_contacts(self, ids):
+        """
+        Удаляет контакты из БД и убирает из таблицы только их строки.
+        Полная перезагрузка списка после удаления не нужна.
+        """
+        if not ids:
+            return
+        if not self.db.delete_contacts(ids):
+            messagebox.showerror("Ошибка", "Не удалось удалить контакты")
+            return
+        self.drop_rows(ids)
+
+    def drop_rows(self, ids):
+        """Убирает строки из таблицы и выделения (без обращения к БД)."""
+        self.table_frame.delete_rows(ids)
+        for cid in ids:
+            self.row_ids.pop(cid, None)
+        self.selected_ids.difference_update(ids)
+        self.update_buttons_state()
+        self.lbl_count.config(text=f"Всего: {len(self.row_ids)}")
+
+    # --- Синхронизация с другими окнами ---
+
+    def poll_external_changes(self):
+        """Периодическая проверка: не изменил ли базу другой процесс."""
+        self.db.poll_changes()
+        self.root.after(SYNC_POLL_MS, self.poll_external_changes)
+
+    def on_external_change(self, event):
+        """
+        Чужие изменения контактов: обновляются только затронутые строки.
+        Свои изменения таблица уже отразила сама (форма, удаление, импорт).
+        """
+        if event.table == "saved_searches":
+            selected = self.current_group.get()
+            self.build_group_buttons()
+            if selected != self.current_group.get():
+                self.refresh_table_with_filter()  # Таблица показывала удаленную группу
+            return
+        if event.table in ("contacts", "tags", "categories") and self.group_buttons:
+            # Состав групп уже обновлен (подписчик Database); подписи — после текущей правки
+            self.root.after_idle(self.refresh_group_counts)
+        if event.table == "categories":
+            # Переименование или удаление видно во всех строках категории
+            if event.action != "insert":
+                self.load_category_filter()
+                self.refresh_table_with_filter()
+            return
+        if not event.external or event.table != "contacts":
+            return
+        if event.ids is None or len(event.ids) > SYNC_MAX_ROWS \
+                or self.fuzzy_var.get() or self.scheduler.get("table"):
+            # Массовая правка, порядок по похожести или таблица еще
+            # заполняется — надежнее перечитать список целиком
             self.refresh_table_with_filter()
+        elif event.action == "delete":
+            self.drop_rows(event.ids)
+        else:
+            self.update_rows(event.ids)
+
+        view = self.current_view_window
+        if view is not None and view.winfo_exists() and view.is_shown() \
+                and (event.ids is None or view.contact_id in event.ids):
+            view.load_data()  # Удаленный контакт окно закроет само
+
+    def update_rows(self, ids):
+        """
+        Перечитывает строки ids с учетом текущего поиска и фильтра.
+        Новые контакты добавляются в конец списка, а строки, переставшие
+        подходить под фильтр, убираются.
+        """
+        rows = self.db.get_contacts_by_ids(
+            ids, self.entry_search.get().strip(), self.combo_category.get(),
+            tag_filter=self.current_tag_filter(), date_filter=self.date_filter,
+            saved_search=self.current_saved_search())
+        found = set()
+        for row in rows:
+            found.add(row[0])
+            checked = row[0] in self.selected_ids
+            if self.tree.exists(str(row[0])):
+                self.tree.item(str(row[0]), values=self.row_values(row, checked))
+            else:
+                self.table_frame.insert_contact(
+                    row[0], self.row_values(row, checked), "selected" if checked else "normal")
+                self.row_ids[row[0]] = None
+        self.drop_rows([cid for cid in ids if cid not in found and cid in self.row_ids])
 
     def export_csv(self):
         """Экспорт в CSV."""
@@ -508,7 +932,10 @@ class ContactApp:
             messagebox.showerror("Ошибка", str(e))
 
     def import_csv(self):
-        """Импорт из CSV."""
+        """Импорт из CSV (в фоне, окно остается доступным)."""
+        if self.scheduler.get("background"):
+            messagebox.showwarning("Импорт", "Дождитесь завершения текущей операции.")
+            return
         filename = filedialog.askopenfilename(
             filetypes=[("CSV Files", "*.csv")])
         if not filename:
@@ -517,19 +944,123 @@ class ContactApp:
             with open(filename, mode='r', encoding='utf-8') as file:
                 reader = csv.reader(file, delimiter=';')
                 next(reader, None)
-                count = 0
-                for row in reader:
-                    if len(row) < 5:
-                        continue
+                rows = [row for row in reader if len(row) >= 5]
+        except Exception as e:
+            messagebox.showerror("Ошибка", str(e))
+            return
+        self.run_background("Импорт", self.import_rows(rows), self.on_import_finished)
+
+    def import_rows(self, rows):
+        """
+        Задача планировщика: импорт строк CSV.
+        Каждая порция — своя транзакция, чтобы правки пользователя во время
+        импорта не попадали в чужую транзакцию.
+        """
+        count = 0
+        for start in range(0, len(rows), IMPORT_BATCH_SIZE):
+            with self.db.transaction():
+                for row in rows[start:start + IMPORT_BATCH_SIZE]:
                     birth_date = row[8] if len(row) > 8 else ""
                     data = [row[1], row[2], row[3] if len(row) > 3 else "", row[4], "", row[5] if len(
                         row) > 5 else "", "", "", "", "", "", "", "", "", "", "", row[7] if len(row) > 7 else "", row[6] if len(row) > 6 else "Не распределён", birth_date]
                     self.db.add_contact(data)
                     count += 1
-            self.refresh_table_with_filter()
+            yield count, len(rows)
+        return count
+
+    def export_exchange(self):
+        """Экспорт всех полей в vCard или JSON Lines (в фоне, файл пишется порциями)."""
+        if self.scheduler.get("background"):
+            messagebox.showwarning("Экспорт", "Дождитесь завершения текущей операции.")
+            return
+        filename = filedialog.asksaveasfilename(
+            defaultextension=".vcf",
+            filetypes=[("vCard", "*.vcf"), ("JSON Lines", "*.jsonl")])
+        if not filename:
+            return
+        file_format = detect_format(filename) or "vcard"
+        version = "3.0"
+        if file_format == "vcard" and messagebox.askyesno(
+                "Экспорт", "Сохранить в формате vCard 4.0?\n"
+                           "(Нет — vCard 3.0, его понимает большинство программ)"):
+            version = "4.0"
+
+        def on_finished(count, cancelled=False):
+            if cancelled:
+                messagebox.showinfo("Экспорт", f"Экспорт отменен. Записано {count} контактов.")
+            else:
+                messagebox.showinfo("Экспорт", f"Успешно экспортировано {count} контактов.")
+
+        self.run_background("Экспорт", export_contacts(self.db, filename, file_format, version), on_finished)
+
+    def import_exchange(self):
+        """Импорт vCard (3.0 / 4.0) или JSON Lines (в фоне; большой файл разбирается параллельно)."""
+        if self.scheduler.get("background"):
+            messagebox.showwarning("Импорт", "Дождитесь завершения текущей операции.")
+            return
+        filename = filedialog.askopenfilename(
+            filetypes=[("vCard и JSON Lines", "*.vcf *.vcard *.jsonl *.ndjson"),
+                       ("Все файлы", "*.*")])
+        if not filename:
+            return
+        file_format = detect_format(filename)
+        if file_format is None:
+            messagebox.showerror("Импорт", "Поддерживаются файлы .vcf и .jsonl")
+            return
+        self.run_background("Импорт", import_contacts(self.db, filename, file_format),
+                            self.on_import_finished)
+
+    def on_import_finished(self, count, cancelled=False):
+        self.refresh_table_with_filter()
+        if cancelled:
+            messagebox.showinfo("Импорт", f"Импорт отменен. Импортировано {count} контактов.")
+        else:
             messagebox.showinfo("Импорт", f"Импортировано {count} контактов.")
-        except Exception as e:
-            messagebox.showerror("Ошибка", str(e))
+
+    def on_migration_finished(self, count, cancelled=False):
+        """Обновление базы закончено (или отложено до следующего запуска)."""
+        if not cancelled:
+            self.refresh_table_with_filter()
+
+    def run_background(self, title, generator, on_finished):
+        """
+        Запускает длинную операцию в планировщике с индикатором хода
+        и кнопкой отмены в строке состояния.
+        on_finished(результат, cancelled=False); при отмене результат — последний
+        отчет о ходе (сколько уже сделано).
+        """
+        def on_progress(progress):
+            done, total = progress
+            self.lbl_progress.config(text=f"{title}: {done} из {total}")
+
+        def on_done(result):
+            self.hide_progress()
+            on_finished(result)
+
+        def on_error(error):
+            self.hide_progress()
+            messagebox.showerror("Ошибка", f"{title}: {error}")
+            self.refresh_table_with_filter()
+
+        self.background_finished = on_finished
+        self.lbl_progress.config(text=f"{title}...")
+        self.btn_cancel_task.pack(side=tk.LEFT)
+        self.scheduler.spawn(generator, key="background", priority=PRIORITY_LOW,
+                             on_progress=on_progress, on_done=on_done, on_error=on_error)
+
+    def cancel_background_task(self):
+        """Кнопка "Отмена" в строке состояния."""
+        task = self.scheduler.get("background")
+        if task is None:
+            return
+        task.cancel()
+        self.hide_progress()
+        done = task.progress[0] if task.progress else 0
+        self.background_finished(done, cancelled=True)
+
+    def hide_progress(self):
+        self.lbl_progress.config(text="")
+        self.btn_cancel_task.pack_forget()
 
     def create_backup(self):
         """Бэкап базы данных."""
@@ -558,6 +1089,30 @@ class ContactApp:
                 msg += f"{d[0]} {d[1]} ({d[2]})\n"
             messagebox.showinfo("Дубликаты", msg)
 
+    def show_categories(self):
+        """Окно справочника категорий."""
+        CategoriesWindow(self.root, self.db)
+
+    def show_diagnostics(self):
+        """Окно диагностики производительности."""
+        DiagnosticsWindow(self.root, self.db, self.watchdog)
+
+    def toggle_profiling(self):
+        """Включение/выключение профилирования запросов (отчет сохраняется)."""
+        if self.profiling_var.get():
+            self.db.enable_profiling()
+        else:
+            self.db.disable_profiling()
+
+    def toggle_watchdog(self):
+        """Включение/выключение мониторинга зависаний UI (статистика сохраняется)."""
+        if self.watchdog_var.get():
+            if self.watchdog is None:
+                self.watchdog = UiWatchdog(self.root)
+            self.watchdog.start()
+        elif self.watchdog is not None:
+            self.watchdog.stop()
+
     def clear_all_data(self):
         """Очистка всей базы."""
         if messagebox.askyesno("ВНИМАНИЕ", "Удалить ВСЕ контакты?"):
@@ -571,7 +1126,14 @@ class ContactApp:
     def show_hotkeys(self):
         """Справка по клавишам."""
         messagebox.showinfo(
-            "Горячие клавиши", "Ctrl+N: Новый\nCtrl+F: Поиск\nDel: Удалить\nEnter: Просмотр\nCtrl+S: Экспорт")
+            "Горячие клавиши", "Ctrl+N: Новый\nCtrl+F: Поиск\nDel: Удалить\nEnter: Просмотр\nCtrl+S: Экспорт\n\n"
+            "Строка поиска:\n"
+            "phone:900 category:Работа — по полям (name, last, first, email, notes, address, tag)\n"
+            "\"Иван Петров\" — фраза целиком, -tag:архив — исключить\n"
+            "added:>2026-01-01, modified:last-30d — даты добавления и изменения\n"
+            "bday:this-month, bday:12-20..01-10 — дни рождения, born:1980..1990 — годы рождения\n"
+            "has:email, -has:phone — поле заполнено / пусто (phone, email, address, notes, bday, photo)\n\n"
+            "Кнопка \"+\" у фильтров сохраняет поиск как умную группу")
 
     def copy_from_row(self, what):
         """Копирование данных из строки таблицы в буфер."""
@@ -0,0 +1,181 @@
+"""
+Фотографии контактов: миниатюры строятся Pillow в пуле потоков
+и кэшируются на диске и в памяти (LRU ограниченного размера).
+"""
+
+import hashlib
+import io
+import os
+import queue
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from PIL import Image, ImageOps, ImageTk
+except ImportError:  # Без Pillow фотографии просто недоступны
+    Image = ImageOps = ImageTk = None
+
+THUMB_SIZE = 96        # Сторона миниатюры в окне просмотра (пиксели)
+MAX_PHOTO_SIDE = 1024  # Фото уменьшается до этого размера перед записью в БД
+MEMORY_ITEMS = 200     # Сколько готовых миниатюр держать в памяти
+POLL_MS = 30           # Как часто поток Tk забирает результаты из пула
+
+
+def photos_available():
+    return Image is not None
+
+
+def prepare_photo(path):
+    """Рабочий поток: открывает файл, поворачивает по EXIF, уменьшает, сохраняет в JPEG."""
+    with Image.open(path) as image:
+        image = ImageOps.exif_transpose(image).convert("RGB")
+        image.thumbnail((MAX_PHOTO_SIDE, MAX_PHOTO_SIDE))
+        out = io.BytesIO()
+        image.save(out, "JPEG", quality=85)
+        return out.getvalue()
+
+
+def render_thumbnail(data, size, cache_path):
+    """Рабочий поток: миниатюра из байтов фото; PNG сохраняется в дисковый кэш."""
+    with Image.open(io.BytesIO(data)) as image:
+        # JPEG сразу декодируется в уменьшенном масштабе (в разы быстрее)
+        image.draft("RGB", (size * 2, size * 2))
+        image = ImageOps.exif_transpose(image).convert("RGB")
+        image.thumbnail((size, size))
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        tmp_path = cache_path + ".tmp"
+        image.save(tmp_path, "PNG")
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        pass  # Без дискового кэша миниатюра все равно показывается
+    return image
+
+
+def load_cached(cache_path):
+    """Рабочий поток: миниатюра из дискового кэша."""
+    with Image.open(cache_path) as image:
+        image.load()
+        return image
+
+
+class PhotoCache:
+    """
+    Миниатюры фото контактов для Tkinter.
+    - BLOB читается из БД в потоке Tk (соединение SQLite однопоточное), по частям;
+    - декодирование и масштабирование — в пуле потоков;
+    - готовые PNG лежат на диске (имя файла включает размер и дату фото,
+      поэтому замена фото не требует очистки кэша);
+    - PhotoImage создаются только в потоке Tk и хранятся в LRU.
+    """
+
+    def __init__(self, root, db, cache_dir=None, workers=2, memory_items=MEMORY_ITEMS):
+        self.root = root
+        self.db = db
+        self.cache_dir = cache_dir or os.path.splitext(db.db_file)[0] + "_thumbs"
+        self.memory_items = memory_items
+        self._memory = OrderedDict()  # Ключ -> PhotoImage, в порядке использования
+        self._waiting = {}  # Ключ -> обработчики, ждущие одну и ту же миниатюру
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="photos")
+        self._results = queue.Queue()  # (future, обработчик) из рабочих потоков
+        self._in_flight = 0  # Задачи пула, результат которых еще не обработан
+        self._polling = False
+
+    # --- Миниатюры ---
+
+    def get_thumbnail(self, contact_id, callback, size=THUMB_SIZE):
+        """
+        Запрашивает миниатюру; callback(PhotoImage или None) вызывается в потоке Tk.
+        Из памяти — сразу, иначе — когда пул закончит работу.
+        """
+        info = self.db.get_photo_info(contact_id)
+        if info is None:
+            callback(None)
+            return
+        key = (contact_id, size, info[0], info[1])
+        image = self._memory.get(key)
+        if image is not None:
+            self._memory.move_to_end(key)
+            callback(image)
+            return
+        if key in self._waiting:
+            self._waiting[key].append(callback)
+            return
+        self._waiting[key] = [callback]
+
+        cache_path = self._cache_path(key)
+        if os.path.exists(cache_path):
+            future = self._pool.submit(load_cached, cache_path)
+        else:
+            data = self.db.read_contact_photo(contact_id)
+            if data is None:
+                self._deliver(key, None)
+                return
+            future = self._pool.submit(render_thumbnail, data, size, cache_path)
+        self._submit(future, lambda f: self._on_thumbnail(key, f))
+
+    def _cache_path(self, key):
+        contact_id, size, photo_size, updated_at = key
+        stamp = hashlib.sha1(f"{photo_size}|{updated_at}".encode()).hexdigest()[:12]
+        return os.path.join(self.cache_dir, f"{contact_id}_{size}_{stamp}.png")
+
+    def _on_thumbnail(self, key, future):
+        try:
+            image = ImageTk.PhotoImage(future.result())
+        except Exception as e:
+            print(f"Ошибка миниатюры: {e}")
+            image = None
+        if image is not None:
+            self._memory[key] = image
+            while len(self._memory) > self.memory_items:
+                self._memory.popitem(last=False)
+        self._deliver(key, image)
+
+    def _deliver(self, key, image):
+        for callback in self._waiting.pop(key, []):
+            callback(image)
+
+    # --- Загрузка нового фото ---
+
+    def import_photo(self, contact_id, path, callback):
+        """
+        Уменьшает фото из файла в пуле потоков и сохраняет в БД.
+        callback(ok, сообщение_об_ошибке) вызывается в потоке Tk.
+        """
+        def on_prepared(future):
+            try:
+                data = future.result()
+            except Exception as e:
+                callback(False, str(e))
+                return
+            if self.db.set_contact_photo(contact_id, data):
+                callback(True, "")
+            else:
+                callback(False, "Не удалось сохранить фото")
+
+        self._submit(self._pool.submit(prepare_photo, path), on_prepared)
+
+    # --- Передача результатов в поток Tk ---
+
+    def _submit(self, future, handler):
+        self._in_flight += 1
+        future.add_done_callback(lambda f: self._results.put((f, handler)))
+        if not self._polling:
+            self._polling = True
+            self.root.after(POLL_MS, self._poll)
+
+    def _poll(self):
+        while True:
+            try:
+                future, handler = self._results.get_nowait()
+            except queue.Empty:
+                break
+            self._in_flight -= 1
+            handler(future)
+        if self._in_flight:
+            self.root.after(POLL_MS, self._poll)
+        else:
+            self._polling = False
+
+    def close(self):
+        self._pool.shutdown(wait=False)
@@ -0,0 +1,152 @@
+import sys
+import time
+from itertools import count
+
+# Приоритеты задач: меньше — важнее
+PRIORITY_HIGH = 0    # То, что пользователь ждет прямо сейчас (таблица, выделение)
+PRIORITY_NORMAL = 1
+PRIORITY_LOW = 2     # Фоновая работа (импорт)
+
+
+class Task:
+    """
+    Задача планировщика: генератор, выполняемый по шагам.
+    Каждый yield — точка, где планировщик может отдать управление циклу событий;
+    значение yield (например, (сделано, всего)) передается в on_progress.
+    Значение return генератора передается в on_done.
+    """
+
+    def __init__(self, scheduler, generator, key, priority, on_progress, on_done, on_error):
+        self.scheduler = scheduler
+        self.generator = generator
+        self.key = key
+        self.priority = priority
+        self.on_progress = on_progress
+        self.on_done = on_done
+        self.on_error = on_error
+        self.order = 0
+        self.progress = None
+        self.finished = False
+        self.cancelled = False
+
+    def cancel(self):
+        """Отмена: генератор закрывается (срабатывают его finally)."""
+        if self.finished:
+            return
+        self.cancelled = True
+        self.finished = True
+        try:
+            self.generator.close()
+        except ValueError:
+            pass  # Задача отменяет сама себя изнутри шага — закроется после yield
+        self.scheduler._forget(self)
+
+    def step(self):
+        """Один шаг задачи. Возвращает False, когда задача завершилась."""
+        if self.finished:
+            return False
+        try:
+            self.progress = next(self.generator)
+        except StopIteration as stop:
+            self.finished = True
+            if self.on_done:
+                self._call(self.on_done, stop.value)
+            return False
+        except Exception as e:
+            self.finished = True
+            if self.on_error:
+                self._call(self.on_error, e)
+            else:
+                self.scheduler.root.report_callback_exception(*sys.exc_info())
+            return False
+        if self.cancelled:
+            self.generator.close()
+            return False
+        if self.on_progress and self.progress is not None:
+            self._call(self.on_progress, self.progress)
+        return True
+
+    def _call(self, callback, value):
+        """Обратный вызов задачи: его ошибка сообщается Tk и не останавливает планировщик."""
+        try:
+            callback(value)
+        except Exception:
+            self.scheduler.root.report_callback_exception(*sys.exc_info())
+
+
+class TaskScheduler:
+    """
+    Кооперативный планировщик длинных операций в потоке Tkinter.
+    Задачи выполняются квантами не дольше slice_ms, между квантами Tk успевает
+    обработать события и перерисовать окно, поэтому интерфейс не замирает.
+    """
+
+    def __init__(self, root, slice_ms=8):
+        self.root = root
+        self.slice_ms = slice_ms
+        self.tasks = []
+        self._order = count()  # Порядок запуска: при равном приоритете — FIFO
+        self._timer = None
+        self._running = False
+
+    def spawn(self, generator, key=None, priority=PRIORITY_NORMAL,
+              on_progress=None, on_done=None, on_error=None):
+        """
+        Запускает задачу. Задача с тем же key (например, "table") отменяется:
+        новая загрузка таблицы заменяет недоделанную старую.
+        Первый квант выполняется сразу — короткие задачи завершаются без задержки.
+        """
+        if key is not None:
+            self.cancel(key)
+        task = Task(self, generator, key, priority, on_progress, on_done, on_error)
+        task.order = next(self._order)
+        self.tasks.append(task)
+        self.tasks.sort(key=lambda t: (t.priority, t.order))
+        if self._running:
+            # Запуск из шага другой задачи: новая получит управление в этом же кванте
+            return task
+        self._run_slice()
+        return task
+
+    def cancel(self, key):
+        """Отменяет задачу с данным ключом (если она выполняется)."""
+        for task in list(self.tasks):
+            if task.key == key:
+                task.cancel()
+
+    def cancel_all(self):
+        for task in list(self.tasks):
+            task.cancel()
+
+    def get(self, key):
+        """Выполняющаяся задача с данным ключом или None."""
+        for task in self.tasks:
+            if task.key == key:
+                return task
+        return None
+
+    def busy(self):
+        return bool(self.tasks)
+
+    def _forget(self, task):
+        if task in self.tasks:
+            self.tasks.remove(task)
+
+    def _run_slice(self):
+        """Выполняет задачи по приоритету, пока не истечет квант времени."""
+        if self._timer is not None:
+            self.root.after_cancel(self._timer)
+            self._timer = None
+        deadline = time.perf_counter() + self.slice_ms / 1000
+        self._running = True
+        try:
+            while self.tasks and time.perf_counter() < deadline:
+                task = self.tasks[0]
+                if not task.step():
+                    self._forget(task)
+        finally:
+            self._running = False
+            # Следующий квант планируется, даже если шаг завершился исключением
+            if self.tasks:
+                # after(1), а не after_idle: между квантами обрабатываются ввод и отрисовка
+                self._timer = self.root.after(1, self._run_slice)
@@ -1,17 +1,22 @@
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import ttk, messagebox, filedialog
 import webbrowser  # Для открытия ссылок на соцсети
 
 
 class ViewContactWindow(tk.Toplevel):
     """
     Класс окна просмотра контакта.
+    В режиме пула (pooled=True) окно при закрытии прячется, а show_contact
+    перестраивает только те блоки, данные которых изменились.
     """
 
-    def __init__(self, parent, db, contact_id, on_edit_request, on_delete_request):
+    def __init__(self, parent, db, contact_id, on_edit_request, on_delete_request, pooled=False, photos=None):
         super().__init__(parent)
         self.db = db
         self.contact_id = contact_id
+        self.pooled = pooled
+        self.photos = photos  # PhotoCache (None — Pillow недоступен, фото не показываются)
+        self.shown_data = None  # Строка БД, по которой построены блоки окна
 
         # Callback-функции для переключения режимов
         self.on_edit_request = on_edit_request
@@ -19,7 +24,7 @@ class ViewContactWindow(tk.Toplevel):
 
         self.title("Просмотр контакта")
         self.width = 500
-        self.height = 600
+        self.height = 700 if photos else 600
         self.geometry(f"{self.width}x{self.height}")
         self.resizable(False, False)
         self.center_window()
@@ -32,6 +37,27 @@ class ViewContactWindow(tk.Toplevel):
         self.create_ui()  # Создание пустых виджетов
         self.load_data()  # Заполнение данными из БД
         self.bind_keys()  # Горячие клавиши
+        self.protocol("WM_DELETE_WINDOW", self.close)
+
+    def show_contact(self, contact_id):
+        """Показ спрятанного окна из пула для другого контакта."""
+        self.contact_id = contact_id
+        if not self.load_data():
+            return
+        self.center_window()
+        self.deiconify()
+        self.lift()
+
+    def is_shown(self):
+        """Окно на экране (а не спрятано в пуле)."""
+        return self.winfo_exists() and self.state() != "withdrawn"
+
+    def close(self):
+        """Закрытие: в пуле окно прячется, иначе уничтожается."""
+        if self.pooled:
+            self.withdraw()
+        else:
+            self.destroy()
 
     def center_window(self):
         """Центрирование окна."""
@@ -43,10 +69,13 @@ class ViewContactWindow(tk.Toplevel):
 
     def bind_keys(self):
         """Закрытие на Esc."""
-        self.bind("<Escape>", lambda e: self.destroy())
+        self.bind("<Escape>", lambda e: self.close())
 
     def create_ui(self):
         """Создание структуры окна (лейблы, рамки, кнопки)."""
+        # Фото контакта (показывается, когда миниатюра готова)
+        self.lbl_photo = tk.Label(self.main_frame)
+
         # Большой заголовок с именем
         self.lbl_name = tk.Label(self.main_frame, text="", font=(
             "Arial", 18, "bold"), fg="#333", wraplength=450, justify="center")
@@ -71,20 +100,91 @@ class ViewContactWindow(tk.Toplevel):
                   fg="white", width=12, cursor="hand2").pack(side=tk.LEFT, padx=5, expand=True)
         tk.Button(frame_actions, text="Удалить", command=self.delete_me, bg="#F44336",
                   fg="white", width=12, cursor="hand2").pack(side=tk.LEFT, padx=5, expand=True)
-        tk.Button(frame_actions, text="Закрыть", command=self.destroy,
+        if self.photos:
+            btn_photo = tk.Menubutton(frame_actions, text="Фото ▾", relief=tk.RAISED,
+                                      width=10, cursor="hand2")
+            photo_menu = tk.Menu(btn_photo, tearoff=0)
+            photo_menu.add_command(label="Загрузить...", command=self.choose_photo)
+            photo_menu.add_command(label="Удалить", command=self.remove_photo)
+            btn_photo.config(menu=photo_menu)
+            btn_photo.pack(side=tk.LEFT, padx=5, expand=True)
+        tk.Button(frame_actions, text="Закрыть", command=self.close,
                   width=12, cursor="hand2").pack(side=tk.LEFT, padx=5, expand=True)
 
     def load_data(self):
-        """Получение данных из БД и динамическое создание строк."""
+        """
+        Получение данных из БД и динамическое создание строк.
+        Блок перестраивается, только если его данные отличаются от показанных.
+        """
         data = self.db.get_contact_by_id(self.contact_id)
         if not data:
-            self.destroy()
-            return
+            self.close()
+            return False
 
         full_name = f"{data[1]} {data[2]} {data[3]}".strip()
         self.lbl_name.config(text=full_name)
+        self.load_photo()
+
+        old, self.shown_data = self.shown_data, data
+        if old is None or old[4:8] != data[4:8]:
+            self.clear_frame(self.frame_contacts)
+            self.fill_contacts(data)
+        if old is None or old[8:17] != data[8:17]:
+            self.clear_frame(self.frame_socials)
+            self.fill_socials(data)
+        if old is None or old[17:22] != data[17:22]:
+            self.clear_frame(self.frame_info)
+            self.fill_info(data)
+        return True
+
+    # --- Фото ---
+
+    def load_photo(self):
+        """Запрос миниатюры; пока ее нет (или фото нет), место под фото не занято."""
+        if not self.photos:
+            return
+        contact_id = self.contact_id
+
+        def show(image):
+            # Окно могли закрыть или переключить на другой контакт
+            if not self.winfo_exists() or self.contact_id != contact_id:
+                return
+            if image is None:
+                self.lbl_photo.pack_forget()
+                return
+            self.lbl_photo.config(image=image)
+            self.lbl_photo.image = image  # Ссылка, иначе сборщик мусора сотрет картинку
+            self.lbl_photo.pack(before=self.lbl_name, pady=(0, 5))
+
+        self.photos.get_thumbnail(contact_id, show)
+
+    def choose_photo(self):
+        path = filedialog.askopenfilename(parent=self, filetypes=[
+            ("Изображения", "*.jpg *.jpeg *.png *.gif *.bmp *.webp"), ("Все файлы", "*.*")])
+        if not path:
+            return
+
+        def done(ok, message):
+            if not ok:
+                messagebox.showerror("Ошибка", f"Не удалось загрузить фото:\n{message}", parent=self)
+            elif self.winfo_exists():
+                self.load_photo()
+
+        self.photos.import_photo(self.contact_id, path, done)
 
-        # Заполнение блока "Связь"
+    def remove_photo(self):
+        if self.db.get_photo_info(self.contact_id) is None:
+            return
+        if messagebox.askyesno("Фото", "Удалить фото контакта?", parent=self):
+            self.db.delete_contact_photo(self.contact_id)
+            self.load_photo()
+
+    def clear_frame(self, frame):
+        for child in frame.winfo_children():
+            child.destroy()
+
+    def fill_contacts(self, data):
+        """Заполнение блока "Связь"."""
         row = 0
         if data[4]:  # Если есть основной телефон
             self.add_row_with_copy(self.frame_contacts,
@@ -101,7 +201,8 @@ class ViewContactWindow(tk.Toplevel):
             self.add_row_with_copy(self.frame_contacts, row, "Адрес:", data[7])
             row += 1
 
-        # Заполнение блока "Соцсети"
+    def fill_socials(self, data):
+        """Заполнение блока "Соцсети"."""
         social_row = 0
         has_socials = False
         for i in range(0, 3):
@@ -118,7 +219,8 @@ class ViewContactWindow(tk.Toplevel):
             tk.Label(self.frame_socials, text="Нет данных",
                      fg="gray").pack(pady=5)
 
-        # Заполнение блока "Информация"
+    def fill_info(self, data):
+        """Заполнение блока "Информация"."""
         info_row = 0
         self.add_row_simple(self.frame_info, info_row, "Категория:", data[20])
         info_row += 1
@@ -186,11 +288,11 @@ class ViewContactWindow(tk.Toplevel):
 
     def go_to_edit(self):
         """Закрывает просмотр и открывает редактирование."""
-        self.destroy()
+        self.close()
         self.on_edit_request(self.contact_id)
 
     def delete_me(self):
         """Удаляет текущий контакт."""
         if messagebox.askyesno("Удаление", "Удалить этот контакт?"):
             self.on_delete_request([self.contact_id])
-            self.destroy()
+            self.close()
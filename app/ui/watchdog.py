@@ -0,0 +1,168 @@
+import sys
+import json
+import threading
+import time
+import traceback
+import tkinter as tk
+from collections import deque
+from datetime import datetime
+
+from ..diagnostics import LatencyHistogram
+
+
+def handler_name(func):
+    """Читаемое имя обработчика: 'ContactApp.select_all' или qualname функции/lambda."""
+    owner = getattr(func, "__self__", None)
+    name = getattr(func, "__name__", repr(func))
+    if owner is not None and not isinstance(owner, type(sys)):
+        return f"{type(owner).__name__}.{name}"
+    return getattr(func, "__qualname__", name)
+
+
+class UiWatchdog:
+    """
+    Детектор зависаний главного цикла Tkinter (включается по желанию).
+
+    - Пульс: таймер after() каждые heartbeat_ms; опоздание пульса = задержка mainloop.
+    - Все обработчики Tkinter (события, команды кнопок, after) проходят через
+      tkinter.CallWrapper — он подменяется, и каждый вызов замеряется.
+    - Фоновый поток замечает, что цикл событий не обслуживался дольше stall_ms,
+      и снимает Python-стек главного потока — видно, где именно завис обработчик.
+    """
+
+    def __init__(self, root, stall_ms=200, heartbeat_ms=50, max_stalls=100):
+        self.root = root
+        self.stall_ms = stall_ms
+        self.heartbeat_ms = heartbeat_ms
+        self.stalls = deque(maxlen=max_stalls)
+        self.running = False
+        self._original_call = None
+        self._thread = None
+        self._main_thread_id = threading.get_ident()
+        self.reset()
+
+    def reset(self):
+        """Обнуляет накопленную статистику."""
+        self.started_at = datetime.now()
+        self.heartbeat = LatencyHistogram()
+        self.handlers = {}
+        self.stalls.clear()
+        self._active = []  # Стек выполняющихся обработчиков (бывают вложенные)
+        self._last_pump = time.perf_counter()
+        self._stall = None  # Текущее зависание, пока оно не закончилось
+
+    # --- Запуск и остановка ---
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        watchdog = self
+        original = tk.CallWrapper.__call__
+        self._original_call = original
+
+        def timed_call(wrapper, *args):
+            return watchdog._run_handler(original, wrapper, args)
+
+        tk.CallWrapper.__call__ = timed_call
+
+        self._last_pump = time.perf_counter()
+        self._expected_beat = self._last_pump + self.heartbeat_ms / 1000
+        self.root.after(self.heartbeat_ms, self._beat)
+        self._thread = threading.Thread(target=self._sampler, daemon=True,
+                                        name="ui-watchdog")
+        self._thread.start()
+
+    def stop(self):
+        if not self.running:
+            return
+        self.running = False
+        if self._original_call is not None:
+            tk.CallWrapper.__call__ = self._original_call
+            self._original_call = None
+
+    # --- Главный поток ---
+
+    def _pump(self):
+        """Отметка "цикл событий обслуживается"; закрывает текущее зависание."""
+        now = time.perf_counter()
+        if self._stall is not None:
+            self._stall["ms"] = round((now - self._stall["start"]) * 1000, 1)
+            del self._stall["start"]
+            self.stalls.append(self._stall)
+            self._stall = None
+        self._last_pump = now
+
+    def _run_handler(self, original, wrapper, args):
+        if wrapper.func == self._beat:
+            return original(wrapper, *args)
+        name = handler_name(wrapper.func)
+        self._pump()
+        self._active.append(name)
+        start = time.perf_counter()
+        try:
+            return original(wrapper, *args)
+        finally:
+            elapsed = (time.perf_counter() - start) * 1000
+            self._active.pop()
+            self.handlers.setdefault(name, LatencyHistogram()).add(elapsed)
+            self._pump()
+
+    def _beat(self):
+        if not self.running:
+            return
+        now = time.perf_counter()
+        self.heartbeat.add(max(0.0, (now - self._expected_beat) * 1000))
+        self._pump()
+        self._expected_beat = now + self.heartbeat_ms / 1000
+        self.root.after(self.heartbeat_ms, self._beat)
+
+    # --- Фоновый поток ---
+
+    def _sampler(self):
+        """Проверяет, не завис ли цикл событий, и снимает стек главного потока."""
+        interval = max(self.stall_ms / 4000, 0.01)
+        thread = threading.current_thread()
+        # Проверка self._thread: после stop()/start() старый поток завершается
+        while self.running and self._thread is thread:
+            time.sleep(interval)
+            last_pump = self._last_pump
+            blocked_ms = (time.perf_counter() - last_pump) * 1000
+            if blocked_ms < self.stall_ms or self._stall is not None:
+                continue
+            frame = sys._current_frames().get(self._main_thread_id)
+            stack = traceback.format_stack(frame) if frame is not None else []
+            self._stall = {
+                "time": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                "handler": self._active[-1] if self._active else None,
+                "start": last_pump,
+                "stack": [line.rstrip() for line in stack[-15:]],
+            }
+
+    # --- Отчет ---
+
+    def report(self):
+        """Сводка: задержка цикла событий, время обработчиков, зависания со стеками."""
+        stalls_by_handler = {}
+        for stall in self.stalls:
+            item = stalls_by_handler.setdefault(
+                stall["handler"] or "-", {"count": 0, "total_ms": 0.0, "max_ms": 0.0})
+            item["count"] += 1
+            item["total_ms"] = round(item["total_ms"] + stall["ms"], 1)
+            item["max_ms"] = max(item["max_ms"], stall["ms"])
+        return {
+            "started_at": self.started_at.strftime("%Y-%m-%d %H:%M:%S"),
+            "generated_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "stall_threshold_ms": self.stall_ms,
+            "mainloop_latency": self.heartbeat.to_dict(),
+            "handlers": {name: hist.to_dict()
+                         for name, hist in sorted(self.handlers.items(),
+                                                  key=lambda kv: -kv[1].max_ms)},
+            "stalls_by_handler": stalls_by_handler,
+            "stalls": list(self.stalls),
+        }
+
+    def dump_json(self, path):
+        """Сохраняет отчет в JSON-файл."""
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(self.report(), file, ensure_ascii=False, indent=2)
@@ -0,0 +1,73 @@
+"""
+Генерация тестовой базы контактов заданного размера для бенчмарков.
+Записи добавляются через Database.add_contact, поэтому все служебные
+ключи (сортировка, поиск) заполняются так же, как в приложении.
+"""
+
+import os
+import random
+import sqlite3
+
+from app.database import Database
+
+LAST_NAMES = ["Иванов", "Петров", "Сидоров", "Смирнов", "Кузнецов", "Попов",
+              "Васильев", "Соколов", "Михайлов", "Новиков", "Фёдоров", "Морозов",
+              "Волков", "Алексеев", "Лебедев", "Семёнов", "Егоров", "Павлов",
+              "Козлов", "Степанов", "Николаев", "Орлов", "Андреев", "Макаров"]
+FIRST_NAMES = ["Иван", "Анна", "Пётр", "Мария", "Алексей", "Ольга", "Дмитрий",
+               "Елена", "Сергей", "Наталья", "Андрей", "Юлия", "Михаил", "Татьяна"]
+PATRONYMICS = ["Иванович", "Петровна", "Сергеевич", "Андреевна", "Михайлович", ""]
+CATEGORIES = ["Не распределён", "Работа", "Семья", "Друзья", "Знакомые",
+              "Клиенты", "Учеба", "Избранное"]
+
+
+def count_contacts(path):
+    """Число контактов в существующей базе (None, если базы нет или она повреждена)."""
+    if not os.path.exists(path):
+        return None
+    try:
+        with sqlite3.connect(path) as conn:
+            return conn.execute("SELECT COUNT(*) FROM contacts").fetchone()[0]
+    except sqlite3.Error:
+        return None
+
+
+def make_contact(rng, i):
+    """Один случайный контакт в порядке полей формы (CONTACT_FIELDS)."""
+    last = rng.choice(LAST_NAMES)
+    first = rng.choice(FIRST_NAMES)
+    if first.endswith("а") or first.endswith("я"):
+        last += "а"
+    return [
+        last, first, rng.choice(PATRONYMICS),
+        f"+7 (9{rng.randint(0, 99):02d}) {rng.randint(0, 999):03d}-"
+        f"{rng.randint(0, 99):02d}-{rng.randint(0, 99):02d}",
+        "",
+        f"user{i}@mail.ru",
+        f"г. Москва, ул. Ленина, д. {rng.randint(1, 200)}",
+        # Соцсети: три тройки (сеть, ник, ссылка)
+        *(("Telegram", f"@user{i}", f"https://t.me/user{i}") if i % 3 == 0 else ("", "", "")),
+        "", "", "", "", "", "",
+        "Заметка" if i % 7 == 0 else "",
+        rng.choice(CATEGORIES),
+        f"{rng.randint(1, 28):02d}.{rng.randint(1, 12):02d}.{rng.randint(1950, 2010)}",
+    ]
+
+
+def generate_database(path, count, seed=0):
+    """
+    Создает базу path ровно с count контактами.
+    Если база с таким числом контактов уже есть, она используется повторно.
+    """
+    if count_contacts(path) == count:
+        return path
+    if os.path.exists(path):
+        os.remove(path)
+
+    rng = random.Random(seed)
+    db = Database(path)
+    with db.transaction():
+        for i in range(count):
+            db.add_contact(make_contact(rng, i))
+    db.close()
+    return path
@@ -0,0 +1,155 @@
+"""
+Бенчмарк истории изменений: сколько места занимают версии контактов
+и не замедляет ли история основной запрос списка.
+
+На копии сгенерированной базы выполняется серия случайных правок
+(одно-два поля за раз, как в форме и контекстном меню), затем замеряются:
+- размер таблицы contact_history (байт на правку и доля от contacts),
+  цель — TARGET_BYTES_PER_EDIT;
+- время get_contacts до и после правок;
+- время восстановления версии (get_contact_version) и чтения всей истории.
+
+Запуск из корня проекта:
+    python -m benchmarks.history_benchmark --size 10000 --edits 20000
+"""
+
+import argparse
+import json
+import os
+import random
+import shutil
+import tempfile
+import time
+
+from app.database import Database, CONTACT_FIELDS
+from .datagen import generate_database, make_contact
+from .ui_benchmark import summarize
+
+# Цель по месту: сколько в среднем добавляет одна правка уже правленного
+# контакта (дельта + доля периодических снимков + страницы B-дерева).
+# Первая правка дороже — она сохраняет и исходную версию (first_edit_bytes)
+TARGET_BYTES_PER_EDIT = 100
+
+# Поля, которые правятся чаще всего
+EDITED_FIELDS = ("phone_primary", "email", "address", "notes", "category", "birth_date")
+
+
+def table_bytes(db, table):
+    """Место таблицы в файле (dbstat), без dbstat — оценка по длине данных."""
+    try:
+        db.cursor.execute("SELECT SUM(pgsize) FROM dbstat WHERE name = ?", (table,))
+        return db.cursor.fetchone()[0] or 0
+    except Exception:
+        db.cursor.execute(f"SELECT SUM(length(CAST({table} AS BLOB))) FROM {table}")
+        return db.cursor.fetchone()[0] or 0
+
+
+def timed_list_query(db, repeat):
+    """Замеры (мс) основного запроса списка контактов."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        db.get_contacts()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def run(size, edits, repeat, data_dir, seed=0):
+    source = generate_database(os.path.join(data_dir, f"contacts_{size}.db"), size)
+    path = os.path.join(data_dir, f"history_{size}.db")
+    shutil.copyfile(source, path)
+
+    rng = random.Random(seed)
+    db = Database(path)
+    ids = [row[0] for row in db.cursor.execute("SELECT id FROM contacts").fetchall()]
+    list_before = timed_list_query(db, repeat)
+
+    def edit(contact_id, i):
+        row = db.get_contact_by_id(contact_id)
+        fields = dict(zip(CONTACT_FIELDS, row[1:18] + row[20:22]))
+        sample = dict(zip(CONTACT_FIELDS, make_contact(rng, i)))
+        for name in rng.sample(EDITED_FIELDS, rng.randint(1, 2)):
+            fields[name] = sample[name]
+        db.update_contact(contact_id, [fields[name] for name in CONTACT_FIELDS])
+
+    # Первая правка контакта сохраняет и исходную версию — считаем ее отдельно
+    first = ids[:min(len(ids), edits)]
+    with db.transaction():
+        for i, contact_id in enumerate(first):
+            edit(contact_id, i)
+    first_bytes = table_bytes(db, "contact_history")
+
+    start = time.perf_counter()
+    with db.transaction():
+        for i in range(edits):
+            edit(rng.choice(first), i)
+    edit_ms = (time.perf_counter() - start) * 1000
+
+    list_after = timed_list_query(db, repeat)
+
+    db.cursor.execute("SELECT COUNT(*), COUNT(DISTINCT contact_id) FROM contact_history")
+    versions, edited_contacts = db.cursor.fetchone()
+    history_bytes = table_bytes(db, "contact_history")
+    contacts_bytes = table_bytes(db, "contacts")
+
+    # Восстановление версий и чтение истории у самых часто правленных контактов
+    db.cursor.execute("""
+        SELECT contact_id, MAX(version) FROM contact_history
+        GROUP BY contact_id ORDER BY MAX(version) DESC LIMIT 20""")
+    busiest = db.cursor.fetchall()
+    version_samples, history_samples = [], []
+    for contact_id, last in busiest:
+        for _ in range(repeat):
+            version = rng.randint(1, last)
+            start = time.perf_counter()
+            db.get_contact_version(contact_id, version)
+            version_samples.append((time.perf_counter() - start) * 1000)
+        start = time.perf_counter()
+        db.get_contact_history(contact_id)
+        history_samples.append((time.perf_counter() - start) * 1000)
+
+    db.close()
+    os.remove(path)
+
+    bytes_per_edit = (history_bytes - first_bytes) / edits if edits else 0
+    return {
+        "contacts": size,
+        "edits": edits,
+        "versions": versions,
+        "edited_contacts": edited_contacts,
+        "edit_total_ms": round(edit_ms, 1),
+        "history_bytes": history_bytes,
+        "contacts_bytes": contacts_bytes,
+        "history_vs_contacts": round(history_bytes / contacts_bytes, 3) if contacts_bytes else 0,
+        "first_edit_bytes": round(first_bytes / len(first), 1) if first else 0,
+        "bytes_per_edit": round(bytes_per_edit, 1),
+        "target_bytes_per_edit": TARGET_BYTES_PER_EDIT,
+        "within_target": bytes_per_edit <= TARGET_BYTES_PER_EDIT,
+        "list_query_before": summarize(list_before),
+        "list_query_after": summarize(list_after),
+        "get_contact_version": summarize(version_samples),
+        "get_contact_history": summarize(history_samples),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Бенчмарк истории изменений АДРЕСНИКА")
+    parser.add_argument("--size", type=int, default=10000, help="контактов в базе")
+    parser.add_argument("--edits", type=int, default=20000,
+                        help="число правок (после первой правки каждого контакта)")
+    parser.add_argument("--repeat", type=int, default=5, help="повторов каждого замера")
+    parser.add_argument("--data-dir", default=os.path.join(tempfile.gettempdir(), "adresnik_bench"),
+                        help="папка для сгенерированных баз (переиспользуются)")
+    parser.add_argument("--output", default="history_bench.json", help="файл JSON-отчета")
+    args = parser.parse_args(argv)
+
+    os.makedirs(args.data_dir, exist_ok=True)
+    report = run(args.size, args.edits, args.repeat, args.data_dir)
+    with open(args.output, "w", encoding="utf-8") as file:
+        json.dump(report, file, ensure_ascii=False, indent=2)
+    print(f"{report['bytes_per_edit']} байт на правку "
+          f"(цель {TARGET_BYTES_PER_EDIT}), отчет: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Бенчмарк реплики в памяти (Database(in_memory=True)) против обычного режима:
+время открытия базы, прирост памяти процесса и задержки чтений
+(поиск, фильтр по категории, карточка контакта).
+
+Каждый режим замеряется в отдельном процессе, чтобы кэш страниц
+и память одного режима не влияли на другой.
+
+Запуск из корня проекта (база на 1M контактов генерируется один раз):
+    python -m benchmarks.replica_benchmark --size 1000000 --output replica_bench.json
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+
+from app.database import Database
+from .datagen import generate_database
+from .ui_benchmark import summarize
+
+# Запросы, которыми пользуется ресепшн: фамилия, часть телефона, перепутанная раскладка
+SEARCH_QUERIES = ("Иванов", "Петрова", "915", "bdfy", "mail.ru", "Сергеевич")
+
+
+def rss_bytes():
+    """Текущая резидентная память процесса (None, если узнать нельзя)."""
+    try:
+        with open("/proc/self/statm") as file:
+            return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+        # Пиковое значение: на macOS — в байтах, на Linux — в КБ
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+    except ImportError:
+        return None
+
+
+def timed(action, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        action()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def measure(db_path, in_memory, repeat, seed=0):
+    """Замеры одного режима (выполняется в отдельном процессе)."""
+    rss_before = rss_bytes()
+    start = time.perf_counter()
+    db = Database(db_path, in_memory=in_memory)
+    open_ms = (time.perf_counter() - start) * 1000
+    rss_after = rss_bytes()
+
+    rng = random.Random(seed)
+    ids = [row[0] for row in db.cursor.execute("SELECT id FROM contacts").fetchall()]
+    results = {
+        "open_ms": round(open_ms, 1),
+        "rss_delta_bytes": (rss_after - rss_before) if rss_before is not None and rss_after is not None else None,
+        "search": summarize([ms for query in SEARCH_QUERIES
+                             for ms in timed(lambda: db.get_contacts(query), repeat)]),
+        "category_filter": summarize(timed(lambda: db.get_contacts("", "Работа"), repeat)),
+        "get_contact_by_id": summarize(timed(lambda: db.get_contact_by_id(rng.choice(ids)), repeat * 100)),
+        "fuzzy_search": summarize(timed(lambda: db.fuzzy_search("Иваноф"), repeat)),
+    }
+    db.close()
+    return results
+
+
+def _child(db_path, in_memory, repeat, queue):
+    queue.put(measure(db_path, in_memory, repeat))
+
+
+def measure_in_process(db_path, in_memory, repeat):
+    queue = multiprocessing.Queue()
+    proc = multiprocessing.Process(target=_child, args=(db_path, in_memory, repeat, queue))
+    proc.start()
+    result = queue.get()
+    proc.join()
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Бенчмарк реплики в памяти АДРЕСНИКА")
+    parser.add_argument("--size", type=int, default=1000000, help="контактов в базе")
+    parser.add_argument("--repeat", type=int, default=5, help="повторов каждого замера")
+    parser.add_argument("--data-dir", default=os.path.join(tempfile.gettempdir(), "adresnik_bench"),
+                        help="папка для сгенерированных баз (переиспользуются)")
+    parser.add_argument("--output", default="replica_bench.json", help="файл JSON-отчета")
+    args = parser.parse_args(argv)
+
+    os.makedirs(args.data_dir, exist_ok=True)
+    print(f"База на {args.size} контактов...", flush=True)
+    db_path = generate_database(
+        os.path.join(args.data_dir, f"contacts_{args.size}.db"), args.size)
+
+    report = {"contacts": args.size, "file_bytes": os.path.getsize(db_path)}
+    for name, in_memory in (("disk", False), ("memory", True)):
+        print(f"Режим {name}...", flush=True)
+        report[name] = measure_in_process(db_path, in_memory, args.repeat)
+
+    with open(args.output, "w", encoding="utf-8") as file:
+        json.dump(report, file, ensure_ascii=False, indent=2)
+    print(f"Отчет: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
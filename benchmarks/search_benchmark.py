@@ -0,0 +1,80 @@
+"""
+Бенчмарк индекса подстрочного поиска в памяти (Database.enable_search_index)
+против обычного запроса с py_lower на каждую строку.
+
+Замеряются: время построения индекса и прирост памяти процесса,
+время самого поиска по индексу (цель — TARGET_SEARCH_MS на 1M контактов)
+и полное время get_contacts (поиск + чтение и сортировка строк) в обоих режимах.
+
+Запуск из корня проекта (база на 1M контактов генерируется один раз):
+    python -m benchmarks.search_benchmark --size 1000000 --output search_bench.json
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from app.database import Database
+from .datagen import generate_database
+from .replica_benchmark import SEARCH_QUERIES, rss_bytes, timed
+from .ui_benchmark import summarize
+
+# Цель для поиска по индексу (без чтения строк из SQLite)
+TARGET_SEARCH_MS = 10
+
+
+def run(db_path, repeat):
+    db = Database(db_path)
+    report = {"sql": {}, "index": {}, "index_search": {}}
+    for query in SEARCH_QUERIES:
+        report["sql"][query] = summarize(timed(lambda: db.get_contacts(query, search_mode="exact"), repeat))
+
+    rss_before = rss_bytes()
+    start = time.perf_counter()
+    index = db.enable_search_index()
+    if index is None:
+        raise SystemExit("Нужен numpy: pip install numpy")
+    report["build_ms"] = round((time.perf_counter() - start) * 1000, 1)
+    rss_after = rss_bytes()
+    report["rss_delta_bytes"] = (rss_after - rss_before) if rss_before is not None and rss_after is not None else None
+
+    for query in SEARCH_QUERIES:
+        hits = index.search(query)
+        report["index_search"][query] = dict(
+            summarize(timed(lambda: index.search(query), repeat)),
+            ids=len(hits.ids), negated=hits.negated)
+        report["index"][query] = summarize(timed(lambda: db.get_contacts(query, search_mode="exact"), repeat))
+    db.close()
+
+    worst = max(stats["p95_ms"] for stats in report["index_search"].values())
+    report["worst_search_p95_ms"] = worst
+    report["target_search_ms"] = TARGET_SEARCH_MS
+    report["within_target"] = worst <= TARGET_SEARCH_MS
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Бенчмарк индекса поиска АДРЕСНИКА")
+    parser.add_argument("--size", type=int, default=1000000, help="контактов в базе")
+    parser.add_argument("--repeat", type=int, default=5, help="повторов каждого замера")
+    parser.add_argument("--data-dir", default=os.path.join(tempfile.gettempdir(), "adresnik_bench"),
+                        help="папка для сгенерированных баз (переиспользуются)")
+    parser.add_argument("--output", default="search_bench.json", help="файл JSON-отчета")
+    args = parser.parse_args(argv)
+
+    os.makedirs(args.data_dir, exist_ok=True)
+    print(f"База на {args.size} контактов...", flush=True)
+    db_path = generate_database(
+        os.path.join(args.data_dir, f"contacts_{args.size}.db"), args.size)
+
+    report = dict(contacts=args.size, **run(db_path, args.repeat))
+    with open(args.output, "w", encoding="utf-8") as file:
+        json.dump(report, file, ensure_ascii=False, indent=2)
+    print(f"Поиск по индексу: p95 до {report['worst_search_p95_ms']} мс "
+          f"(цель {TARGET_SEARCH_MS}), отчет: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,282 @@
+"""
+Сквозной бенчмарк интерфейса: задержка от нажатия клавиши до отрисовки,
+полная загрузка таблицы, "Выбрать всё", открытие окон формы и просмотра.
+
+ContactApp запускается на сгенерированной базе (по умолчанию 1k, 10k и 100k
+контактов) и управляется синтетическими событиями через настоящие виджеты.
+Без дисплея (CI) поднимается виртуальный X-сервер Xvfb.
+
+Запуск из корня проекта:
+    python -m benchmarks.ui_benchmark --sizes 1000,10000 --output ui_bench.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tkinter as tk
+from datetime import datetime
+
+from app.database import Database
+from app.ui.main_window import ContactApp
+from .datagen import generate_database
+
+# Запрос вводится по буквам в английской раскладке: "bdfy" = "иван"
+# (умный поиск понимает перепутанную раскладку)
+SEARCH_QUERY = "bdfy"
+
+
+def percentile(samples, p):
+    """Перцентиль по ближайшему рангу (samples отсортирован)."""
+    if not samples:
+        return 0.0
+    rank = max(1, -(-len(samples) * p // 100))  # ceil без math
+    return samples[int(rank) - 1]
+
+
+def summarize(samples):
+    """Сводка замеров (мс) для JSON-отчета."""
+    ordered = sorted(samples)
+    return {
+        "count": len(ordered),
+        "mean_ms": round(sum(ordered) / len(ordered), 3) if ordered else 0.0,
+        "p50_ms": round(percentile(ordered, 50), 3),
+        "p90_ms": round(percentile(ordered, 90), 3),
+        "p95_ms": round(percentile(ordered, 95), 3),
+        "p99_ms": round(percentile(ordered, 99), 3),
+        "max_ms": round(ordered[-1], 3) if ordered else 0.0,
+    }
+
+
+# --- Виртуальный дисплей ---
+
+def start_virtual_display(display=99):
+    """
+    Запускает Xvfb, если дисплея нет (Linux без X, CI).
+    Возвращает процесс Xvfb или None, если дисплей уже есть.
+    """
+    if os.environ.get("DISPLAY") or sys.platform in ("win32", "darwin"):
+        return None
+    if shutil.which("Xvfb") is None:
+        raise RuntimeError("Нет дисплея и не найден Xvfb (пакет xvfb)")
+    proc = subprocess.Popen(
+        ["Xvfb", f":{display}", "-screen", "0", "1600x1000x24", "-nolisten", "tcp"],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    socket_path = f"/tmp/.X11-unix/X{display}"
+    deadline = time.monotonic() + 10
+    while not os.path.exists(socket_path):
+        if proc.poll() is not None or time.monotonic() > deadline:
+            proc.kill()
+            raise RuntimeError(f"Не удалось запустить Xvfb на :{display}")
+        time.sleep(0.05)
+    os.environ["DISPLAY"] = f":{display}"
+    return proc
+
+
+# --- Управление приложением ---
+
+class AppDriver:
+    """Синтетические события для виджетов ContactApp и замер времени до отрисовки."""
+
+    def __init__(self, root, app):
+        self.root = root
+        self.app = app
+
+    def settle(self):
+        """Обрабатывает накопившиеся события (отложенная отрисовка, таймеры)."""
+        self.root.update()
+
+    def drain(self):
+        """Ждет, пока планировщик доделает порционные задачи (таблица, отметки)."""
+        while self.app.scheduler.busy():
+            self.root.update()
+        # Перерасчет геометрии и перерисовка идут в idle-обработчиках Tk
+        self.root.update_idletasks()
+
+    def timed(self, action):
+        """Время (мс) от синтетического события до полной отрисовки результата."""
+        start = time.perf_counter()
+        action()
+        self.drain()
+        return (time.perf_counter() - start) * 1000
+
+    def press_key(self, widget, keysym, char=None):
+        """Нажатие и отпускание клавиши; обработчик поиска висит на <KeyRelease>."""
+        before = widget.get()
+        widget.event_generate("<KeyPress>", keysym=keysym)
+        # Без фокуса ввода (бывает под Xvfb без оконного менеджера)
+        # символ не попадет в поле — вставляем его, как это сделал бы Tk
+        if widget.get() == before:
+            if char is not None:
+                widget.insert(tk.END, char)
+            elif keysym == "BackSpace" and before:
+                widget.delete(len(before) - 1, tk.END)
+        widget.event_generate("<KeyRelease>", keysym=keysym)
+
+    def select_combo(self, combo, index):
+        combo.current(index)
+        combo.event_generate("<<ComboboxSelected>>")
+
+    def row_point(self, item_id):
+        """Координаты середины ячейки ФИО строки таблицы."""
+        tree = self.app.tree
+        tree.see(item_id)
+        tree.update_idletasks()
+        x, y, w, h = tree.bbox(item_id, column="fio")
+        return x + w // 2, y + h // 2
+
+    def click_row(self, item_id, double=False):
+        x, y = self.row_point(item_id)
+        self.app.tree.event_generate("<Button-1>", x=x, y=y)
+        if double:
+            self.app.tree.event_generate("<Double-Button-1>", x=x, y=y)
+
+    def menu_invoke(self, cascade_label, item_label):
+        """Выбор пункта главного меню (как мышью)."""
+        menubar = self.root.nametowidget(self.root["menu"])
+        for i in range(menubar.index(tk.END) + 1):
+            if menubar.type(i) == "cascade" and menubar.entrycget(i, "label") == cascade_label:
+                submenu = self.root.nametowidget(menubar.entrycget(i, "menu"))
+                submenu.invoke(item_label)
+                return
+        raise LookupError(f"Нет пункта меню {cascade_label} -> {item_label}")
+
+    def shown_toplevels(self):
+        return {w for w in self.root.winfo_children()
+                if isinstance(w, tk.Toplevel) and w.state() != "withdrawn"}
+
+    def timed_window(self, action):
+        """
+        Время открытия окна: от команды до первой отрисовки; окно затем закрывается.
+        Окно может быть новым или показанным из пула (Вид -> Держать окна в памяти).
+        """
+        before = self.shown_toplevels()
+        start = time.perf_counter()
+        action()
+        windows = self.shown_toplevels() - before
+        if not windows:
+            raise RuntimeError("Окно не открылось")
+        window = windows.pop()
+        if not window.winfo_viewable():
+            window.wait_visibility()
+        window.update_idletasks()
+        elapsed = (time.perf_counter() - start) * 1000
+        window.close()
+        self.settle()
+        return elapsed
+
+
+def bench_size(db_path, repeat):
+    """Все сценарии на базе одного размера; возвращает {сценарий: сводка}."""
+    results = {}
+    samples = {name: [] for name in (
+        "startup", "keystroke", "load_contacts", "category_filter",
+        "row_click", "select_all", "deselect_all", "open_add_form",
+        "open_edit_form", "open_view")}
+
+    root = tk.Tk()
+    db = Database(db_path)
+    start = time.perf_counter()
+    app = ContactApp(root, db)
+    driver = AppDriver(root, app)
+    driver.drain()
+    samples["startup"].append((time.perf_counter() - start) * 1000)
+
+    root.deiconify()
+    driver.settle()
+    app.entry_search.focus_force()
+    driver.settle()
+
+    for _ in range(repeat):
+        # Набор запроса по буквам и очистка: каждое нажатие = один замер
+        for ch in SEARCH_QUERY:
+            samples["keystroke"].append(driver.timed(
+                lambda: driver.press_key(app.entry_search, ch, ch)))
+        for _ in SEARCH_QUERY:
+            samples["keystroke"].append(driver.timed(
+                lambda: driver.press_key(app.entry_search, "BackSpace")))
+        driver.settle()
+
+        # Полная перезагрузка таблицы: смена сортировки туда и обратно
+        for index in (1, 0):
+            samples["load_contacts"].append(driver.timed(
+                lambda: driver.select_combo(app.combo_sort, index)))
+        for index in (2, 0):
+            samples["category_filter"].append(driver.timed(
+                lambda: driver.select_combo(app.combo_category, index)))
+        driver.settle()
+
+        rows = app.tree.get_children()
+        if not rows:
+            continue
+        item_id = rows[min(len(rows) - 1, 5)]
+
+        samples["row_click"].append(driver.timed(lambda: driver.click_row(item_id)))
+        samples["open_edit_form"].append(driver.timed_window(
+            lambda: app.btn_edit.invoke()))
+        samples["open_view"].append(driver.timed_window(
+            lambda: driver.click_row(item_id, double=True)))
+        samples["open_add_form"].append(driver.timed_window(
+            lambda: app.btn_add.invoke()))
+
+        samples["select_all"].append(driver.timed(
+            lambda: driver.menu_invoke("Правка", "Выбрать всё")))
+        samples["deselect_all"].append(driver.timed(
+            lambda: driver.menu_invoke("Правка", "Снять выделение")))
+        driver.settle()
+
+    results["rows_loaded"] = len(app.tree.get_children())
+    for name, values in samples.items():
+        results[name] = summarize(values)
+
+    root.destroy()
+    db.close()
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Бенчмарк интерфейса АДРЕСНИКА")
+    parser.add_argument("--sizes", default="1000,10000,100000",
+                        help="размеры баз через запятую (по умолчанию 1000,10000,100000)")
+    parser.add_argument("--repeat", type=int, default=5,
+                        help="повторов каждого сценария")
+    parser.add_argument("--data-dir", default=os.path.join(tempfile.gettempdir(), "adresnik_bench"),
+                        help="папка для сгенерированных баз (переиспользуются)")
+    parser.add_argument("--output", default="ui_bench.json", help="файл JSON-отчета")
+    args = parser.parse_args(argv)
+
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    os.makedirs(args.data_dir, exist_ok=True)
+
+    xvfb = start_virtual_display()
+    try:
+        report = {
+            "generated_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "tk": str(tk.TkVersion),
+            "repeat": args.repeat,
+            "sizes": {},
+        }
+        for size in sizes:
+            db_path = generate_database(
+                os.path.join(args.data_dir, f"contacts_{size}.db"), size)
+            print(f"{size} контактов...", flush=True)
+            report["sizes"][str(size)] = bench_size(db_path, args.repeat)
+    finally:
+        if xvfb is not None:
+            xvfb.terminate()
+            xvfb.wait()
+
+    with open(args.output, "w", encoding="utf-8") as file:
+        json.dump(report, file, ensure_ascii=False, indent=2)
+    print(f"Отчет: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
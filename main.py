@@ -1,5 +1,14 @@
+# Модуль os нужен для чтения переменных окружения (режим БД, диагностика)
+import os
+# Процессы разбора при импорте больших файлов (нужно и для сборки PyInstaller)
+import multiprocessing
+
+# Ошибки открытия базы (sqlite3.Error)
+import sqlite3
+
 # Импортируем библиотеку Tkinter для создания графического интерфейса (GUI)
 import tkinter as tk
+from tkinter import messagebox
 
 # Импортируем класс Database из нашего модуля, отвечающего за работу с данными
 from app.database import Database
@@ -18,21 +27,51 @@ def main():
 
     # 2. Инициализация базы данных.
     # Создается объект db, который проверяет наличие файла contacts.db
-    # и создает таблицы, если их нет.
-    db = Database()
+    # и создает таблицы или обновляет схему старого файла (шаги миграции).
+    # CONTACTS_IN_MEMORY=1 — база копируется в память, поиск и чтения идут из RAM
+    try:
+        db = Database(in_memory=bool(os.environ.get("CONTACTS_IN_MEMORY")))
+    except sqlite3.Error as e:
+        # Схема не обновилась (файл занят, поврежден, нет места):
+        # со старой схемой окно работать не сможет — сообщаем и выходим
+        root.withdraw()
+        messagebox.showerror("Ошибка базы данных", f"Не удалось открыть базу данных:\n{e}")
+        root.destroy()
+        return
+    # CONTACTS_SEARCH_INDEX=1 — поиск подстрок по индексу в памяти (нужен numpy)
+    if os.environ.get("CONTACTS_SEARCH_INDEX"):
+        db.enable_search_index()
 
     # 3. Запуск основного приложения.
     # Мы передаем root (где рисовать) и db (откуда брать данные) в наш класс ContactApp.
     # ContactApp построит весь интерфейс внутри окна root.
     app = ContactApp(root, db)
 
+    # Групповой commit: серия быстрых правок делит один сброс на диск.
+    # Таймер берем у Tkinter (root.after), чтобы commit выполнялся в том же потоке.
+    db.enable_group_commit(200, root.after)
+
+    # Профилирование запросов с самого старта (отчет: Сервис -> Диагностика): CONTACTS_PROFILING=1
+    if os.environ.get("CONTACTS_PROFILING"):
+        app.profiling_var.set(True)
+        app.toggle_profiling()
+
+    # Мониторинг зависаний UI с самого старта: CONTACTS_UI_WATCHDOG=1
+    if os.environ.get("CONTACTS_UI_WATCHDOG"):
+        app.watchdog_var.set(True)
+        app.toggle_watchdog()
+
     # 4. Запуск главного цикла событий (Event Loop).
     # Программа "зависает" в этом методе, ожидая кликов мыши и нажатий клавиш,
     # пока пользователь не закроет окно.
     root.mainloop()
 
+    # 5. После закрытия окна фиксируем отложенные изменения и закрываем БД.
+    db.close()
+
 
 # Стандартная проверка Python:
 # Если этот файл запущен напрямую (не импортирован как модуль), то запускаем main().
 if __name__ == "__main__":
+    multiprocessing.freeze_support()
     main()
@@ -0,0 +1,38 @@
+import os
+import sys
+
+import pytest
+
+# Тесты запускаются из корня проекта: пакет app — рядом с папкой tests
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import Database, CONTACT_FIELDS  # noqa: E402
+
+
+def contact_row(last_name, first_name, **fields):
+    """Данные контакта в порядке CONTACT_FIELDS (как их передает UI)."""
+    data = dict.fromkeys(CONTACT_FIELDS, "")
+    data.update(last_name=last_name, first_name=first_name, category="Не распределён")
+    data.update(fields)
+    return [data[name] for name in CONTACT_FIELDS]
+
+
+def run_task(task):
+    """Выполняет задачу планировщика (генератор) до конца, возвращает ее результат."""
+    while True:
+        try:
+            next(task)
+        except StopIteration as stop:
+            return stop.value
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "contacts.db")
+
+
+@pytest.fixture
+def db(db_path):
+    database = Database(db_path)
+    yield database
+    database.close()
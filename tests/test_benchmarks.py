@@ -0,0 +1,51 @@
+import os
+import sqlite3
+import sys
+
+import pytest
+
+from benchmarks import ui_benchmark
+from benchmarks.datagen import generate_database, count_contacts
+from benchmarks.ui_benchmark import percentile, summarize, start_virtual_display
+
+
+def test_nearest_rank_percentile():
+    samples = list(range(1, 101))
+    assert [percentile(samples, p) for p in (50, 90, 99, 100)] == [50, 90, 99, 100]
+    assert percentile([7.5], 99) == 7.5
+    assert percentile([], 50) == 0.0
+
+
+def test_summary_of_samples():
+    summary = summarize([3.0, 1.0, 2.0, 10.0])
+    assert summary == {"count": 4, "mean_ms": 4.0, "p50_ms": 2.0, "p90_ms": 10.0,
+                       "p95_ms": 10.0, "p99_ms": 10.0, "max_ms": 10.0}
+    assert summarize([])["count"] == 0
+
+
+def test_existing_display_is_used(monkeypatch):
+    monkeypatch.setenv("DISPLAY", ":0")
+    assert start_virtual_display() is None
+
+
+@pytest.mark.skipif(sys.platform in ("win32", "darwin"), reason="Xvfb нужен только без X-сервера")
+def test_missing_xvfb_is_reported(monkeypatch):
+    monkeypatch.delenv("DISPLAY", raising=False)
+    monkeypatch.setattr(ui_benchmark.shutil, "which", lambda name: None)
+    with pytest.raises(RuntimeError, match="Xvfb"):
+        start_virtual_display()
+
+
+def test_generated_database_is_reused(tmp_path):
+    path = str(tmp_path / "bench.db")
+    assert count_contacts(path) is None
+    generate_database(path, 30)
+    assert count_contacts(path) == 30
+    modified = os.path.getmtime(path)
+    generate_database(path, 30)  # Та же база — не пересоздается
+    assert os.path.getmtime(path) == modified
+    generate_database(path, 10)
+    with sqlite3.connect(path) as connection:
+        # Служебные ключи заполнены так же, как в приложении
+        assert connection.execute(
+            "SELECT COUNT(*) FROM contacts WHERE name_sort_key IS NOT NULL AND added_ts IS NOT NULL").fetchone() == (10,)
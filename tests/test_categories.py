@@ -0,0 +1,74 @@
+import pytest
+
+from conftest import contact_row
+from app.database import DEFAULT_CATEGORY_ID
+
+
+@pytest.fixture
+def db(db):
+    for last_name, category in (("Иванов", "Работа"), ("Петров", "Работа"), ("Сидоров", "Семья")):
+        db.add_contact(contact_row(last_name, "Имя", category=category))
+    return db
+
+
+def category_id(db, name):
+    return next(i for i, category, _ in db.get_categories() if category == name)
+
+
+def names(db, category):
+    return sorted(row[1] for row in db.get_contacts(category_filter=category))
+
+
+def test_counters_follow_writes(db):
+    counts = {name: count for _, name, count in db.get_categories()}
+    assert (counts["Работа"], counts["Семья"]) == (2, 1)
+    ids = {row[1]: row[0] for row in db.get_contacts()}
+    db.update_single_field(ids["Иванов"], "category", "Семья")
+    db.delete_contacts([ids["Петров"]])
+    total, by_category = db.get_statistics()
+    assert total == 2 and dict(by_category) == {"Семья": 2}
+
+
+def test_unknown_category_is_added_to_the_list(db):
+    db.add_contact(contact_row("Кузнецов", "Олег", category="Клиенты VIP"))
+    assert db.get_category_names()[-1] == "Клиенты VIP"
+    assert names(db, "клиенты vip") == ["Кузнецов"]  # Без учета регистра
+
+
+def test_add_category(db):
+    assert db.add_category("  Соседи ") == (True, "Категория добавлена")
+    assert db.add_category("соседи")[0] is False
+    assert db.add_category("")[0] is False
+    assert "Соседи" in db.get_category_names()
+
+
+def test_rename_is_one_row_and_keeps_contacts(db):
+    assert db.rename_category(category_id(db, "Работа"), "Офис") == (True, "Категория переименована")
+    assert names(db, "Офис") == ["Иванов", "Петров"] and names(db, "Работа") == []
+    assert db.get_contacts("Иванов")[0][20] == "Офис"
+    ok, message = db.rename_category(category_id(db, "Офис"), "семья")
+    assert not ok and "уже есть" in message
+
+
+def test_delete_moves_contacts_to_default(db):
+    events = []
+    db.add_listener(events.append)
+    assert db.delete_category(category_id(db, "Работа")) == (True, "Категория удалена")
+    assert "Работа" not in db.get_category_names()
+    assert [row[20] for row in db.get_contacts("Иванов")] == ["Не распределён"]
+    assert [(e.table, e.action) for e in events] == [("contacts", "update"), ("categories", "delete")]
+    assert db.delete_category(DEFAULT_CATEGORY_ID)[0] is False
+
+
+def test_new_category_event_follows_the_contact_write(db):
+    seen = []
+
+    def listener(event):
+        if event.table == "categories":
+            db.cursor.execute("SELECT COUNT(*) FROM contacts")
+            seen.append((event.action, db.cursor.fetchone()[0]))
+
+    db.add_listener(listener)
+    db.add_contact(contact_row("Кузнецов", "Олег", category="Партнеры"))
+    # Подписчики узнают о категории, когда контакт уже записан
+    assert seen == [("insert", 4)]
@@ -0,0 +1,92 @@
+import pytest
+
+from conftest import contact_row
+from app.database import Database
+
+
+@pytest.fixture
+def other(db, db_path):
+    # Второе окно (или скрипт) с тем же файлом
+    database = Database(db_path)
+    yield database
+    database.close()
+
+
+def listen(db):
+    events = []
+    db.add_listener(events.append)
+    return events
+
+
+def test_nothing_changed_costs_nothing(db):
+    assert db.poll_changes() == 0
+
+
+def test_changes_of_other_connection_are_delivered(db, other):
+    events = listen(db)
+    other.add_contact(contact_row("Иванов", "Иван"))
+    contact_id = other.get_contacts()[0][0]
+    assert db.poll_changes() == 1
+    assert events == [("contacts", "insert", [contact_id], None, True)]
+
+    events.clear()
+    other.update_single_field(contact_id, "email", "ivan@test.ru")
+    other.update_single_field(contact_id, "phone_primary", "+7 900 000-00-00")
+    assert db.poll_changes() == 1
+    # Две правки одной строки — одно событие с объединенными колонками
+    (event,) = events
+    assert (event.action, event.ids, event.fields, event.external) == \
+        ("update", [contact_id], {"email", "phone_primary"}, True)
+
+
+def test_own_changes_are_not_sent_again(db, other):
+    db.add_contact(contact_row("Иванов", "Иван"))
+    events = listen(db)
+    assert db.poll_changes() == 0 and events == []
+    # Но другое соединение их видит
+    other_events = listen(other)
+    assert other.poll_changes() == 1 and other_events[0].table == "contacts"
+
+
+def test_events_are_ordered_insert_update_delete(db, other):
+    other.add_contact(contact_row("Иванов", "Иван"))
+    other.add_contact(contact_row("Петров", "Петр"))
+    ids = {row[1]: row[0] for row in other.get_contacts()}
+    db.poll_changes()
+    events = listen(db)
+    other.delete_contacts([ids["Петров"]])
+    other.update_single_field(ids["Иванов"], "email", "ivan@test.ru")
+    other.add_contact(contact_row("Сидоров", "Сидор"))
+    db.poll_changes()
+    assert [(e.table, e.action) for e in events] == \
+        [("contacts", "insert"), ("contacts", "update"), ("contacts", "delete")]
+
+
+def test_tag_changes_arrive_as_contact_update(db, other):
+    other.add_contact(contact_row("Иванов", "Иван"))
+    contact_id = other.get_contacts()[0][0]
+    db.poll_changes()
+    events = listen(db)
+    other.set_contact_tags(contact_id, ["друзья"])
+    db.poll_changes()
+    updates = [e for e in events if e.table == "contacts"]
+    assert [(e.action, e.ids, e.fields) for e in updates] == [("update", [contact_id], {"tags"})]
+
+
+def test_poll_waits_for_open_transaction(db, other):
+    other.add_contact(contact_row("Иванов", "Иван"))
+    with db.transaction():
+        # Внутри транзакции виден старый снимок — опрос откладывается
+        assert db.poll_changes() == 0
+    assert db.poll_changes() == 1
+
+
+def test_missed_changes_reload_everything(db, other):
+    events = listen(db)
+    other.add_contact(contact_row("Иванов", "Иван"))
+    # Журнал сжат раньше, чем первое окно его прочло
+    other.cursor.execute("DELETE FROM change_log")
+    other.connection.commit()
+    db.poll_changes()
+    assert {e.table for e in events} >= {"contacts", "tags", "categories"}
+    assert all(e.ids is None and e.external for e in events)
@@ -0,0 +1,53 @@
+from conftest import contact_row
+
+
+def add_contact(db, last_name, first_name):
+    db.add_contact(contact_row(last_name, first_name))
+    return next(row[0] for row in db.get_contacts() if row[1] == last_name)
+
+
+def test_incremental_reading(db):
+    cursor = db.get_change_cursor()
+    assert cursor == 0 and db.get_changes(cursor) == []
+    ivan = add_contact(db, "Иванов", "Иван")
+    petr = add_contact(db, "Петров", "Петр")
+    db.update_single_field(ivan, "email", "ivan@test.ru")
+
+    first = db.get_changes(cursor, limit=2, tables=["contacts"])
+    assert [(r.action, r.row_id) for r in first] == [("insert", ivan), ("insert", petr)]
+    rest = db.get_changes(first[-1].seq, tables=["contacts"])
+    assert [(r.action, r.row_id, r.columns) for r in rest] == [("update", ivan, frozenset({"email"}))]
+    assert db.get_changes(rest[-1].seq) == []
+    assert db.get_change_cursor() == rest[-1].seq
+
+
+def test_update_without_changes_is_not_logged(db):
+    ivan = add_contact(db, "Иванов", "Иван")
+    cursor = db.get_change_cursor()
+    db.update_single_field(ivan, "last_name", "Иванов")
+    assert db.get_changes(cursor) == []
+
+
+def test_compaction_merges_updates_of_one_row(db):
+    ivan = add_contact(db, "Иванов", "Иван")
+    for field, value in (("email", "a@test.ru"), ("phone_primary", "1"), ("email", "b@test.ru")):
+        db.update_single_field(ivan, field, value)
+    cursor = db.get_changes(0)[0].seq  # Читатель уже видел вставку
+    assert db.compact_change_log() == 2
+    (update,) = db.get_changes(cursor)
+    assert (update.action, update.columns) == ("update", frozenset({"email", "phone_primary"}))
+
+
+def test_reader_behind_compaction_gets_none(db):
+    add_contact(db, "Иванов", "Иван")
+    cursor = db.get_change_cursor()
+    add_contact(db, "Петров", "Петр")
+    db.cursor.execute("UPDATE change_log SET changed_at = datetime('now', 'localtime', '-40 days')")
+    assert db.compact_change_log(keep_days=30) == 2
+    # Журнал пуст, но отставшие читатели узнают, что пропустили записи
+    assert db.get_changes(0) is None and db.get_changes(cursor - 1) is None
+    # Новая позиция — конец журнала; с нее чтение снова работает
+    cursor = db.get_change_cursor()
+    assert db.get_changes(cursor) == []
+    add_contact(db, "Сидоров", "Сидор")
+    assert [r.action for r in db.get_changes(cursor)] == ["insert"]
@@ -0,0 +1,83 @@
+from datetime import datetime
+
+import pytest
+
+from app.database import ChangeEvent
+from app.ui.components import dashboard
+from app.ui.components.dashboard import DashboardFrame
+
+
+class Label:
+    def __init__(self):
+        self.text = None
+
+    def config(self, text, **options):
+        self.text = text
+
+
+@pytest.fixture
+def panel():
+    """Панель без окна Tk: таймеры и надпись записываются тестом."""
+    frame = DashboardFrame.__new__(DashboardFrame)
+    frame.refresh_scheduled = False
+    frame.idle, frame.timers = [], []
+    frame.after_idle = frame.idle.append
+    frame.after = lambda ms, callback: frame.timers.append((ms, callback))
+    frame.lbl_birthdays = Label()
+    frame.refreshes = 0
+
+    class Db:
+        def get_upcoming_birthdays(self):
+            frame.refreshes += 1
+            return []
+
+    frame.db = Db()
+    return frame
+
+
+@pytest.mark.parametrize("event", [
+    ChangeEvent("saved_notes", "insert", [1], None),
+    ChangeEvent("contacts", "update", [1], {"phone_primary", "notes"}),
+    ChangeEvent("tags", "delete", [1], None),
+])
+def test_unrelated_changes_do_not_refresh(panel, event):
+    panel.on_data_changed(event)
+    assert panel.idle == []
+
+
+@pytest.mark.parametrize("event", [
+    ChangeEvent("contacts", "insert", [1], None),
+    ChangeEvent("contacts", "delete", None, None),
+    ChangeEvent("contacts", "update", [1], {"birth_date"}),
+    ChangeEvent("contacts", "update", [1], {"last_name"}),
+    ChangeEvent("contacts", "update", [1], None, True),  # Чужая правка без списка колонок
+])
+def test_birthday_changes_refresh(panel, event):
+    panel.on_data_changed(event)
+    assert len(panel.idle) == 1
+
+
+def test_series_of_changes_gives_one_refresh(panel):
+    for contact_id in range(100):
+        panel.on_data_changed(ChangeEvent("contacts", "insert", [contact_id], None))
+    assert len(panel.idle) == 1
+    panel.idle.pop()()
+    assert panel.refreshes == 1 and panel.lbl_birthdays.text.endswith("Нет ближайших")
+    # После пересчета следующее изменение снова планирует его
+    panel.on_data_changed(ChangeEvent("contacts", "delete", [1], None))
+    assert len(panel.idle) == 1
+
+
+def test_midnight_timer(panel, monkeypatch):
+    class Clock(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return cls(2026, 12, 31, 23, 59, 30)
+
+    monkeypatch.setattr(dashboard, "datetime", Clock)
+    panel.schedule_midnight_refresh()
+    (delay_ms, callback), = panel.timers
+    assert delay_ms == 31000  # До полуночи 30 с + 1 с запаса
+    callback()
+    # Полночь: пересчет и новый таймер на следующую
+    assert panel.refreshes == 1 and len(panel.timers) == 2
@@ -0,0 +1,103 @@
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from conftest import contact_row
+from app.query_syntax import compile_query, Condition, date_bounds
+from app.text_keys import day_key
+
+TODAY = date(2026, 3, 15)
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("2026-03", (date(2026, 3, 1), date(2026, 4, 1))),
+    (">2026-03-01", (date(2026, 3, 2), None)),
+    ("<=2025", (None, date(2026, 1, 1))),
+    ("2025-12-20..2026-01", (date(2025, 12, 20), date(2026, 2, 1))),
+    ("this-month", (date(2026, 3, 1), date(2026, 4, 1))),
+    ("last-7d", (date(2026, 3, 9), date(2026, 3, 16))),
+    ("2026-02-30", None),
+    ("вчера", None),
+])
+def test_date_bounds(value, expected):
+    assert date_bounds(value, TODAY) == expected
+
+
+def test_date_condition_uses_integer_column():
+    (condition,) = compile_query("added:2026-03", TODAY)
+    assert condition == Condition("added_ts >= ? AND added_ts < ?",
+                                  (day_key(date(2026, 3, 1)), day_key(date(2026, 4, 1))), False)
+
+
+@pytest.mark.parametrize("query", [
+    "added:last-99999999d",
+    "added:last-" + "9" * 30 + "d",
+    "added:9999-12-31",
+    "modified:>9999-12",
+    "bday:next-" + "9" * 30 + "d",
+])
+def test_out_of_range_dates_do_not_raise(query):
+    plan = compile_query(query, TODAY)
+    assert all(isinstance(term, Condition) for term in plan)
+
+
+def test_birthday_range_across_new_year():
+    (condition,) = compile_query("bday:12-20..01-10", TODAY)
+    assert " OR " in condition.sql and condition.params == (1220, 110)
+
+
+def birthday_matches(condition, month_day):
+    first, last = condition.params
+    if " OR " in condition.sql:
+        return month_day >= first or month_day <= last
+    return first <= month_day <= last
+
+
+@pytest.mark.parametrize("today", [date(2027, 1, 1), date(2027, 3, 1), date(2028, 3, 1), date(2027, 12, 31)])
+@pytest.mark.parametrize("days", [0, 1, 30, 59, 60, 200, 364, 365, 366, 400, 10000])
+def test_birthday_next_days(today, days):
+    (condition,) = compile_query(f"bday:next-{days}d", today)
+    expected = {(today + timedelta(days=k)).strftime("%m%d") for k in range(min(days, 366) + 1)}
+    day = date(2001, 1, 1)  # Невисокосный год: 29 февраля сравнивается отдельно
+    while day.year == 2001:
+        month_day = day.month * 100 + day.day
+        assert birthday_matches(condition, month_day) == (day.strftime("%m%d") in expected), day
+        day += timedelta(days=1)
+
+
+def test_relative_dates_depend_on_today():
+    assert compile_query("added:today", TODAY) != compile_query("added:today", TODAY + timedelta(days=1))
+    assert compile_query("added:2026", TODAY) == compile_query("added:2026", TODAY + timedelta(days=1))
+
+
+# --- Даты в базе ---
+
+def test_date_filters_use_integer_keys(db):
+    db.add_contact(contact_row("Иванов", "Иван", birth_date="15.01.1990"))
+    db.add_contact(contact_row("Петров", "Петр", birth_date="02.03.1985"))
+    db.add_contact(contact_row("Сидоров", "Сидор"))
+    assert [row[1] for row in db.get_contacts("born:1990")] == ["Иванов"]
+    assert sorted(row[1] for row in db.get_contacts("born:<1991")) == ["Иванов", "Петров"]
+    assert [row[1] for row in db.get_contacts("-has:bday")] == ["Сидоров"]
+    assert len(db.get_contacts("added:today")) == 3
+
+
+def birthday_in(days):
+    return (datetime.now().date() + timedelta(days=days)).replace(year=1992).strftime("%d.%m.%Y")
+
+
+def test_upcoming_birthdays(db):
+    db.add_contact(contact_row("Иванов", "Иван", birth_date=birthday_in(3)))
+    db.add_contact(contact_row("Петров", "Петр", birth_date=birthday_in(0)))
+    db.add_contact(contact_row("Сидоров", "Сидор", birth_date=birthday_in(60)))
+    assert [(days, name) for days, name, _ in db.get_upcoming_birthdays()] == \
+        [(0, "Петров Петр"), (3, "Иванов Иван")]
+
+
+def test_upcoming_birthdays_before_backfill(db):
+    # Запись старой версии: целой колонки даты еще нет (фоновая миграция не дошла)
+    db.add_contact(contact_row("Иванов", "Иван", birth_date=birthday_in(5)))
+    db.add_contact(contact_row("Петров", "Петр", birth_date=birthday_in(60)))
+    db.cursor.execute("UPDATE contacts SET birth_ymd = NULL")
+    db.connection.commit()
+    assert [name for _, name, _ in db.get_upcoming_birthdays()] == ["Иванов Иван"]
@@ -0,0 +1,58 @@
+from conftest import contact_row
+
+
+def add_people(db, names):
+    for last_name, first_name in names:
+        db.add_contact(contact_row(last_name, first_name))
+    return {row[1]: row[0] for row in db.get_contacts()}
+
+
+def test_delete_more_ids_than_sqlite_parameters(db):
+    ids = add_people(db, [("Иванов", "Иван"), ("Петров", "Петр"), ("Сидоров", "Сидор")])
+    events = []
+    db.add_listener(events.append)
+    # Больше SQLITE_MAX_VARIABLE_NUMBER (32766): ID передаются не параметрами запроса
+    selection = [ids["Иванов"], ids["Сидоров"]] + list(range(10 ** 6, 10 ** 6 + 100000))
+    assert db.delete_contacts(selection)
+    assert [row[1] for row in db.get_contacts()] == ["Петров"]
+    # Удаление — одно уведомление со всеми ID (таблица убирает только эти строки)
+    assert [(e.action, len(e.ids)) for e in events] == [("delete", len(selection))]
+
+
+def test_delete_removes_dependent_rows(db):
+    ids = add_people(db, [("Иванов", "Иван")])
+    contact_id = ids["Иванов"]
+    db.set_contact_tags(contact_id, ["друзья"])
+    db.update_single_field(contact_id, "phone_primary", "+7 900 000-00-00")
+    db.delete_contacts([contact_id])
+    for table in ("contact_tags", "contact_history", "contact_name_keys", "contact_fuzzy_words"):
+        db.cursor.execute(f"SELECT COUNT(*) FROM {table} WHERE contact_id = ?", (contact_id,))
+        assert db.cursor.fetchone()[0] == 0, table
+    assert db.get_statistics() == (0, [])
+
+
+def test_delete_by_filter_matches_what_get_contacts_shows(db):
+    add_people(db, [("Иванов", "Иван"), ("Иваненко", "Петр"), ("Петров", "Петр")])
+    # "Ivan" находит транслитом — по умолчанию тот же режим "smart", что и у выборки
+    shown = {row[0] for row in db.get_contacts("Ivan")}
+    assert len(shown) == 2
+    assert db.delete_contacts_by_filter("Ivan") == (True, 2)
+    assert [row[1] for row in db.get_contacts()] == ["Петров"]
+
+
+def test_delete_by_filter_with_category_and_syntax(db):
+    db.add_contact(contact_row("Иванов", "Иван", category="Работа", email="ivan@test.ru"))
+    db.add_contact(contact_row("Петров", "Петр", category="Работа"))
+    db.add_contact(contact_row("Сидоров", "Сидор", category="Семья"))
+    assert db.delete_contacts_by_filter("-has:email", "Работа") == (True, 1)
+    assert sorted(row[1] for row in db.get_contacts()) == ["Иванов", "Сидоров"]
+    assert db.delete_contacts_by_filter("нет такого") == (True, 0)
+
+
+def test_fuzzy_delete_removes_the_ranked_result(db):
+    add_people(db, [("Иванов", "Иван"), ("Петров", "Петр")])
+    shown = [row[0] for row in db.get_contacts("Иванв", search_mode="fuzzy")]
+    assert len(shown) == 1
+    assert db.delete_contacts_by_filter("Иванв", search_mode="fuzzy") == (True, 1)
+    assert [row[1] for row in db.get_contacts()] == ["Петров"]
+
@@ -0,0 +1,53 @@
+import sqlite3
+
+from conftest import contact_row
+from app.diagnostics import LatencyHistogram, normalize_sql
+
+
+def test_histogram_percentiles():
+    histogram = LatencyHistogram()
+    for ms in [0.05] * 90 + [3] * 9 + [700]:
+        histogram.add(ms)
+    # Оценка сверху: граница корзины, но не больше максимума
+    assert (histogram.percentile(50), histogram.percentile(95), histogram.percentile(100)) == (0.1, 5, 700)
+    data = histogram.to_dict()
+    assert data["count"] == 100 and data["buckets"] == {"<=0.1": 90, "<=5": 9, "<=1000": 1}
+
+
+def test_statement_template():
+    assert normalize_sql("SELECT *\n  FROM contacts WHERE id IN (?, ?,?)") == \
+        "SELECT * FROM contacts WHERE id IN (?...)"
+
+
+def test_profiling_is_off_by_default(db):
+    assert db.profiler is None
+    assert isinstance(db.cursor, sqlite3.Cursor)
+
+
+def test_profiler_collects_methods_statements_and_slow_log(db):
+    profiler = db.enable_profiling(slow_ms=0)
+    db.add_contact(contact_row("Иванов", "Иван"), ["друзья"])
+    db.get_contacts("Иванов")
+    report = profiler.report()
+    assert report["methods"]["add_contact"]["count"] == 1
+    assert report["methods"]["get_contacts"]["count"] == 1
+    # trace видит и операторы мимо курсора: триггеры (журнал изменений, счетчики), COMMIT
+    executed = sum(stats["count"] for stats in report["statements"].values())
+    assert report["traced"]["total"] > executed
+    select = next(entry for entry in report["slow_queries"]
+                  if entry["sql"].startswith("SELECT * FROM contact_rows"))
+    assert select["method"] == "get_contacts" and select["rows"] == 1 and select["plan"]
+
+
+def test_disable_profiling_removes_hooks_and_keeps_report(db):
+    profiler = db.enable_profiling()
+    db.get_contacts()
+    db.disable_profiling()
+    assert not profiler.attached and isinstance(db.cursor, sqlite3.Cursor)
+    assert "get_contacts" not in vars(db)  # Снова метод класса, без обертки
+    db.get_contacts()
+    assert profiler.report()["methods"]["get_contacts"]["count"] == 1
+    # Повторное включение продолжает тот же отчет
+    assert db.enable_profiling() is profiler and profiler.attached
+    db.get_contacts()
+    assert profiler.report()["methods"]["get_contacts"]["count"] == 2
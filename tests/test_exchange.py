@@ -0,0 +1,95 @@
+import pytest
+
+from conftest import contact_row, run_task
+from app.database import Database
+from app import exchange
+
+CONTACTS = [
+    (contact_row("Иванов", "Иван", patronymic="Иванович", phone_primary="+7 (900) 111-22-33",
+                 phone_secondary="8 800 555-35-35", email="ivan@test.ru", address="Москва, ул. Ленина; д. 1",
+                 social_network_1="Telegram", social_nickname_1="@ivan", social_link_1="https://t.me/ivan",
+                 social_network_2="VK", social_nickname_2="ivan,pro", social_link_2="https://vk.com/ivan",
+                 notes="Первая строка\nвторая: с запятой, точкой; и \\ слешем",
+                 category="Работа", birth_date="15.01.1990"),
+     ["друзья", "клиенты VIP"]),
+    (contact_row("Петрова", "Анна", email="anna@mail.ru", category="Новая категория",
+                 notes=" ".join(["Очень длинная заметка"] * 20)),
+     []),
+    (contact_row("O'Brien", "Seán", phone_primary="+353 1 234 5678"), ["ирландия"]),
+]
+
+
+@pytest.fixture
+def source(tmp_path):
+    db = Database(str(tmp_path / "source.db"))
+    for data, tags in CONTACTS:
+        db.add_contact(data, tags)
+    yield db
+    db.close()
+
+
+@pytest.fixture
+def target(tmp_path):
+    db = Database(str(tmp_path / "target.db"))
+    yield db
+    db.close()
+
+
+def exported(db):
+    """Все контакты без ID (они в новой базе другие)."""
+    return [{name: value for name, value in record.items() if name != "id"}
+            for records in db.iter_contacts() for record in records]
+
+
+@pytest.mark.parametrize("file_format, extension, version", [
+    ("jsonl", ".jsonl", None),
+    ("vcard", ".vcf", "3.0"),
+    ("vcard", ".vcf", "4.0"),
+])
+def test_round_trip(source, target, tmp_path, file_format, extension, version):
+    filename = str(tmp_path / f"contacts{extension}")
+    assert exchange.detect_format(filename) == file_format
+    args = (version,) if version else ()
+    assert run_task(exchange.export_contacts(source, filename, file_format, *args)) == len(CONTACTS)
+    assert run_task(exchange.import_contacts(target, filename, file_format, workers=1)) == len(CONTACTS)
+    assert exported(target) == exported(source)
+
+
+def test_vcard_lines_are_folded(source, tmp_path):
+    filename = str(tmp_path / "contacts.vcf")
+    run_task(exchange.export_contacts(source, filename, "vcard"))
+    with open(filename, "rb") as file:
+        lines = file.read().split(b"\r\n")
+    assert max(len(line) for line in lines) <= exchange.VCARD_LINE_BYTES
+    # UTF-8 символ не разрывается переносом
+    for line in lines:
+        line.decode("utf-8")
+
+
+@pytest.mark.parametrize("file_format, extension", [("jsonl", ".jsonl"), ("vcard", ".vcf")])
+@pytest.mark.parametrize("chunk_bytes", [1, 7, 100, 333, 10 ** 6])
+def test_chunks_split_on_record_boundaries(source, tmp_path, file_format, extension, chunk_bytes):
+    filename = str(tmp_path / f"contacts{extension}")
+    run_task(exchange.export_contacts(source, filename, file_format))
+    chunks = list(exchange.split_chunks(filename, file_format, chunk_bytes))
+    assert chunks[0][0] == 0 and all(a[1] == b[0] for a, b in zip(chunks, chunks[1:]))
+    records = [record for start, end in chunks
+               for record in exchange.parse_chunk(filename, file_format, start, end)]
+    whole = exchange.parse_chunk(filename, file_format, 0, chunks[-1][1])
+    assert records == whole and len(records) == len(CONTACTS)
+
+
+def test_foreign_vcard(tmp_path, target):
+    filename = str(tmp_path / "apple.vcf")
+    with open(filename, "w", encoding="utf-8", newline="\r\n") as file:
+        file.write("BEGIN:VCARD\nVERSION:3.0\nN:Смирнов;Олег;;;\nFN:Олег Смирнов\n"
+                   "item1.TEL;type=CELL;type=pref:+7 901 000-00-00\nitem1.X-ABLabel:мобильный\n"
+                   "NOTE;ENCODING=QUOTED-PRINTABLE;CHARSET=UTF-8:=D0=9F=D1=80=D0=B8=\n=D0=B2=D0=B5=D1=82\n"
+                   "END:VCARD\n"
+                   "BEGIN:VCARD\nVERSION:3.0\nFN:Только Имя\nEND:VCARD\n")
+    assert run_task(exchange.import_contacts(target, filename, "vcard", workers=1)) == 2
+    records = exported(target)
+    assert (records[0]["last_name"], records[0]["first_name"], records[0]["phone_primary"]) == \
+        ("Смирнов", "Олег", "+7 901 000-00-00")
+    assert records[0]["notes"] == "Привет"
+    assert records[1]["first_name"] or records[1]["last_name"]
@@ -0,0 +1,78 @@
+import sqlite3
+
+import pytest
+
+from conftest import contact_row
+from app.database import Database
+
+PEOPLE = [("Иванов", "Иван", "ivanov@mail.ru"), ("Петрова", "Анна", ""),
+          ("Сидоров", "Петр", "petr.s@mail.ru"), ("Смирнова", "Ольга", "")]
+
+
+@pytest.fixture(params=[False, True], ids=["file", "in_memory"])
+def people(request, db_path):
+    db = Database(db_path, in_memory=request.param)
+    for last_name, first_name, email in PEOPLE:
+        db.add_contact(contact_row(last_name, first_name, email=email))
+    yield db
+    db.close()
+
+
+def fuzzy(db, text, **kwargs):
+    return [(row[1], row[2]) for row in db.get_contacts(text, search_mode="fuzzy", **kwargs)]
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("Иванв", ("Иванов", "Иван")),
+    ("Петрова Ана", ("Петрова", "Анна")),
+    ("Питрова", ("Петрова", "Анна")),      # Фонетический ключ фамилии
+    ("petr.s", ("Сидоров", "Петр")),       # Имя ящика email
+])
+def test_typos_are_found_first(people, text, expected):
+    assert fuzzy(people, text)[0] == expected
+
+
+def test_unrelated_text_finds_nothing(people):
+    assert fuzzy(people, "Кузнецов") == []
+
+
+def test_fuzzy_search_respects_category_filter(people):
+    contact_id = people.get_contacts("Иванов")[0][0]
+    people.update_single_field(contact_id, "category", "Работа")
+    assert fuzzy(people, "Иванв", category_filter="Работа") == [("Иванов", "Иван")]
+    assert fuzzy(people, "Иванв", category_filter="Семья") == []
+
+
+def test_fuzzy_search_is_read_only(people, db_path):
+    fuzzy(people, "Иванв")
+    # Поиск не держит открытой транзакции: ни записи в файл, ни старого снимка
+    assert not people.connection.in_transaction
+    other = sqlite3.connect(db_path, timeout=0.1)
+    try:
+        other.execute("UPDATE contacts SET first_name = 'Иоанн' WHERE last_name = 'Иванов'")
+        other.commit()
+    finally:
+        other.close()
+    # Живая синхронизация видит чужой commit сразу после поиска
+    assert people.poll_changes() == 1
+    assert people.get_contacts("Иванов")[0][2] == "Иоанн"
+
+
+def test_trigram_index_follows_edits_and_deletes(people):
+    contact_id = people.get_contacts("Иванов")[0][0]
+    people.update_single_field(contact_id, "last_name", "Кузнецов")
+    # Старые триграммы удалены из индекса, новые добавлены
+    assert ("Иванов", "Иван") not in fuzzy(people, "Иванв")
+    assert fuzzy(people, "Кузнецв")[0] == ("Кузнецов", "Иван")
+    people.delete_contacts([contact_id])
+    assert fuzzy(people, "Кузнецв") == []
+    people.cursor.execute("SELECT COUNT(*) FROM contact_fuzzy_words")
+    assert people.cursor.fetchone()[0] == len(PEOPLE) - 1
+    # Индекс FTS согласован с таблицей слов
+    people.cursor.execute("INSERT INTO contact_fuzzy (contact_fuzzy) VALUES ('integrity-check')")
+
+
+def test_without_trigram_index_phonetic_match_still_works(people):
+    # Сборка SQLite без токенизатора trigram: кандидаты только по фонетике
+    people.fuzzy_fts = False
+    assert fuzzy(people, "Питрова")[0] == ("Петрова", "Анна")
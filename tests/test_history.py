@@ -0,0 +1,63 @@
+from conftest import contact_row
+from app.database import HISTORY_SNAPSHOT_EVERY
+
+
+def add_contact(db, **fields):
+    db.add_contact(contact_row("Иванов", "Иван", **fields))
+    return db.get_contacts()[0][0]
+
+
+def test_contact_without_edits_has_no_history(db):
+    contact_id = add_contact(db)
+    assert db.get_contact_history(contact_id) == []
+
+
+def test_history_lists_changes_of_each_version(db):
+    contact_id = add_contact(db, email="old@test.ru")
+    db.update_single_field(contact_id, "email", "new@test.ru")
+    db.update_single_field(contact_id, "phone_primary", "+7 900")
+    first, second, third = db.get_contact_history(contact_id)
+    assert first.version == 1 and first.changes["email"] == ("", "old@test.ru")
+    assert second.changes == {"email": ("old@test.ru", "new@test.ru")}
+    assert third.changes == {"phone_primary": ("", "+7 900")}
+
+
+def test_history_stores_deltas_and_periodic_snapshots(db):
+    contact_id = add_contact(db)
+    for i in range(HISTORY_SNAPSHOT_EVERY + 2):
+        db.update_single_field(contact_id, "email", f"mail{i}@test.ru")
+    db.cursor.execute(
+        "SELECT version FROM contact_history WHERE contact_id = ? AND is_snapshot ORDER BY version",
+        (contact_id,))
+    assert [row[0] for row in db.cursor.fetchall()] == [1, HISTORY_SNAPSHOT_EVERY + 1]
+    # Дельта хранит только измененное поле
+    db.cursor.execute(
+        "SELECT data FROM contact_history WHERE contact_id = ? AND version = 2", (contact_id,))
+    assert db.cursor.fetchone()[0].count(":") == 1
+
+
+def test_any_version_is_restored(db):
+    contact_id = add_contact(db, phone_primary="+7 900")
+    emails = [f"mail{i}@test.ru" for i in range(HISTORY_SNAPSHOT_EVERY * 2)]
+    for email in emails:
+        db.update_single_field(contact_id, "email", email)
+    version = db.get_contact_version(contact_id, 1)
+    assert (version["email"], version["phone_primary"], version["last_name"]) == ("", "+7 900", "Иванов")
+    # Версия n+1 — после n-й правки, в том числе сразу после снимка и перед ним
+    for n in (1, HISTORY_SNAPSHOT_EVERY - 1, HISTORY_SNAPSHOT_EVERY, len(emails)):
+        assert db.get_contact_version(contact_id, n + 1)["email"] == emails[n - 1]
+    assert db.get_contact_version(contact_id, len(emails) + 2) is None
+
+
+def test_revert_is_a_new_version(db):
+    contact_id = add_contact(db, email="first@test.ru")
+    db.update_single_field(contact_id, "email", "second@test.ru")
+    db.update_single_field(contact_id, "last_name", "Петров")
+    assert db.revert_contact(contact_id, 1)[0]
+    row = db.get_contact_version(contact_id, 4)
+    assert (row["last_name"], row["email"]) == ("Иванов", "first@test.ru")
+    assert db.get_contacts("first@test.ru")[0][1] == "Иванов"
+    # Откат тоже можно отменить
+    assert db.revert_contact(contact_id, 3)[0]
+    assert db.get_contact_version(contact_id, 5)["last_name"] == "Петров"
+    assert db.revert_contact(contact_id, 99) == (False, "Версия не найдена")
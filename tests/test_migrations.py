@@ -0,0 +1,207 @@
+import sqlite3
+
+import pytest
+
+from conftest import run_task
+from app.database import Database, DEFAULT_CATEGORY_ID
+from app.migrations import MIGRATIONS, Migration, Migrator
+
+# Схема первой версии программы (до миграций): категория — текстом в contacts
+BASELINE_SCHEMA = """
+CREATE TABLE contacts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    last_name TEXT NOT NULL,
+    first_name TEXT NOT NULL,
+    patronymic TEXT,
+    phone_primary TEXT,
+    phone_secondary TEXT,
+    email TEXT,
+    address TEXT,
+    social_network_1 TEXT,
+    social_nickname_1 TEXT,
+    social_link_1 TEXT,
+    social_network_2 TEXT,
+    social_nickname_2 TEXT,
+    social_link_2 TEXT,
+    social_network_3 TEXT,
+    social_nickname_3 TEXT,
+    social_link_3 TEXT,
+    notes TEXT,
+    date_added TEXT NOT NULL,
+    date_modified TEXT NOT NULL,
+    category TEXT DEFAULT 'Не распределён',
+    birth_date TEXT
+);
+CREATE TABLE saved_notes (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    title TEXT NOT NULL,
+    content TEXT NOT NULL,
+    created_at TEXT
+);
+"""
+
+LATEST_VERSION = MIGRATIONS[-1].version
+
+
+def make_baseline(path, contacts):
+    """Файл БД старой версии: contacts — список (фамилия, имя, категория, дата рождения)."""
+    connection = sqlite3.connect(path)
+    connection.executescript(BASELINE_SCHEMA)
+    connection.executemany(
+        """INSERT INTO contacts (last_name, first_name, category, birth_date, date_added, date_modified)
+           VALUES (?, ?, ?, ?, '2024-05-01 10:00:00', '2024-05-02 11:30:00')""", contacts)
+    connection.execute(
+        "INSERT INTO saved_notes (title, content, created_at) VALUES (?, ?, ?)",
+        ("Звонок", "перезвонить бухгалтеру", "2024-05-03 09:00:00"))
+    connection.commit()
+    connection.close()
+
+
+def test_upgrade_baseline_database(db_path):
+    make_baseline(db_path, [
+        ("Иванов", "Иван", "Работа", "15.01.1990"),
+        ("Петрова", "Анна", "Клиенты VIP", ""),
+        ("Сидоров", "Петр", "Не распределён", None),
+    ])
+    db = Database(db_path)
+    try:
+        assert db.migrations.schema_version() == LATEST_VERSION
+        assert set(db.migrations.pending()) == {"reindex_contacts", "category_tags", "category_ids", "date_keys"}
+        run_task(db.migrations.run())
+        assert db.migrations.pending() == []
+
+        by_name = {row[1]: row for row in db.get_contacts()}
+        # Справочник категорий: неизвестное имя добавлено, текстовая колонка очищена
+        assert by_name["Петрова"][20] == "Клиенты VIP"
+        assert "Клиенты VIP" in db.get_category_names()
+        db.cursor.execute("SELECT COUNT(*) FROM contacts WHERE category_id IS NULL OR category IS NOT NULL")
+        assert db.cursor.fetchone()[0] == 0
+        db.cursor.execute("SELECT category_id FROM contacts WHERE last_name = 'Сидоров'")
+        assert db.cursor.fetchone()[0] == DEFAULT_CATEGORY_ID
+
+        # Теги из категорий ("Не распределён" тегом не становится)
+        assert db.get_contact_tags(by_name["Иванов"][0]) == ["Работа"]
+        assert db.get_contact_tags(by_name["Сидоров"][0]) == []
+
+        # Целые колонки дат и ключи поиска
+        db.cursor.execute("SELECT COUNT(*) FROM contacts WHERE added_ts IS NULL OR name_sort_key IS NULL")
+        assert db.cursor.fetchone()[0] == 0
+        assert [row[1] for row in db.get_contacts("born:1990")] == ["Иванов"]
+        assert [row[1] for row in db.get_contacts("Сидоров")] == ["Сидоров"]
+
+        # Полнотекстовый индекс построен и по старым заметкам
+        assert [row[1] for row in db.get_notes_page("бухгал")] == ["Звонок"]
+    finally:
+        db.close()
+
+    # Повторное открытие: шаги уже применены
+    db = Database(db_path)
+    try:
+        assert db.migrations.upgrade() == []
+        assert db.migrations.pending() == []
+    finally:
+        db.close()
+
+
+def schema(path):
+    """Объекты схемы файла: колонки таблиц и SQL индексов, триггеров, представлений."""
+    connection = sqlite3.connect(path)
+    objects = {}
+    for kind, name, sql in connection.execute(
+            "SELECT type, name, sql FROM sqlite_master WHERE name NOT LIKE 'sqlite_%'"):
+        if kind == "table":
+            # Текст CREATE TABLE у старого файла другой (отступы, ALTER TABLE) — сравниваем колонки
+            sql = connection.execute(f"PRAGMA table_info({name})").fetchall()
+        objects[kind, name] = sql
+    connection.close()
+    return objects
+
+
+def test_new_and_upgraded_files_have_the_same_schema(tmp_path):
+    new_path, old_path = str(tmp_path / "new.db"), str(tmp_path / "old.db")
+    make_baseline(old_path, [("Иванов", "Иван", "Работа", "")])
+    for path in (new_path, old_path):
+        Database(path).close()
+    assert schema(new_path) == schema(old_path)
+
+
+def test_current_file_opens_without_ddl(db_path, monkeypatch):
+    Database(db_path).close()
+    statements = []
+    create_tables = Database.create_tables
+
+    def traced(self):
+        self.connection.set_trace_callback(statements.append)
+        create_tables(self)
+
+    monkeypatch.setattr(Database, "create_tables", traced)
+    Database(db_path).close()
+    # Остаются только исходные таблицы (IF NOT EXISTS), служебная таблица миграций
+    # и временные объекты соединения
+    ddl = [sql.split("(")[0].split() for sql in statements
+           if sql.lstrip().upper().startswith(("CREATE", "ALTER", "DROP"))]
+    assert {words[-1] for words in ddl} == {"contacts", "saved_notes", "migration_jobs", "own_changes"}
+
+
+def test_failed_upgrade_stops_opening(db_path, monkeypatch):
+    def broken(self):
+        raise sqlite3.OperationalError("диск переполнен")
+
+    monkeypatch.setattr(Database, "_create_photos", broken)
+    with pytest.raises(sqlite3.OperationalError):
+        Database(db_path)
+    # Шаги до сломанного зафиксированы, следующее открытие продолжает с него
+    connection = sqlite3.connect(db_path)
+    assert connection.execute("PRAGMA user_version").fetchone()[0] == 5
+    assert connection.execute(
+        "SELECT COUNT(*) FROM sqlite_master WHERE name = 'contact_photos'").fetchone()[0] == 0
+    connection.close()
+    monkeypatch.undo()
+    db = Database(db_path)
+    try:
+        assert db.migrations.schema_version() == LATEST_VERSION
+    finally:
+        db.close()
+
+
+def test_backfill_resumes_after_interruption(db_path):
+    make_baseline(db_path, [(f"Фамилия{i:04d}", "Имя", "Работа" if i % 2 else "Семья", "")
+                            for i in range(1, 251)])
+    db = Database(db_path)
+    migrator = Migrator(db, batch_size=40)
+    task = migrator.run()
+    next(task)
+    next(task)
+    task.close()  # Закрытие программы посреди задачи
+    done, total = migrator.progress()
+    assert 0 < done < total
+    db.close()
+
+    db = Database(db_path)
+    try:
+        run_task(Migrator(db, batch_size=40).run())
+        assert db.migrations.pending() == []
+        db.cursor.execute("SELECT COUNT(*) FROM contacts WHERE category_id IS NULL OR added_ts IS NULL")
+        assert db.cursor.fetchone()[0] == 0
+        # Ни одна порция не пропущена: у каждого контакта — тег его категории
+        db.cursor.execute("""SELECT COUNT(*) FROM contact_tags ct JOIN tags t ON t.id = ct.tag_id
+                             JOIN contact_rows c ON c.id = ct.contact_id WHERE t.name = c.category""")
+        assert db.cursor.fetchone()[0] == 250
+    finally:
+        db.close()
+
+
+def test_failed_step_keeps_previous_version(db_path):
+    make_baseline(db_path, [("Иванов", "Иван", "Работа", "")])
+
+    def broken(db):
+        raise sqlite3.OperationalError("сбой шага")
+
+    db = Database(db_path)
+    try:
+        migrator = Migrator(db, MIGRATIONS + [Migration(LATEST_VERSION + 1, "Сломанный шаг", broken)])
+        with pytest.raises(sqlite3.OperationalError):
+            migrator.upgrade()
+        assert migrator.schema_version() == LATEST_VERSION
+    finally:
+        db.close()
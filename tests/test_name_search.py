@@ -0,0 +1,53 @@
+import pytest
+
+from conftest import contact_row
+from app.text_keys import translit_key, swap_layout_to_ru, swap_layout_to_en, query_key_variants
+
+
+@pytest.mark.parametrize("spellings", [
+    ("Дмитрий", "Dmitry", "Dmitriy"),
+    ("Щукин", "Shchukin", "Schukin"),
+    ("Юлия", "Yulia", "Julia", "Yuliya"),
+])
+def test_translit_spellings_share_a_key(spellings):
+    assert len({translit_key(word) for word in spellings}) == 1
+
+
+def test_wrong_keyboard_layout():
+    assert swap_layout_to_ru("Bdfyjd") == "иванов"
+    assert swap_layout_to_en("шмфт") == "ivan"
+    assert translit_key("Иванов") in query_key_variants("Bdfyjd")
+
+
+@pytest.fixture
+def people(db):
+    for last_name, first_name in [("Иванов", "Иван"), ("Иванова", "Мария"), ("Петров", "Иван"), ("Щукин", "Дмитрий")]:
+        db.add_contact(contact_row(last_name, first_name))
+    return db
+
+
+def found(db, text, search_mode="smart"):
+    return sorted((row[1], row[2]) for row in db.get_contacts(text, search_mode=search_mode))
+
+
+@pytest.mark.parametrize("text", ["Bdfyjd", "Ivanov", "ivanov", "Иванов"])
+def test_smart_search_finds_layout_and_translit(people, text):
+    assert found(people, text) == [("Иванов", "Иван"), ("Иванова", "Мария")]
+
+
+def test_exact_search_is_plain_substring(people):
+    assert found(people, "Bdfyjd", "exact") == []
+    assert found(people, "Иванов", "exact") == [("Иванов", "Иван"), ("Иванова", "Мария")]
+
+
+def test_every_query_word_must_match(people):
+    assert found(people, "Ivanov Mari") == [("Иванова", "Мария")]
+    assert found(people, "Ivan Petrov") == [("Петров", "Иван")]
+    assert found(people, "Shchukin Dmitry") == [("Щукин", "Дмитрий")]
+
+
+def test_keys_follow_edits(people):
+    contact_id = people.get_contacts("Петров")[0][0]
+    people.update_single_field(contact_id, "last_name", "Сидоров")
+    assert found(people, "Petrov") == []
+    assert found(people, "Sidorov") == [("Сидоров", "Иван")]
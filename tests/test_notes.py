@@ -0,0 +1,51 @@
+import pytest
+
+
+@pytest.fixture
+def notes(db):
+    for title, content in (("Звонок", "Позвонить бухгалтеру до пятницы"),
+                           ("Покупки", "Хлеб, молоко"),
+                           ('Цитата "в кавычках"', "Бухгалтерия закрыта")):
+        assert db.save_note(title, content)
+    return db
+
+
+def titles(rows):
+    return [row[1] for row in rows]
+
+
+def test_notes_page_newest_first(notes):
+    # Заметки одной секунды различаются по id
+    assert titles(notes.get_notes_page()) == ['Цитата "в кавычках"', "Покупки", "Звонок"]
+
+
+def test_pages_continue_after_last_row(notes):
+    first = notes.get_notes_page(limit=2)
+    second = notes.get_notes_page(after=first[-1], limit=2)
+    assert titles(first + second) == titles(notes.get_notes_page())
+    assert notes.get_notes_page(after=second[-1]) == []
+
+
+@pytest.mark.parametrize("fts", [True, False], ids=["fts", "like"])
+@pytest.mark.parametrize("text, expected", [
+    ("бухгал", ["Цитата \"в кавычках\"", "Звонок"]),  # По началу слова, в тексте
+    ("позвонить бухгал", ["Звонок"]),
+    ("покупки", ["Покупки"]),                         # В названии
+    ('"в', ['Цитата "в кавычках"']),                   # Кавычка — не синтаксис запроса
+    ("самолет", []),
+])
+def test_search_in_title_and_text(notes, fts, text, expected):
+    notes.notes_fts = fts
+    assert titles(notes.get_notes_page(text)) == expected
+
+
+def test_content_is_read_on_demand_and_delete(notes):
+    events = []
+    notes.add_listener(events.append)
+    note_id = notes.get_notes_page("покупки")[0][0]
+    assert notes.get_note_content(note_id) == "Хлеб, молоко"
+    assert notes.delete_note(note_id)
+    assert notes.get_note_content(note_id) is None
+    # Удаленная заметка пропала и из индекса поиска
+    assert notes.get_notes_page("хлеб") == []
+    assert [(e.table, e.action, e.ids) for e in events] == [("saved_notes", "delete", [note_id])]
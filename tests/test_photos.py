@@ -0,0 +1,133 @@
+import io
+import os
+import time
+
+import pytest
+
+from conftest import contact_row
+
+Image = pytest.importorskip("PIL.Image")
+
+from app.ui import photos  # noqa: E402
+from app.ui.photos import PhotoCache, prepare_photo, render_thumbnail  # noqa: E402
+
+
+def jpeg_bytes(width, height, color="red"):
+    out = io.BytesIO()
+    Image.new("RGB", (width, height), color).save(out, "JPEG")
+    return out.getvalue()
+
+
+@pytest.fixture
+def contact_id(db):
+    db.add_contact(contact_row("Иванов", "Иван"))
+    return db.get_contacts()[0][0]
+
+
+class Root:
+    """Вместо окна Tk: таймеры after() вызывает тест."""
+
+    def __init__(self):
+        self.timers = []
+
+    def after(self, ms, callback):
+        self.timers.append(callback)
+
+    def wait(self, cache):
+        # Крутим "цикл событий", пока пул не отдаст все результаты
+        while self.timers:
+            while cache._results.qsize() < cache._in_flight:
+                time.sleep(0.005)
+            self.timers.pop(0)()
+
+
+@pytest.fixture
+def cache(db, tmp_path, monkeypatch):
+    # PhotoImage требует Tk; в тестах миниатюрой остается сам Image
+    monkeypatch.setattr(photos.ImageTk, "PhotoImage", lambda image: image)
+    root = Root()
+    cache = PhotoCache(root, db, cache_dir=str(tmp_path / "thumbs"))
+    yield cache
+    cache.close()
+
+
+def test_photo_is_read_back_in_chunks(db, contact_id):
+    data = os.urandom(200 * 1024)
+    events = []
+    db.add_listener(events.append)
+    assert db.set_contact_photo(contact_id, data)
+    assert db.get_photo_info(contact_id)[0] == len(data)
+    assert db.read_contact_photo(contact_id, chunk_size=7000) == data
+    assert [(e.table, e.action) for e in events] == [("contact_photos", "update")]
+    assert [row[0] for row in db.get_contacts("has:photo")] == [contact_id]
+
+
+def test_photo_replace_and_delete(db, contact_id):
+    db.set_contact_photo(contact_id, b"old")
+    db.set_contact_photo(contact_id, b"new photo")
+    assert db.read_contact_photo(contact_id) == b"new photo"
+    assert db.delete_contact_photo(contact_id)
+    assert db.get_photo_info(contact_id) is None and db.read_contact_photo(contact_id) is None
+
+
+def test_photo_is_removed_with_contact(db, contact_id):
+    db.set_contact_photo(contact_id, b"photo")
+    db.delete_contacts([contact_id])
+    db.cursor.execute("SELECT COUNT(*) FROM contact_photos")
+    assert db.cursor.fetchone()[0] == 0
+
+
+def test_prepare_photo_shrinks_large_image(tmp_path):
+    path = str(tmp_path / "big.png")
+    Image.new("RGB", (3000, 1500), "blue").save(path)
+    with Image.open(io.BytesIO(prepare_photo(path))) as image:
+        assert image.format == "JPEG" and image.size == (photos.MAX_PHOTO_SIDE, photos.MAX_PHOTO_SIDE // 2)
+
+
+def test_render_thumbnail_writes_disk_cache(tmp_path):
+    cache_path = str(tmp_path / "thumbs" / "1.png")
+    image = render_thumbnail(jpeg_bytes(400, 200), 96, cache_path)
+    assert image.size == (96, 48)
+    with Image.open(cache_path) as cached:
+        assert cached.size == (96, 48)
+
+
+def test_thumbnail_is_built_once_and_cached(db, contact_id, cache):
+    db.set_contact_photo(contact_id, jpeg_bytes(300, 300))
+    results = []
+    # Два запроса одной миниатюры до готовности — одна задача пула
+    cache.get_thumbnail(contact_id, results.append)
+    cache.get_thumbnail(contact_id, results.append)
+    cache.root.wait(cache)
+    assert len(results) == 2 and results[0] is results[1] and results[0].size == (96, 96)
+    assert len(os.listdir(cache.cache_dir)) == 1
+    cache.get_thumbnail(contact_id, results.append)  # Из памяти — сразу
+    assert results[2] is results[0] and cache.root.timers == []
+
+
+def test_thumbnail_for_contact_without_photo(db, contact_id, cache):
+    results = []
+    cache.get_thumbnail(contact_id, results.append)
+    assert results == [None]
+
+
+def test_memory_cache_is_bounded(db, cache):
+    cache.memory_items = 2
+    for name in ("Первый", "Второй", "Третий"):
+        db.add_contact(contact_row(name, "Иван"))
+    for row in db.get_contacts():
+        db.set_contact_photo(row[0], jpeg_bytes(50, 50))
+        cache.get_thumbnail(row[0], lambda image: None)
+        cache.root.wait(cache)
+    assert len(cache._memory) == 2
+
+
+def test_import_photo_saves_prepared_jpeg(db, contact_id, cache, tmp_path):
+    path = str(tmp_path / "photo.png")
+    Image.new("RGB", (64, 64), "green").save(path)
+    results = []
+    cache.import_photo(contact_id, path, lambda ok, error: results.append((ok, error)))
+    cache.root.wait(cache)
+    assert results == [(True, "")]
+    with Image.open(io.BytesIO(db.read_contact_photo(contact_id))) as image:
+        assert image.format == "JPEG"
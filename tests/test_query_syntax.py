@@ -0,0 +1,81 @@
+from datetime import date
+
+import pytest
+
+from conftest import contact_row
+from app.query_syntax import compile_query, Lookup, TEXT_COLUMNS
+
+TODAY = date(2026, 3, 15)
+
+
+def test_plain_text_has_no_plan():
+    assert compile_query("Иванов 900") is None
+    assert compile_query("   ") is None
+
+
+def test_fields_phrases_and_negation():
+    plan = compile_query('phone:900 "Иван Петров" -tag:архив', TODAY)
+    assert plan == (
+        Lookup("text", ("phone_primary",), "900", False),
+        Lookup("text", TEXT_COLUMNS, "Иван Петров", False),
+        Lookup("tag", (), "архив", True),
+    )
+
+
+def test_unknown_prefix_is_a_plain_word():
+    # "http://..." и "10:30" — не поля, а слова целиком
+    assert compile_query("-http://site.ru", TODAY) == (
+        Lookup("text", TEXT_COLUMNS, "http://site.ru", True),)
+    assert compile_query("10:30", TODAY) is None
+
+
+def test_field_without_value_is_skipped_while_typing():
+    assert compile_query("phone:", TODAY) == ()
+    assert compile_query('email:""', TODAY) == ()
+
+
+def test_has_conditions():
+    (condition,) = compile_query("-has:email", TODAY)
+    assert condition.negated and "email" in condition.sql
+    assert compile_query("has:неизвестно", TODAY) == ()
+
+
+# --- Запросы к базе ---
+
+@pytest.fixture
+def people(db):
+    db.add_contact(contact_row("Иванов", "Иван", phone_primary="+7 900 111", email="ivan@mail.ru",
+                               category="Работа"), ["архив"])
+    db.add_contact(contact_row("Петров", "Петр", notes="звонить после 900", address="Тверская 1",
+                               category="Работа"))
+    db.add_contact(contact_row("Сидоров", "Иван", email="sid@test.ru", category="Семья"), ["друзья"])
+    return db
+
+
+def found(db, query):
+    return sorted(row[1] for row in db.get_contacts(query))
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("phone:900", ["Иванов"]),              # Только телефон, не заметки
+    ("900", ["Иванов", "Петров"]),
+    ("имя:Иван", ["Иванов", "Сидоров"]),
+    ('"после 900"', ["Петров"]),             # Фраза ищется подстрокой целиком
+    ('"900 после"', []),
+    ('"sid@test"', ["Сидоров"]),
+    ("category:Работа -tag:архив", ["Петров"]),
+    ("тег:друзья", ["Сидоров"]),
+    ("-email:mail", ["Петров", "Сидоров"]),  # Пустой email тоже "не содержит"
+    ("has:email", ["Иванов", "Сидоров"]),
+    ("-has:email", ["Петров"]),
+    ("адрес:тверская has:notes", ["Петров"]),
+    ("name:ivan", ["Иванов", "Сидоров"]),     # Ключи ФИО: транслит
+    ("http://site.ru", []),
+])
+def test_queries_against_database(people, query, expected):
+    assert found(people, query) == expected
+
+
+def test_query_combines_with_category_filter(people):
+    rows = people.get_contacts("имя:Иван", category_filter="Семья")
+    assert [row[1] for row in rows] == ["Сидоров"]
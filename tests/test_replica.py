@@ -0,0 +1,96 @@
+import sqlite3
+
+import pytest
+
+from conftest import contact_row
+from app.database import Database
+from app.replica import is_read
+
+
+def last_names(db):
+    db.cursor.execute("SELECT last_name FROM contacts ORDER BY id")
+    return [row[0] for row in db.cursor.fetchall()]
+
+
+def disk_last_names(path):
+    connection = sqlite3.connect(path)
+    try:
+        return [row[0] for row in connection.execute("SELECT last_name FROM contacts ORDER BY id")]
+    finally:
+        connection.close()
+
+
+@pytest.fixture
+def replica(db_path):
+    db = Database(db_path, in_memory=True)
+    yield db
+    db.close()
+
+
+@pytest.mark.parametrize("sql, expected", [
+    ("SELECT * FROM contacts", True),
+    ("  with t AS (SELECT 1) SELECT * FROM t", True),
+    ("PRAGMA data_version", True),
+    ("PRAGMA user_version = 3", False),
+    ("INSERT INTO contacts DEFAULT VALUES", False),
+    ("CREATE INDEX idx ON contacts(email)", False),
+])
+def test_statement_kinds(sql, expected):
+    assert is_read(sql) is expected
+
+
+def test_writes_go_to_file_and_memory(db_path):
+    replica = Database(db_path, in_memory=True)
+    replica.add_contact(contact_row("Иванов", "Иван"), ["друзья"])
+    assert disk_last_names(db_path) == ["Иванов"] == last_names(replica)
+    # Чтения идут из копии в памяти
+    assert replica.connection.memory.execute("SELECT COUNT(*) FROM contact_tags").fetchone() == (1,)
+    replica.close()
+    reopened = Database(db_path)
+    try:
+        assert reopened.get_contact_tags(reopened.get_contacts()[0][0]) == ["друзья"]
+    finally:
+        reopened.close()
+
+
+def test_rollback_keeps_copies_equal(replica, db_path):
+    replica.add_contact(contact_row("Иванов", "Иван"))
+    with pytest.raises(ZeroDivisionError):
+        with replica.transaction():
+            replica.add_contact(contact_row("Петров", "Петр"))
+            1 / 0
+    assert last_names(replica) == disk_last_names(db_path) == ["Иванов"]
+    assert not replica.connection.in_transaction
+
+
+def test_replica_catches_up_on_poll(replica, db_path):
+    other = Database(db_path)
+    try:
+        events = []
+        replica.add_listener(events.append)
+        other.add_contact(contact_row("Петров", "Петр"))
+        assert last_names(replica) == []  # Копия в памяти еще старая
+        assert replica.poll_changes() == 1
+        assert last_names(replica) == ["Петров"] and events[0].external
+    finally:
+        other.close()
+
+
+def test_replica_follows_writes_of_other_connections(db_path):
+    replica = Database(db_path, in_memory=True)
+    other = Database(db_path)
+    try:
+        replica.add_contact(contact_row("Иванов", "Иван"), ["а"])
+        other.add_contact(contact_row("Петров", "Петр"))
+        # Без poll_changes: запись реплики сама догоняет чужой commit
+        replica.add_contact(contact_row("Сидоров", "Сидор"), ["б"])
+        connection = sqlite3.connect(db_path)
+        rows = connection.execute("""SELECT c.last_name, t.name FROM contact_tags ct
+                                     JOIN contacts c ON c.id = ct.contact_id
+                                     JOIN tags t ON t.id = ct.tag_id ORDER BY c.id""").fetchall()
+        connection.close()
+        assert rows == [("Иванов", "а"), ("Сидоров", "б")]
+        assert last_names(replica) == ["Иванов", "Петров", "Сидоров"]
+    finally:
+        other.close()
+        replica.close()
@@ -0,0 +1,119 @@
+import time
+
+import pytest
+
+from app.ui.scheduler import TaskScheduler, PRIORITY_HIGH, PRIORITY_LOW
+
+
+class Root:
+    """Вместо окна Tk: таймеры after() выполняет сам тест (run_timers)."""
+
+    def __init__(self):
+        self.timers = {}
+        self.errors = []
+        self._ids = iter(range(1, 10 ** 6))
+
+    def after(self, ms, callback):
+        timer = next(self._ids)
+        self.timers[timer] = callback
+        return timer
+
+    def after_cancel(self, timer):
+        self.timers.pop(timer, None)
+
+    def report_callback_exception(self, kind, value, traceback):
+        self.errors.append(value)
+
+    def run_timers(self, limit=1000):
+        for _ in range(limit):
+            if not self.timers:
+                return
+            self.timers.pop(min(self.timers))()
+        raise AssertionError("Задачи не завершились")
+
+
+# Шаг задачи дольше кванта в 1 мс
+STEP = 0.002
+
+
+@pytest.fixture
+def root():
+    return Root()
+
+
+def steps(log, name, count, sleep=0.0):
+    for i in range(count):
+        log.append(name)
+        time.sleep(sleep)
+        yield i + 1, count
+    return name
+
+
+def test_short_task_finishes_in_spawn(root):
+    done = []
+    TaskScheduler(root).spawn(steps([], "a", 3), on_done=done.append)
+    assert done == ["a"] and root.timers == {}
+
+
+def test_long_task_is_sliced(root):
+    scheduler = TaskScheduler(root, slice_ms=8)
+    log, progress = [], []
+    scheduler.spawn(steps(log, "a", 10, sleep=0.005), on_progress=progress.append)
+    # Квант 8 мс вмещает шаг-два, остальное — в следующих after()
+    assert 0 < len(log) < 10 and scheduler.busy() and root.timers
+    root.run_timers()
+    assert len(log) == 10 and progress[-1] == (10, 10) and not scheduler.busy()
+
+
+def test_priority_then_fifo(root):
+    scheduler = TaskScheduler(root, slice_ms=1)  # Один шаг за квант
+    log = []
+    scheduler.spawn(steps(log, "low", 2, STEP), priority=PRIORITY_LOW)
+    scheduler.spawn(steps(log, "normal", 2, STEP))
+    scheduler.spawn(steps(log, "high", 2, STEP), priority=PRIORITY_HIGH)
+    root.run_timers()
+    # Каждый spawn сразу делает шаг новой задачи, дальше — по приоритету
+    assert log == ["low", "normal", "high", "high", "normal", "low"]
+
+
+def test_same_key_replaces_task(root):
+    scheduler = TaskScheduler(root, slice_ms=1)
+    closed = []
+
+    def table(name):
+        try:
+            yield from steps([], name, 5, STEP)
+        finally:
+            closed.append(name)
+        return name
+
+    done = []
+    scheduler.spawn(table("old"), key="table", on_done=done.append)
+    scheduler.spawn(table("new"), key="table", on_done=done.append)
+    root.run_timers()
+    assert closed == ["old", "new"] and done == ["new"]
+    assert scheduler.get("table") is None
+
+
+def test_task_error_goes_to_on_error(root):
+    def broken():
+        yield
+        raise ValueError("сбой")
+
+    errors = []
+    TaskScheduler(root).spawn(broken(), on_error=errors.append)
+    assert [str(e) for e in errors] == ["сбой"] and root.errors == []
+
+
+def test_callback_error_does_not_stop_other_tasks(root):
+    scheduler = TaskScheduler(root, slice_ms=1)
+    log = []
+
+    def failing_progress(value):
+        raise RuntimeError("ошибка обработчика")
+
+    scheduler.spawn(steps(log, "a", 3, STEP), on_progress=failing_progress)
+    scheduler.spawn(steps(log, "b", 3, STEP))
+    root.run_timers()
+    assert log.count("a") == 3 and log.count("b") == 3
+    assert len(root.errors) == 3 and not scheduler.busy()
@@ -0,0 +1,72 @@
+import pytest
+
+from conftest import contact_row
+
+pytest.importorskip("numpy")
+
+from app import search_index  # noqa: E402
+
+PEOPLE = [
+    ("Иванов", "Иван", "+7 900 111-22-33", "ivanov@mail.ru", "Работа"),
+    ("Петрова", "Анна", "+7 900 444-55-66", "anna@test.ru", "Семья"),
+    ("Сидоров", "Петр", "8 812 000", "", "Работа"),
+    ("Смирнова", "Ольга", "", "olga@mail.ru", "Друзья"),
+]
+QUERIES = ["ив", "ИВАН", "900", "@mail", "работа", "ова", "о", "кузнецов", "50%"]
+
+
+@pytest.fixture
+def db(db):
+    for last_name, first_name, phone, email, category in PEOPLE:
+        db.add_contact(contact_row(last_name, first_name, phone_primary=phone,
+                                   email=email, category=category))
+    return db
+
+
+def results(db):
+    return {query: sorted(row[0] for row in db.get_contacts(query, search_mode="exact"))
+            for query in QUERIES}
+
+
+def test_index_matches_sql(db):
+    expected = results(db)
+    assert db.enable_search_index() is not None
+    assert results(db) == expected
+
+
+def test_index_follows_writes(db):
+    db.enable_search_index()
+    ids = {row[1]: row[0] for row in db.get_contacts()}
+    db.add_contact(contact_row("Кузнецов", "Олег", category="Работа"))
+    db.update_single_field(ids["Иванов"], "email", "ivan@work.ru")
+    db.delete_contacts([ids["Петрова"]])
+    category_id = next(i for i, name, _ in db.get_categories() if name == "Работа")
+    db.rename_category(category_id, "Офис")
+    with_index = results(db)
+    db.search_index = None  # Тот же запрос без индекса — обычным SQL
+    assert with_index == results(db)
+    assert with_index["кузнецов"] and not with_index["работа"]
+
+
+def test_frequent_substring_returns_complement(db):
+    index = db.enable_search_index()
+    hits = index.search("о")  # Есть почти у всех — короче список НЕ подошедших
+    matched = {row[0] for row in db.get_contacts("о", search_mode="exact")}
+    all_ids = {row[0] for row in db.get_contacts()}
+    assert hits.negated and set(hits.ids.tolist()) == all_ids - matched
+    assert not index.search("петров").negated
+
+
+def test_like_wildcards_fall_back_to_sql(db):
+    index = db.enable_search_index()
+    assert index.search("50%") is None and index.search("a_b") is None
+
+
+def test_new_values_are_packed_from_tail(db, monkeypatch):
+    monkeypatch.setattr(search_index, "TAIL_SIZE", 2)
+    index = db.enable_search_index()
+    segments = len(index.segments)
+    for i in range(5):
+        db.add_contact(contact_row(f"Новиков{i}", "Илья", email=f"n{i}@x.ru"))
+    assert len(index.segments) > segments and len(index.tail_values) < 2
+    assert len(db.get_contacts("новиков", search_mode="exact")) == 5
@@ -0,0 +1,120 @@
+from datetime import date, timedelta
+
+import pytest
+
+from conftest import contact_row
+from app import query_syntax, smart_groups
+from app.database import Database
+
+QUERY = "category:Клиенты -has:email"
+
+
+@pytest.fixture
+def db(db):
+    db.add_contact(contact_row("Иванов", "Иван", category="Клиенты"))
+    db.add_contact(contact_row("Петров", "Петр", category="Клиенты", email="p@test.ru"))
+    db.add_contact(contact_row("Сидоров", "Сидор", category="Семья"))
+    return db
+
+
+def add_group(db, query=QUERY, name="Без почты"):
+    assert db.groups.add(name, query) == (True, "Группа сохранена")
+    return db.groups.get_all()[-1][0]
+
+
+def members(db, search_id):
+    return sorted(row[1] for row in db.get_contacts(saved_search=search_id))
+
+
+def count(db, search_id):
+    return next(group[3] for group in db.groups.get_all() if group[0] == search_id)
+
+
+def test_group_members_and_count(db):
+    search_id = add_group(db)
+    assert members(db, search_id) == ["Иванов"] and count(db, search_id) == 1
+    # Группа сочетается с поиском
+    assert db.get_contacts("Петров", saved_search=search_id) == []
+
+
+def test_membership_follows_edits(db, monkeypatch):
+    search_id = add_group(db)
+    # Дальше — только проверка измененных строк, без полного пересчета
+    monkeypatch.setattr(smart_groups.SmartGroups, "_rebuild", None)
+    ids = {row[1]: row[0] for row in db.get_contacts()}
+    db.update_single_field(ids["Петров"], "email", "")
+    db.update_single_field(ids["Иванов"], "email", "i@test.ru")
+    db.add_contact(contact_row("Кузнецов", "Олег", category="Клиенты"))
+    assert members(db, search_id) == ["Кузнецов", "Петров"] and count(db, search_id) == 2
+    db.delete_contacts([ids["Петров"]])
+    assert members(db, search_id) == ["Кузнецов"] and count(db, search_id) == 1
+
+
+def test_category_rename_rebuilds(db):
+    search_id = add_group(db)
+    category_id = next(i for i, name, _ in db.get_categories() if name == "Клиенты")
+    db.rename_category(category_id, "Заказчики")
+    # Условие ссылается на старое имя — группа пустеет
+    assert members(db, search_id) == [] and count(db, search_id) == 0
+
+
+def test_changes_made_by_other_connection(db, db_path):
+    search_id = add_group(db)
+    other = Database(db_path)
+    try:
+        other.add_contact(contact_row("Кузнецов", "Олег", category="Клиенты"))
+    finally:
+        other.close()
+    db.poll_changes()
+    assert members(db, search_id) == ["Иванов", "Кузнецов"]
+
+
+def test_group_catches_up_after_reopen(db, db_path):
+    search_id = add_group(db)
+    db.close()
+    other = Database(db_path)
+    other.add_contact(contact_row("Кузнецов", "Олег", category="Клиенты"))
+    other.close()
+    db.__init__(db_path)  # Программа снова открыта: правки, сделанные без нее
+    assert members(db, search_id) == ["Иванов", "Кузнецов"]
+
+
+def test_full_rebuild_when_log_was_compacted(db, db_path, monkeypatch):
+    search_id = add_group(db)
+    monkeypatch.setattr(smart_groups.SmartGroups, "_evaluate", None)
+    other = Database(db_path)
+    try:
+        other.add_contact(contact_row("Кузнецов", "Олег", category="Клиенты"))
+        other.cursor.execute(
+            "UPDATE change_log SET changed_at = datetime('now', 'localtime', '-40 days')")
+        other.compact_change_log(keep_days=30)
+    finally:
+        other.close()
+    # Записи о правке уже удалены — состав пересчитывается целиком
+    assert members(db, search_id) == ["Иванов", "Кузнецов"] and count(db, search_id) == 2
+
+
+def test_relative_date_group_is_recomputed_next_day(db, monkeypatch):
+    search_id = add_group(db, "modified:today", "Сегодня")
+    assert count(db, search_id) == 3
+
+    class Tomorrow(date):
+        @classmethod
+        def today(cls):
+            return date.today() + timedelta(days=1)
+
+    # Часы и у групп, и у языка запросов
+    monkeypatch.setattr(smart_groups, "date", Tomorrow)
+    monkeypatch.setattr(query_syntax, "date", Tomorrow)
+    assert members(db, search_id) == []
+
+
+def test_rename_and_delete(db):
+    search_id = add_group(db)
+    assert db.groups.rename(search_id, "  Клиенты  без почты ") == (True, "Группа переименована")
+    assert db.groups.get_all()[0][1] == "Клиенты без почты"
+    assert db.groups.add("", QUERY)[0] is False
+    assert db.groups.delete(search_id)
+    assert db.groups.get_all() == []
+    db.cursor.execute("SELECT COUNT(*) FROM saved_search_members")
+    assert db.cursor.fetchone()[0] == 0
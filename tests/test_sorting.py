@@ -0,0 +1,37 @@
+from conftest import contact_row
+from app.text_keys import name_sort_key
+
+
+def test_russian_alphabet_order():
+    names = ["Еловая", "Ёлкин", "Елкин", "елкин", "Абрамов", "Яковлев"]
+    ordered = sorted(names, key=lambda name: name_sort_key(name, ""))
+    # ё = е на первом уровне; при равенстве е раньше ё, строчные раньше заглавных
+    assert ordered == ["Абрамов", "елкин", "Елкин", "Ёлкин", "Еловая", "Яковлев"]
+
+
+def test_shorter_last_name_goes_first():
+    assert name_sort_key("Иван", "Петр") < name_sort_key("Иванов", "Анна")
+    assert name_sort_key("Иванов", "Анна") < name_sort_key("Иванов", "Анна", "Петровна")
+
+
+def test_get_contacts_orders_by_sort_key(db):
+    for last_name, first_name in [("Ёлкин", "Петр"), ("Елкин", "Иван"), ("Абрамов", "Олег"), ("Елкин", "Анна")]:
+        db.add_contact(contact_row(last_name, first_name))
+    names = [(row[1], row[2]) for row in db.get_contacts()]
+    assert names == [("Абрамов", "Олег"), ("Елкин", "Анна"), ("Елкин", "Иван"), ("Ёлкин", "Петр")]
+    assert [row[1:3] for row in db.get_contacts(sort_by="По ФИО (Я-А)")] == names[::-1]
+
+
+def test_sort_key_follows_edits(db):
+    db.add_contact(contact_row("Яковлев", "Яков"))
+    db.add_contact(contact_row("Борисов", "Борис"))
+    contact_id = db.get_contacts()[1][0]
+    db.update_single_field(contact_id, "last_name", "Алексеев")
+    assert [row[1] for row in db.get_contacts()] == ["Алексеев", "Борисов"]
+
+
+def test_name_order_reads_the_index(db):
+    # ORDER BY идет по индексу, без сортировки всей выборки в памяти
+    db.cursor.execute("EXPLAIN QUERY PLAN SELECT * FROM contact_rows ORDER BY name_sort_key, id")
+    plan = " ".join(row[-1] for row in db.cursor.fetchall())
+    assert "idx_contacts_name_sort" in plan and "TEMP B-TREE" not in plan
@@ -0,0 +1,99 @@
+import pytest
+
+from conftest import contact_row
+from app.database import Database
+from app.tags import TagFilter, bitmap_from_ids, ids_from_bitmap, parse_tags
+
+PEOPLE = [("Иванов", ["работа", "дача"]), ("Петров", ["работа"]),
+          ("Сидоров", ["дача", "важное"]), ("Смирнов", [])]
+
+
+@pytest.fixture
+def db(db):
+    for last_name, tags in PEOPLE:
+        db.add_contact(contact_row(last_name, "Имя"), tags)
+    return db
+
+
+def names(db, *include, exclude=(), match_all=True):
+    rows = db.get_contacts(tag_filter=TagFilter(include, exclude, match_all))
+    return sorted(row[1] for row in rows)
+
+
+def tag_id(db, name):
+    return next(i for i, tag in db.get_tags() if tag == name)
+
+
+def test_parse_tags():
+    assert parse_tags(" Работа,  дача ,работа,, Важное  дело") == ["Работа", "дача", "Важное дело"]
+
+
+def test_bitmap_round_trip():
+    ids = [1, 7, 8, 64, 1000]
+    assert ids_from_bitmap(bitmap_from_ids(ids)) == ids
+    assert bitmap_from_ids([]) == 0
+
+
+def test_filter_all_any_and_exclude(db):
+    assert names(db, "работа", "дача") == ["Иванов"]
+    assert names(db, "работа", "дача", match_all=False) == ["Иванов", "Петров", "Сидоров"]
+    assert names(db, exclude=("дача",)) == ["Петров", "Смирнов"]
+    assert names(db, "Работа", exclude=("ДАЧА",)) == ["Петров"]  # Без учета регистра
+    assert names(db, "нет такого") == []
+    # Фильтр сочетается с поиском
+    rows = db.get_contacts("Иван", tag_filter=TagFilter(("дача",)))
+    assert [row[1] for row in rows] == ["Иванов"]
+
+
+def test_tag_filter_in_search_query(db):
+    assert sorted(row[1] for row in db.get_contacts("tag:работа -tag:дача")) == ["Петров"]
+
+
+def test_counts_follow_changes(db):
+    assert db.tags.counts() == {"работа": 2, "дача": 2, "важное": 1}
+    ids = {row[1]: row[0] for row in db.get_contacts()}
+    db.set_contact_tags(ids["Смирнов"], ["важное"])
+    db.delete_contacts([ids["Иванов"]])
+    assert db.tags.counts() == {"работа": 1, "дача": 1, "важное": 2}
+
+
+def test_rename_tag(db):
+    assert db.rename_tag(tag_id(db, "дача"), "Загород") == (True, "Тег переименован")
+    assert names(db, "загород") == ["Иванов", "Сидоров"] and names(db, "дача") == []
+    ok, message = db.rename_tag(tag_id(db, "Загород"), "РАБОТА")
+    assert not ok and "уже есть" in message
+    assert db.rename_tag(tag_id(db, "важное"), "  ")[0] is False
+
+
+def test_delete_tag(db):
+    names(db, "работа")  # Карты загружены — дальше обновляются по уведомлениям
+    assert db.delete_tag(tag_id(db, "работа"))
+    assert names(db, "работа") == []
+    ivanov = db.get_contacts("Иванов")[0][0]
+    assert db.get_contact_tags(ivanov) == ["дача"]
+
+
+def test_tags_of_other_connection(db, db_path):
+    names(db, "работа")
+    other = Database(db_path)
+    try:
+        smirnov = other.get_contacts("Смирнов")[0][0]
+        other.set_contact_tags(smirnov, ["работа"])
+    finally:
+        other.close()
+    db.poll_changes()
+    assert names(db, "работа") == ["Иванов", "Петров", "Смирнов"]
+
+
+def test_new_tag_event_follows_the_contact_write(db):
+    seen = []
+
+    def listener(event):
+        if event.table == "tags":
+            db.cursor.execute("SELECT COUNT(*) FROM contact_tags")
+            seen.append((event.action, db.cursor.fetchone()[0]))
+
+    db.add_listener(listener)
+    db.add_contact(contact_row("Кузнецов", "Олег"), ["новый"])
+    # Подписчики узнают о теге, когда связь с контактом уже записана
+    assert seen == [("insert", 6)]
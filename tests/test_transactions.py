@@ -0,0 +1,111 @@
+import sqlite3
+
+import pytest
+
+from conftest import contact_row
+from app.database import Database
+
+
+def last_names(db):
+    db.cursor.execute("SELECT last_name FROM contacts ORDER BY id")
+    return [row[0] for row in db.cursor.fetchall()]
+
+
+def disk_last_names(path):
+    """Что уже зафиксировано в файле (отдельное соединение не видит чужую транзакцию)."""
+    connection = sqlite3.connect(path)
+    try:
+        return [row[0] for row in connection.execute("SELECT last_name FROM contacts ORDER BY id")]
+    finally:
+        connection.close()
+
+
+class Boom(Exception):
+    pass
+
+
+def test_transaction_commits_once(db, db_path):
+    with db.transaction():
+        db.add_contact(contact_row("Иванов", "Иван"))
+        db.add_contact(contact_row("Петров", "Петр"))
+        assert disk_last_names(db_path) == []
+    assert disk_last_names(db_path) == ["Иванов", "Петров"]
+
+
+def test_nested_failure_rolls_back_only_inner_block(db):
+    with db.transaction():
+        db.add_contact(contact_row("Иванов", "Иван"))
+        with pytest.raises(Boom):
+            with db.transaction():
+                db.add_contact(contact_row("Петров", "Петр"))
+                raise Boom
+        db.add_contact(contact_row("Сидоров", "Сидор"))
+    assert last_names(db) == ["Иванов", "Сидоров"]
+
+
+def test_outer_failure_rolls_back_everything(db):
+    with pytest.raises(Boom):
+        with db.transaction():
+            db.add_contact(contact_row("Иванов", "Иван"))
+            with db.transaction():
+                db.add_contact(contact_row("Петров", "Петр"))
+            raise Boom
+    assert last_names(db) == []
+
+
+def test_events_wait_for_commit_and_drop_on_rollback(db):
+    events = []
+    db.add_listener(events.append)
+    with db.transaction():
+        db.add_contact(contact_row("Иванов", "Иван"))
+        with pytest.raises(Boom):
+            with db.transaction():
+                db.add_contact(contact_row("Петров", "Петр"))
+                raise Boom
+        assert events == []
+    assert [(e.table, e.action) for e in events] == [("contacts", "insert")]
+
+
+@pytest.fixture
+def grouped_db(db):
+    """База с групповым commit: отложенный flush вызывается тестом вручную."""
+    timers = []
+    db.enable_group_commit(200, lambda ms, callback: timers.append(callback))
+    db.timers = timers
+    return db
+
+
+def test_group_commit_defers_flush(grouped_db, db_path):
+    grouped_db.add_contact(contact_row("Иванов", "Иван"))
+    grouped_db.add_contact(contact_row("Петров", "Петр"))
+    assert disk_last_names(db_path) == []
+    assert len(grouped_db.timers) == 1  # Одно окно на серию правок
+    grouped_db.timers.pop()()
+    assert disk_last_names(db_path) == ["Иванов", "Петров"]
+
+
+def test_failed_crud_call_under_group_commit_leaves_no_trace(grouped_db, db_path, monkeypatch):
+    db = grouped_db
+    db.add_contact(contact_row("Иванов", "Иван"), ["друзья"])
+    contact_id = db.get_contacts()[0][0]
+
+    def broken(*args):
+        raise sqlite3.OperationalError("сбой записи истории")
+
+    # Правка пишет контакт, новую категорию, теги и падает на истории
+    monkeypatch.setattr(db, "_record_history", broken)
+    ok, _ = db.update_contact(
+        contact_id, contact_row("Петров", "Иван", category="Новая категория"), ["коллеги"])
+    assert not ok
+    monkeypatch.undo()
+
+    assert last_names(db) == ["Иванов"]
+    assert db.get_contact_tags(contact_id) == ["друзья"]
+    assert "Новая категория" not in db.get_category_names()
+    assert [name for _, name in db.get_tags()] == ["друзья"]
+
+    # Успешная правка до сбоя осталась и уходит на диск при flush
+    for callback in db.timers:
+        callback()
+    assert disk_last_names(db_path) == ["Иванов"]
+
@@ -0,0 +1,64 @@
+import time
+import tkinter as tk
+
+import pytest
+
+from app.ui.watchdog import UiWatchdog, handler_name
+
+
+class Root:
+    """Вместо окна Tk: таймеры after() записываются и вызываются тестом."""
+
+    def __init__(self):
+        self.timers = []
+
+    def after(self, ms, callback):
+        self.timers.append(callback)
+
+
+class Panel:
+    def refresh(self):
+        pass
+
+
+def slow_handler():
+    time.sleep(0.4)
+
+
+@pytest.fixture
+def watchdog():
+    watchdog = UiWatchdog(Root(), stall_ms=100)
+    original = tk.CallWrapper.__call__
+    watchdog.start()
+    yield watchdog
+    watchdog.stop()
+    assert tk.CallWrapper.__call__ is original
+
+
+def test_handler_names():
+    assert handler_name(Panel().refresh) == "Panel.refresh"
+    assert handler_name(slow_handler) == "slow_handler"
+
+
+def test_stall_is_attributed_to_the_handler(watchdog):
+    tk.CallWrapper(Panel().refresh, None, None)()
+    tk.CallWrapper(slow_handler, None, None)()
+    report = watchdog.report()
+    assert report["handlers"]["slow_handler"]["max_ms"] >= 400
+    assert report["handlers"]["Panel.refresh"]["count"] == 1
+    (stall,) = report["stalls"]
+    assert stall["handler"] == "slow_handler" and stall["ms"] >= 100
+    # Стек главного потока снят во время зависания — видно, где оно
+    assert any("slow_handler" in line for line in stall["stack"])
+    assert report["stalls_by_handler"]["slow_handler"]["count"] == 1
+
+
+def test_heartbeat_measures_loop_delay(watchdog):
+    beat = watchdog.root.timers.pop()
+    time.sleep(0.1)
+    beat()
+    assert watchdog.heartbeat.count == 1 and watchdog.heartbeat.max_ms >= 40
+    assert watchdog.root.timers == [beat]  # Следующий пульс запланирован
+    watchdog.stop()
+    watchdog.root.timers.pop()()
+    assert watchdog.root.timers == []  # После stop пульс не продолжается
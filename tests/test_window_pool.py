@@ -0,0 +1,111 @@
+from types import SimpleNamespace
+
+import pytest
+
+from app.ui import main_window
+from app.ui.main_window import ContactApp
+
+
+class Window:
+    """Вместо Toplevel: окно формы или просмотра с состоянием "показано/спрятано"."""
+
+    def __init__(self, parent, db, *args, contact_id=None, pooled=False, **kwargs):
+        # Форма: (parent, db, refresh, contact_id=...); просмотр: (parent, db, contact_id, ...)
+        self.contact_id = args[0] if args and not callable(args[0]) else contact_id
+        self.pooled = pooled
+        self.shown = True
+        self.exists = True
+        self.reused = 0
+        Window.created.append(self)
+
+    def winfo_exists(self):
+        return self.exists
+
+    def is_shown(self):
+        return self.exists and self.shown
+
+    def open_for(self, contact_id=None, refresh_callback=None):
+        self.contact_id, self.shown = contact_id, True
+        self.reused += 1
+
+    show_contact = open_for
+
+    def close(self):
+        if self.pooled:
+            self.shown = False
+        else:
+            self.exists = False
+
+    def destroy(self):
+        self.exists = False
+
+
+class Var:
+    def __init__(self, value):
+        self.value = value
+
+    def get(self):
+        return self.value
+
+
+@pytest.fixture
+def app(monkeypatch):
+    Window.created = []
+    monkeypatch.setattr(main_window, "ContactFormWindow", Window)
+    monkeypatch.setattr(main_window, "ViewContactWindow", Window)
+    app = SimpleNamespace(root=None, db=None, photos=None, pool_windows_var=Var(True),
+                          form_window=None, current_view_window=None, selected_ids=set(),
+                          refresh_table_with_filter=lambda: None,
+                          open_edit_from_view=None, remove_contacts=None)
+    for name in ("open_form", "view_contact", "toggle_window_pool"):
+        setattr(app, name, getattr(ContactApp, name).__get__(app))
+    return app
+
+
+def test_hidden_form_is_reused(app):
+    app.open_form(1)
+    form = app.form_window
+    form.close()
+    app.open_form(2)  # Спрятанная форма показывается снова, без создания виджетов
+    assert Window.created == [form] and form.pooled
+    assert (form.contact_id, form.reused, form.shown) == (2, 1, True)
+
+
+def test_shown_form_is_not_taken_from_pool(app):
+    app.open_form(1)
+    app.open_form(2)  # Первая форма еще открыта — ее правки не трогаем
+    pooled, extra = Window.created
+    assert (pooled.contact_id, pooled.reused) == (1, 0)
+    assert extra.contact_id == 2 and not extra.pooled
+
+
+def test_view_window_is_reused(app):
+    app.selected_ids = {1}
+    app.view_contact()
+    view = app.current_view_window
+    view.close()
+    app.selected_ids = {2}
+    app.view_contact()
+    assert Window.created == [view] and view.contact_id == 2 and view.shown
+
+
+def test_without_pool_windows_are_destroyed(app):
+    app.pool_windows_var.value = False
+    app.open_form(1)
+    app.open_form(2)
+    assert [w.pooled for w in Window.created] == [False, False] and app.form_window is None
+
+
+def test_switching_pool_off(app):
+    app.open_form(1)
+    app.form_window.close()  # Спрятана в пуле
+    app.selected_ids = {1}
+    app.view_contact()  # На экране
+    form, view = Window.created
+    app.pool_windows_var.value = False
+    app.toggle_window_pool()
+    assert not form.exists and app.form_window is None
+    # Открытое окно остается, но при закрытии уничтожится
+    assert view.exists and not view.pooled
+    view.close()
+    assert not view.exists